@@ -0,0 +1 @@
+# Analytics service package
\ No newline at end of file
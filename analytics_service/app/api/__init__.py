@@ -0,0 +1 @@
+# Export analytics router
\ No newline at end of file
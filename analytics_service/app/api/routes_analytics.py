@@ -0,0 +1,38 @@
+"""
+API routes for the analytics service.
+"""
+
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+
+from ..database import get_db
+from ..events.consumer import analytics_consumer
+from ..schemas.analytics import AtRiskStudentOut, DashboardOut, StudentWorkshopStatsOut
+from ..services import analytics_service, risk
+
+router = APIRouter(tags=["analytics"])
+
+
+@router.get("/dashboard", response_model=DashboardOut)
+def dashboard_route(workshop_id: int = Query(...), db: Session = Depends(get_db)):
+    return analytics_service.get_dashboard(db, workshop_id)
+
+
+@router.get("/students/{user_id}", response_model=List[StudentWorkshopStatsOut])
+def student_stats_route(user_id: int, db: Session = Depends(get_db)):
+    return analytics_service.get_student_stats(db, user_id)
+
+
+@router.get("/at-risk", response_model=List[AtRiskStudentOut])
+def at_risk_route(
+    limit: int = Query(50, ge=1, le=risk.RISK_TOP_K),
+    workshop_id: Optional[int] = Query(None),
+):
+    return risk.risk_engine.at_risk(limit, workshop_id)
+
+
+@router.get("/metrics/consumer")
+def consumer_metrics_route():
+    return analytics_consumer.metrics()
@@ -0,0 +1,152 @@
+"""
+Kafka consumer feeding the analytics aggregates.
+
+Workers join the `analytics_service` consumer group, so Kafka spreads the
+topic partitions across every worker of every replica.  Events are keyed
+by `user_id`, which keeps each student's events on one partition and
+therefore in order, with a single writer for that student's rows.
+
+Each worker loops over micro-batches: poll up to `batch_size` records,
+decode them, fold them into the aggregates in one transaction, commit it
+and only then commit the Kafka offsets.  A crash between the two commits
+redelivers the batch, which the idempotent aggregator absorbs.
+"""
+
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from sukhverse_common.events import serializers
+from sukhverse_common.events.registry import SchemaError
+
+from .. import database
+from ..services.aggregator import TOPICS, Event, apply_events
+
+logger = logging.getLogger(__name__)
+
+CONSUMER_ENABLED = os.getenv("ANALYTICS_CONSUMER_ENABLED", "true").lower() == "true"
+CONSUMER_GROUP = os.getenv("ANALYTICS_CONSUMER_GROUP", "analytics_service")
+WORKERS = int(os.getenv("ANALYTICS_CONSUMER_WORKERS", "1"))
+BATCH_SIZE = int(os.getenv("ANALYTICS_BATCH_SIZE", "5000"))
+
+
+def decode_records(records: List[Any]) -> List[Event]:
+    """Turn consumed records into `(topic, payload, time)`, skipping undecodable ones."""
+    events: List[Event] = []
+    for record in records:
+        try:
+            payload = serializers.decode(record.value, record.headers, record.topic)
+        except (SchemaError, ValueError):
+            logger.exception("Skipping undecodable %s record at offset %s", record.topic, record.offset)
+            continue
+        events.append((record.topic, payload, datetime.utcfromtimestamp(record.timestamp / 1000)))
+    return events
+
+
+class AnalyticsConsumer:
+    """Pool of consumer-group workers applying event micro-batches."""
+
+    def __init__(
+        self,
+        workers: int = WORKERS,
+        batch_size: int = BATCH_SIZE,
+        poll_timeout_ms: int = 500,
+        retry_seconds: float = 5.0,
+        session_factory: Optional[Callable[[], Session]] = None,
+    ) -> None:
+        self.workers = workers
+        self.batch_size = batch_size
+        self.poll_timeout_ms = poll_timeout_ms
+        self.retry_seconds = retry_seconds
+        self.session_factory = session_factory or (lambda: database.SessionLocal())
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._events = 0
+        self._batches = 0
+        self._busy_seconds = 0.0
+
+    def _connect(self) -> Any:
+        from kafka import KafkaConsumer
+
+        return KafkaConsumer(
+            *TOPICS,
+            bootstrap_servers=os.getenv("KAFKA_BOOTSTRAP_SERVERS", "kafka:9092"),
+            group_id=CONSUMER_GROUP,
+            enable_auto_commit=False,
+            auto_offset_reset="earliest",
+            max_poll_records=self.batch_size,
+        )
+
+    def process_batch(self, consumer: Any) -> int:
+        """Poll one micro-batch from `consumer`, apply it and commit; return its size."""
+        batches = consumer.poll(timeout_ms=self.poll_timeout_ms, max_records=self.batch_size)
+        records = [record for partition_records in batches.values() for record in partition_records]
+        if not records:
+            return 0
+        started = time.perf_counter()
+        db = self.session_factory()
+        try:
+            apply_events(db, decode_records(records))
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        consumer.commit()
+        with self._lock:
+            self._events += len(records)
+            self._batches += 1
+            self._busy_seconds += time.perf_counter() - started
+        return len(records)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                consumer = self._connect()
+            except Exception:
+                logger.exception("Analytics consumer could not connect; retrying")
+                self._stop.wait(self.retry_seconds)
+                continue
+            try:
+                while not self._stop.is_set():
+                    self.process_batch(consumer)
+            except Exception:
+                # Closing without committing rewinds this member's partitions
+                # to the last committed offsets.
+                logger.exception("Analytics consumer failed; reconnecting")
+                self._stop.wait(self.retry_seconds)
+            finally:
+                consumer.close()
+
+    def start(self) -> None:
+        if CONSUMER_ENABLED and not self._threads:
+            self._stop.clear()
+            for index in range(self.workers):
+                thread = threading.Thread(target=self._run, name=f"analytics-consumer-{index}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self) -> None:
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout=10)
+        self._threads = []
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "workers": len(self._threads),
+                "events": self._events,
+                "batches": self._batches,
+                "events_per_busy_second": round(self._events / self._busy_seconds) if self._busy_seconds else None,
+            }
+
+
+analytics_consumer = AnalyticsConsumer()
@@ -0,0 +1,36 @@
+"""
+Entrypoint for the analytics microservice.
+"""
+
+from fastapi import FastAPI
+from fastapi.middleware.cors import CORSMiddleware
+
+from .database import engine
+from .models.base import Base
+from .api.routes_analytics import router as analytics_router
+from .events.consumer import analytics_consumer
+from .services import risk
+
+
+def init_db() -> None:
+    Base.metadata.create_all(bind=engine)
+
+
+def create_app() -> FastAPI:
+    app = FastAPI(title="Analytics Service", version="0.1.0")
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    init_db()
+    app.include_router(analytics_router)
+    app.add_event_handler("startup", analytics_consumer.start)
+    app.add_event_handler("startup", risk.risk_engine.start)
+    app.add_event_handler("shutdown", risk.risk_engine.stop)
+    app.add_event_handler("shutdown", analytics_consumer.stop)
+    return app
+
+
+app = create_app()
\ No newline at end of file
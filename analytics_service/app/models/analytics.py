@@ -0,0 +1,61 @@
+"""
+SQLAlchemy models for the analytics service.
+
+The service never stores raw events.  It keeps running aggregates that the
+event consumer updates incrementally, so dashboard reads are key lookups.
+"""
+
+from sqlalchemy import Boolean, Column, DateTime, Float, Integer
+
+from .base import Base
+
+
+class WorkshopStats(Base):
+    """Per-workshop totals."""
+
+    __tablename__ = "workshop_stats"
+    workshop_id = Column(Integer, primary_key=True)
+    total_substeps = Column(Integer, nullable=False, default=0)
+    quiz_attempts = Column(Integer, nullable=False, default=0)
+    quiz_score_sum = Column(Integer, nullable=False, default=0)
+    last_activity = Column(DateTime(timezone=False), nullable=True)
+
+
+class StudentWorkshopStats(Base):
+    """Per-student, per-workshop progress and quiz totals.
+
+    The primary key leads with `workshop_id` so a workshop's dashboard is
+    one range read.
+    """
+
+    __tablename__ = "student_workshop_stats"
+    workshop_id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, primary_key=True, index=True)
+    completed_substeps = Column(Integer, nullable=False, default=0)
+    quiz_attempts = Column(Integer, nullable=False, default=0)
+    quiz_score_sum = Column(Integer, nullable=False, default=0)
+    quiz_failed = Column(Integer, nullable=False, default=0)
+    quiz_passed = Column(Boolean, nullable=True)  # outcome of the latest attempt
+    quiz_score_ewm = Column(Float, nullable=True)  # rolling (exponentially weighted) quiz average
+    first_activity = Column(DateTime(timezone=False), nullable=True)
+    last_activity = Column(DateTime(timezone=False), nullable=True)
+    last_step_activity = Column(DateTime(timezone=False), nullable=True)
+    # Lets the risk engine reload only rows changed since its last pass.
+    updated_at = Column(DateTime(timezone=False), nullable=True, index=True)
+
+
+class SubstepState(Base):
+    """Latest known status of each substep, used to count completions once."""
+
+    __tablename__ = "substep_states"
+    user_id = Column(Integer, primary_key=True)
+    workshop_id = Column(Integer, primary_key=True)
+    substep_id = Column(Integer, primary_key=True)
+    completed = Column(Boolean, nullable=False, default=False)
+
+
+class ProcessedQuizResult(Base):
+    """Quiz results already counted, so redelivered events are skipped."""
+
+    __tablename__ = "processed_quiz_results"
+    result_id = Column(Integer, primary_key=True)
@@ -0,0 +1 @@
+# Aggregate analytics schemas
\ No newline at end of file
@@ -0,0 +1,51 @@
+"""
+Pydantic models for the analytics service.
+"""
+
+from datetime import datetime
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+
+class CompletionOut(BaseModel):
+    user_id: int
+    percent_complete: float
+    completed_substeps: int
+    last_activity: Optional[datetime] = None
+
+
+class QuizScoreOut(BaseModel):
+    user_id: int
+    average_score: float
+    pass_fail: bool
+    attempts: int
+
+
+class DashboardOut(BaseModel):
+    workshop_id: int
+    total_substeps: int
+    active_students: int
+    average_score: Optional[float] = None
+    last_activity: Optional[datetime] = None
+    completion: List[CompletionOut]
+    quiz_scores: List[QuizScoreOut]
+
+
+class StudentWorkshopStatsOut(BaseModel):
+    workshop_id: int
+    percent_complete: float
+    completed_substeps: int
+    average_score: Optional[float] = None
+    quiz_attempts: int
+    last_activity: Optional[datetime] = None
+
+
+class AtRiskStudentOut(BaseModel):
+    user_id: int
+    workshop_id: int
+    risk_score: float
+    reason: str
+    percent_complete: float
+    quiz_average: Optional[float] = None
+    failed_attempts: int
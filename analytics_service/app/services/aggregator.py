@@ -0,0 +1,244 @@
+"""
+Incremental aggregation of learning events.
+
+`apply_events` folds one micro-batch of decoded events into the aggregate
+tables with a fixed number of set-based statements, whatever the batch
+size: a couple of lookups for the state the batch depends on, then one
+bulk upsert per table that adds the batch's deltas to the stored totals.
+
+Events are delivered at least once, so every step is idempotent: substep
+completions are counted from state transitions, and quiz results are
+skipped when their `result_id` has been seen before.
+
+Alongside the dashboard totals each student row carries the inputs of the
+at-risk model in `risk`: first and last progress times, failed attempts
+and an exponentially weighted quiz average.
+"""
+
+import os
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+
+from sukhverse_common.substeps import StudentKey, SubstepKey, chunks, count_transitions, upsert_insert
+
+from ..models.analytics import ProcessedQuizResult, StudentWorkshopStats, SubstepState, WorkshopStats
+
+TOPICS = ("workshop_created", "step_completed", "step_updated", "quiz_submitted")
+
+# Weight of the newest attempt in the rolling quiz average.
+QUIZ_EWM_ALPHA = float(os.getenv("QUIZ_EWM_ALPHA", "0.3"))
+
+# (topic, payload, event time); replayed quiz results have no time.
+Event = Tuple[str, Dict, Optional[datetime]]
+
+
+class _Delta:
+    __slots__ = (
+        "completed", "attempts", "score_sum", "failed", "passed", "scores",
+        "first_activity", "last_activity", "last_step_activity",
+    )
+
+    def __init__(self) -> None:
+        self.completed = 0
+        self.attempts = 0
+        self.score_sum = 0
+        self.failed = 0
+        self.passed: Optional[bool] = None
+        self.scores: List[int] = []
+        self.first_activity: Optional[datetime] = None
+        self.last_activity: Optional[datetime] = None
+        self.last_step_activity: Optional[datetime] = None
+
+    def touch(self, at: datetime) -> None:
+        if self.last_activity is None or at > self.last_activity:
+            self.last_activity = at
+        if self.first_activity is None or at < self.first_activity:
+            self.first_activity = at
+
+    def touch_step(self, at: datetime) -> None:
+        self.touch(at)
+        if self.last_step_activity is None or at > self.last_step_activity:
+            self.last_step_activity = at
+
+
+def _later(column, excluded):
+    """SQL for whichever of the stored and incoming timestamps is later."""
+    return case((column.is_(None), excluded), (excluded > column, excluded), else_=column)
+
+
+def _seen_results(db: Session, result_ids: List[int]) -> Set[int]:
+    seen: Set[int] = set()
+    for chunk in chunks(result_ids):
+        rows = db.query(ProcessedQuizResult.result_id).filter(ProcessedQuizResult.result_id.in_(chunk))
+        seen.update(result_id for (result_id,) in rows)
+    return seen
+
+
+def _quiz_averages(db: Session, keys: List[StudentKey]) -> Dict[StudentKey, Optional[float]]:
+    # Filtering on the indexed user_id alone compiles far cheaper than a
+    # tuple IN; the few rows for other workshops are dropped here.
+    wanted = set(keys)
+    user_ids = sorted({user_id for _, user_id in keys})
+    averages: Dict[StudentKey, Optional[float]] = {}
+    for chunk in chunks(user_ids):
+        rows = db.query(
+            StudentWorkshopStats.workshop_id, StudentWorkshopStats.user_id, StudentWorkshopStats.quiz_score_ewm
+        ).filter(StudentWorkshopStats.user_id.in_(chunk), StudentWorkshopStats.quiz_score_ewm.isnot(None))
+        averages.update(((workshop_id, user_id), ewm) for workshop_id, user_id, ewm in rows if (workshop_id, user_id) in wanted)
+    return averages
+
+
+def apply_events(db: Session, events: Iterable[Event]) -> int:
+    """Fold `events` into the aggregates without committing; return how many were applied."""
+    totals: Dict[int, int] = {}
+    substeps: Dict[SubstepKey, bool] = {}
+    quizzes: List[Event] = []
+    students: Dict[StudentKey, _Delta] = defaultdict(_Delta)
+    applied = 0
+
+    for topic, event, at in events:
+        if topic == "workshop_created":
+            if event.get("total_substeps") is not None:
+                totals[event["workshop_id"]] = event["total_substeps"]
+        elif topic in ("step_completed", "step_updated"):
+            # Within a batch the last status of a substep wins.
+            substeps[(event["user_id"], event["workshop_id"], event["substep_id"])] = event["status"] == "completed"
+            students[(event["workshop_id"], event["user_id"])].touch_step(at)
+        elif topic == "quiz_submitted":
+            quizzes.append((topic, event, at))
+        else:
+            continue
+        applied += 1
+
+    for key, change in count_transitions(db, SubstepState, substeps).items():
+        students[key].completed += change
+
+    if quizzes:
+        result_ids = [event["result_id"] for _, event, _ in quizzes if event.get("result_id") is not None]
+        seen = _seen_results(db, result_ids)
+        fresh = []
+        for _, event, at in quizzes:
+            result_id = event.get("result_id")
+            if result_id is not None:
+                if result_id in seen:
+                    continue
+                seen.add(result_id)
+                fresh.append({"result_id": result_id})
+            # Scores are only aggregated for quizzes linked to a workshop.
+            if event.get("workshop_id") is None:
+                continue
+            delta = students[(event["workshop_id"], event["user_id"])]
+            delta.attempts += 1
+            delta.score_sum += event["score"]
+            delta.failed += not event["pass_fail"]
+            delta.passed = event["pass_fail"]
+            delta.scores.append(event["score"])
+            if at is not None:
+                delta.touch(at)
+        if fresh:
+            db.execute(ProcessedQuizResult.__table__.insert(), fresh)
+
+    if totals:
+        stmt = upsert_insert(db)(WorkshopStats.__table__)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[WorkshopStats.workshop_id],
+            set_={"total_substeps": stmt.excluded.total_substeps},
+        )
+        db.execute(
+            stmt,
+            [
+                {
+                    "workshop_id": workshop_id,
+                    "total_substeps": total,
+                    "quiz_attempts": 0,
+                    "quiz_score_sum": 0,
+                }
+                for workshop_id, total in totals.items()
+            ],
+        )
+
+    if students:
+        _upsert_students(db, students)
+    return applied
+
+
+def _upsert_students(db: Session, students: Dict[StudentKey, _Delta]) -> None:
+    # The rolling average depends on the stored one, so it is read first.
+    # Each student's events come from one partition, so nothing else
+    # writes the row in between.
+    quiz_takers = [key for key, delta in students.items() if delta.scores]
+    averages = _quiz_averages(db, quiz_takers) if quiz_takers else {}
+    workshops: Dict[int, _Delta] = defaultdict(_Delta)
+    now = datetime.utcnow()
+    rows = []
+    for (workshop_id, user_id), delta in students.items():
+        ewm = averages.get((workshop_id, user_id))
+        for score in delta.scores:
+            ewm = score if ewm is None else QUIZ_EWM_ALPHA * score + (1 - QUIZ_EWM_ALPHA) * ewm
+        rows.append(
+            {
+                "workshop_id": workshop_id,
+                "user_id": user_id,
+                "completed_substeps": delta.completed,
+                "quiz_attempts": delta.attempts,
+                "quiz_score_sum": delta.score_sum,
+                "quiz_failed": delta.failed,
+                "quiz_passed": delta.passed,
+                "quiz_score_ewm": ewm,
+                "first_activity": delta.first_activity,
+                "last_activity": delta.last_activity,
+                "last_step_activity": delta.last_step_activity,
+                "updated_at": now,
+            }
+        )
+        workshop = workshops[workshop_id]
+        workshop.attempts += delta.attempts
+        workshop.score_sum += delta.score_sum
+        if delta.last_activity is not None:
+            workshop.touch(delta.last_activity)
+
+    table = StudentWorkshopStats.__table__
+    stmt = upsert_insert(db)(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.workshop_id, table.c.user_id],
+        set_={
+            "completed_substeps": table.c.completed_substeps + stmt.excluded.completed_substeps,
+            "quiz_attempts": table.c.quiz_attempts + stmt.excluded.quiz_attempts,
+            "quiz_score_sum": table.c.quiz_score_sum + stmt.excluded.quiz_score_sum,
+            "quiz_failed": table.c.quiz_failed + stmt.excluded.quiz_failed,
+            "quiz_passed": func.coalesce(stmt.excluded.quiz_passed, table.c.quiz_passed),
+            "quiz_score_ewm": func.coalesce(stmt.excluded.quiz_score_ewm, table.c.quiz_score_ewm),
+            "last_activity": _later(table.c.last_activity, stmt.excluded.last_activity),
+            "last_step_activity": _later(table.c.last_step_activity, stmt.excluded.last_step_activity),
+            "updated_at": stmt.excluded.updated_at,
+        },
+    )
+    db.execute(stmt, rows)
+
+    table = WorkshopStats.__table__
+    stmt = upsert_insert(db)(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.workshop_id],
+        set_={
+            "quiz_attempts": table.c.quiz_attempts + stmt.excluded.quiz_attempts,
+            "quiz_score_sum": table.c.quiz_score_sum + stmt.excluded.quiz_score_sum,
+            "last_activity": _later(table.c.last_activity, stmt.excluded.last_activity),
+        },
+    )
+    db.execute(
+        stmt,
+        [
+            {
+                "workshop_id": workshop_id,
+                "total_substeps": 0,
+                "quiz_attempts": delta.attempts,
+                "quiz_score_sum": delta.score_sum,
+                "last_activity": delta.last_activity,
+            }
+            for workshop_id, delta in workshops.items()
+        ],
+    )
@@ -0,0 +1,81 @@
+"""
+Read side of the analytics service.
+
+Everything here reads precomputed aggregates; nothing scans events.
+"""
+
+from typing import Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from ..models.analytics import StudentWorkshopStats, WorkshopStats
+
+
+def percent_complete(completed: int, total: int) -> float:
+    if not total:
+        return 0.0
+    return round(min(100.0, 100.0 * completed / total), 1)
+
+
+def average_score(score_sum: int, attempts: int) -> Optional[float]:
+    return round(score_sum / attempts, 1) if attempts else None
+
+
+def get_dashboard(db: Session, workshop_id: int) -> Dict:
+    """Completion and quiz scores of every student in a workshop."""
+    workshop = db.query(WorkshopStats).filter(WorkshopStats.workshop_id == workshop_id).first()
+    total = workshop.total_substeps if workshop else 0
+    students = (
+        db.query(StudentWorkshopStats)
+        .filter(StudentWorkshopStats.workshop_id == workshop_id)
+        .order_by(StudentWorkshopStats.user_id)
+        .all()
+    )
+    return {
+        "workshop_id": workshop_id,
+        "total_substeps": total,
+        "active_students": len(students),
+        "average_score": average_score(workshop.quiz_score_sum, workshop.quiz_attempts) if workshop else None,
+        "last_activity": workshop.last_activity if workshop else None,
+        "completion": [
+            {
+                "user_id": student.user_id,
+                "percent_complete": percent_complete(student.completed_substeps, total),
+                "completed_substeps": student.completed_substeps,
+                "last_activity": student.last_activity,
+            }
+            for student in students
+        ],
+        "quiz_scores": [
+            {
+                "user_id": student.user_id,
+                "average_score": average_score(student.quiz_score_sum, student.quiz_attempts),
+                "pass_fail": bool(student.quiz_passed),
+                "attempts": student.quiz_attempts,
+            }
+            for student in students
+            if student.quiz_attempts
+        ],
+    }
+
+
+def get_student_stats(db: Session, user_id: int) -> List[Dict]:
+    """One row per workshop the student has activity in."""
+    rows = (
+        db.query(StudentWorkshopStats, WorkshopStats.total_substeps)
+        .outerjoin(WorkshopStats, WorkshopStats.workshop_id == StudentWorkshopStats.workshop_id)
+        .filter(StudentWorkshopStats.user_id == user_id)
+        .order_by(StudentWorkshopStats.workshop_id)
+        .all()
+    )
+    return [
+        {
+            "workshop_id": student.workshop_id,
+            "percent_complete": percent_complete(student.completed_substeps, total or 0),
+            "completed_substeps": student.completed_substeps,
+            "average_score": average_score(student.quiz_score_sum, student.quiz_attempts),
+            "quiz_attempts": student.quiz_attempts,
+            "last_activity": student.last_activity,
+        }
+        for student, total in rows
+    ]
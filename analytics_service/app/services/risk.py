@@ -0,0 +1,261 @@
+"""
+At-risk student scoring.
+
+`RiskEngine` keeps one row per (workshop, student) in NumPy arrays, with
+the risk inputs the aggregator maintains on `student_workshop_stats`:
+
+* days since the student last touched a substep,
+* completion velocity, as progress against the pace needed to finish a
+  workshop in `RISK_EXPECTED_DAYS`,
+* the rolling quiz average,
+* the number of failed quiz attempts.
+
+Each refresh reloads only the rows whose `updated_at` moved since the
+previous pass, then rescores the whole population in one vectorized pass
+and keeps the top `RISK_TOP_K` rows for `/at-risk`.  Reads are served from
+an immutable snapshot that a refresh swaps in whole.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import Integer, cast, func, select
+from sqlalchemy.orm import Session
+
+from .. import database
+from ..models.analytics import StudentWorkshopStats, WorkshopStats
+
+logger = logging.getLogger(__name__)
+
+RISK_ENABLED = os.getenv("RISK_REFRESH_ENABLED", "true").lower() == "true"
+RISK_REFRESH_SECONDS = float(os.getenv("RISK_REFRESH_SECONDS", "300"))
+RISK_TOP_K = int(os.getenv("RISK_TOP_K", "1000"))
+RISK_EXPECTED_DAYS = float(os.getenv("RISK_EXPECTED_DAYS", "30"))
+RISK_INACTIVE_DAYS = float(os.getenv("RISK_INACTIVE_DAYS", "14"))
+RISK_PASS_SCORE = float(os.getenv("RISK_PASS_SCORE", "75"))
+RISK_MAX_FAILURES = float(os.getenv("RISK_MAX_FAILURES", "3"))
+# Rows updated this long before a refresh started are reloaded again, so
+# batches committed while the previous refresh ran are never missed.
+RISK_REFRESH_OVERLAP_SECONDS = float(os.getenv("RISK_REFRESH_OVERLAP_SECONDS", "60"))
+
+# inactivity, slow progress, low quiz average, failed attempts
+WEIGHTS = np.array([0.35, 0.25, 0.25, 0.15])
+DAY = 86400.0
+
+# Columns loaded per row, all held as float64 with NaN for NULL.
+_FEATURES = ("workshop_id", "user_id", "completed", "failed", "quiz_average", "first_activity", "last_step")
+
+
+def _epoch(db: Session, column):
+    """SQL for a naive UTC timestamp as Unix seconds, so rows load as plain numbers."""
+    if db.bind.dialect.name == "postgresql":
+        return func.extract("epoch", column)
+    return cast(func.strftime("%s", column), Integer)
+
+
+def _reason(factors: np.ndarray, features: Dict[str, np.ndarray], fraction: np.ndarray, now: float, i: int) -> str:
+    main = int(np.argmax(factors[:, i] * WEIGHTS))
+    if main == 0:
+        return f"No progress in {int((now - features['last_step'][i]) // DAY)} days"
+    if main == 1:
+        days = int((now - features["first_activity"][i]) // DAY)
+        return f"Behind pace: {fraction[i] * 100:.0f}% complete after {days} days"
+    if main == 2:
+        return f"Quiz average {features['quiz_average'][i]:.0f}"
+    return f"{int(features['failed'][i])} failed quiz attempts"
+
+
+class _Snapshot:
+    """Scores of one refresh; never mutated after it is published."""
+
+    def __init__(
+        self,
+        workshop_ids: np.ndarray,
+        scores: np.ndarray,
+        top: List[Dict],
+        rows: Callable[[np.ndarray], List[Dict]],
+    ) -> None:
+        self.workshop_ids = workshop_ids
+        self.scores = scores
+        self.top = top
+        self.rows = rows
+
+
+class RiskEngine:
+    """Vectorized risk scores for every student, refreshed on a schedule."""
+
+    def __init__(
+        self,
+        interval: float = RISK_REFRESH_SECONDS,
+        top_k: int = RISK_TOP_K,
+        overlap: float = RISK_REFRESH_OVERLAP_SECONDS,
+        session_factory: Optional[Callable[[], Session]] = None,
+    ) -> None:
+        self.interval = interval
+        self.top_k = top_k
+        self.overlap = overlap
+        self.session_factory = session_factory or (lambda: database.SessionLocal())
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._snapshot: Optional[_Snapshot] = None
+        self._since: Optional[datetime] = None
+        self._index: Dict[int, int] = {}
+        self._size = 0
+        self._features = {name: np.empty(0) for name in _FEATURES}
+
+    def _grow(self, needed: int) -> None:
+        capacity = len(self._features["workshop_id"])
+        if needed <= capacity:
+            return
+        capacity = max(needed, 2 * capacity, 1024)
+        for name, values in self._features.items():
+            grown = np.full(capacity, np.nan)
+            grown[: self._size] = values[: self._size]
+            self._features[name] = grown
+
+    def _load(self, db: Session, since: Optional[datetime]) -> int:
+        table = StudentWorkshopStats
+        query = select(
+            table.workshop_id,
+            table.user_id,
+            table.completed_substeps,
+            table.quiz_failed,
+            table.quiz_score_ewm,
+            _epoch(db, table.first_activity),
+            _epoch(db, func.coalesce(table.last_step_activity, table.last_activity)),
+        )
+        if since is not None:
+            query = query.where(table.updated_at >= since)
+        rows = db.execute(query).fetchall()
+        if not rows:
+            return 0
+        loaded = np.array([tuple(row) for row in rows], dtype=np.float64)
+        keys = (loaded[:, 0].astype(np.int64) << 32) | loaded[:, 1].astype(np.int64)
+        positions = np.empty(len(rows), dtype=np.int64)
+        for row, key in enumerate(keys.tolist()):
+            position = self._index.get(key)
+            if position is None:
+                position = self._index[key] = len(self._index)
+            positions[row] = position
+        self._grow(len(self._index))
+        for column, name in enumerate(_FEATURES):
+            self._features[name][positions] = loaded[:, column]
+        self._size = len(self._index)
+        return len(rows)
+
+    def _totals(self, db: Session, workshop_ids: np.ndarray) -> np.ndarray:
+        # Totals live on the small workshop table and change without
+        # touching student rows, so they are mapped in fresh every pass.
+        known = db.query(WorkshopStats.workshop_id, WorkshopStats.total_substeps).all()
+        known = np.array([tuple(row) for row in known], dtype=np.float64).reshape(-1, 2)
+        if not len(known):
+            return np.zeros(len(workshop_ids))
+        known = known[np.argsort(known[:, 0])]
+        position = np.clip(np.searchsorted(known[:, 0], workshop_ids), 0, len(known) - 1)
+        return np.where(known[position, 0] == workshop_ids, known[position, 1], 0.0)
+
+    def score(self, totals: np.ndarray, now: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Per-factor risk in [0, 1] for every loaded row, shape (4, rows), and completion fractions."""
+        f = {name: values[: self._size] for name, values in self._features.items()}
+        with np.errstate(divide="ignore", invalid="ignore"):
+            fraction = np.where(totals > 0, np.minimum(f["completed"] / totals, 1.0), 0.0)
+            finished = (totals > 0) & (fraction >= 1.0)
+            idle = np.nan_to_num((now - f["last_step"]) / DAY, nan=0.0)
+            inactivity = np.clip(idle / RISK_INACTIVE_DAYS, 0.0, 1.0)
+            elapsed = np.nan_to_num((now - f["first_activity"]) / DAY, nan=0.0)
+            expected = np.minimum(elapsed / RISK_EXPECTED_DAYS, 1.0)
+            slow = np.where(totals > 0, np.clip(expected - fraction, 0.0, 1.0), 0.0)
+            quiz = np.nan_to_num(np.clip((RISK_PASS_SCORE - f["quiz_average"]) / RISK_PASS_SCORE, 0.0, 1.0), nan=0.0)
+            failures = np.clip(f["failed"] / RISK_MAX_FAILURES, 0.0, 1.0)
+        inactivity[finished] = 0.0
+        slow[finished] = 0.0
+        return np.vstack((inactivity, slow, quiz, failures)), fraction
+
+    def refresh(self) -> int:
+        """Reload changed rows, rescore everyone and publish a new snapshot; return rows reloaded."""
+        with self._lock:
+            started = datetime.utcnow()
+            db = self.session_factory()
+            try:
+                loaded = self._load(db, self._since)
+                workshop_ids = self._features["workshop_id"][: self._size].copy()
+                totals = self._totals(db, workshop_ids)
+            finally:
+                db.close()
+            self._since = started - timedelta(seconds=self.overlap)
+
+            now = time.time()
+            factors, fraction = self.score(totals, now)
+            scores = np.round(WEIGHTS @ factors * 100.0, 1)
+            features = {name: values[: self._size].copy() for name, values in self._features.items()}
+
+            def rows(indexes: np.ndarray) -> List[Dict]:
+                # Only the handful of rows returned are turned into dicts.
+                order = indexes[np.lexsort((indexes, -scores[indexes]))]
+                return [
+                    {
+                        "user_id": int(features["user_id"][i]),
+                        "workshop_id": int(features["workshop_id"][i]),
+                        "risk_score": float(scores[i]),
+                        "reason": _reason(factors, features, fraction, now, i),
+                        "percent_complete": round(float(fraction[i]) * 100.0, 1),
+                        "quiz_average": None if np.isnan(features["quiz_average"][i]) else round(float(features["quiz_average"][i]), 1),
+                        "failed_attempts": int(features["failed"][i]),
+                    }
+                    for i in order
+                    if scores[i] > 0
+                ]
+
+            snapshot = _Snapshot(workshop_ids, scores, rows(_top(scores, self.top_k)), rows)
+            self._snapshot = snapshot
+            return loaded
+
+    def at_risk(self, limit: int, workshop_id: Optional[int] = None) -> List[Dict]:
+        """The `limit` highest-risk students, optionally within one workshop."""
+        snapshot = self._snapshot
+        if snapshot is None:
+            self.refresh()
+            snapshot = self._snapshot
+        if workshop_id is None:
+            return snapshot.top[:limit]
+        members = np.flatnonzero(snapshot.workshop_ids == workshop_id)
+        return snapshot.rows(members[_top(snapshot.scores[members], limit)])
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                loaded = await run_in_threadpool(self.refresh)
+                logger.debug("Risk scores refreshed; %d rows reloaded", loaded)
+            except Exception:
+                logger.exception("Risk score refresh failed")
+            await asyncio.sleep(self.interval)
+
+    async def start(self) -> None:
+        if RISK_ENABLED and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+def _top(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indexes of the `k` largest scores, unordered, in linear time."""
+    if k >= len(scores):
+        return np.arange(len(scores))
+    return np.argpartition(-scores, k)[:k]
+
+
+risk_engine = RiskEngine()
@@ -0,0 +1,138 @@
+"""
+Measure at-risk scoring over a large student population.
+
+Seeds `student_workshop_stats` with random rows in SQLite, then times a
+full `RiskEngine.refresh`, an incremental one after 1% of the rows
+changed, and the same scoring done row by row over ORM objects (on a
+sample, extrapolated).  Usage (from the repo root):
+
+    python -m analytics_service.benchmarks.bench_risk --rows 1000000
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+DB_PATH = os.path.join(tempfile.gettempdir(), "bench_analytics_risk.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{DB_PATH}")
+os.environ.setdefault("ANALYTICS_CONSUMER_ENABLED", "false")
+
+from analytics_service.app import database  # noqa: E402
+from analytics_service.app.models.analytics import StudentWorkshopStats, WorkshopStats  # noqa: E402
+from analytics_service.app.models.base import Base  # noqa: E402
+from analytics_service.app.services import risk  # noqa: E402
+
+
+def rows(rng: random.Random, count: int, workshops: int, substeps: int):
+    now = datetime.utcnow()
+    for n in range(count):
+        age = rng.uniform(0, 60)
+        attempts = rng.randint(0, 5)
+        yield {
+            "workshop_id": n % workshops + 1,
+            "user_id": n // workshops + 1,
+            "completed_substeps": rng.randint(0, substeps),
+            "quiz_attempts": attempts,
+            "quiz_score_sum": 0,
+            "quiz_failed": rng.randint(0, attempts),
+            "quiz_score_ewm": rng.uniform(0, 100) if attempts else None,
+            "first_activity": now - timedelta(days=age),
+            "last_activity": now - timedelta(days=rng.uniform(0, age)),
+            "updated_at": now,
+        }
+
+
+def seed(count: int, workshops: int, substeps: int) -> None:
+    rng = random.Random(7)
+    with database.engine.begin() as connection:
+        connection.execute(
+            WorkshopStats.__table__.insert(),
+            [{"workshop_id": w, "total_substeps": substeps, "quiz_attempts": 0, "quiz_score_sum": 0} for w in range(1, workshops + 1)],
+        )
+        batch = []
+        for row in rows(rng, count, workshops, substeps):
+            batch.append(row)
+            if len(batch) == 50_000:
+                connection.execute(StudentWorkshopStats.__table__.insert(), batch)
+                batch = []
+        if batch:
+            connection.execute(StudentWorkshopStats.__table__.insert(), batch)
+
+
+def touch(count: int, total: int, workshops: int) -> None:
+    rng = random.Random(11)
+    table = StudentWorkshopStats.__table__
+    with database.engine.begin() as connection:
+        for n in rng.sample(range(total), count):
+            connection.execute(
+                table.update()
+                .where(table.c.workshop_id == n % workshops + 1, table.c.user_id == n // workshops + 1)
+                .values(quiz_failed=table.c.quiz_failed + 1, updated_at=datetime.utcnow())
+            )
+
+
+def row_by_row(sample: int) -> float:
+    """Score `sample` ORM rows one at a time, as a naive implementation would."""
+    started = time.perf_counter()
+    now = datetime.utcnow()
+    db = database.SessionLocal()
+    try:
+        scored = []
+        for student in db.query(StudentWorkshopStats).limit(sample):
+            total = db.query(WorkshopStats.total_substeps).filter(WorkshopStats.workshop_id == student.workshop_id).scalar()
+            fraction = min(student.completed_substeps / total, 1.0) if total else 0.0
+            idle = (now - (student.last_step_activity or student.last_activity)).total_seconds() / risk.DAY
+            elapsed = (now - student.first_activity).total_seconds() / risk.DAY
+            factors = [
+                min(idle / risk.RISK_INACTIVE_DAYS, 1.0),
+                max(0.0, min(elapsed / risk.RISK_EXPECTED_DAYS, 1.0) - fraction),
+                max(0.0, (risk.RISK_PASS_SCORE - student.quiz_score_ewm) / risk.RISK_PASS_SCORE)
+                if student.quiz_score_ewm is not None
+                else 0.0,
+                min(student.quiz_failed / risk.RISK_MAX_FAILURES, 1.0),
+            ]
+            scored.append((sum(w * f for w, f in zip(risk.WEIGHTS.tolist(), factors)), student.user_id))
+        scored.sort(reverse=True)
+    finally:
+        db.close()
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--workshops", type=int, default=50)
+    parser.add_argument("--substeps", type=int, default=40)
+    parser.add_argument("--sample", type=int, default=20_000)
+    args = parser.parse_args()
+
+    if os.path.exists(DB_PATH):
+        os.remove(DB_PATH)
+    Base.metadata.create_all(bind=database.engine)
+    seed(args.rows, args.workshops, args.substeps)
+
+    # No overlap, so the second pass reloads just the touched rows.
+    engine = risk.RiskEngine(overlap=0)
+    started = time.perf_counter()
+    engine.refresh()
+    full = time.perf_counter() - started
+    print(f"full refresh of {args.rows:,} rows: {full:.2f}s")
+
+    changed = args.rows // 100
+    touch(changed, args.rows, args.workshops)
+    started = time.perf_counter()
+    reloaded = engine.refresh()
+    print(f"incremental refresh ({reloaded:,} rows reloaded): {time.perf_counter() - started:.2f}s")
+
+    sample = min(args.sample, args.rows)
+    elapsed = row_by_row(sample)
+    print(f"row-by-row ORM scoring of {sample:,} rows: {elapsed:.2f}s, "
+          f"~{elapsed * args.rows / sample:.0f}s extrapolated to {args.rows:,}")
+    os.remove(DB_PATH)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+
+@pytest.fixture()
+def client(monkeypatch):
+    os.environ.setdefault("ANALYTICS_CONSUMER_ENABLED", "false")
+    os.environ.setdefault("RISK_REFRESH_ENABLED", "false")
+
+    from analytics_service.app import database as database_module
+    from analytics_service.app.models.base import Base
+
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+    monkeypatch.setattr(database_module, "engine", engine)
+    monkeypatch.setattr(database_module, "SessionLocal", TestingSessionLocal)
+
+    from analytics_service.app.services import risk
+
+    monkeypatch.setattr(risk, "risk_engine", risk.RiskEngine())
+
+    from analytics_service.app.main import create_app
+    from analytics_service.app.database import get_db
+
+    def override_get_db():
+        db = TestingSessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app = create_app()
+    app.dependency_overrides[get_db] = override_get_db
+
+    with TestClient(app) as c:
+        c.session_factory = TestingSessionLocal
+        yield c
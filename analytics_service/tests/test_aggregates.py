@@ -0,0 +1,96 @@
+import pytest
+
+from sukhverse_common.events.bus import EventBus
+from sukhverse_common.events.testing import InMemoryBroker
+
+
+@pytest.fixture()
+def pipeline(client):
+    from analytics_service.app.events.consumer import AnalyticsConsumer
+    from analytics_service.app.services.aggregator import TOPICS
+
+    broker = InMemoryBroker(partitions=4)
+    bus = EventBus("test", producer_factory=lambda: broker)
+    consumer = broker.consumer(*TOPICS)
+    worker = AnalyticsConsumer(batch_size=100, session_factory=client.session_factory)
+
+    def publish(topic, **event):
+        bus.send(topic, event)
+
+    def drain():
+        bus.flush()
+        while worker.process_batch(consumer):
+            pass
+
+    return publish, drain, consumer, worker
+
+
+def step(publish, user_id, substep_id, status="completed", workshop_id=1):
+    topic = "step_completed" if status == "completed" else "step_updated"
+    publish(topic, user_id=user_id, workshop_id=workshop_id, step_id=1, substep_id=substep_id, status=status)
+
+
+def test_dashboard_reflects_progress_and_quiz_events(client, pipeline):
+    publish, drain, _, _ = pipeline
+    publish("workshop_created", workshop_id=1, creator_user_id=9, total_substeps=4)
+    for substep_id in (1, 2, 3):
+        step(publish, 10, substep_id)
+    step(publish, 11, 1, status="in_progress")
+    publish("quiz_submitted", quiz_id=5, user_id=10, score=60, pass_fail=True, workshop_id=1, result_id=1)
+    publish("quiz_submitted", quiz_id=5, user_id=10, score=90, pass_fail=True, workshop_id=1, result_id=2)
+    publish("quiz_submitted", quiz_id=5, user_id=11, score=30, pass_fail=False, workshop_id=1, result_id=3)
+    publish("quiz_submitted", quiz_id=6, user_id=11, score=100, pass_fail=True, result_id=4)
+    drain()
+
+    body = client.get("/dashboard", params={"workshop_id": 1}).json()
+    assert body["total_substeps"] == 4
+    assert body["active_students"] == 2
+    assert body["average_score"] == 60.0
+    assert [(c["user_id"], c["percent_complete"]) for c in body["completion"]] == [(10, 75.0), (11, 0.0)]
+    assert [(q["user_id"], q["average_score"], q["pass_fail"], q["attempts"]) for q in body["quiz_scores"]] == [
+        (10, 75.0, True, 2),
+        (11, 30.0, False, 1),
+    ]
+    assert [s["workshop_id"] for s in client.get("/students/10").json()] == [1]
+
+
+def test_completions_count_state_changes_only(client, pipeline):
+    publish, drain, _, _ = pipeline
+    publish("workshop_created", workshop_id=1, creator_user_id=9, total_substeps=2)
+    step(publish, 10, 1)
+    step(publish, 10, 1)
+    drain()
+    step(publish, 10, 1)
+    step(publish, 10, 2)
+    step(publish, 10, 2, status="in_progress")
+    drain()
+
+    completion = client.get("/dashboard", params={"workshop_id": 1}).json()["completion"]
+    assert completion[0]["completed_substeps"] == 1
+
+    step(publish, 10, 1, status="in_progress")
+    drain()
+    completion = client.get("/dashboard", params={"workshop_id": 1}).json()["completion"]
+    assert completion[0]["completed_substeps"] == 0
+
+
+def test_redelivered_batches_do_not_double_count(client, pipeline):
+    publish, drain, consumer, worker = pipeline
+    publish("workshop_created", workshop_id=1, creator_user_id=9, total_substeps=2)
+    step(publish, 10, 1)
+    publish("quiz_submitted", quiz_id=5, user_id=10, score=80, pass_fail=True, workshop_id=1, result_id=1)
+    drain()
+    before = client.get("/dashboard", params={"workshop_id": 1}).json()
+
+    # Crash after the database commit but before the offset commit.
+    consumer.committed = {}
+    consumer.seek_to_committed()
+    drain()
+
+    assert client.get("/dashboard", params={"workshop_id": 1}).json() == before
+    assert worker.metrics()["events"] == 6
+
+
+def test_unknown_workshop_has_an_empty_dashboard(client):
+    body = client.get("/dashboard", params={"workshop_id": 42}).json()
+    assert (body["active_students"], body["completion"], body["quiz_scores"]) == (0, [], [])
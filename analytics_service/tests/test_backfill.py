@@ -0,0 +1,50 @@
+from datetime import datetime
+
+from sqlalchemy import create_engine
+from sqlalchemy.pool import StaticPool
+
+from sukhverse_common.events import backfill
+
+
+def test_backfill_rebuilds_the_dashboard(client):
+    from analytics_service.app.events.backfill import AnalyticsSink
+
+    source = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    backfill.metadata.create_all(bind=source)
+    with source.begin() as connection:
+        connection.execute(backfill.workshops.insert(), [{"id": 1, "creator_user_id": 9}])
+        connection.execute(backfill.steps.insert(), [{"id": 1, "workshop_id": 1}])
+        connection.execute(backfill.substeps.insert(), [{"id": n, "step_id": 1} for n in range(1, 5)])
+        connection.execute(
+            backfill.substep_progress.insert(),
+            [
+                {"user_id": user_id, "workshop_id": 1, "step_id": 1, "substep_id": substep_id,
+                 "status": status, "updated_at": datetime(2026, 1, 1)}
+                for user_id, substep_id, status in [
+                    (10, 1, "completed"), (10, 2, "completed"), (10, 3, "in_progress"), (11, 1, "in_progress"),
+                ]
+            ],
+        )
+        connection.execute(backfill.quizzes.insert(), [{"id": 5, "linked_to": "1"}])
+        connection.execute(
+            backfill.quiz_results.insert(),
+            [{"quiz_id": 5, "user_id": 10, "score": 90, "pass_fail": True},
+             {"quiz_id": 5, "user_id": 11, "score": 30, "pass_fail": False}],
+        )
+
+    sink = AnalyticsSink(client.session_factory)
+    checkpoint = backfill.Checkpoint(None)
+    for name in ("workshops", "progress", "quiz_results"):
+        backfill.replay(backfill.SOURCES[name], source, sink, checkpoint, chunk_size=2)
+    before = client.get("/dashboard", params={"workshop_id": 1}).json()
+    assert before["total_substeps"] == 4
+    assert [(c["user_id"], c["completed_substeps"]) for c in before["completion"]] == [(10, 2), (11, 0)]
+    assert before["average_score"] == 60.0
+
+    # A rerun from scratch without a reset is absorbed by the idempotent aggregator.
+    for name in ("workshops", "progress", "quiz_results"):
+        backfill.replay(backfill.SOURCES[name], source, sink, backfill.Checkpoint(None), chunk_size=3)
+    assert client.get("/dashboard", params={"workshop_id": 1}).json() == before
+
+    sink.reset()
+    assert client.get("/dashboard", params={"workshop_id": 1}).json()["completion"] == []
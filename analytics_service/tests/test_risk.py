@@ -0,0 +1,96 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+
+@pytest.fixture()
+def seed(client):
+    from analytics_service.app.models.analytics import StudentWorkshopStats, WorkshopStats
+
+    now = datetime.utcnow()
+
+    def seed(*workshops, **students):
+        db = client.session_factory()
+        for workshop_id, total in workshops:
+            db.add(WorkshopStats(workshop_id=workshop_id, total_substeps=total))
+        for user_id, (workshop_id, completed, idle_days, age_days, ewm, failed) in students.items():
+            db.merge(
+                StudentWorkshopStats(
+                    workshop_id=workshop_id,
+                    user_id=int(user_id[1:]),
+                    completed_substeps=completed,
+                    quiz_failed=failed,
+                    quiz_score_ewm=ewm,
+                    first_activity=now - timedelta(days=age_days),
+                    last_step_activity=now - timedelta(days=idle_days),
+                    updated_at=datetime.utcnow(),
+                )
+            )
+        db.commit()
+        db.close()
+
+    return seed
+
+
+def test_at_risk_ranks_students_by_weighted_factors(client, seed):
+    seed(
+        (1, 10),
+        u1=(1, 10, 30, 40, 95.0, 0),  # finished: never at risk for pace or inactivity
+        u2=(1, 2, 20, 25, 40.0, 3),  # idle, behind, failing
+        u3=(1, 5, 0, 10, 50.0, 0),  # on track, low quiz average
+        u4=(1, 1, 15, 15, None, 0),  # idle and behind, no quizzes yet
+    )
+
+    body = client.get("/at-risk").json()
+    assert [r["user_id"] for r in body] == [2, 4, 3]
+    assert body[0]["risk_score"] == 77.5
+    assert body[0]["reason"] == "No progress in 20 days"
+    assert body[1]["quiz_average"] is None
+    assert body[2]["reason"] == "Quiz average 50"
+    assert body[0].keys() >= {"user_id", "risk_score", "reason"}
+
+
+def test_at_risk_filters_by_workshop_and_limits(client, seed):
+    seed(
+        (1, 4),
+        (2, 4),
+        u1=(1, 0, 20, 20, None, 0),
+        u2=(2, 0, 10, 20, None, 0),
+        u3=(2, 0, 20, 20, None, 1),
+    )
+
+    assert [r["user_id"] for r in client.get("/at-risk", params={"limit": 1}).json()] == [3]
+    assert [r["user_id"] for r in client.get("/at-risk", params={"workshop_id": 2}).json()] == [3, 2]
+    assert client.get("/at-risk", params={"workshop_id": 9}).json() == []
+
+
+def test_refresh_reloads_only_changed_rows(client, seed):
+    from analytics_service.app.services.risk import RiskEngine
+
+    engine = RiskEngine(session_factory=client.session_factory)
+    seed((1, 4), u1=(1, 0, 20, 20, None, 0), u2=(1, 4, 0, 20, None, 0))
+    assert engine.refresh() == 2
+    assert [r["user_id"] for r in engine.at_risk(10)] == [1]
+
+    # The engine rereads rows touched within the overlap window only.
+    seed(u1=(1, 4, 0, 20, None, 0), u2=(1, 0, 20, 20, None, 3))
+    assert engine.refresh() == 2
+    assert [r["user_id"] for r in engine.at_risk(10)] == [2]
+
+
+def test_quiz_average_is_exponentially_weighted(client):
+    from analytics_service.app.models.analytics import StudentWorkshopStats
+    from analytics_service.app.services.aggregator import QUIZ_EWM_ALPHA, apply_events
+
+    now = datetime.utcnow()
+    db = client.session_factory()
+    for result_id, score in enumerate((40, 80, 100)):
+        event = {"quiz_id": 5, "user_id": 10, "score": score, "pass_fail": score >= 75, "workshop_id": 1, "result_id": result_id}
+        apply_events(db, [("quiz_submitted", event, now)])
+        db.commit()
+    row = db.query(StudentWorkshopStats).one()
+    expected = 40
+    for score in (80, 100):
+        expected = QUIZ_EWM_ALPHA * score + (1 - QUIZ_EWM_ALPHA) * expected
+    assert (row.quiz_score_ewm, row.quiz_failed, row.quiz_attempts) == (pytest.approx(expected), 1, 3)
+    db.close()
@@ -10,15 +10,19 @@ changing passwords, and password reset. Role/permission endpoints are stubbed an
 from typing import Any, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import ORJSONResponse
 from fastapi.security import OAuth2PasswordRequestForm, OAuth2PasswordBearer
 from jose import JWTError, jwt
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from .. import schemas
-from ..database import get_db
+from ..database import get_async_db, get_db
 from ..models.user import User
 from ..services import auth as auth_service
-from ..security.jwt import get_current_user
+from ..security.identity_cache import UserSnapshot
+from ..security.jwt import get_current_user, require_identity_reader
+from ..utils.hashing_pool import hashing_pool
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
@@ -27,47 +31,42 @@ router = APIRouter(prefix="/auth", tags=["auth"])
 
 
 @router.post("/register", response_model=schemas.UserOut, status_code=status.HTTP_201_CREATED)
-def register(user_in: schemas.UserCreate, db: Session = Depends(get_db)) -> Any:
+async def register(user_in: schemas.UserCreate, db: AsyncSession = Depends(get_async_db)) -> Any:
     """Register a new user."""
-    existing = db.query(User).filter(User.email == user_in.email).first()
+    existing = await db.run_sync(auth_service.get_user_by_email, user_in.email)
     if existing:
         raise HTTPException(status_code=400, detail="Email already registered")
-    user = auth_service.create_user(db, user_in)
+    user = await auth_service.create_user(db, user_in)
     return schemas.UserOut(id=user.id, email=user.email, status=user.status, roles=[])
 
 
 @router.post("/login", response_model=schemas.Token)
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)) -> Any:
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)) -> Any:
     """Login and get access/refresh tokens."""
-    user = auth_service.authenticate_user(db, form_data.username, form_data.password)
+    user = await auth_service.authenticate_user(db, form_data.username, form_data.password)
     if not user:
         raise HTTPException(status_code=401, detail="Invalid credentials")
-    roles = auth_service.get_user_roles(user)
-    access_token = auth_service.create_access_token(user.id, roles)
-    refresh_token = auth_service.create_refresh_token(db, user.id)
-    return schemas.Token(access_token=access_token, refresh_token=refresh_token)
+    return await db.run_sync(auth_service.issue_tokens, user)
 
 
 @router.post("/refresh", response_model=schemas.Token)
-def refresh_token(token_in: schemas.RefreshTokenRequest, db: Session = Depends(get_db)) -> Any:
-    """🔁 Legacy alias for `/refresh-token`."""
-    user = auth_service.verify_refresh_token(db, token_in.refresh_token)
-    if not user:
+async def refresh_token(token_in: schemas.RefreshTokenRequest, db: AsyncSession = Depends(get_async_db)) -> Any:
+    """🔁 Legacy alias for `/refresh-token`: the refresh token is consumed and replaced."""
+    tokens = await db.run_sync(auth_service.rotate_tokens, token_in.refresh_token)
+    if not tokens:
         raise HTTPException(status_code=401, detail="Invalid or expired refresh token")
-    roles = auth_service.get_user_roles(user)
-    access_token = auth_service.create_access_token(user.id, roles)
-    return schemas.Token(access_token=access_token, refresh_token=token_in.refresh_token)
+    return tokens
 
 
 # ✅ Merged block: Added by Codex — Change Password, Forgot/Reset Password, Refresh-Token
 @router.post("/change-password")
-def change_password(
+async def change_password(
     passwords: schemas.ChangePasswordRequest,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: UserSnapshot = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
 ) -> Any:
     """Allow an authenticated user to change their password."""
-    success = auth_service.change_password(
+    success = await auth_service.change_password(
         db,
         user_id=current_user.id,
         old_password=passwords.old_password,
@@ -89,32 +88,58 @@ def forgot_password(payload: schemas.PasswordResetRequest, db: Session = Depends
 
 
 @router.post("/reset-password")
-def reset_password(payload: schemas.ResetPasswordRequest, db: Session = Depends(get_db)) -> Any:
+async def reset_password(payload: schemas.ResetPasswordRequest, db: AsyncSession = Depends(get_async_db)) -> Any:
     """Reset a user's password using a valid token."""
-    success = auth_service.reset_user_password(db, payload.token, payload.new_password)
+    success = await auth_service.reset_user_password(db, payload.token, payload.new_password)
     if not success:
         raise HTTPException(status_code=400, detail="Invalid or expired token")
     return {"message": "Password updated"}
 
 
 @router.post("/refresh-token", response_model=schemas.Token)
-def refresh_token_new(token_in: schemas.RefreshTokenRequest, db: Session = Depends(get_db)) -> Any:
-    """Issue a new access token based on a valid refresh token."""
-    user = auth_service.verify_refresh_token(db, token_in.refresh_token)
-    if not user:
+async def refresh_token_new(token_in: schemas.RefreshTokenRequest, db: AsyncSession = Depends(get_async_db)) -> Any:
+    """Exchange a refresh token for a new access token and a new refresh token.
+
+    The presented refresh token is consumed and cannot be used again.
+    """
+    tokens = await db.run_sync(auth_service.rotate_tokens, token_in.refresh_token)
+    if not tokens:
         raise HTTPException(status_code=401, detail="Invalid or expired refresh token")
-    roles = auth_service.get_user_roles(user)
-    access_token = auth_service.create_access_token(user.id, roles)
-    return schemas.Token(access_token=access_token, refresh_token=token_in.refresh_token)
+    return tokens
 
 
 @router.get("/me", response_model=schemas.UserOut)
-def read_users_me(current_user: User = Depends(get_current_user)) -> Any:
+async def read_users_me(current_user: UserSnapshot = Depends(get_current_user)) -> Any:
     """Return the currently authenticated user's information."""
-    roles = auth_service.get_user_roles(current_user)
     return schemas.UserOut(
         id=current_user.id,
         email=current_user.email,
         status=current_user.status,
-        roles=roles,
+        roles=list(current_user.roles),
     )
+
+
+@router.post("/users:batch", response_class=ORJSONResponse, dependencies=[Depends(require_identity_reader)])
+def get_users_batch(payload: schemas.UserBatchRequest, db: Session = Depends(get_db)) -> Any:
+    """Resolve many user ids to identity records in a single round trip.
+
+    Only for other services and admins.  Unknown ids are omitted from the
+    response, which is serialized with orjson, bypassing FastAPI's encoder.
+    """
+    users = [auth_service.user_record(user) for user in auth_service.get_users_by_ids(db, payload.ids)]
+    return ORJSONResponse({"users": users})
+
+
+@router.get("/users/{user_id}", response_model=schemas.UserOut, dependencies=[Depends(require_identity_reader)])
+def get_user(user_id: int, db: Session = Depends(get_db)) -> Any:
+    """Return identity information for a single user.  Only for other services and admins."""
+    users = auth_service.get_users_by_ids(db, [user_id])
+    if not users:
+        raise HTTPException(status_code=404, detail="User not found")
+    return auth_service.user_record(users[0])
+
+
+@router.get("/metrics/hashing-pool")
+def hashing_pool_metrics() -> Any:
+    """Expose password hashing pool utilisation and queue depth."""
+    return hashing_pool.metrics()
@@ -1,36 +1,20 @@
 """
-Kafka producer utilities for the auth service.
+Event publishing for the auth service.
 
-This module defines a simple wrapper around kafka-python to publish
-domain events.  Events are encoded as dictionaries and serialised
-to JSON before sending to Kafka.
+Thin bindings of the shared `sukhverse_common` event bus and outbox to
+this service's database; see `sukhverse_common.events.publisher`.
 """
 
-import json
-import os
-from typing import Dict
+from sukhverse_common.events import outbox
+from sukhverse_common.events.bus import EventBus
+from sukhverse_common.events.publisher import make_publishers
 
-from kafka import KafkaProducer
+from .. import database
+from ..models.outbox import OutboxEvent
 
 
-_producer = None
+bus = EventBus(client_id="auth_service")
+publish_event, publish_events = make_publishers(bus, OutboxEvent)
 
-
-def get_producer() -> KafkaProducer:
-    """Lazy-initialise and return a Kafka producer."""
-    global _producer
-    if _producer is None:
-        bootstrap_servers = os.getenv("KAFKA_BOOTSTRAP_SERVERS", "kafka:9092")
-        _producer = KafkaProducer(
-            bootstrap_servers=bootstrap_servers,
-            value_serializer=lambda v: json.dumps(v).encode("utf-8"),
-            key_serializer=lambda k: k.encode("utf-8") if k else None,
-        )
-    return _producer
-
-
-def publish_event(topic: str, message: Dict, key: str | None = None) -> None:
-    """Publish a JSON-serialisable event on the given Kafka topic."""
-    producer = get_producer()
-    producer.send(topic, value=message, key=key)
-    # Fire-and-forget; in a production system you may wish to block on flush
\ No newline at end of file
+# Background relay draining the outbox table to Kafka.
+outbox_relay = outbox.OutboxRelay(lambda: database.SessionLocal(), OutboxEvent, lambda: bus)
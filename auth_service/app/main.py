@@ -5,12 +5,18 @@ Initialises the FastAPI application, sets up CORS and includes the
 authentication routes.  On startup, database tables are created.
 """
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
-from .database import engine
+from sukhverse_common.events.bus import metrics_router
+
+from .database import async_db, engine
 from .models.base import Base
 from .api.routes_auth import router as auth_router
+from .events.producer import bus, outbox_relay
+from .services.token_sweeper import sweeper
+from .utils.hashing_pool import HashingPoolBusy, hashing_pool
 
 
 def init_db() -> None:
@@ -18,6 +24,15 @@ def init_db() -> None:
     Base.metadata.create_all(bind=engine)
 
 
+async def hashing_pool_busy_handler(request: Request, exc: HashingPoolBusy) -> JSONResponse:
+    """Shed load quickly instead of queueing behind saturated bcrypt workers."""
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Server busy, please retry"},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
 def create_app() -> FastAPI:
     app = FastAPI(title="Auth Service", version="0.1.0")
 
@@ -33,6 +48,16 @@ def create_app() -> FastAPI:
     init_db()
 
     app.include_router(auth_router)
+    app.include_router(metrics_router(bus, outbox_relay))
+    app.add_exception_handler(HashingPoolBusy, hashing_pool_busy_handler)
+    app.add_event_handler("startup", sweeper.start)
+    app.add_event_handler("startup", outbox_relay.start)
+    app.add_event_handler("shutdown", sweeper.stop)
+    app.add_event_handler("shutdown", outbox_relay.stop)
+    # Registered after the relay so its final drain is flushed too.
+    app.add_event_handler("shutdown", bus.aclose)
+    app.add_event_handler("shutdown", async_db.dispose)
+    app.add_event_handler("shutdown", hashing_pool.shutdown)
 
     return app
 
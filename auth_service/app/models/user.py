@@ -9,7 +9,7 @@ management service.
 
 from datetime import datetime, timedelta
 
-from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Integer, String, Table
+from sqlalchemy import CHAR, Boolean, Column, DateTime, ForeignKey, Index, Integer, String, Table
 from sqlalchemy.orm import relationship
 
 from .base import Base
@@ -30,12 +30,15 @@ class User(Base):
 
 class RefreshToken(Base):
     __tablename__ = "refresh_tokens"
+    __table_args__ = (Index("ix_refresh_tokens_user_id_expiry", "user_id", "expiry"),)
 
     id = Column(Integer, primary_key=True, index=True)
-    token = Column(String(255), nullable=False)
+    # SHA-256 hex digest of the token; the raw token is never stored.
+    token_hash = Column(CHAR(64), nullable=False, unique=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     device_info = Column(String(255), nullable=True)
-    expiry = Column(DateTime, nullable=False)
+    # Indexed on its own so the expiry sweeper never scans the table.
+    expiry = Column(DateTime, nullable=False, index=True)
 
     user = relationship("User", back_populates="refresh_tokens")
 
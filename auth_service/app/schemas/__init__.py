@@ -10,6 +10,7 @@ from .auth import (
     ChangePasswordRequest,
     PasswordResetRequest,
     ResetPasswordRequest,
+    UserBatchRequest,
 )
 
 __all__ = [
@@ -22,4 +23,5 @@ __all__ = [
     "ChangePasswordRequest",
     "PasswordResetRequest",
     "ResetPasswordRequest",
+    "UserBatchRequest",
 ]
@@ -5,7 +5,10 @@ Pydantic models for requests and responses in the auth service.
 from datetime import datetime
 from typing import Optional, List
 
-from pydantic import BaseModel, EmailStr, constr
+from pydantic import BaseModel, EmailStr, conlist, constr
+
+# Upper bound on ids accepted by a single batch lookup.
+MAX_BATCH_USER_IDS = 5000
 
 
 class Token(BaseModel):
@@ -60,4 +63,10 @@ class ResetPasswordRequest(BaseModel):
     """Request model for completing a password reset."""
 
     token: str
-    new_password: constr(min_length=8)
\ No newline at end of file
+    new_password: constr(min_length=8)
+
+
+class UserBatchRequest(BaseModel):
+    """Request model for resolving many users in one call."""
+
+    ids: conlist(int, min_items=1, max_items=MAX_BATCH_USER_IDS)
@@ -0,0 +1,136 @@
+"""
+In-process caches backing the authentication fast path.
+
+Two caches live here:
+
+* decoded access-token claims, keyed by a SHA-256 of the raw token so the
+  signature is only verified once per token and process;
+* immutable user/role snapshots, keyed by user id.
+
+User snapshots are dropped whenever a transaction that touches a user's
+credentials, status or roles commits.  This is wired through SQLAlchemy
+session events so every write path (password change, password reset,
+role assignment) invalidates the cache without having to remember to.
+"""
+
+import hashlib
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import get_history
+
+from sukhverse_common.cache import TTLCache
+
+from ..models.user import Role, User
+
+
+@dataclass(frozen=True)
+class UserSnapshot:
+    """Detached, read-only view of a user used by authenticated routes."""
+
+    id: int
+    email: str
+    status: str
+    roles: Tuple[str, ...]
+
+    @classmethod
+    def from_user(cls, user: User) -> "UserSnapshot":
+        return cls(
+            id=user.id,
+            email=user.email,
+            status=user.status,
+            roles=tuple(role.name for role in user.roles),
+        )
+
+
+token_cache = TTLCache(
+    maxsize=int(os.getenv("TOKEN_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("TOKEN_CACHE_TTL_SECONDS", "300")),
+)
+user_cache = TTLCache(
+    maxsize=int(os.getenv("USER_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("USER_CACHE_TTL_SECONDS", "30")),
+)
+
+# Bumped on every invalidation so a snapshot loaded before a concurrent
+# write is not stored after that write has committed.
+_generations: Dict[int, int] = {}
+_generations_lock = threading.Lock()
+
+_PENDING_KEY = "identity_cache_invalidations"
+
+
+def token_key(token: str) -> bytes:
+    return hashlib.sha256(token.encode("utf-8")).digest()
+
+
+def get_claims(token: str, decode: Callable[[str], Dict[str, Any]]) -> Dict[str, Any]:
+    """Return decoded claims for `token`, verifying the signature only on a miss."""
+    key = token_key(token)
+    claims = token_cache.get(key)
+    if claims is None:
+        claims = decode(token)
+        exp = claims.get("exp")
+        ttl = exp - time.time() if isinstance(exp, (int, float)) else None
+        token_cache.set(key, claims, ttl)
+    return claims
+
+
+async def get_user_snapshot(user_id: int, load: Callable[[int], Awaitable[Optional[User]]]) -> Optional[UserSnapshot]:
+    """Return a cached snapshot of the user, loading it on a miss."""
+    snapshot = user_cache.get(user_id)
+    if snapshot is not None:
+        return snapshot
+    with _generations_lock:
+        generation = _generations.get(user_id, 0)
+    user = await load(user_id)
+    if user is None:
+        return None
+    snapshot = UserSnapshot.from_user(user)
+    with _generations_lock:
+        if _generations.get(user_id, 0) == generation:
+            user_cache.set(user_id, snapshot)
+    return snapshot
+
+
+def invalidate_user(user_id: int) -> None:
+    with _generations_lock:
+        _generations[user_id] = _generations.get(user_id, 0) + 1
+        user_cache.pop(user_id)
+
+
+def _pending(session: Session) -> Set[int]:
+    return session.info.setdefault(_PENDING_KEY, set())
+
+
+@event.listens_for(Session, "before_flush")
+def _collect_user_changes(session: Session, flush_context: Any, instances: Any) -> None:
+    pending = _pending(session)
+    for obj in session.dirty:
+        if isinstance(obj, User):
+            if session.is_modified(obj) and obj.id is not None:
+                pending.add(obj.id)
+        elif isinstance(obj, Role):
+            history = get_history(obj, "users")
+            for user in list(history.added) + list(history.deleted):
+                if user.id is not None:
+                    pending.add(user.id)
+    for obj in session.deleted:
+        if isinstance(obj, User) and obj.id is not None:
+            pending.add(obj.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_invalidations(session: Session) -> None:
+    for user_id in session.info.pop(_PENDING_KEY, ()):
+        invalidate_user(user_id)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_invalidations(session: Session, previous_transaction: Any) -> None:
+    session.info.pop(_PENDING_KEY, None)
@@ -1,39 +1,84 @@
-from typing import Generator
+import os
+import secrets
+from typing import Optional
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, Header, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
 
-from ..database import get_db
+from ..database import get_async_db
 from ..models.user import User
 from ..services import auth as auth_service
+from .identity_cache import UserSnapshot, get_claims, get_user_snapshot
 
 # Reuse the same secret and algorithm used for token generation
 JWT_SECRET_KEY = auth_service.JWT_SECRET_KEY
 JWT_ALGORITHM = auth_service.JWT_ALGORITHM
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login", auto_error=False)
 
+# Shared with the services that look identities up, sent as `X-Service-Token`.
+SERVICE_TOKEN = os.getenv("AUTH_SERVICE_TOKEN", "")
+# Users holding one of these roles may look up other users' identities.
+IDENTITY_READER_ROLES = frozenset({"admin", "service"})
 
-def get_current_user(
-    db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)
-) -> User:
-    """Return the user associated with the provided JWT access token."""
+
+def _decode(token: str) -> dict:
+    return jwt.decode(token, JWT_SECRET_KEY, algorithms=[JWT_ALGORITHM])
+
+
+def _load_user(db: Session, user_id: int) -> User | None:
+    return db.query(User).options(selectinload(User.roles)).filter(User.id == user_id).first()
+
+
+async def get_current_user(
+    db: AsyncSession = Depends(get_async_db), token: str = Depends(oauth2_scheme)
+) -> UserSnapshot:
+    """Return the user associated with the provided JWT access token.
+
+    Decoded claims and user snapshots are served from in-process caches,
+    so in the steady state this dependency does not touch the database.
+    """
+    return await _authenticate(db, token)
+
+
+async def require_identity_reader(
+    x_service_token: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db),
+    token: Optional[str] = Depends(optional_oauth2_scheme),
+) -> None:
+    """Admit other services by their `X-Service-Token`, or users with an identity reader role."""
+    if SERVICE_TOKEN and x_service_token and secrets.compare_digest(x_service_token, SERVICE_TOKEN):
+        return
+    if token is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    user = await _authenticate(db, token)
+    if not IDENTITY_READER_ROLES.intersection(user.roles):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not allowed to read user identities")
+
+
+async def _authenticate(db: AsyncSession, token: str) -> UserSnapshot:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, JWT_SECRET_KEY, algorithms=[JWT_ALGORITHM])
+        payload = get_claims(token, _decode)
         user_id: str | None = payload.get("sub")
         if user_id is None:
             raise credentials_exception
     except JWTError:
         raise credentials_exception
 
-    user = db.query(User).filter(User.id == int(user_id)).first()
+    user = await get_user_snapshot(int(user_id), lambda uid: db.run_sync(_load_user, uid))
     if user is None:
         raise credentials_exception
     return user
@@ -5,15 +5,19 @@ Business logic for authentication and user management in the auth service.
 """
 
 from datetime import datetime, timedelta
-from typing import List, Optional
+from typing import List, Optional, Sequence, Tuple
 
+import hashlib
 import os
+import secrets
 from jose import JWTError, jwt
-from sqlalchemy.orm import Session
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
 
 from .. import schemas
 from ..models.user import User, RefreshToken, PasswordReset, Role
-from ..utils.security import hash_password, verify_password
+from ..utils.hashing_pool import hash_password_async, verify_password_async
 from ..events.producer import publish_event
 
 # ✅ Secure loading of JWT-related environment variables
@@ -37,27 +41,63 @@ except ValueError as exc:
     ) from exc
 
 REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "7"))
+REFRESH_TOKEN_SWEEP_BATCH_SIZE = int(os.getenv("REFRESH_TOKEN_SWEEP_BATCH_SIZE", "5000"))
 
 
-def create_user(db: Session, user_in: schemas.UserCreate) -> User:
+def get_user_by_email(db: Session, email: str) -> Optional[User]:
+    """Return the user registered under `email`, if any."""
+    return db.query(User).filter(User.email == email).first()
+
+
+def get_user_by_id(db: Session, user_id: int) -> Optional[User]:
+    """Return the user with primary key `user_id`, if any."""
+    return db.query(User).filter(User.id == user_id).first()
+
+
+async def create_user(db: AsyncSession, user_in: schemas.UserCreate) -> User:
     """Create a new user account and emit a UserRegistered event."""
-    user = User(email=user_in.email, password_hash=hash_password(user_in.password))
+    # Hand the connection back to the pool while the password hashes.
+    await db.close()
+    password_hash = await hash_password_async(user_in.password)
+    return await db.run_sync(_insert_user, user_in.email, password_hash)
+
+
+def _insert_user(db: Session, email: str, password_hash: str) -> User:
+    user = User(email=email, password_hash=password_hash)
     db.add(user)
+    db.flush()
+    # Recorded in the outbox within the same transaction as the user row
+    publish_event("user_registered", {"user_id": user.id, "email": user.email}, db=db)
     db.commit()
     db.refresh(user)
-    # Publish event to Kafka
-    publish_event("user_registered", {"user_id": user.id, "email": user.email})
     return user
 
 
-def authenticate_user(db: Session, email: str, password: str) -> Optional[User]:
-    """Verify user credentials and return the user if valid."""
-    user: User | None = db.query(User).filter(User.email == email).first()
-    if not user or not verify_password(password, user.password_hash):
+def _get_user_with_roles(db: Session, email: str) -> Optional[User]:
+    return db.query(User).options(selectinload(User.roles)).filter(User.email == email).first()
+
+
+async def authenticate_user(db: AsyncSession, email: str, password: str) -> Optional[User]:
+    """Verify user credentials and return the user if valid.
+
+    The user comes back detached, with its roles loaded: the session's
+    connection is returned to the pool before the password is verified.
+    """
+    user: User | None = await db.run_sync(_get_user_with_roles, email)
+    await db.close()
+    if not user or not await verify_password_async(password, user.password_hash):
         return None
     return user
 
 
+def issue_tokens(db: Session, user: User) -> schemas.Token:
+    """Create an access/refresh token pair for an authenticated user."""
+    roles = get_user_roles(user)
+    access_token = create_access_token(user.id, roles)
+    refresh_token = create_refresh_token(db, user.id)
+    return schemas.Token(access_token=access_token, refresh_token=refresh_token)
+
+
 def create_access_token(user_id: int, roles: List[str], expires_delta: Optional[timedelta] = None) -> str:
     """Create a JWT access token embedding the user's roles."""
     to_encode = {"sub": str(user_id), "roles": roles}
@@ -66,23 +106,93 @@ def create_access_token(user_id: int, roles: List[str], expires_delta: Optional[
     return jwt.encode(to_encode, JWT_SECRET_KEY, algorithm=JWT_ALGORITHM)
 
 
+def hash_refresh_token(token: str) -> str:
+    """Return the fixed-width digest under which a refresh token is stored."""
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def _add_refresh_token(db: Session, user_id: int, device_info: str | None = None) -> str:
+    token = secrets.token_urlsafe(32)
+    expiry = datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+    db.add(
+        RefreshToken(
+            token_hash=hash_refresh_token(token),
+            user_id=user_id,
+            device_info=device_info,
+            expiry=expiry,
+        )
+    )
+    return token
+
+
 def create_refresh_token(db: Session, user_id: int, device_info: str | None = None) -> str:
     """Generate and persist a refresh token for a user."""
-    import uuid
-    token = str(uuid.uuid4())
-    expiry = datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
-    db_token = RefreshToken(token=token, user_id=user_id, device_info=device_info, expiry=expiry)
-    db.add(db_token)
+    token = _add_refresh_token(db, user_id, device_info)
     db.commit()
     return token
 
 
-def verify_refresh_token(db: Session, token: str) -> Optional[User]:
-    """Return the associated user if the refresh token is valid and not expired."""
-    db_token = db.query(RefreshToken).filter(RefreshToken.token == token).first()
+def _get_valid_refresh_token(db: Session, token: str) -> Optional[RefreshToken]:
+    db_token = (
+        db.query(RefreshToken)
+        .filter(RefreshToken.token_hash == hash_refresh_token(token))
+        .first()
+    )
     if not db_token or db_token.expiry < datetime.utcnow():
         return None
-    return db_token.user
+    return db_token
+
+
+def rotate_refresh_token(db: Session, token: str) -> Optional[Tuple[User, str]]:
+    """Consume a refresh token and return its user with a freshly issued replacement.
+
+    Each token can be used exactly once: the old row is deleted in the same
+    transaction that stores the new one, and a concurrent rotation of the
+    same token loses the race on the delete.
+    """
+    db_token = _get_valid_refresh_token(db, token)
+    if not db_token:
+        return None
+    user, device_info = db_token.user, db_token.device_info
+    # Deleted below with a guarded statement; the session must not flush it again.
+    db.expunge(db_token)
+    deleted = (
+        db.query(RefreshToken)
+        .filter(RefreshToken.id == db_token.id)
+        .delete(synchronize_session=False)
+    )
+    if deleted != 1:
+        db.rollback()
+        return None
+    new_token = _add_refresh_token(db, user.id, device_info)
+    db.commit()
+    return user, new_token
+
+
+def rotate_tokens(db: Session, token: str) -> Optional[schemas.Token]:
+    """Consume a refresh token and return a new access token and refresh token."""
+    rotated = rotate_refresh_token(db, token)
+    if not rotated:
+        return None
+    user, new_token = rotated
+    return schemas.Token(access_token=create_access_token(user.id, get_user_roles(user)), refresh_token=new_token)
+
+
+def purge_expired_refresh_tokens(db: Session, batch_size: int = REFRESH_TOKEN_SWEEP_BATCH_SIZE) -> int:
+    """Delete up to `batch_size` expired refresh tokens and return how many were removed."""
+    expired_ids = (
+        select(RefreshToken.id)
+        .where(RefreshToken.expiry < datetime.utcnow())
+        .limit(batch_size)
+        .scalar_subquery()
+    )
+    result = db.execute(
+        delete(RefreshToken)
+        .where(RefreshToken.id.in_(expired_ids))
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return result.rowcount
 
 
 def get_user_roles(user: User) -> List[str]:
@@ -90,6 +200,21 @@ def get_user_roles(user: User) -> List[str]:
     return [role.name for role in user.roles]
 
 
+def get_users_by_ids(db: Session, user_ids: Sequence[int]) -> List[User]:
+    """Load the given users and their roles in two queries, regardless of count."""
+    return (
+        db.query(User)
+        .options(selectinload(User.roles))
+        .filter(User.id.in_(set(user_ids)))
+        .all()
+    )
+
+
+def user_record(user: User) -> dict:
+    """Return the compact identity record shared with other services."""
+    return {"id": user.id, "email": user.email, "status": user.status, "roles": get_user_roles(user)}
+
+
 def create_password_reset(db: Session, user_id: int) -> str:
     """Create a password reset token for the given user."""
     import uuid
@@ -109,13 +234,22 @@ def verify_password_reset(db: Session, token: str) -> Optional[PasswordReset]:
     return reset
 
 
-def reset_user_password(db: Session, token: str, new_password: str) -> bool:
+async def reset_user_password(db: AsyncSession, token: str, new_password: str) -> bool:
     """Update the user's password if the reset token is valid."""
+    reset = await db.run_sync(verify_password_reset, token)
+    await db.close()
+    if not reset:
+        return False
+    password_hash = await hash_password_async(new_password)
+    return await db.run_sync(_apply_password_reset, token, password_hash)
+
+
+def _apply_password_reset(db: Session, token: str, password_hash: str) -> bool:
+    # Looked up again: the token may have been used while the password hashed.
     reset = verify_password_reset(db, token)
     if not reset:
         return False
-    user = reset.user
-    user.password_hash = hash_password(new_password)
+    reset.user.password_hash = password_hash
     db.delete(reset)
     db.commit()
     return True
@@ -134,11 +268,21 @@ def decode_access_token(token: str) -> Optional[schemas.TokenData]:
         return None
 
 
-def change_password(db: Session, user_id: int, old_password: str, new_password: str) -> bool:
+async def change_password(db: AsyncSession, user_id: int, old_password: str, new_password: str) -> bool:
     """Update a user's password after verifying the old password."""
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user or not verify_password(old_password, user.password_hash):
+    user = await db.run_sync(get_user_by_id, user_id)
+    # Hand the connection back to the pool while the passwords hash.
+    await db.close()
+    if not user or not await verify_password_async(old_password, user.password_hash):
+        return False
+    password_hash = await hash_password_async(new_password)
+    return await db.run_sync(_set_password_hash, user_id, password_hash)
+
+
+def _set_password_hash(db: Session, user_id: int, password_hash: str) -> bool:
+    user = get_user_by_id(db, user_id)
+    if not user:
         return False
-    user.password_hash = hash_password(new_password)
+    user.password_hash = password_hash
     db.commit()
     return True
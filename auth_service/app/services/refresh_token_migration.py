@@ -0,0 +1,90 @@
+"""
+Move an existing `refresh_tokens` table to hashed tokens.
+
+Refresh tokens used to be stored in the clear in `token`, without any
+index.  They are now looked up by `token_hash`, a SHA-256 hex digest, and
+swept by `expiry`.  `create_all` does not alter existing tables, so a
+database created before the change is migrated once, from the repo root:
+
+    DATABASE_URL=postgresql+psycopg2://.../auth_db JWT_SECRET_KEY=... \\
+        python -m auth_service.app.services.refresh_token_migration
+
+The migration adds `token_hash`, deletes expired tokens, hashes the rest
+`--batch-size` at a time so live sessions survive, drops `token` and
+creates the indexes, in that order.  A table without a `token` column is
+left alone, so running it again is harmless.  On PostgreSQL it amounts to:
+
+    ALTER TABLE refresh_tokens ADD COLUMN token_hash CHAR(64);
+    DELETE FROM refresh_tokens WHERE expiry < now();
+    UPDATE refresh_tokens SET token_hash = encode(sha256(token::bytea), 'hex');
+    ALTER TABLE refresh_tokens ALTER COLUMN token_hash SET NOT NULL;
+    ALTER TABLE refresh_tokens DROP COLUMN token;
+    CREATE UNIQUE INDEX refresh_tokens_token_hash_key ON refresh_tokens (token_hash);
+    CREATE INDEX ix_refresh_tokens_user_id_expiry ON refresh_tokens (user_id, expiry);
+    CREATE INDEX ix_refresh_tokens_expiry ON refresh_tokens (expiry);
+"""
+
+import argparse
+import logging
+from datetime import datetime
+
+from sqlalchemy import bindparam, inspect, text
+from sqlalchemy.engine import Engine
+
+from ..models.user import RefreshToken
+from .auth import hash_refresh_token
+
+logger = logging.getLogger(__name__)
+
+
+def migrate(engine: Engine, batch_size: int = 10000) -> int:
+    """Migrate `refresh_tokens` in place; return how many tokens were hashed."""
+    columns = {column["name"] for column in inspect(engine).get_columns("refresh_tokens")}
+    hashed = 0
+    if "token" in columns:
+        with engine.begin() as connection:
+            if "token_hash" not in columns:
+                connection.execute(text("ALTER TABLE refresh_tokens ADD COLUMN token_hash CHAR(64)"))
+            connection.execute(
+                text("DELETE FROM refresh_tokens WHERE expiry < :now"), {"now": datetime.utcnow()}
+            )
+        update = text("UPDATE refresh_tokens SET token_hash = :digest WHERE id = :row_id").bindparams(
+            bindparam("digest"), bindparam("row_id")
+        )
+        while True:
+            with engine.begin() as connection:
+                rows = connection.execute(
+                    text("SELECT id, token FROM refresh_tokens WHERE token_hash IS NULL ORDER BY id LIMIT :n"),
+                    {"n": batch_size},
+                ).all()
+                if not rows:
+                    break
+                connection.execute(
+                    update, [{"digest": hash_refresh_token(token), "row_id": row_id} for row_id, token in rows]
+                )
+            hashed += len(rows)
+            logger.info("Hashed %d refresh tokens", hashed)
+        with engine.begin() as connection:
+            if engine.dialect.name == "postgresql":
+                connection.execute(text("ALTER TABLE refresh_tokens ALTER COLUMN token_hash SET NOT NULL"))
+            connection.execute(text("ALTER TABLE refresh_tokens DROP COLUMN token"))
+            connection.execute(
+                text("CREATE UNIQUE INDEX IF NOT EXISTS refresh_tokens_token_hash_key ON refresh_tokens (token_hash)")
+            )
+            for index in RefreshToken.__table__.indexes:
+                index.create(connection, checkfirst=True)
+    return hashed
+
+
+def main() -> None:
+    from .. import database
+
+    parser = argparse.ArgumentParser(description="Store refresh tokens as SHA-256 digests.")
+    parser.add_argument("--batch-size", type=int, default=10000)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    print(f"hashed {migrate(database.engine, args.batch_size)} refresh tokens")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Background removal of expired refresh tokens.
+
+Every login adds a row to `refresh_tokens`.  The sweeper periodically
+deletes expired rows in bounded batches so the table and its indexes
+stay proportional to the number of live sessions, without holding long
+locks or large transactions.
+"""
+
+import asyncio
+import logging
+import os
+from typing import Optional
+
+from fastapi.concurrency import run_in_threadpool
+
+from .. import database
+from . import auth as auth_service
+
+logger = logging.getLogger(__name__)
+
+SWEEP_INTERVAL_SECONDS = float(os.getenv("REFRESH_TOKEN_SWEEP_INTERVAL_SECONDS", "300"))
+SWEEP_ENABLED = os.getenv("REFRESH_TOKEN_SWEEP_ENABLED", "true").lower() == "true"
+
+
+def sweep_expired_tokens(batch_size: int = auth_service.REFRESH_TOKEN_SWEEP_BATCH_SIZE) -> int:
+    """Delete expired refresh tokens batch by batch and return the total removed."""
+    total = 0
+    db = database.SessionLocal()
+    try:
+        while True:
+            deleted = auth_service.purge_expired_refresh_tokens(db, batch_size)
+            total += deleted
+            if deleted < batch_size:
+                return total
+    finally:
+        db.close()
+
+
+class RefreshTokenSweeper:
+    """Runs `sweep_expired_tokens` on the event loop's threadpool at a fixed interval."""
+
+    def __init__(self, interval: float = SWEEP_INTERVAL_SECONDS) -> None:
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                removed = await run_in_threadpool(sweep_expired_tokens)
+                if removed:
+                    logger.info("Removed %d expired refresh tokens", removed)
+            except Exception:
+                logger.exception("Refresh token sweep failed")
+
+    async def start(self) -> None:
+        if SWEEP_ENABLED and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+sweeper = RefreshTokenSweeper()
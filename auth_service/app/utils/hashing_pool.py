@@ -0,0 +1,57 @@
+"""
+Bounded worker pool for password hashing.
+
+bcrypt is deliberately slow, so hashing and verifying passwords on the
+request threadpool lets a burst of logins starve every other endpoint.
+This module runs those calls on a dedicated process pool sized to the
+machine's cores and caps the number of outstanding jobs.  When the cap
+is reached new work is rejected immediately with `HashingPoolBusy`,
+which the application turns into a `503` with a `Retry-After` header.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from sukhverse_common.pool import BoundedPool, PoolBusy
+
+from . import security
+
+
+class HashingPoolBusy(PoolBusy):
+    """Raised when the hashing pool queue is full."""
+
+    message = "Password hashing pool is saturated"
+
+
+class HashingPool(BoundedPool):
+    """Process pool for bcrypt with a bounded backlog; see `sukhverse_common.pool`."""
+
+    busy_error = HashingPoolBusy
+
+
+def _build_pool() -> HashingPool:
+    workers = int(os.getenv("PASSWORD_HASH_WORKERS", "0")) or None
+    max_queue = os.getenv("PASSWORD_HASH_MAX_QUEUE")
+    executor = os.getenv("PASSWORD_HASH_EXECUTOR", "process")
+    factory = None
+    if executor == "thread":
+        factory = lambda n: ThreadPoolExecutor(max_workers=n, thread_name_prefix="hashing")
+    return HashingPool(
+        workers=workers,
+        max_queue=int(max_queue) if max_queue else None,
+        retry_after=int(os.getenv("PASSWORD_HASH_RETRY_AFTER", "1")),
+        executor_factory=factory,
+    )
+
+
+hashing_pool = _build_pool()
+
+
+async def hash_password_async(password: str) -> str:
+    """Hash a password on the hashing pool."""
+    return await hashing_pool.run(security.hash_password, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password on the hashing pool."""
+    return await hashing_pool.run(security.verify_password, plain_password, hashed_password)
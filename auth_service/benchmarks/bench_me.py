@@ -0,0 +1,78 @@
+"""
+Benchmark `/auth/me` with and without the identity caches.
+
+Runs the auth app in-process against a SQLite database and reports
+requests/sec for authenticated reads.  Usage (from the repo root):
+
+    python -m auth_service.benchmarks.bench_me --requests 5000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+DB_PATH = os.path.join(tempfile.gettempdir(), "bench_auth_me.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{DB_PATH}")
+os.environ.setdefault("JWT_SECRET_KEY", "benchsecret")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+
+
+class _NullProducer:
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def send(self, *args, **kwargs):
+        pass
+
+
+sys.modules.setdefault("kafka", SimpleNamespace(KafkaProducer=_NullProducer))
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from auth_service.app.main import create_app  # noqa: E402
+from auth_service.app.security import identity_cache  # noqa: E402
+from auth_service.app.services import auth as auth_service  # noqa: E402
+
+
+def run(client: TestClient, headers: dict, requests: int) -> float:
+    start = time.perf_counter()
+    for _ in range(requests):
+        resp = client.get("/auth/me", headers=headers)
+        assert resp.status_code == 200
+    return requests / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+
+    if os.path.exists(DB_PATH):
+        os.remove(DB_PATH)
+    auth_service.publish_event = lambda *a, **kw: None
+    app = create_app()
+    with TestClient(app) as client:
+        client.post("/auth/register", json={"email": "bench@example.com", "password": "password123"})
+        login = client.post("/auth/login", data={"username": "bench@example.com", "password": "password123"})
+        headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+
+        token_size, user_size = identity_cache.token_cache.maxsize, identity_cache.user_cache.maxsize
+        identity_cache.token_cache.maxsize = identity_cache.user_cache.maxsize = 0
+        identity_cache.token_cache.clear()
+        identity_cache.user_cache.clear()
+        uncached = run(client, headers, args.requests)
+
+        identity_cache.token_cache.maxsize, identity_cache.user_cache.maxsize = token_size, user_size
+        client.get("/auth/me", headers=headers)
+        cached = run(client, headers, args.requests)
+
+    print(f"/auth/me without cache: {uncached:8.0f} req/s")
+    print(f"/auth/me with cache:    {cached:8.0f} req/s  ({cached / uncached:.2f}x)")
+    os.remove(DB_PATH)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Benchmark refresh-token rotation against a large `refresh_tokens` table.
+
+Fills a SQLite database with `--rows` refresh tokens (10M by default)
+spread over many users, then times `rotate_refresh_token` for a sample
+of live tokens and reports latency percentiles.  For comparison it also
+times the lookup as it was before tokens were indexed, a scan of the
+table for the token.  Usage (from the repo root):
+
+    python -m auth_service.benchmarks.bench_refresh --rows 10000000
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from typing import List
+
+DB_PATH = os.path.join(tempfile.gettempdir(), "bench_auth_refresh.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{DB_PATH}")
+os.environ.setdefault("JWT_SECRET_KEY", "benchsecret")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+sys.modules.setdefault("kafka", SimpleNamespace(KafkaProducer=lambda *a, **kw: None))
+
+from sqlalchemy import text  # noqa: E402
+
+from auth_service.app.database import SessionLocal, engine  # noqa: E402
+from auth_service.app.models.base import Base  # noqa: E402
+from auth_service.app.models.user import RefreshToken, User  # noqa: E402
+from auth_service.app.services import auth as auth_service  # noqa: E402
+
+USERS = 100_000
+CHUNK = 50_000
+
+
+def populate(rows: int) -> None:
+    Base.metadata.create_all(bind=engine)
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        conn.execute(
+            User.__table__.insert(),
+            [{"email": f"user{i}@example.com", "password_hash": "x"} for i in range(USERS)],
+        )
+    for start in range(0, rows, CHUNK):
+        batch = [
+            {
+                "token_hash": auth_service.hash_refresh_token(f"bench-{i}"),
+                "user_id": i % USERS + 1,
+                # Half the table is already expired, as it would be without sweeping.
+                "expiry": now + timedelta(days=1 if i % 2 else -1),
+            }
+            for i in range(start, min(start + CHUNK, rows))
+        ]
+        with engine.begin() as conn:
+            conn.execute(RefreshToken.__table__.insert(), batch)
+
+
+def _percentiles(latencies: List[float]) -> str:
+    latencies.sort()
+    p99 = latencies[max(int(len(latencies) * 0.99) - 1, 0)]
+    return f"p50 {statistics.median(latencies):.3f} ms, p99 {p99:.3f} ms"
+
+
+def scan_lookups(tokens: List[int]) -> List[float]:
+    """Time the lookup with the digest index unusable, as with the unindexed `token` column."""
+    latencies = []
+    with engine.connect() as conn:
+        for i in tokens:
+            t0 = time.perf_counter()
+            row = conn.execute(
+                text("SELECT id FROM refresh_tokens WHERE token_hash || '' = :digest"),
+                {"digest": auth_service.hash_refresh_token(f"bench-{i}")},
+            ).first()
+            latencies.append((time.perf_counter() - t0) * 1000)
+            assert row is not None
+    return latencies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--samples", type=int, default=2000)
+    parser.add_argument("--scan-samples", type=int, default=20, help="lookups timed without the index")
+    args = parser.parse_args()
+
+    if os.path.exists(DB_PATH):
+        os.remove(DB_PATH)
+    started = time.perf_counter()
+    populate(args.rows)
+    print(f"populated {args.rows:,} rows in {time.perf_counter() - started:.1f}s")
+
+    live = [i for i in random.sample(range(args.rows), min(args.samples * 2, args.rows)) if i % 2][: args.samples]
+    print(f"lookup without index: {_percentiles(scan_lookups(live[: args.scan_samples]))}")
+    latencies = []
+    db = SessionLocal()
+    try:
+        for i in live:
+            t0 = time.perf_counter()
+            assert auth_service.rotate_refresh_token(db, f"bench-{i}") is not None
+            latencies.append((time.perf_counter() - t0) * 1000)
+    finally:
+        db.close()
+    print(f"rotate_refresh_token: {_percentiles(latencies)}")
+
+    t0 = time.perf_counter()
+    from auth_service.app.services.token_sweeper import sweep_expired_tokens
+
+    removed = sweep_expired_tokens()
+    print(f"swept {removed:,} expired rows in {time.perf_counter() - t0:.1f}s")
+    os.remove(DB_PATH)
+
+
+if __name__ == "__main__":
+    main()
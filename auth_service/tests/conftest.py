@@ -1,41 +1,48 @@
 import os
-import sys
-from types import SimpleNamespace
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 
+from sukhverse_common.db import engine_options
+
+
 @pytest.fixture()
 def client(monkeypatch):
-    # Stub kafka module before importing app code
-    class DummyProducer:
-        def __init__(self, *args, **kwargs):
-            pass
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    yield from make_client(monkeypatch, engine)
+
 
-        def send(self, *args, **kwargs):
-            pass
+@pytest.fixture()
+def async_client(monkeypatch, tmp_path):
+    """`client` with the async routes on an aiosqlite engine over a database file."""
+    url = f"sqlite:///{tmp_path / 'auth.db'}"
+    engine = create_engine(url, **engine_options(url))
+    yield from make_client(monkeypatch, engine, async_url=url)
 
-    sys.modules.setdefault("kafka", SimpleNamespace(KafkaProducer=DummyProducer))
 
+def make_client(monkeypatch, engine, async_url=None):
     # Provide required JWT settings for the auth service
     os.environ.setdefault("JWT_SECRET_KEY", "testsecret")
     os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+    os.environ.setdefault("OUTBOX_RELAY_ENABLED", "false")
 
     from auth_service.app import database as database_module
     from auth_service.app.models.base import Base
 
-    engine = create_engine(
-        "sqlite://",
-        connect_args={"check_same_thread": False},
-        poolclass=StaticPool,
-    )
     TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
     Base.metadata.create_all(bind=engine)
 
-    database_module.engine = engine
-    database_module.SessionLocal = TestingSessionLocal
+    monkeypatch.setattr(database_module, "engine", engine)
+    monkeypatch.setattr(database_module, "SessionLocal", TestingSessionLocal)
+    if async_url:
+        monkeypatch.setattr(database_module.async_db, "url", async_url)
+        monkeypatch.setattr(database_module.async_db, "enabled", True)
 
     from auth_service.app import schemas as schemas_pkg
     from auth_service.app.schemas import auth as auth_schemas
@@ -50,9 +57,16 @@ def client(monkeypatch):
         "ChangePasswordRequest",
         "PasswordResetRequest",
         "ResetPasswordRequest",
+        "UserBatchRequest",
     ):
         setattr(schemas_pkg, name, getattr(auth_schemas, name))
 
+    from auth_service.app.security import identity_cache
+
+    # Each test starts from an empty database, so ids are reused
+    identity_cache.token_cache.clear()
+    identity_cache.user_cache.clear()
+
     from auth_service.app.main import create_app
     from auth_service.app.database import get_db
     from auth_service.app.events import producer as producer_module
@@ -67,7 +81,7 @@ def client(monkeypatch):
 
     events = []
 
-    def fake_publish_event(topic, message, key=None):
+    def fake_publish_event(topic, message, key=None, db=None):
         events.append({"topic": topic, "message": message, "key": key})
 
     monkeypatch.setattr(producer_module, "publish_event", fake_publish_event)
@@ -78,4 +92,6 @@ def client(monkeypatch):
 
     with TestClient(app) as c:
         c.event_calls = events
+        c.session_factory = TestingSessionLocal
+        c.async_db = database_module.async_db
         yield c
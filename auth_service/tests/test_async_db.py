@@ -0,0 +1,31 @@
+from sqlalchemy import event
+
+
+def test_hot_routes_on_async_sessions(async_client):
+    statements = []
+    event.listen(async_client.async_db.engine.sync_engine, "before_cursor_execute", lambda *a: statements.append(a[2]))
+
+    assert async_client.post("/auth/register", json={"email": "a@example.com", "password": "secret123"}).status_code == 201
+    login = async_client.post("/auth/login", data={"username": "a@example.com", "password": "secret123"})
+    assert login.status_code == 200
+    tokens = login.json()
+    assert async_client.post("/auth/login", data={"username": "a@example.com", "password": "nope"}).status_code == 401
+
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+    me = async_client.get("/auth/me", headers=headers)
+    assert me.json() == {"id": me.json()["id"], "email": "a@example.com", "status": "active", "roles": []}
+
+    refreshed = async_client.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert refreshed.status_code == 200
+    rotated = async_client.post("/auth/refresh-token", json={"refresh_token": refreshed.json()["refresh_token"]})
+    assert rotated.status_code == 200
+    assert rotated.json()["refresh_token"] != refreshed.json()["refresh_token"]
+    assert async_client.post("/auth/refresh-token", json={"refresh_token": tokens["refresh_token"]}).status_code == 401
+
+    changed = async_client.post(
+        "/auth/change-password", json={"old_password": "secret123", "new_password": "secret456"}, headers=headers
+    )
+    assert changed.status_code == 200
+    assert async_client.post("/auth/login", data={"username": "a@example.com", "password": "secret456"}).status_code == 200
+    # Everything above ran on the async engine.
+    assert any("refresh_tokens" in statement for statement in statements)
@@ -47,7 +47,9 @@ def test_login_and_refresh(client):
     assert refresh_resp.status_code == 200
     refreshed = refresh_resp.json()
     assert refreshed["access_token"]
-    assert refreshed["refresh_token"] == token["refresh_token"]
+    assert refreshed["refresh_token"] != token["refresh_token"]
+    # The legacy alias rotates too, so the old token is spent.
+    assert client.post("/auth/refresh", json={"refresh_token": token["refresh_token"]}).status_code == 401
 
 
 def test_me_requires_auth_and_returns_user(client):
@@ -94,3 +96,112 @@ def test_forgot_and_reset_missing(client):
     assert resp1.status_code == 404
     assert resp2.status_code == 400
 
+
+
+def test_refresh_token_rotation_is_one_shot(client):
+    client.post(
+        "/auth/register",
+        json={"email": "rotate@example.com", "password": "secret123"},
+    )
+    token = client.post(
+        "/auth/login",
+        data={"username": "rotate@example.com", "password": "secret123"},
+    ).json()
+
+    rotated = client.post("/auth/refresh-token", json={"refresh_token": token["refresh_token"]})
+    assert rotated.status_code == 200
+    new_refresh = rotated.json()["refresh_token"]
+    assert new_refresh and new_refresh != token["refresh_token"]
+
+    replay = client.post("/auth/refresh-token", json={"refresh_token": token["refresh_token"]})
+    assert replay.status_code == 401
+
+    again = client.post("/auth/refresh-token", json={"refresh_token": new_refresh})
+    assert again.status_code == 200
+
+
+def test_sweeper_removes_expired_tokens_in_batches(client):
+    from datetime import datetime, timedelta
+
+    from auth_service.app import database
+    from auth_service.app.models.user import RefreshToken, User
+    from auth_service.app.services.token_sweeper import sweep_expired_tokens
+
+    db = database.SessionLocal()
+    try:
+        user = User(email="sweep@example.com", password_hash="x")
+        db.add(user)
+        db.flush()
+        now = datetime.utcnow()
+        for i in range(7):
+            db.add(RefreshToken(token_hash=f"{i:064d}", user_id=user.id, expiry=now - timedelta(days=1)))
+        db.add(RefreshToken(token_hash="f" * 64, user_id=user.id, expiry=now + timedelta(days=1)))
+        db.commit()
+
+        assert sweep_expired_tokens(batch_size=3) == 7
+        remaining = db.query(RefreshToken).all()
+        assert [t.token_hash for t in remaining] == ["f" * 64]
+    finally:
+        db.close()
+
+
+@pytest.fixture()
+def service_headers(monkeypatch):
+    from auth_service.app.security import jwt as jwt_module
+
+    monkeypatch.setattr(jwt_module, "SERVICE_TOKEN", "service-secret")
+    return {"X-Service-Token": "service-secret"}
+
+
+def test_users_batch_lookup(client, service_headers):
+    ids = []
+    for i in range(3):
+        resp = client.post(
+            "/auth/register",
+            json={"email": f"batch{i}@example.com", "password": "password123"},
+        )
+        ids.append(resp.json()["id"])
+
+    resp = client.post("/auth/users:batch", json={"ids": ids + [ids[0], 9999]}, headers=service_headers)
+    assert resp.status_code == 200
+    assert b", " not in resp.content  # compact orjson output
+    users = {u["id"]: u for u in resp.json()["users"]}
+    assert set(users) == set(ids)
+    assert users[ids[1]] == {"id": ids[1], "email": "batch1@example.com", "status": "active", "roles": []}
+
+    single = client.get(f"/auth/users/{ids[2]}", headers=service_headers)
+    assert single.status_code == 200
+    assert single.json()["email"] == "batch2@example.com"
+    assert client.get("/auth/users/9999", headers=service_headers).status_code == 404
+
+
+def test_user_lookups_require_a_service_token_or_reader_role(client, service_headers):
+    from auth_service.app.models.user import Role, User
+
+    client.post("/auth/register", json={"email": "plain@example.com", "password": "password123"})
+    client.post("/auth/register", json={"email": "admin@example.com", "password": "password123"})
+    with client.session_factory() as db:
+        admin = db.query(User).filter(User.email == "admin@example.com").one()
+        admin.roles.append(Role(name="admin"))
+        db.commit()
+
+    def bearer(email):
+        login = client.post("/auth/login", data={"username": email, "password": "password123"})
+        return {"Authorization": f"Bearer {login.json()['access_token']}"}
+
+    for headers, expected in (
+        ({}, 401),
+        ({"X-Service-Token": "guess"}, 401),
+        (bearer("plain@example.com"), 403),
+        (bearer("admin@example.com"), 200),
+    ):
+        assert client.post("/auth/users:batch", json={"ids": [1, 2]}, headers=headers).status_code == expected
+        assert client.get("/auth/users/1", headers=headers).status_code == expected
+
+
+def test_users_batch_rejects_empty_and_oversized(client, service_headers):
+    from auth_service.app.schemas.auth import MAX_BATCH_USER_IDS
+
+    assert client.post("/auth/users:batch", json={"ids": []}, headers=service_headers).status_code == 422
+    too_many = list(range(MAX_BATCH_USER_IDS + 1))
+    assert client.post("/auth/users:batch", json={"ids": too_many}, headers=service_headers).status_code == 422
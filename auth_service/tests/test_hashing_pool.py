@@ -0,0 +1,91 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+
+def test_pool_rejects_when_backlog_full():
+    from auth_service.app.utils.hashing_pool import HashingPool, HashingPoolBusy
+
+    pool = HashingPool(
+        workers=1,
+        max_queue=1,
+        retry_after=3,
+        executor_factory=lambda n: ThreadPoolExecutor(max_workers=n),
+    )
+    gate = threading.Event()
+
+    async def scenario():
+        running = asyncio.ensure_future(pool.run(gate.wait))
+        queued = asyncio.ensure_future(pool.run(gate.wait))
+        await asyncio.sleep(0)
+        assert pool.metrics()["in_flight"] == 2
+        assert pool.metrics()["queue_depth"] == 1
+        with pytest.raises(HashingPoolBusy) as excinfo:
+            await pool.run(gate.wait)
+        assert excinfo.value.retry_after == 3
+        gate.set()
+        await asyncio.gather(running, queued)
+
+    asyncio.run(scenario())
+    metrics = pool.metrics()
+    assert metrics["in_flight"] == 0
+    assert metrics["completed"] == 2
+    assert metrics["rejected"] == 1
+    pool.shutdown()
+
+
+def test_saturated_pool_returns_503_with_retry_after(client, monkeypatch):
+    from auth_service.app.utils.hashing_pool import hashing_pool
+
+    monkeypatch.setattr(hashing_pool, "_in_flight", hashing_pool.capacity)
+    resp = client.post(
+        "/auth/register",
+        json={"email": "busy@example.com", "password": "password123"},
+    )
+    assert resp.status_code == 503
+    assert resp.headers["Retry-After"] == str(hashing_pool.retry_after)
+
+    metrics = client.get("/auth/metrics/hashing-pool").json()
+    assert metrics["rejected"] >= 1
+    assert metrics["queue_depth"] == hashing_pool.max_queue
+
+
+@pytest.mark.parametrize("fixture", ["client", "async_client"])
+def test_no_connection_is_checked_out_while_hashing(fixture, request, monkeypatch):
+    from sqlalchemy import event
+
+    from auth_service.app import database
+    from auth_service.app.services import auth as auth_service
+
+    client = request.getfixturevalue(fixture)
+    engine = client.async_db.engine.sync_engine if client.async_db.enabled else database.engine
+    checked_out = []
+    event.listen(engine, "checkout", lambda *a: checked_out.append(1))
+    event.listen(engine, "checkin", lambda *a: checked_out.pop())
+    seen = []
+
+    def recording(func):
+        async def wrapper(*args):
+            seen.append(len(checked_out))
+            return await func(*args)
+        return wrapper
+
+    monkeypatch.setattr(auth_service, "hash_password_async", recording(auth_service.hash_password_async))
+    monkeypatch.setattr(auth_service, "verify_password_async", recording(auth_service.verify_password_async))
+
+    assert client.post("/auth/register", json={"email": "a@example.com", "password": "secret123"}).status_code == 201
+    login = client.post("/auth/login", data={"username": "a@example.com", "password": "secret123"})
+    assert login.status_code == 200
+    headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+    changed = client.post(
+        "/auth/change-password", json={"old_password": "secret123", "new_password": "secret456"}, headers=headers
+    )
+    assert changed.status_code == 200
+    token = client.post("/auth/forgot-password", json={"email": "a@example.com"}).json()["reset_token"]
+    assert client.post("/auth/reset-password", json={"token": token, "new_password": "secret789"}).status_code == 200
+    assert client.post("/auth/login", data={"username": "a@example.com", "password": "secret789"}).status_code == 200
+
+    # register, login, change-password (2), reset-password, login
+    assert seen == [0] * 6
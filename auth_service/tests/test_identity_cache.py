@@ -0,0 +1,75 @@
+from sqlalchemy import event
+
+
+def _login(client, email, password="password123"):
+    client.post("/auth/register", json={"email": email, "password": password})
+    resp = client.post("/auth/login", data={"username": email, "password": password})
+    return resp.json()["access_token"]
+
+
+def _count_queries(engine):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    return statements, lambda: event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def test_me_is_served_from_cache(client):
+    from auth_service.app import database
+
+    token = _login(client, "cached@example.com")
+    headers = {"Authorization": f"Bearer {token}"}
+    assert client.get("/auth/me", headers=headers).status_code == 200
+
+    statements, stop = _count_queries(database.engine)
+    try:
+        for _ in range(3):
+            resp = client.get("/auth/me", headers=headers)
+            assert resp.status_code == 200
+            assert resp.json()["email"] == "cached@example.com"
+    finally:
+        stop()
+    assert statements == []
+
+
+def test_role_change_invalidates_snapshot(client):
+    from auth_service.app import database
+    from auth_service.app.models.user import Role, User
+    from auth_service.app.security import identity_cache
+
+    token = _login(client, "roles@example.com")
+    headers = {"Authorization": f"Bearer {token}"}
+    me = client.get("/auth/me", headers=headers).json()
+    assert me["roles"] == []
+    assert identity_cache.user_cache.get(me["id"]) is not None
+
+    db = database.SessionLocal()
+    try:
+        user = db.query(User).filter(User.id == me["id"]).first()
+        user.roles.append(Role(name="trainer"))
+        db.commit()
+    finally:
+        db.close()
+
+    assert identity_cache.user_cache.get(me["id"]) is None
+    assert client.get("/auth/me", headers=headers).json()["roles"] == ["trainer"]
+
+
+def test_change_password_invalidates_snapshot(client):
+    from auth_service.app.security import identity_cache
+
+    token = _login(client, "pw@example.com")
+    headers = {"Authorization": f"Bearer {token}"}
+    user_id = client.get("/auth/me", headers=headers).json()["id"]
+    assert identity_cache.user_cache.get(user_id) is not None
+
+    resp = client.post(
+        "/auth/change-password",
+        json={"old_password": "password123", "new_password": "newpassword123"},
+        headers=headers,
+    )
+    assert resp.status_code == 200
+    assert identity_cache.user_cache.get(user_id) is None
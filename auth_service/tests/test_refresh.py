@@ -15,6 +15,7 @@ sys.path.append(str(pathlib.Path(__file__).resolve().parents[2]))
 from auth_service.app.main import create_app
 from auth_service.app.database import SessionLocal
 from auth_service.app.models.user import RefreshToken
+from auth_service.app.services.auth import hash_refresh_token
 
 @pytest.fixture(scope="module")
 def client():
@@ -46,11 +47,41 @@ def test_refresh_token_flow(client):
 
     # Verify refresh token persisted
     with SessionLocal() as db:
-        assert db.query(RefreshToken).filter(RefreshToken.token == refresh_token).first()
+        assert db.query(RefreshToken).filter(RefreshToken.token_hash == hash_refresh_token(refresh_token)).first()
 
     resp = client.post("/auth/refresh", json={"refresh_token": refresh_token})
     assert resp.status_code == 200
     new_tokens = resp.json()
-    assert new_tokens["refresh_token"] == refresh_token
+    assert new_tokens["refresh_token"] != refresh_token
     assert new_tokens["access_token"]
     assert new_tokens["token_type"] == "bearer"
+
+
+def test_migration_hashes_stored_tokens_and_creates_the_indexes(tmp_path):
+    from datetime import datetime, timedelta
+
+    from sqlalchemy import create_engine, inspect, text
+
+    from auth_service.app.services.refresh_token_migration import migrate
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'old_auth.db'}")
+    live, expired = datetime.utcnow() + timedelta(days=1), datetime.utcnow() - timedelta(days=1)
+    with engine.begin() as connection:
+        connection.execute(text(
+            "CREATE TABLE refresh_tokens (id INTEGER PRIMARY KEY, token VARCHAR(255) NOT NULL, "
+            "user_id INTEGER NOT NULL, device_info VARCHAR(255), expiry DATETIME NOT NULL)"
+        ))
+        connection.execute(
+            text("INSERT INTO refresh_tokens (token, user_id, expiry) VALUES (:token, 1, :expiry)"),
+            [{"token": f"t{n}", "expiry": expired if n % 2 else live} for n in range(5)],
+        )
+
+    assert migrate(engine, batch_size=2) == 3
+    assert migrate(engine, batch_size=2) == 0
+    with engine.connect() as connection:
+        rows = connection.execute(text("SELECT * FROM refresh_tokens ORDER BY id")).mappings().all()
+    assert [row["token_hash"] for row in rows] == [hash_refresh_token(f"t{n}") for n in (0, 2, 4)]
+    assert "token" not in rows[0]
+    indexes = {index["name"]: index["unique"] for index in inspect(engine).get_indexes("refresh_tokens")}
+    assert indexes["refresh_tokens_token_hash_key"]
+    assert not indexes["ix_refresh_tokens_user_id_expiry"] and not indexes["ix_refresh_tokens_expiry"]
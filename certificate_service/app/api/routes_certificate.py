@@ -2,36 +2,164 @@
 API routes for certificate management.
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
+import anyio
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from ..database import get_db
-from ..schemas.certificate import CertificateCreate, CertificateOut, CertificateTemplateCreate, IssueCertificateRequest, IssuedCertificateOut
-from ..models.certificate import Certificate, IssuedCertificate
-from ..services import certificate_service
+from sukhverse_common import pagination
+
+from ..database import get_async_db, get_db
+from ..schemas.certificate import (
+    BulkIssueRequest,
+    CertificateCreate,
+    CertificateOut,
+    CertificateTemplateCreate,
+    IssueCertificateRequest,
+    IssuedCertificateOut,
+)
+from ..models.certificate import Certificate
+from ..events.consumer import eligibility_consumer
+from ..security import require_admin
+from ..services import bulk_issue, certificate_service, criteria, downloads, eligibility, file_store, rendering
 
 router = APIRouter(prefix="/certificates", tags=["certificates"])
 
 
 @router.post("", response_model=CertificateOut, status_code=status.HTTP_201_CREATED)
 def create_certificate_route(cert_in: CertificateCreate, db: Session = Depends(get_db)):
-    cert = certificate_service.create_certificate(db, cert_in)
+    try:
+        cert = certificate_service.create_certificate(db, cert_in)
+    except criteria.CriteriaError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
     return cert
 
 
-@router.post("/templates", status_code=status.HTTP_201_CREATED)
+@router.post("/templates", status_code=status.HTTP_201_CREATED, dependencies=[Depends(require_admin)])
 def create_template_route(tmpl_in: CertificateTemplateCreate, db: Session = Depends(get_db)):
-    tmpl = certificate_service.create_template(db, tmpl_in)
+    try:
+        tmpl = certificate_service.create_template(db, tmpl_in)
+    except rendering.TemplateError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
     return {"template_id": tmpl.id}
 
 
 @router.post("/issue", response_model=IssuedCertificateOut, status_code=status.HTTP_201_CREATED)
-def issue_certificate_route(req: IssueCertificateRequest, db: Session = Depends(get_db)):
-    issued = certificate_service.issue_certificate(db, req)
+async def issue_certificate_route(req: IssueCertificateRequest, response: Response, db: AsyncSession = Depends(get_async_db)):
+    """Render the certificate on the render pool, then record it.
+
+    A user holds a certificate at most once: issuing it again returns the
+    existing issuance with a `200`.  An issuance a bulk run created but
+    has not rendered is rendered now, unless that run is still rendering
+    it, in which case it is returned as is with a `202`.
+    """
+    issued = await db.run_sync(certificate_service.find_issued, req.certificate_id, req.user_id)
+    if issued is not None and issued.file_url is not None:
+        response.status_code = status.HTTP_200_OK
+        return issued
+    job = await db.run_sync(certificate_service.render_job, req)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Certificate not found")
+    if issued is None:
+        # Hand the connection back to the pool while the certificate renders.
+        await db.close()
+        digest = await rendering.render_pool.render(job)
+        issued = await db.run_sync(certificate_service.record_issued, req, file_store.file_url(digest))
+    else:
+        response.status_code = status.HTTP_200_OK
+        token = bulk_issue.new_token()
+        pending, _ = await db.run_sync(bulk_issue.claim, req.certificate_id, [req.user_id], token)
+        if pending:
+            await db.close()
+            try:
+                digest = await rendering.render_pool.render(job)
+            except BaseException:
+                # Also when the client disconnects, so the claim does not linger.
+                with anyio.CancelScope(shield=True):
+                    await db.run_sync(bulk_issue.release, token)
+                raise
+            await db.run_sync(bulk_issue.finish, req.certificate_id, token, pending, [digest])
+            issued = await db.run_sync(certificate_service.find_issued, req.certificate_id, req.user_id)
+    if issued.file_url is None:
+        response.status_code = status.HTTP_202_ACCEPTED
     return issued
 
 
+@router.post("/{certificate_id}/issue:bulk")
+def bulk_issue_route(certificate_id: int, req: BulkIssueRequest, db: Session = Depends(get_db)):
+    """Issue the certificate to every listed user, or every eligible one, who does not hold it yet.
+
+    Progress is streamed as JSON Lines, one line per chunk of users; the
+    last line has `status` `completed` or `failed`.  Rerunning resumes
+    where a failed run stopped.
+    """
+    cert = db.query(Certificate).filter(Certificate.id == certificate_id).first()
+    if cert is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Certificate not found")
+    if req.all_eligible:
+        if not cert.criteria:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Certificate has no criteria")
+        try:
+            user_ids = eligibility.eligible_user_ids(db, cert.workshop_id, cert.criteria)
+        except criteria.CriteriaError as exc:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+    else:
+        user_ids = list(dict.fromkeys(req.user_ids))
+    return StreamingResponse(
+        bulk_issue.issue_bulk(certificate_id, user_ids, req.fields),
+        media_type="application/x-ndjson",
+    )
+
+
+@router.api_route("/files/{digest}.pdf", methods=["GET", "HEAD"])
+async def download_file(digest: str, request: Request):
+    """A stored certificate by digest, with Range, ETag and immutable caching; no database access."""
+    response = downloads.file_response(digest, request.headers) if file_store.is_digest(digest) else None
+    if response is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found")
+    return response
+
+
+@router.api_route("/issued/{issued_id}/file", methods=["GET", "HEAD"])
+async def download_issued_certificate(issued_id: int, request: Request):
+    """An issued certificate's PDF; its file is looked up in the database only once."""
+    digest = downloads.digest_cache.get(issued_id)
+    if digest is None:
+        digest = await downloads.lookup_digest(issued_id)
+    response = downloads.file_response(digest, request.headers) if digest else None
+    if response is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Certificate file not found")
+    return response
+
+
+@router.get("/metrics/rendering")
+def render_pool_metrics():
+    """Render pool queue depth, throughput and latency."""
+    return rendering.render_pool.metrics()
+
+
+@router.get("/metrics/eligibility")
+def eligibility_metrics():
+    """Events applied and certificates auto-issued by the eligibility consumer."""
+    return eligibility_consumer.metrics()
+
+
 @router.get("/user/{user_id}", response_model=list[IssuedCertificateOut])
-def list_user_certificates(user_id: int, db: Session = Depends(get_db)):
-    certs = db.query(IssuedCertificate).filter(IssuedCertificate.user_id == user_id).all()
-    return certs
\ No newline at end of file
+async def list_user_certificates(
+    user_id: int,
+    request: Request,
+    response: Response,
+    cursor: str | None = None,
+    limit: int = Query(pagination.DEFAULT_PAGE_SIZE, ge=1, le=pagination.MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """A user's certificates, newest first; the next page is linked from the `Link` header."""
+    try:
+        page = await db.run_sync(certificate_service.list_user_certificates, user_id, cursor, limit)
+    except pagination.InvalidCursor as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+    link = pagination.next_link(request.url, page.next_cursor)
+    if link:
+        response.headers["Link"] = link
+    return page.items
\ No newline at end of file
@@ -0,0 +1,56 @@
+"""
+Rebuild the eligibility counters from the workshop and quiz databases.
+
+Replays `workshops`, `substep_progress` and `quiz_results` through the
+same code the consumer uses, one transaction per chunk.  Nothing is
+issued while replaying; afterwards issue each certificate to everyone
+eligible with `POST /certificates/<id>/issue:bulk` and
+`{"all_eligible": true}`.  From the repo root:
+
+    python -m certificate_service.app.events.backfill --reset \\
+        --workshop-url postgresql+psycopg2://.../workshop_db \\
+        --quiz-url postgresql+psycopg2://.../quiz_db
+
+Rerunning without `--reset` resumes from the checkpoint file.
+"""
+
+from typing import Callable, List, Optional
+
+from sqlalchemy.orm import Session
+
+from sukhverse_common.events import backfill
+
+from .. import database
+from ..models.eligibility import PassedQuiz, StudentProgress, SubstepState, WorkshopTotal
+from ..services.eligibility import apply_events
+
+
+class EligibilitySink:
+    """Applies replayed events to the eligibility counters."""
+
+    def __init__(self, session_factory: Optional[Callable[[], Session]] = None) -> None:
+        self.session_factory = session_factory or (lambda: database.SessionLocal())
+
+    def reset(self) -> None:
+        db = self.session_factory()
+        try:
+            for model in (StudentProgress, WorkshopTotal, SubstepState, PassedQuiz):
+                db.query(model).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    def apply(self, events: List[backfill.Event]) -> None:
+        db = self.session_factory()
+        try:
+            apply_events(db, events)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+
+if __name__ == "__main__":
+    backfill.main(EligibilitySink)
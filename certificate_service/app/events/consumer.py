@@ -0,0 +1,168 @@
+"""
+Kafka consumer auto-issuing certificates.
+
+Workers join the `certificate_service` consumer group and read
+workshop and quiz events keyed by `user_id`, so each student's events
+arrive in order at a single worker.
+
+Each worker loops over micro-batches: poll up to `batch_size` records,
+fold them into the students' counters, claim the certificates they now
+qualify for, commit that transaction and then the Kafka offsets.  Only
+then are the claimed certificates rendered and recorded.  A crash
+before the offsets are committed redelivers the batch, which the
+idempotent counters absorb.  Claimed certificates left unrendered by a
+crash afterwards are rendered on the student's next event, or by a bulk
+issuance to all eligible students.
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from sukhverse_common.events import serializers
+from sukhverse_common.events.registry import SchemaError
+
+from .. import database
+from ..services import bulk_issue
+from ..services.eligibility import TOPICS, Event, apply_events
+
+logger = logging.getLogger(__name__)
+
+CONSUMER_ENABLED = os.getenv("CERTIFICATE_CONSUMER_ENABLED", "true").lower() == "true"
+CONSUMER_GROUP = os.getenv("CERTIFICATE_CONSUMER_GROUP", "certificate_service")
+WORKERS = int(os.getenv("CERTIFICATE_CONSUMER_WORKERS", "1"))
+BATCH_SIZE = int(os.getenv("CERTIFICATE_BATCH_SIZE", "2000"))
+
+
+def decode_records(records: List[Any]) -> List[Event]:
+    """Turn consumed records into `(topic, payload, time)`, skipping undecodable ones."""
+    events: List[Event] = []
+    for record in records:
+        try:
+            payload = serializers.decode(record.value, record.headers, record.topic)
+        except (SchemaError, ValueError):
+            logger.exception("Skipping undecodable %s record at offset %s", record.topic, record.offset)
+            continue
+        events.append((record.topic, payload, None))
+    return events
+
+
+class EligibilityConsumer:
+    """Pool of consumer-group workers applying event micro-batches and issuing certificates."""
+
+    def __init__(
+        self,
+        workers: int = WORKERS,
+        batch_size: int = BATCH_SIZE,
+        poll_timeout_ms: int = 500,
+        retry_seconds: float = 5.0,
+        session_factory: Optional[Callable[[], Session]] = None,
+    ) -> None:
+        self.workers = workers
+        self.batch_size = batch_size
+        self.poll_timeout_ms = poll_timeout_ms
+        self.retry_seconds = retry_seconds
+        self.session_factory = session_factory or (lambda: database.SessionLocal())
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._events = 0
+        self._batches = 0
+        self._issued = 0
+        self._busy_seconds = 0.0
+
+    def _connect(self) -> Any:
+        from kafka import KafkaConsumer
+
+        return KafkaConsumer(
+            *TOPICS,
+            bootstrap_servers=os.getenv("KAFKA_BOOTSTRAP_SERVERS", "kafka:9092"),
+            group_id=CONSUMER_GROUP,
+            enable_auto_commit=False,
+            auto_offset_reset="earliest",
+            max_poll_records=self.batch_size,
+        )
+
+    def process_batch(self, consumer: Any) -> int:
+        """Poll one micro-batch from `consumer`, apply it, commit and issue; return its size."""
+        batches = consumer.poll(timeout_ms=self.poll_timeout_ms, max_records=self.batch_size)
+        records = [record for partition_records in batches.values() for record in partition_records]
+        if not records:
+            return 0
+        started = time.perf_counter()
+        db = self.session_factory()
+        try:
+            token = bulk_issue.new_token()
+            try:
+                eligible = apply_events(db, decode_records(records))
+                claimed = {
+                    certificate_id: bulk_issue.claim_all(db, certificate_id, user_ids, token)
+                    for certificate_id, user_ids in eligible.items()
+                }
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+            consumer.commit()
+            issued = 0
+            for certificate_id, pending in claimed.items():
+                if pending:
+                    issued += bulk_issue.render_claimed(db, certificate_id, token, pending)
+        finally:
+            db.close()
+        with self._lock:
+            self._events += len(records)
+            self._batches += 1
+            self._issued += issued
+            self._busy_seconds += time.perf_counter() - started
+        return len(records)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                consumer = self._connect()
+            except Exception:
+                logger.exception("Certificate consumer could not connect; retrying")
+                self._stop.wait(self.retry_seconds)
+                continue
+            try:
+                while not self._stop.is_set():
+                    self.process_batch(consumer)
+            except Exception:
+                # Closing without committing rewinds this member's partitions
+                # to the last committed offsets.
+                logger.exception("Certificate consumer failed; reconnecting")
+                self._stop.wait(self.retry_seconds)
+            finally:
+                consumer.close()
+
+    def start(self) -> None:
+        if CONSUMER_ENABLED and not self._threads:
+            self._stop.clear()
+            for index in range(self.workers):
+                thread = threading.Thread(target=self._run, name=f"certificate-consumer-{index}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self) -> None:
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout=10)
+        self._threads = []
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "workers": len(self._threads),
+                "events": self._events,
+                "batches": self._batches,
+                "issued": self._issued,
+                "events_per_busy_second": round(self._events / self._busy_seconds) if self._busy_seconds else None,
+            }
+
+
+eligibility_consumer = EligibilityConsumer()
@@ -2,18 +2,33 @@
 Entrypoint for the certificate service.
 """
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
-from .database import engine
+from sukhverse_common.events.bus import metrics_router
+
+from .database import async_db, engine
 from .models.base import Base
 from .api.routes_certificate import router as certificate_router
+from .events.consumer import eligibility_consumer
+from .events.producer import bus, outbox_relay
+from .services.rendering import RenderPoolBusy, render_pool
 
 
 def init_db() -> None:
     Base.metadata.create_all(bind=engine)
 
 
+async def render_pool_busy_handler(request: Request, exc: RenderPoolBusy) -> JSONResponse:
+    """Shed load quickly instead of queueing behind saturated render workers."""
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Server busy, please retry"},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
 def create_app() -> FastAPI:
     app = FastAPI(title="Certificate Service", version="0.1.0")
     app.add_middleware(
@@ -24,6 +39,17 @@ def create_app() -> FastAPI:
     )
     init_db()
     app.include_router(certificate_router)
+    app.include_router(metrics_router(bus, outbox_relay))
+    app.add_exception_handler(RenderPoolBusy, render_pool_busy_handler)
+    app.add_event_handler("startup", outbox_relay.start)
+    app.add_event_handler("startup", eligibility_consumer.start)
+    # Stopped first: it writes to the outbox and renders on the pool.
+    app.add_event_handler("shutdown", eligibility_consumer.stop)
+    app.add_event_handler("shutdown", outbox_relay.stop)
+    # Registered after the relay so its final drain is flushed too.
+    app.add_event_handler("shutdown", bus.aclose)
+    app.add_event_handler("shutdown", async_db.dispose)
+    app.add_event_handler("shutdown", render_pool.shutdown)
     return app
 
 
@@ -2,7 +2,7 @@
 SQLAlchemy models for the certificate service.
 """
 
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, JSON, Index
 from sqlalchemy.sql import func
 
 from .base import Base
@@ -14,6 +14,8 @@ class Certificate(Base):
     workshop_id = Column(Integer, nullable=False)
     name = Column(String(100), nullable=False)
     criteria = Column(JSON, nullable=True)
+    # Layout to render with; the built-in one when unset.
+    template_id = Column(Integer, ForeignKey("certificate_templates.id"), nullable=True)
 
 
 class CertificateTemplate(Base):
@@ -25,8 +27,24 @@ class CertificateTemplate(Base):
 
 class IssuedCertificate(Base):
     __tablename__ = "issued_certificates"
+    __table_args__ = (
+        # Per-user listing, newest first; covering on PostgreSQL.
+        Index(
+            "ix_issued_certificates_user_id_issued_at",
+            "user_id",
+            "issued_at",
+            "id",
+            postgresql_include=["certificate_id", "file_url"],
+        ),
+        # A certificate is issued to a user at most once.
+        Index("uq_issued_certificates_certificate_id_user_id", "certificate_id", "user_id", unique=True),
+    )
     id = Column(Integer, primary_key=True, index=True)
     certificate_id = Column(Integer, ForeignKey("certificates.id"), nullable=False)
     user_id = Column(Integer, nullable=False)
     issued_at = Column(DateTime(timezone=False), server_default=func.now())
-    file_url = Column(String(255), nullable=True)
\ No newline at end of file
+    # Unset while a bulk issuance has yet to render it.
+    file_url = Column(String(255), nullable=True)
+    # The run rendering it, and since when; see `services/bulk_issue.py`.
+    claim_token = Column(String(32), nullable=True)
+    claimed_at = Column(DateTime(timezone=False), nullable=True)
\ No newline at end of file
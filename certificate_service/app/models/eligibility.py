@@ -0,0 +1,54 @@
+"""
+Per-student progress kept by the eligibility consumer.
+
+Only the counters the certificate criteria read are stored, updated
+incrementally from workshop and quiz events, so checking whether a
+student now qualifies is a key lookup.
+"""
+
+from sqlalchemy import Column, DateTime, Integer, Boolean
+
+from .base import Base
+
+
+class WorkshopTotal(Base):
+    """Number of substeps in each workshop, from `workshop_created` events."""
+
+    __tablename__ = "eligibility_workshop_totals"
+    workshop_id = Column(Integer, primary_key=True)
+    total_substeps = Column(Integer, nullable=False, default=0)
+
+
+class StudentProgress(Base):
+    """A student's counters in one workshop.
+
+    The primary key leads with `workshop_id` so finding everyone eligible
+    for a workshop's certificate is one range read.
+    """
+
+    __tablename__ = "eligibility_student_progress"
+    workshop_id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, primary_key=True)
+    completed_substeps = Column(Integer, nullable=False, default=0)
+    best_quiz_score = Column(Integer, nullable=True)
+    quizzes_passed = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=False), nullable=True)
+
+
+class SubstepState(Base):
+    """Latest known status of each substep, used to count completions once."""
+
+    __tablename__ = "eligibility_substep_states"
+    user_id = Column(Integer, primary_key=True)
+    workshop_id = Column(Integer, primary_key=True)
+    substep_id = Column(Integer, primary_key=True)
+    completed = Column(Boolean, nullable=False, default=False)
+
+
+class PassedQuiz(Base):
+    """Quizzes a student has passed, used to count each one once."""
+
+    __tablename__ = "eligibility_passed_quizzes"
+    user_id = Column(Integer, primary_key=True)
+    quiz_id = Column(Integer, primary_key=True)
+    workshop_id = Column(Integer, nullable=False)
@@ -2,14 +2,16 @@
 Pydantic models for the certificate service.
 """
 
+from datetime import datetime
 from typing import Optional, Dict, Any
-from pydantic import BaseModel
+from pydantic import BaseModel, conlist, root_validator
 
 
 class CertificateCreate(BaseModel):
     workshop_id: int
     name: str
     criteria: Optional[Dict[str, Any]] = None
+    template_id: Optional[int] = None
 
 
 class CertificateTemplateCreate(BaseModel):
@@ -20,6 +22,22 @@ class CertificateTemplateCreate(BaseModel):
 class IssueCertificateRequest(BaseModel):
     certificate_id: int
     user_id: int
+    # Extra values for the template's fields, e.g. the recipient's name.
+    fields: Optional[Dict[str, str]] = None
+
+
+class BulkIssueRequest(BaseModel):
+    user_ids: Optional[conlist(int, min_items=1, max_items=100_000)] = None
+    # Everyone the certificate's criteria accept, instead of `user_ids`.
+    all_eligible: bool = False
+    # Extra values for the template's fields, the same for every user.
+    fields: Optional[Dict[str, str]] = None
+
+    @root_validator(skip_on_failure=True)
+    def one_audience(cls, values):
+        if (values.get("user_ids") is None) == (not values.get("all_eligible")):
+            raise ValueError("give either user_ids or all_eligible")
+        return values
 
 
 class CertificateOut(BaseModel):
@@ -27,6 +45,7 @@ class CertificateOut(BaseModel):
     workshop_id: int
     name: str
     criteria: Optional[Dict[str, Any]]
+    template_id: Optional[int]
 
     class Config:
         orm_mode = True
@@ -36,7 +55,7 @@ class IssuedCertificateOut(BaseModel):
     id: int
     certificate_id: int
     user_id: int
-    issued_at: str
+    issued_at: Optional[datetime]
     file_url: Optional[str]
 
     class Config:
@@ -0,0 +1,49 @@
+"""
+Access control for the certificate service's admin routes.
+
+Other services identify themselves with the `AUTH_SERVICE_TOKEN` shared
+with the auth service, sent as `X-Service-Token`.  Users send the access
+token the auth service issued them, which is verified with the same
+`JWT_SECRET_KEY` and must carry the `admin` role.  With neither
+configured, admin routes refuse everyone.
+"""
+
+import os
+import secrets
+from typing import Optional
+
+from fastapi import Depends, Header, HTTPException, status
+from fastapi.security import OAuth2PasswordBearer
+from jose import JWTError, jwt
+
+SERVICE_TOKEN = os.getenv("AUTH_SERVICE_TOKEN", "")
+JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "")
+JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
+ADMIN_ROLE = "admin"
+
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login", auto_error=False)
+
+
+def require_admin(
+    x_service_token: Optional[str] = Header(None),
+    token: Optional[str] = Depends(optional_oauth2_scheme),
+) -> None:
+    """Admit other services by their `X-Service-Token`, or users with the admin role."""
+    if SERVICE_TOKEN and x_service_token and secrets.compare_digest(x_service_token, SERVICE_TOKEN):
+        return
+    if token is None or not JWT_SECRET_KEY:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    try:
+        payload = jwt.decode(token, JWT_SECRET_KEY, algorithms=[JWT_ALGORITHM])
+    except JWTError:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    if ADMIN_ROLE not in (payload.get("roles") or []):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin role required")
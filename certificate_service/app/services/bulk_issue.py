@@ -0,0 +1,238 @@
+"""
+Bulk issuance of a certificate to a cohort.
+
+User ids are handled `CERTIFICATE_BULK_CHUNK_SIZE` at a time.  For each
+chunk the missing issuances are created with one multi-row INSERT that
+skips users who already hold the certificate (the unique index on
+`(certificate_id, user_id)` settles races with single issues), the
+issuances still without a file are claimed for the run, rendered in
+parallel on the render pool, and their file URLs and `certificate_issued`
+events are written in one transaction.  A progress line is streamed
+after every chunk.
+
+A claim stamps the run's token on issuances that have no file and no
+live claim, so concurrent runs (and the eligibility consumer) never
+render the same issuance twice.  Files are only recorded on issuances
+still claimed by the run, and only those are announced.  A run that
+fails or is abandoned (the client disconnects) releases its claims; one
+that dies holding them loses them after `CERTIFICATE_CLAIM_TIMEOUT_SECONDS`.
+
+Rerunning is idempotent: a user whose certificate is already rendered
+costs one indexed read per chunk and nothing else, and issuances left
+unrendered by an interrupted run are picked up and rendered.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+import anyio
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import and_, bindparam, or_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from .. import database
+from ..events.producer import publish_events
+from ..models.certificate import Certificate, IssuedCertificate
+from . import file_store, rendering
+from .certificate_service import build_job, certificate_with_layout
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = int(os.getenv("CERTIFICATE_BULK_CHUNK_SIZE", "500"))
+CLAIM_TIMEOUT_SECONDS = int(os.getenv("CERTIFICATE_CLAIM_TIMEOUT_SECONDS", "600"))
+
+
+def new_token() -> str:
+    """A claim token for one run."""
+    return uuid.uuid4().hex
+
+
+def _insert_missing(db: Session, certificate_id: int, user_ids: Sequence[int]) -> None:
+    table = IssuedCertificate.__table__
+    rows = [{"certificate_id": certificate_id, "user_id": user_id} for user_id in user_ids]
+    dialect = db.bind.dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        statement = insert(table).values(rows).on_conflict_do_nothing(index_elements=["certificate_id", "user_id"])
+    else:
+        statement = table.insert().values(rows)
+    db.execute(statement)
+
+
+def claim(
+    db: Session, certificate_id: int, user_ids: Sequence[int], token: str
+) -> Tuple[List[Tuple[int, int]], int]:
+    """Create the chunk's missing issuances and claim the unrendered ones for `token`.
+
+    Returns `(id, user_id)` of the issuances claimed, and the number of
+    users who already held a rendered certificate.  Issuances another run
+    holds a live claim on are left to it.
+    """
+    rows = (
+        db.query(IssuedCertificate.user_id, IssuedCertificate.file_url)
+        .filter(IssuedCertificate.certificate_id == certificate_id, IssuedCertificate.user_id.in_(user_ids))
+        .all()
+    )
+    rendered = sum(1 for row in rows if row.file_url is not None)
+    held = {row.user_id for row in rows}
+    missing = [user_id for user_id in user_ids if user_id not in held]
+    if missing:
+        _insert_missing(db, certificate_id, missing)
+    now = datetime.utcnow()
+    chunk = and_(IssuedCertificate.certificate_id == certificate_id, IssuedCertificate.user_id.in_(user_ids))
+    db.query(IssuedCertificate).filter(
+        chunk,
+        IssuedCertificate.file_url.is_(None),
+        or_(
+            IssuedCertificate.claimed_at.is_(None),
+            IssuedCertificate.claimed_at < now - timedelta(seconds=CLAIM_TIMEOUT_SECONDS),
+        ),
+    ).update({"claim_token": token, "claimed_at": now}, synchronize_session=False)
+    pending = [
+        (row.id, row.user_id)
+        for row in db.query(IssuedCertificate.id, IssuedCertificate.user_id).filter(
+            chunk, IssuedCertificate.claim_token == token, IssuedCertificate.file_url.is_(None)
+        )
+    ]
+    db.commit()
+    return pending, rendered
+
+
+def release(db: Session, token: str) -> None:
+    """Give up `token`'s claims on issuances it has not rendered."""
+    db.query(IssuedCertificate).filter(
+        IssuedCertificate.claim_token == token, IssuedCertificate.file_url.is_(None)
+    ).update({"claim_token": None, "claimed_at": None}, synchronize_session=False)
+    db.commit()
+
+
+def finish(
+    db: Session, certificate_id: int, token: str, pending: Sequence[Tuple[int, int]], digests: Sequence[str]
+) -> int:
+    """Record the rendered files of a chunk and announce the issuances.
+
+    Only issuances still claimed by `token` and without a file are
+    recorded; returns how many were.
+    """
+    table = IssuedCertificate.__table__
+    urls = {issued_id: file_store.file_url(digest) for (issued_id, _), digest in zip(pending, digests)}
+    db.execute(
+        table.update()
+        .where(table.c.id == bindparam("issued_id"), table.c.claim_token == token, table.c.file_url.is_(None))
+        .values(file_url=bindparam("rendered_url")),
+        [{"issued_id": issued_id, "rendered_url": url} for issued_id, url in urls.items()],
+    )
+    # A claim that lapsed and was taken over by another run no longer has our token.
+    recorded = (
+        db.query(IssuedCertificate.user_id, IssuedCertificate.file_url)
+        .filter(IssuedCertificate.id.in_(list(urls)), IssuedCertificate.claim_token == token)
+        .all()
+    )
+    publish_events(
+        "certificate_issued",
+        ({"certificate_id": certificate_id, "user_id": row.user_id, "file_url": row.file_url} for row in recorded),
+        key_field="user_id",
+        db=db,
+    )
+    db.commit()
+    return len(recorded)
+
+
+def _load(db: Session, certificate_id: int) -> Optional[Tuple[Certificate, Optional[Dict[str, Any]]]]:
+    row = certificate_with_layout(db, certificate_id)
+    if row is not None:
+        # Kept usable across the run's commits without reloading.
+        db.expunge(row[0])
+    return row
+
+
+def claim_all(db: Session, certificate_id: int, user_ids: Sequence[int], token: str) -> List[Tuple[int, int]]:
+    """`claim` for any number of users; returns `(id, user_id)` of the issuances claimed."""
+    pending: List[Tuple[int, int]] = []
+    for start in range(0, len(user_ids), CHUNK_SIZE):
+        pending += claim(db, certificate_id, user_ids[start : start + CHUNK_SIZE], token)[0]
+    return pending
+
+
+def render_claimed(db: Session, certificate_id: int, token: str, pending: Sequence[Tuple[int, int]]) -> int:
+    """Render claimed issuances from a worker thread and record them, a chunk at a time.
+
+    Returns how many were recorded.
+    """
+    row = _load(db, certificate_id)
+    if row is None:
+        return 0
+    cert, layout = row
+    recorded = 0
+    try:
+        for start in range(0, len(pending), CHUNK_SIZE):
+            chunk = pending[start : start + CHUNK_SIZE]
+            jobs = [build_job(cert, layout, user_id) for _, user_id in chunk]
+            digests = asyncio.run(rendering.render_pool.render_many(jobs))
+            recorded += finish(db, certificate_id, token, chunk, digests)
+    except Exception:
+        db.rollback()
+        release(db, token)
+        raise
+    return recorded
+
+
+def _progress(**fields: Any) -> bytes:
+    return json.dumps(fields).encode() + b"\n"
+
+
+async def _abandon(db: Session, token: str) -> None:
+    # Shielded: it also runs while the request is being cancelled.
+    with anyio.CancelScope(shield=True):
+        await run_in_threadpool(db.rollback)
+        await run_in_threadpool(release, db, token)
+
+
+async def issue_bulk(
+    certificate_id: int,
+    user_ids: Sequence[int],
+    fields: Optional[Dict[str, str]] = None,
+    chunk_size: Optional[int] = None,
+) -> AsyncIterator[bytes]:
+    """Issue a certificate to `user_ids`, yielding a JSON progress line after each chunk."""
+    chunk_size = chunk_size or CHUNK_SIZE
+    total = len(user_ids)
+    processed = issued = already_issued = 0
+    token = new_token()
+    db = database.SessionLocal()
+    settled = False
+    try:
+        row = await run_in_threadpool(_load, db, certificate_id)
+        if row is None:
+            raise ValueError("Certificate not found")
+        cert, layout = row
+        if not total:
+            yield _progress(status="completed", processed=0, total=0, issued=0, already_issued=0)
+        for start in range(0, total, chunk_size):
+            chunk = user_ids[start : start + chunk_size]
+            pending, rendered = await run_in_threadpool(claim, db, certificate_id, chunk, token)
+            if pending:
+                jobs = [build_job(cert, layout, user_id, fields) for _, user_id in pending]
+                digests = await rendering.render_pool.render_many(jobs)
+                issued += await run_in_threadpool(finish, db, certificate_id, token, pending, digests)
+            processed += len(chunk)
+            already_issued += rendered
+            status = "completed" if processed == total else "running"
+            yield _progress(status=status, processed=processed, total=total, issued=issued, already_issued=already_issued)
+        settled = True
+    except Exception as exc:
+        logger.exception("Bulk issuance of certificate %s failed", certificate_id)
+        settled = True
+        await _abandon(db, token)
+        yield _progress(status="failed", processed=processed, total=total, issued=issued,
+                        already_issued=already_issued, error=str(exc))
+    finally:
+        if not settled:
+            await _abandon(db, token)
+        db.close()
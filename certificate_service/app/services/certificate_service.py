@@ -6,26 +6,37 @@ from pathlib import Path
 from datetime import datetime
 import json
 import os
+from typing import Any, Dict, Optional, Tuple
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
+from sukhverse_common import pagination
+
 from ..models.certificate import Certificate, CertificateTemplate, IssuedCertificate
 from ..schemas.certificate import CertificateCreate, CertificateTemplateCreate, IssueCertificateRequest
 from ..events.producer import publish_event
+from .criteria import compile_criteria, criteria_index
+from .rendering import RenderJob, compile_template
 
 
 def create_certificate(db: Session, cert_in: CertificateCreate) -> Certificate:
+    compile_criteria(cert_in.criteria)
     cert = Certificate(
         workshop_id=cert_in.workshop_id,
         name=cert_in.name,
         criteria=cert_in.criteria,
+        template_id=cert_in.template_id,
     )
     db.add(cert)
     db.commit()
+    criteria_index.invalidate()
     db.refresh(cert)
     return cert
 
 
 def create_template(db: Session, template_in: CertificateTemplateCreate) -> CertificateTemplate:
+    # Reject layouts that cannot be rendered now rather than at issue time.
+    compile_template(template_in.format_json)
     tmpl = CertificateTemplate(
         format_json=template_in.format_json,
         preview_path=template_in.preview_path,
@@ -36,17 +47,67 @@ def create_template(db: Session, template_in: CertificateTemplateCreate) -> Cert
     return tmpl
 
 
-def issue_certificate(db: Session, req: IssueCertificateRequest) -> IssuedCertificate:
-    # In a real implementation, we would render a PDF using the template and upload it to object storage.
-    filename = f"certificate-{req.certificate_id}-{req.user_id}-{int(datetime.utcnow().timestamp())}.pdf"
-    file_url = f"/certificates/{filename}"  # pretend path
+def certificate_with_layout(db: Session, certificate_id: int) -> Optional[Tuple[Certificate, Optional[Dict[str, Any]]]]:
+    """A certificate and its template's layout (None for the built-in one); None if it does not exist."""
+    return (
+        db.query(Certificate, CertificateTemplate.format_json)
+        .outerjoin(CertificateTemplate, CertificateTemplate.id == Certificate.template_id)
+        .filter(Certificate.id == certificate_id)
+        .first()
+    )
+
+
+def build_job(cert: Certificate, layout: Optional[Dict[str, Any]], user_id: int,
+              fields: Optional[Dict[str, str]] = None) -> RenderJob:
+    values = {
+        "certificate_id": str(cert.id),
+        "certificate_name": cert.name,
+        "workshop_id": str(cert.workshop_id),
+        "user_id": str(user_id),
+        "recipient": f"User {user_id}",
+        "issued_on": datetime.utcnow().date().isoformat(),
+        **(fields or {}),
+    }
+    return RenderJob(template_id=cert.template_id if layout is not None else None, layout=layout, values=values)
+
+
+def render_job(db: Session, req: IssueCertificateRequest) -> Optional[RenderJob]:
+    """What to render for an issue request; None if the certificate does not exist."""
+    row = certificate_with_layout(db, req.certificate_id)
+    return build_job(*row, req.user_id, req.fields) if row is not None else None
+
+
+def find_issued(db: Session, certificate_id: int, user_id: int) -> Optional[IssuedCertificate]:
+    return (
+        db.query(IssuedCertificate)
+        .filter(IssuedCertificate.certificate_id == certificate_id, IssuedCertificate.user_id == user_id)
+        .first()
+    )
+
+
+def record_issued(db: Session, req: IssueCertificateRequest, file_url: str) -> IssuedCertificate:
+    """Store an issuance; if a concurrent request stored it first, that one is returned."""
     issued = IssuedCertificate(
         certificate_id=req.certificate_id,
         user_id=req.user_id,
         file_url=file_url,
     )
     db.add(issued)
-    db.commit()
+    publish_event("certificate_issued", {"certificate_id": req.certificate_id, "user_id": req.user_id, "file_url": file_url}, db=db)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        return find_issued(db, req.certificate_id, req.user_id)
     db.refresh(issued)
-    publish_event("certificate_issued", {"certificate_id": req.certificate_id, "user_id": req.user_id, "file_url": file_url})
-    return issued
\ No newline at end of file
+    return issued
+
+
+def list_user_certificates(db: Session, user_id: int, cursor: str | None, limit: int) -> pagination.Page:
+    return pagination.paginate(
+        db.query(IssuedCertificate).filter(IssuedCertificate.user_id == user_id),
+        [IssuedCertificate.issued_at, IssuedCertificate.id],
+        cursor,
+        limit,
+        descending=True,
+    )
\ No newline at end of file
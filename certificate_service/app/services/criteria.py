@@ -0,0 +1,146 @@
+"""
+Certificate criteria, compiled to predicates.
+
+`Certificate.criteria` is a JSON object whose keys must all hold:
+
+    {"all_steps_completed": true, "min_quiz_score": 70}
+
+- `all_steps_completed`: every substep of the workshop is completed;
+- `min_completed_substeps`: at least this many substeps are completed;
+- `min_quiz_score`: the student's best score on a quiz of the workshop;
+- `min_quizzes_passed`: distinct quizzes of the workshop passed;
+- `all` / `any`: lists of criteria objects, combined with AND / OR.
+
+A certificate without criteria (null or `{}`) is only issued by hand.
+
+Criteria are compiled once into a closure over a student's `Progress`
+counters, and the compiled predicates are indexed by `workshop_id`, so an
+event is checked against the certificates of its workshop only.  The
+index reloads after `CERTIFICATE_CRITERIA_TTL_SECONDS`, or at once when
+this process creates a certificate.
+"""
+
+import logging
+import os
+import threading
+import time
+from operator import attrgetter
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from ..models.certificate import Certificate
+
+logger = logging.getLogger(__name__)
+
+CRITERIA_TTL_SECONDS = float(os.getenv("CERTIFICATE_CRITERIA_TTL_SECONDS", "30"))
+
+
+class Progress(NamedTuple):
+    completed_substeps: int
+    total_substeps: int
+    best_quiz_score: Optional[int]
+    quizzes_passed: int
+
+
+Predicate = Callable[[Progress], bool]
+
+_THRESHOLDS = {
+    "min_completed_substeps": attrgetter("completed_substeps"),
+    "min_quiz_score": attrgetter("best_quiz_score"),
+    "min_quizzes_passed": attrgetter("quizzes_passed"),
+}
+
+
+class CriteriaError(ValueError):
+    """Criteria that cannot be compiled."""
+
+
+def _all_steps_completed(progress: Progress) -> bool:
+    return 0 < progress.total_substeps <= progress.completed_substeps
+
+
+def _threshold(get: Callable[[Progress], Optional[int]], minimum: int) -> Predicate:
+    def predicate(progress: Progress) -> bool:
+        value = get(progress)
+        return value is not None and value >= minimum
+
+    return predicate
+
+
+def _conjunction(predicates: List[Predicate]) -> Predicate:
+    if len(predicates) == 1:
+        return predicates[0]
+    return lambda progress: all(predicate(progress) for predicate in predicates)
+
+
+def _compile(criteria: Any) -> Predicate:
+    if not isinstance(criteria, dict) or not criteria:
+        raise CriteriaError("criteria must be a non-empty object")
+    predicates: List[Predicate] = []
+    for key, value in criteria.items():
+        if key == "all_steps_completed":
+            if not isinstance(value, bool):
+                raise CriteriaError("'all_steps_completed' must be a boolean")
+            if value:
+                predicates.append(_all_steps_completed)
+        elif key in _THRESHOLDS:
+            if isinstance(value, bool) or not isinstance(value, int):
+                raise CriteriaError(f"'{key}' must be an integer")
+            predicates.append(_threshold(_THRESHOLDS[key], value))
+        elif key in ("all", "any"):
+            if not isinstance(value, list) or not value:
+                raise CriteriaError(f"'{key}' must be a non-empty list")
+            parts = [_compile(part) for part in value]
+            if key == "all":
+                predicates.append(_conjunction(parts))
+            else:
+                predicates.append(lambda progress, parts=parts: any(part(progress) for part in parts))
+        else:
+            raise CriteriaError(f"unknown criterion {key!r}")
+    return _conjunction(predicates) if predicates else (lambda progress: True)
+
+
+def compile_criteria(criteria: Optional[Dict[str, Any]]) -> Optional[Predicate]:
+    """The predicate for `criteria`, or None when the certificate has none."""
+    if not criteria:
+        return None
+    return _compile(criteria)
+
+
+class CriteriaIndex:
+    """Compiled criteria of every certificate, by workshop; safe to share between threads."""
+
+    def __init__(self, ttl: float = CRITERIA_TTL_SECONDS) -> None:
+        self.ttl = ttl
+        self._by_workshop: Dict[int, List[Tuple[int, Predicate]]] = {}
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+
+    def _load(self, db: Session) -> Dict[int, List[Tuple[int, Predicate]]]:
+        by_workshop: Dict[int, List[Tuple[int, Predicate]]] = {}
+        rows = db.query(Certificate.id, Certificate.workshop_id, Certificate.criteria).order_by(Certificate.id)
+        for certificate_id, workshop_id, criteria in rows:
+            try:
+                predicate = compile_criteria(criteria)
+            except CriteriaError as exc:
+                logger.warning("Certificate %s has invalid criteria, not auto-issuing: %s", certificate_id, exc)
+                continue
+            if predicate is not None:
+                by_workshop.setdefault(workshop_id, []).append((certificate_id, predicate))
+        return by_workshop
+
+    def certificates(self, db: Session) -> Dict[int, List[Tuple[int, Predicate]]]:
+        """`(certificate_id, predicate)` of the auto-issued certificates, by workshop id."""
+        with self._lock:
+            if time.monotonic() >= self._expires_at:
+                self._by_workshop = self._load(db)
+                self._expires_at = time.monotonic() + self.ttl
+            return self._by_workshop
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._expires_at = 0.0
+
+
+criteria_index = CriteriaIndex()
@@ -0,0 +1,105 @@
+"""
+Serving stored certificate files.
+
+Files are named by their digest, so `/certificates/files/<digest>.pdf`
+is answered from the store alone.  Downloading an issued certificate by
+its id looks its digest up once and then keeps it in an in-process LRU
+of `CERTIFICATE_DOWNLOAD_CACHE_SIZE` entries: an issuance's file never
+changes once rendered, so the entry never goes stale.  Issuances still
+waiting to be rendered are not cached.
+
+Behind nginx, set `CERTIFICATE_ACCEL_REDIRECT_PREFIX` to an `internal`
+location aliased to the store directory and nginx sends the files:
+
+    location /_certificate_store/ {
+        internal;
+        alias /srv/certificates/;
+    }
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+from sqlalchemy.orm import Session
+from starlette.datastructures import Headers
+
+from .. import database
+from ..models.certificate import IssuedCertificate
+from ..utils.file_response import ImmutableFileResponse
+from . import file_store, rendering
+
+CACHE_SIZE = int(os.getenv("CERTIFICATE_DOWNLOAD_CACHE_SIZE", "65536"))
+ACCEL_REDIRECT_PREFIX = os.getenv("CERTIFICATE_ACCEL_REDIRECT_PREFIX", "")
+
+
+class DigestCache:
+    """Thread-safe LRU of issued certificate id to file digest."""
+
+    def __init__(self, maxsize: int = CACHE_SIZE) -> None:
+        self.maxsize = maxsize
+        self._data: "OrderedDict[int, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, issued_id: int) -> Optional[str]:
+        with self._lock:
+            digest = self._data.get(issued_id)
+            if digest is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(issued_id)
+            self.hits += 1
+            return digest
+
+    def set(self, issued_id: int, digest: str) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[issued_id] = digest
+            self._data.move_to_end(issued_id)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+digest_cache = DigestCache()
+
+
+def _file_url(db: Session, issued_id: int) -> Optional[str]:
+    return db.query(IssuedCertificate.file_url).filter(IssuedCertificate.id == issued_id).scalar()
+
+
+async def lookup_digest(issued_id: int) -> Optional[str]:
+    """The digest of an issuance's file, from the database; None if not rendered."""
+    async with database.async_db.session() as db:
+        file_url = await db.run_sync(_file_url, issued_id)
+    digest = file_store.digest_from_url(file_url) if file_url else None
+    if digest is not None:
+        digest_cache.set(issued_id, digest)
+    return digest
+
+
+def file_response(digest: str, request_headers: Headers) -> Optional[ImmutableFileResponse]:
+    """The stored file `digest` as a PDF response; None if the store has no such file."""
+    store = file_store.FileStore(rendering.render_pool.store_root)
+    path: Path = store.path(digest)
+    accel_redirect = None
+    if ACCEL_REDIRECT_PREFIX:
+        accel_redirect = f"{ACCEL_REDIRECT_PREFIX.rstrip('/')}/{store.relative_path(digest)}"
+    try:
+        return ImmutableFileResponse(
+            path,
+            etag=f'"{digest}"',
+            request_headers=request_headers,
+            media_type="application/pdf",
+            accel_redirect=accel_redirect,
+        )
+    except FileNotFoundError:
+        return None
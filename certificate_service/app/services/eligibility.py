@@ -0,0 +1,190 @@
+"""
+Incremental eligibility tracking for certificate auto-issuance.
+
+`apply_events` folds a micro-batch of workshop and quiz events into each
+student's counters with a fixed number of set-based statements, then
+checks every student the batch touched against the compiled criteria of
+their workshop's certificates only.  It returns who now qualifies for
+which certificate; the caller issues those in bulk.
+
+Events are delivered at least once, so every update is idempotent:
+substep completions are counted from state transitions (see
+`sukhverse_common.substeps`), each quiz is counted as passed once, and
+the best score is a maximum.
+"""
+
+from collections import defaultdict
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Session
+
+from sukhverse_common.substeps import StudentKey, chunks, count_transitions, upsert_insert
+
+from ..models.eligibility import PassedQuiz, StudentProgress, SubstepState, WorkshopTotal
+from .criteria import Progress, compile_criteria, criteria_index
+
+TOPICS = ("workshop_created", "step_completed", "step_updated", "quiz_submitted")
+
+# (topic, payload, event time)
+Event = Tuple[str, Dict, Optional[datetime]]
+
+
+def _lookup(db: Session, columns: Sequence, keys: List[tuple], *extra) -> List[tuple]:
+    rows: List[tuple] = []
+    for chunk in chunks(keys):
+        rows += db.query(*columns, *extra).filter(tuple_(*columns).in_(chunk)).all()
+    return rows
+
+
+def _workshop_totals(db: Session, workshop_ids: Iterable[int]) -> Dict[int, int]:
+    ids = sorted(workshop_ids)
+    totals: Dict[int, int] = {}
+    for chunk in chunks(ids):
+        totals.update(db.query(WorkshopTotal.workshop_id, WorkshopTotal.total_substeps).filter(WorkshopTotal.workshop_id.in_(chunk)))
+    return totals
+
+
+def apply_events(db: Session, events: Iterable[Event]) -> Dict[int, List[int]]:
+    """Fold `events` into the counters without committing.
+
+    Returns the users each certificate's criteria now accept, by
+    certificate id, among the students the batch touched and, when a
+    workshop's total arrives or changes, all of that workshop's students.
+    """
+    totals: Dict[int, int] = {}
+    substeps: Dict[Tuple[int, int, int], bool] = {}
+    passes: Dict[Tuple[int, int], int] = {}
+    best_scores: Dict[StudentKey, int] = {}
+    touched: Set[StudentKey] = set()
+
+    for topic, event, _ in events:
+        if topic == "workshop_created":
+            if event.get("total_substeps") is not None:
+                totals[event["workshop_id"]] = event["total_substeps"]
+        elif topic in ("step_completed", "step_updated"):
+            # Within a batch the last status of a substep wins.
+            substeps[(event["user_id"], event["workshop_id"], event["substep_id"])] = event["status"] == "completed"
+            touched.add((event["workshop_id"], event["user_id"]))
+        elif topic == "quiz_submitted" and event.get("workshop_id") is not None:
+            key = (event["workshop_id"], event["user_id"])
+            best_scores[key] = max(best_scores.get(key, event["score"]), event["score"])
+            if event["pass_fail"]:
+                passes[(event["user_id"], event["quiz_id"])] = event["workshop_id"]
+            touched.add(key)
+
+    completed = count_transitions(db, SubstepState, substeps)
+
+    passed: Dict[StudentKey, int] = defaultdict(int)
+    if passes:
+        seen = {tuple(row) for row in _lookup(db, (PassedQuiz.user_id, PassedQuiz.quiz_id), list(passes))}
+        fresh = [
+            {"user_id": user_id, "quiz_id": quiz_id, "workshop_id": workshop_id}
+            for (user_id, quiz_id), workshop_id in passes.items()
+            if (user_id, quiz_id) not in seen
+        ]
+        for row in fresh:
+            passed[(row["workshop_id"], row["user_id"])] += 1
+        if fresh:
+            db.execute(PassedQuiz.__table__.insert(), fresh)
+
+    # Students whose last substep arrived before their workshop's total
+    # only qualify once it arrives, so a new total re-checks them all.
+    new_totals: Set[int] = set()
+    if totals:
+        stored_totals = _workshop_totals(db, totals)
+        new_totals = {workshop_id for workshop_id, total in totals.items() if stored_totals.get(workshop_id) != total}
+        stmt = upsert_insert(db)(WorkshopTotal.__table__)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[WorkshopTotal.workshop_id],
+            set_={"total_substeps": stmt.excluded.total_substeps},
+        )
+        db.execute(stmt, [{"workshop_id": workshop_id, "total_substeps": total} for workshop_id, total in totals.items()])
+
+    if not touched and not new_totals:
+        return {}
+    # Each student's events come from one partition, so nothing else
+    # writes their row between this read and the upsert below.
+    columns = (StudentProgress.workshop_id, StudentProgress.user_id)
+    stored = {
+        (row.workshop_id, row.user_id): row
+        for row in _lookup(
+            db, columns, sorted(touched),
+            StudentProgress.completed_substeps, StudentProgress.best_quiz_score, StudentProgress.quizzes_passed,
+        )
+    }
+    workshop_totals = _workshop_totals(db, {workshop_id for workshop_id, _ in touched})
+    now = datetime.utcnow()
+    rows = []
+    progress: Dict[StudentKey, Progress] = {}
+    for key in touched:
+        workshop_id, user_id = key
+        row = stored.get(key)
+        best = best_scores.get(key)
+        if row is not None and row.best_quiz_score is not None:
+            best = row.best_quiz_score if best is None else max(best, row.best_quiz_score)
+        progress[key] = Progress(
+            completed_substeps=(row.completed_substeps if row else 0) + completed[key],
+            total_substeps=workshop_totals.get(workshop_id, 0),
+            best_quiz_score=best,
+            quizzes_passed=(row.quizzes_passed if row else 0) + passed[key],
+        )
+        rows.append(
+            {
+                "workshop_id": workshop_id,
+                "user_id": user_id,
+                "completed_substeps": progress[key].completed_substeps,
+                "best_quiz_score": best,
+                "quizzes_passed": progress[key].quizzes_passed,
+                "updated_at": now,
+            }
+        )
+    if rows:
+        stmt = upsert_insert(db)(StudentProgress.__table__)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[StudentProgress.workshop_id, StudentProgress.user_id],
+            set_={
+                column: stmt.excluded[column]
+                for column in ("completed_substeps", "best_quiz_score", "quizzes_passed", "updated_at")
+            },
+        )
+        db.execute(stmt, rows)
+
+    certificates = criteria_index.certificates(db)
+    eligible: Dict[int, Set[int]] = defaultdict(set)
+    for (workshop_id, user_id), student in progress.items():
+        for certificate_id, predicate in certificates.get(workshop_id, ()):
+            if predicate(student):
+                eligible[certificate_id].add(user_id)
+    for workshop_id in new_totals:
+        for certificate_id, predicate in certificates.get(workshop_id, ()):
+            eligible[certificate_id].update(_qualifying(db, workshop_id, predicate))
+    return {certificate_id: sorted(user_ids) for certificate_id, user_ids in eligible.items() if user_ids}
+
+
+def _qualifying(db: Session, workshop_id: int, predicate: Callable[[Progress], bool]) -> List[int]:
+    total = _workshop_totals(db, [workshop_id]).get(workshop_id, 0)
+    rows = (
+        db.query(
+            StudentProgress.user_id,
+            StudentProgress.completed_substeps,
+            StudentProgress.best_quiz_score,
+            StudentProgress.quizzes_passed,
+        )
+        .filter(StudentProgress.workshop_id == workshop_id)
+        .order_by(StudentProgress.user_id)
+    )
+    return [
+        row.user_id
+        for row in rows
+        if predicate(Progress(row.completed_substeps, total, row.best_quiz_score, row.quizzes_passed))
+    ]
+
+
+def eligible_user_ids(db: Session, workshop_id: int, criteria: Optional[Dict]) -> List[int]:
+    """Every student of the workshop whose counters satisfy `criteria`, by user id."""
+    predicate = compile_criteria(criteria)
+    if predicate is None:
+        return []
+    return _qualifying(db, workshop_id, predicate)
@@ -0,0 +1,71 @@
+"""
+Local content-addressed store for rendered certificates.
+
+A file is stored under the SHA-256 of its bytes, sharded two levels deep
+(`ab/cd/abcd...`) so no directory grows too large.  Identical renders map
+to the same file and are stored once, and a stored file never changes,
+so readers need no locking.  Writes go to a temporary file in the target
+directory and are moved into place, so a crash never leaves a partial
+file under a digest.
+"""
+
+import hashlib
+import os
+import re
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+STORE_DIR = os.getenv("CERTIFICATE_STORE_DIR", "data/certificates")
+URL_PREFIX = "/certificates/files"
+
+_DIGEST_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+class FileStore:
+    def __init__(self, root: str = STORE_DIR) -> None:
+        self.root = Path(root)
+
+    @staticmethod
+    def relative_path(digest: str) -> str:
+        return f"{digest[:2]}/{digest[2:4]}/{digest}"
+
+    def path(self, digest: str) -> Path:
+        return self.root / self.relative_path(digest)
+
+    def put(self, data: bytes) -> str:
+        """Store `data` unless already present and return its digest."""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.path(digest)
+        if path.exists():
+            return digest
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        return digest
+
+    def exists(self, digest: str) -> bool:
+        return self.path(digest).exists()
+
+
+def file_url(digest: str) -> str:
+    return f"{URL_PREFIX}/{digest}.pdf"
+
+
+def is_digest(value: str) -> bool:
+    return _DIGEST_RE.match(value) is not None
+
+
+def digest_from_url(url: str) -> Optional[str]:
+    """The digest a `file_url` points at; None for anything else."""
+    prefix = URL_PREFIX + "/"
+    if not (url.startswith(prefix) and url.endswith(".pdf")):
+        return None
+    digest = url[len(prefix) : -len(".pdf")]
+    return digest if is_digest(digest) else None
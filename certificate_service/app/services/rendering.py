@@ -0,0 +1,407 @@
+"""
+Certificate PDF rendering.
+
+A template's `format_json` describes one page:
+
+    {
+        "page": {"size": "A4", "landscape": true},  # or {"width": ..., "height": ...} in points
+        "fonts": {"Brand": "fonts/Brand.ttf"},      # TrueType fonts to register
+        "background": [                              # static artwork
+            {"type": "rect", "x": 20, "y": 20, "width": 802, "height": 555, "stroke": "#1f3a5f", "line_width": 4},
+            {"type": "line", "x1": 200, "y1": 300, "x2": 642, "y2": 300},
+            {"type": "image", "path": "art/seal.png",  "x": 40, "y": 40, "width": 96, "height": 96},
+            {"type": "text", "text": "Certificate of Completion", "x": 421, "y": 470,
+             "font": "Helvetica-Bold", "size": 32, "align": "center"}
+        ],
+        "fields": [                                  # stamped per certificate
+            {"text": "Awarded to {recipient}", "x": 421, "y": 330, "size": 24, "align": "center"}
+        ]
+    }
+
+Font and image paths name files under `CERTIFICATE_ASSET_DIR`; anything
+that resolves outside it, including URLs, is rejected.
+
+Field texts are format strings over the issue's values (`recipient`,
+`certificate_name`, `issued_on`, ... and any `fields` of the request);
+unknown names render empty.
+
+A template is compiled once per process and cached by template id:
+fonts are registered, images decoded, colours parsed and static text
+positioned.  Rendering a certificate then only draws the background into
+a form XObject, places it on the page and stamps the fields.  Output is
+deterministic, so identical certificates share one file in the store.
+
+Rendering runs on a process pool so it never holds the API's event loop
+or the GIL.  Workers render straight into the file store and hand back
+the digest; the pool's latency and queue depth are exposed as metrics.
+"""
+
+import asyncio
+import io
+import os
+import string
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Deque, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from reportlab.lib import colors, pagesizes
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+
+from sukhverse_common.pool import BoundedPool, PoolBusy
+
+from .file_store import STORE_DIR, FileStore
+
+TEMPLATE_CACHE_SIZE = int(os.getenv("CERTIFICATE_TEMPLATE_CACHE_SIZE", "256"))
+ASSET_DIR = os.getenv("CERTIFICATE_ASSET_DIR", "data/certificate-assets")
+# Latency percentiles are computed over this many recent renders.
+LATENCY_WINDOW = 1024
+
+DEFAULT_LAYOUT: Dict[str, Any] = {
+    "page": {"size": "A4", "landscape": True},
+    "background": [
+        {"type": "rect", "x": 24, "y": 24, "width": 793.89, "height": 547.28, "stroke": "#1f3a5f", "line_width": 3},
+        {"type": "rect", "x": 34, "y": 34, "width": 773.89, "height": 527.28, "stroke": "#c9a227", "line_width": 1},
+        {"type": "text", "text": "Certificate of Completion", "x": 420.94, "y": 450,
+         "font": "Helvetica-Bold", "size": 34, "color": "#1f3a5f", "align": "center"},
+        {"type": "text", "text": "This certifies that", "x": 420.94, "y": 370,
+         "font": "Helvetica", "size": 16, "align": "center"},
+        {"type": "line", "x1": 220, "y1": 318, "x2": 621.89, "y2": 318, "stroke": "#c9a227"},
+    ],
+    "fields": [
+        {"text": "{recipient}", "x": 420.94, "y": 326, "font": "Helvetica-Bold", "size": 26, "align": "center"},
+        {"text": "has completed {certificate_name}", "x": 420.94, "y": 270, "size": 18, "align": "center"},
+        {"text": "Issued {issued_on}", "x": 420.94, "y": 120, "size": 12, "align": "center"},
+    ],
+}
+
+_ALIGNMENTS = ("left", "center", "right")
+_FORMATTER = string.Formatter()
+
+
+class TemplateError(ValueError):
+    """A `format_json` layout that cannot be rendered."""
+
+
+class RenderPoolBusy(PoolBusy):
+    """Raised when the render pool queue is full."""
+
+    message = "Certificate render pool is saturated"
+
+
+class CompiledTemplate(NamedTuple):
+    page_size: Tuple[float, float]
+    # Drawing operations as tuples, see `_draw`.
+    background: Tuple[tuple, ...]
+    fields: Tuple[tuple, ...]
+
+
+class RenderJob(NamedTuple):
+    template_id: Optional[int]
+    layout: Optional[Dict[str, Any]]
+    values: Dict[str, str]
+
+
+class _Values(dict):
+    def __missing__(self, key: str) -> str:
+        return ""
+
+
+def _number(spec: Dict[str, Any], key: str, default: Optional[float] = None) -> float:
+    value = spec.get(key, default)
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise TemplateError(f"'{key}' must be a number")
+    return float(value)
+
+
+def _color(spec: Dict[str, Any], key: str, default: Optional[str]) -> Any:
+    value = spec.get(key, default)
+    if value is None:
+        return None
+    try:
+        return colors.toColor(value)
+    except ValueError as exc:
+        raise TemplateError(f"invalid colour {value!r}") from exc
+
+
+def _font(spec: Dict[str, Any]) -> Tuple[str, float]:
+    name = spec.get("font", "Helvetica")
+    try:
+        pdfmetrics.getFont(name)
+    except KeyError as exc:
+        raise TemplateError(f"unknown font {name!r}") from exc
+    return name, _number(spec, "size", 12)
+
+
+def _text(spec: Dict[str, Any]) -> str:
+    text = spec.get("text")
+    if not isinstance(text, str):
+        raise TemplateError("'text' must be a string")
+    return text
+
+
+def _align(spec: Dict[str, Any]) -> str:
+    align = spec.get("align", "left")
+    if align not in _ALIGNMENTS:
+        raise TemplateError(f"'align' must be one of {', '.join(_ALIGNMENTS)}")
+    return align
+
+
+def _page_size(page: Any) -> Tuple[float, float]:
+    if not isinstance(page, dict):
+        raise TemplateError("'page' must be an object")
+    if "width" in page or "height" in page:
+        return _number(page, "width"), _number(page, "height")
+    size = getattr(pagesizes, str(page.get("size", "A4")).upper(), None)
+    if not isinstance(size, tuple):
+        raise TemplateError(f"unknown page size {page.get('size')!r}")
+    return pagesizes.landscape(size) if page.get("landscape") else pagesizes.portrait(size)
+
+
+def _asset(path: Any) -> str:
+    """The file `path` names under `ASSET_DIR`; templates cannot reach anything else."""
+    if not isinstance(path, str) or not path or "://" in path or os.path.isabs(path):
+        raise TemplateError(f"{path!r} is not a file name under the asset directory")
+    root = os.path.realpath(ASSET_DIR)
+    resolved = os.path.realpath(os.path.join(root, path))
+    if os.path.commonpath([root, resolved]) != root:
+        raise TemplateError(f"{path!r} is not a file name under the asset directory")
+    return resolved
+
+
+def _register_fonts(fonts: Any) -> None:
+    if not isinstance(fonts, dict):
+        raise TemplateError("'fonts' must map font names to TrueType files")
+    registered = set(pdfmetrics.getRegisteredFontNames())
+    for name, path in fonts.items():
+        if name in registered:
+            continue
+        file = _asset(path)
+        try:
+            pdfmetrics.registerFont(TTFont(name, file))
+        except Exception as exc:
+            raise TemplateError(f"cannot load font {name!r} from {path!r}: {exc}") from exc
+
+
+def _compile_static(spec: Any) -> tuple:
+    if not isinstance(spec, dict):
+        raise TemplateError("background items must be objects")
+    kind = spec.get("type")
+    if kind == "rect":
+        return (
+            "rect",
+            _number(spec, "x"), _number(spec, "y"), _number(spec, "width"), _number(spec, "height"),
+            _color(spec, "stroke", "black"), _color(spec, "fill", None), _number(spec, "line_width", 1),
+        )
+    if kind == "line":
+        return (
+            "line",
+            _number(spec, "x1"), _number(spec, "y1"), _number(spec, "x2"), _number(spec, "y2"),
+            _color(spec, "stroke", "black"), _number(spec, "line_width", 1),
+        )
+    if kind == "image":
+        path = _asset(spec.get("path"))
+        try:
+            image = ImageReader(path)
+        except Exception as exc:
+            raise TemplateError(f"cannot load image {spec.get('path')!r}: {exc}") from exc
+        return ("image", image, _number(spec, "x"), _number(spec, "y"), _number(spec, "width"), _number(spec, "height"))
+    if kind == "text":
+        text = _text(spec)
+        font, size = _font(spec)
+        x = _number(spec, "x")
+        align = _align(spec)
+        # Static text is positioned once, so drawing it is a plain drawString.
+        if align != "left":
+            width = pdfmetrics.stringWidth(text, font, size)
+            x -= width / 2 if align == "center" else width
+        return ("text", x, _number(spec, "y"), font, size, _color(spec, "color", "black"), text)
+    raise TemplateError(f"unknown background item type {kind!r}")
+
+
+def _compile_field(spec: Any) -> tuple:
+    if not isinstance(spec, dict):
+        raise TemplateError("fields must be objects")
+    text = _text(spec)
+    try:
+        list(_FORMATTER.parse(text))
+    except ValueError as exc:
+        raise TemplateError(f"invalid field text {text!r}: {exc}") from exc
+    font, size = _font(spec)
+    return ("field", _number(spec, "x"), _number(spec, "y"), font, size, _color(spec, "color", "black"), _align(spec), text)
+
+
+def compile_template(layout: Optional[Dict[str, Any]]) -> CompiledTemplate:
+    """Validate a `format_json` layout and resolve everything that does not depend on the recipient."""
+    layout = layout or DEFAULT_LAYOUT
+    if not isinstance(layout, dict):
+        raise TemplateError("layout must be an object")
+    _register_fonts(layout.get("fonts", {}))
+    background = layout.get("background", [])
+    fields = layout.get("fields", DEFAULT_LAYOUT["fields"])
+    if not isinstance(background, list) or not isinstance(fields, list):
+        raise TemplateError("'background' and 'fields' must be lists")
+    return CompiledTemplate(
+        page_size=_page_size(layout.get("page", DEFAULT_LAYOUT["page"])),
+        background=tuple(_compile_static(spec) for spec in background),
+        fields=tuple(_compile_field(spec) for spec in fields),
+    )
+
+
+def _draw(c: canvas.Canvas, operations: Tuple[tuple, ...], values: Optional[_Values] = None) -> None:
+    for op in operations:
+        kind = op[0]
+        if kind == "field":
+            _, x, y, font, size, color, align, text = op
+            c.setFont(font, size)
+            c.setFillColor(color)
+            text = text.format_map(values)
+            if align == "center":
+                c.drawCentredString(x, y, text)
+            elif align == "right":
+                c.drawRightString(x, y, text)
+            else:
+                c.drawString(x, y, text)
+        elif kind == "text":
+            _, x, y, font, size, color, text = op
+            c.setFont(font, size)
+            c.setFillColor(color)
+            c.drawString(x, y, text)
+        elif kind == "rect":
+            _, x, y, width, height, stroke, fill, line_width = op
+            c.setLineWidth(line_width)
+            if stroke is not None:
+                c.setStrokeColor(stroke)
+            if fill is not None:
+                c.setFillColor(fill)
+            c.rect(x, y, width, height, stroke=int(stroke is not None), fill=int(fill is not None))
+        elif kind == "line":
+            _, x1, y1, x2, y2, stroke, line_width = op
+            c.setLineWidth(line_width)
+            c.setStrokeColor(stroke)
+            c.line(x1, y1, x2, y2)
+        elif kind == "image":
+            _, image, x, y, width, height = op
+            c.drawImage(image, x, y, width, height, mask="auto")
+
+
+def render(template: CompiledTemplate, values: Dict[str, str]) -> bytes:
+    """One certificate as PDF bytes; the same inputs always give the same bytes."""
+    out = io.BytesIO()
+    c = canvas.Canvas(out, pagesize=template.page_size, invariant=1, pageCompression=1)
+    if template.background:
+        c.beginForm("background")
+        _draw(c, template.background)
+        c.endForm()
+        c.doForm("background")
+    _draw(c, template.fields, _Values(values))
+    c.showPage()
+    c.save()
+    return out.getvalue()
+
+
+# Per-process cache of compiled templates.  Templates are never edited,
+# so an entry stays valid until it is evicted.
+_compiled: "OrderedDict[Optional[int], CompiledTemplate]" = OrderedDict()
+_compiled_lock = threading.Lock()
+
+
+def compiled_template(template_id: Optional[int], layout: Optional[Dict[str, Any]]) -> CompiledTemplate:
+    """The compiled template for `template_id`, compiling `layout` on a miss."""
+    with _compiled_lock:
+        template = _compiled.get(template_id)
+        if template is not None:
+            _compiled.move_to_end(template_id)
+            return template
+    template = compile_template(layout)
+    with _compiled_lock:
+        _compiled[template_id] = template
+        while len(_compiled) > TEMPLATE_CACHE_SIZE:
+            _compiled.popitem(last=False)
+    return template
+
+
+def render_to_store(store_root: str, job: RenderJob) -> Tuple[str, float]:
+    """Worker entry point: render `job` into the store, return its digest and the render time."""
+    started = time.perf_counter()
+    data = render(compiled_template(job.template_id, job.layout), job.values)
+    digest = FileStore(store_root).put(data)
+    return digest, time.perf_counter() - started
+
+
+def _percentiles(samples: Deque[float]) -> Dict[str, float]:
+    if not samples:
+        return {"p50_ms": 0.0, "p95_ms": 0.0, "max_ms": 0.0}
+    ordered = sorted(samples)
+    return {
+        "p50_ms": round(ordered[len(ordered) // 2] * 1000, 3),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
+
+
+class RenderPool(BoundedPool):
+    """Render pool with a bounded backlog, queue-depth and latency metrics; see `sukhverse_common.pool`."""
+
+    busy_error = RenderPoolBusy
+    queue_per_worker = 64
+
+    def __init__(self, store_root: str = STORE_DIR, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.store_root = store_root
+        self._render_seconds: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self._total_seconds: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+
+    async def render(self, job: RenderJob) -> str:
+        """Render `job` into the store on the pool and return the file's digest."""
+        started = time.perf_counter()
+        digest, render_seconds = await self.run(render_to_store, self.store_root, job)
+        with self._lock:
+            self._render_seconds.append(render_seconds)
+            self._total_seconds.append(time.perf_counter() - started)
+        return digest
+
+    async def render_many(self, jobs: Sequence[RenderJob]) -> List[str]:
+        """Render `jobs` in parallel, a couple per worker at a time, and return their digests in order.
+
+        Bulk work stays well inside the backlog, so interactive renders
+        are not turned away while it runs.
+        """
+        window = asyncio.Semaphore(self.workers * 2)
+
+        async def render_one(job: RenderJob) -> str:
+            async with window:
+                return await self.render(job)
+
+        return list(await asyncio.gather(*(render_one(job) for job in jobs)))
+
+    def metrics(self) -> Dict[str, Any]:
+        """Return a snapshot of pool utilisation and latency."""
+        metrics = super().metrics()
+        with self._lock:
+            # Time spent rendering in a worker, and from submission to result.
+            metrics["render_latency"] = _percentiles(self._render_seconds)
+            metrics["total_latency"] = _percentiles(self._total_seconds)
+        return metrics
+
+
+def _build_pool() -> RenderPool:
+    workers = int(os.getenv("CERTIFICATE_RENDER_WORKERS", "0")) or None
+    max_queue = os.getenv("CERTIFICATE_RENDER_MAX_QUEUE")
+    executor = os.getenv("CERTIFICATE_RENDER_EXECUTOR", "process")
+    factory = None
+    if executor == "thread":
+        factory = lambda n: ThreadPoolExecutor(max_workers=n, thread_name_prefix="certificate-render")
+    return RenderPool(
+        workers=workers,
+        max_queue=int(max_queue) if max_queue else None,
+        retry_after=int(os.getenv("CERTIFICATE_RENDER_RETRY_AFTER", "1")),
+        executor_factory=factory,
+    )
+
+
+render_pool = _build_pool()
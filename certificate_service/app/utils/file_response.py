@@ -0,0 +1,169 @@
+"""
+Responses for immutable, content-addressed files.
+
+`ImmutableFileResponse` serves a file that never changes once written,
+so its ETag is its digest and it may be cached forever.  It answers
+`If-None-Match` with a `304`, a single `Range` with a `206` (or a `416`
+when out of bounds) and sends the bytes without copying them in Python
+when the server allows it, using the best mechanism available, in order:
+
+* `X-Accel-Redirect` when the caller gives an internal URI: the response
+  carries only headers and nginx sends the file, ranges included, with
+  `sendfile(2)`.
+* The ASGI `http.response.zerocopysend` extension when the server
+  advertises it: the server `sendfile(2)`s the range from our file.
+* The ASGI `http.response.pathsend` extension for whole files.
+* Otherwise the file is read off the event loop and sent as `bytes`
+  chunks, the body type every ASGI server accepts.
+
+Multiple ranges are not supported; such requests get the whole file,
+which RFC 9110 allows.
+"""
+
+import os
+import re
+from pathlib import Path
+from typing import Dict, Mapping, Optional, Tuple
+
+import anyio
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+CHUNK_SIZE = 1024 * 1024
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class RangeNotSatisfiable(Exception):
+    """The requested range lies outside the file."""
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """Return the inclusive `(first, last)` byte positions of a single `Range`.
+
+    None means the header is absent, malformed or asks for several ranges,
+    and the whole file should be sent.
+    """
+    if not header:
+        return None
+    match = _RANGE_RE.match(header.strip())
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes.
+        length = int(last)
+        if length == 0 or size == 0:
+            raise RangeNotSatisfiable()
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = size - 1 if not last else min(int(last), size - 1)
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable()
+    return start, end
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    candidates = [tag.strip() for tag in header.split(",")]
+    # Weak comparison, as RFC 9110 prescribes for If-None-Match.
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+class ImmutableFileResponse(Response):
+    """The file at `path`, or the part of it a conditional or range request asks for.
+
+    With `accel_redirect`, the internal URI nginx serves the file from,
+    only the headers are sent.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        etag: str,
+        request_headers: Mapping[str, str],
+        media_type: str = "application/octet-stream",
+        accel_redirect: Optional[str] = None,
+    ) -> None:
+        self.path = path
+        self.media_type = media_type
+        self.accel_redirect = accel_redirect
+        self.background = None
+        self.body = b""
+        self.status_code = 200
+        self.range: Optional[Tuple[int, int]] = None
+        self.size = 0
+        headers: Dict[str, str] = {"etag": etag, "cache-control": CACHE_CONTROL, "accept-ranges": "bytes"}
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match and _etag_matches(if_none_match, etag):
+            self.status_code = 304
+        elif accel_redirect:
+            # nginx evaluates Range itself on the internal redirect.
+            headers["x-accel-redirect"] = accel_redirect
+            headers["content-type"] = media_type
+            headers["content-length"] = "0"
+        else:
+            self.size = os.stat(path).st_size
+            if_range = request_headers.get("if-range")
+            try:
+                if if_range is None or if_range.strip() == etag:
+                    self.range = parse_range(request_headers.get("range"), self.size)
+            except RangeNotSatisfiable:
+                self.status_code = 416
+                headers["content-range"] = f"bytes */{self.size}"
+            if self.range is not None:
+                self.status_code = 206
+                headers["content-range"] = f"bytes {self.range[0]}-{self.range[1]}/{self.size}"
+            if self.status_code != 416:
+                headers["content-type"] = media_type
+            headers["content-length"] = str(self.length)
+        self.raw_headers = [(key.encode("latin-1"), value.encode("latin-1")) for key, value in headers.items()]
+
+    @property
+    def offset(self) -> int:
+        return self.range[0] if self.range else 0
+
+    @property
+    def length(self) -> int:
+        if self.status_code == 416:
+            return 0
+        if self.range:
+            return self.range[1] - self.range[0] + 1
+        return self.size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if self.status_code not in (200, 206) or self.accel_redirect or scope["method"].upper() == "HEAD" or not self.length:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+        extensions = scope.get("extensions") or {}
+        if "http.response.zerocopysend" in extensions:
+            with open(self.path, "rb") as file:
+                await send(
+                    {
+                        "type": "http.response.zerocopysend",
+                        "file": file,
+                        "offset": self.offset,
+                        "count": self.length,
+                        "more_body": False,
+                    }
+                )
+        elif "http.response.pathsend" in extensions and self.range is None:
+            await send({"type": "http.response.pathsend", "path": str(self.path)})
+        else:
+            await self._send_chunks(send)
+
+    async def _send_chunks(self, send: Send) -> None:
+        remaining = self.length
+        async with await anyio.open_file(self.path, "rb") as file:
+            await file.seek(self.offset)
+            while remaining:
+                chunk = await file.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    raise RuntimeError(f"{self.path} is shorter than {self.size} bytes")
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
@@ -0,0 +1,95 @@
+"""
+Issuing a certificate to a cohort: one request per user against bulk issuance.
+
+Issues one certificate to `--users` users through the ASGI app, against a
+SQLite database with the outbox relay off and the render pool writing
+into a temporary store: with one `POST /certificates/issue` per user
+(`--concurrency` at a time), with one `POST /certificates/<id>/issue:bulk`,
+and with the same bulk request rerun.  Reports users per second and the
+statements each run executed.  Usage (from the repo root):
+
+    python -m certificate_service.benchmarks.bench_bulk_issue --users 5000
+"""
+
+import argparse
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+
+DB_PATH = os.path.join(tempfile.gettempdir(), "bench_certificate_bulk.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{DB_PATH}")
+os.environ.setdefault("OUTBOX_RELAY_ENABLED", "false")
+
+import httpx  # noqa: E402
+from sqlalchemy import create_engine, event  # noqa: E402
+
+from certificate_service.app import database  # noqa: E402
+from certificate_service.app.main import create_app  # noqa: E402
+from certificate_service.app.services import rendering  # noqa: E402
+
+
+async def one_per_user(client, certificate_id: int, users: int, concurrency: int) -> None:
+    window = asyncio.Semaphore(concurrency)
+
+    async def issue(user_id: int) -> None:
+        async with window:
+            response = await client.post("/certificates/issue", json={"certificate_id": certificate_id, "user_id": user_id})
+            response.raise_for_status()
+
+    await asyncio.gather(*(issue(user_id) for user_id in range(users)))
+
+
+async def bulk(client, certificate_id: int, users: int) -> None:
+    response = await client.post(f"/certificates/{certificate_id}/issue:bulk", json={"user_ids": list(range(users))})
+    response.raise_for_status()
+    last = response.text.splitlines()[-1]
+    if '"completed"' not in last:
+        raise RuntimeError(last)
+
+
+async def run(app, users: int, concurrency: int, statements: list) -> None:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        ids = []
+        for name in ("Per user", "Bulk"):
+            response = await client.post("/certificates", json={"workshop_id": 1, "name": name})
+            ids.append(response.json()["id"])
+        modes = (
+            ("one request per user", lambda: one_per_user(client, ids[0], users, concurrency)),
+            ("bulk", lambda: bulk(client, ids[1], users)),
+            ("bulk rerun", lambda: bulk(client, ids[1], users)),
+        )
+        for label, issue in modes:
+            del statements[:]
+            started = time.perf_counter()
+            await issue()
+            elapsed = time.perf_counter() - started
+            print(f"{label:22} {users / elapsed:,.0f} users/s ({elapsed:.2f}s, {len(statements)} statements)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    args = parser.parse_args()
+
+    app = create_app()
+    # Sessions are opened and closed on different threadpool threads.
+    engine = create_engine(database.DATABASE_URL, connect_args={"check_same_thread": False})
+    database.SessionLocal.configure(bind=engine)
+    statements: list = []
+    event.listen(engine, "before_cursor_execute", lambda *a: statements.append(a[2]))
+    store = tempfile.mkdtemp(prefix="bench_certificates_")
+    rendering.render_pool.store_root = store
+    try:
+        asyncio.run(run(app, args.users, args.concurrency, statements))
+    finally:
+        rendering.render_pool.shutdown()
+        shutil.rmtree(store)
+        os.remove(DB_PATH)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Certificate downloads.
+
+Issues a certificate to `--users` users, then downloads them through the
+ASGI app `--requests` times, `--concurrency` at a time, against a SQLite
+database: with starlette's `FileResponse` as a baseline, by digest, by
+issuance id with the digest cache cleared before every request and with
+it warm, as 1 KiB ranges, and as `If-None-Match` revalidations.  Reports
+requests per second and the statements each run executed.  Usage (from
+the repo root):
+
+    python -m certificate_service.benchmarks.bench_download --users 200 --requests 5000
+"""
+
+import argparse
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+
+DB_PATH = os.path.join(tempfile.gettempdir(), "bench_certificate_download.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{DB_PATH}")
+os.environ.setdefault("OUTBOX_RELAY_ENABLED", "false")
+os.environ.setdefault("CERTIFICATE_CONSUMER_ENABLED", "false")
+
+import httpx  # noqa: E402
+from sqlalchemy import create_engine, event  # noqa: E402
+from starlette.responses import FileResponse  # noqa: E402
+
+from certificate_service.app import database  # noqa: E402
+from certificate_service.app.main import create_app  # noqa: E402
+from certificate_service.app.services import downloads, file_store, rendering  # noqa: E402
+
+
+def add_baseline_route(app) -> None:
+    async def baseline(digest: str):
+        return FileResponse(file_store.FileStore(rendering.render_pool.store_root).path(digest), media_type="application/pdf")
+
+    app.add_api_route("/bench/file-response/{digest}", baseline)
+
+
+async def run(app, users: int, requests: int, concurrency: int, statements: list) -> None:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        certificate = (await client.post("/certificates", json={"workshop_id": 1, "name": "Intro"})).json()
+        issued = []
+        for user_id in range(users):
+            response = await client.post(
+                "/certificates/issue",
+                json={"certificate_id": certificate["id"], "user_id": user_id, "fields": {"recipient": f"Student {user_id}"}},
+            )
+            issued.append(response.json())
+        digests = [row["file_url"].rsplit("/", 1)[1][: -len(".pdf")] for row in issued]
+
+        def cold(n: int):
+            downloads.digest_cache.clear()
+            return client.get(f"/certificates/issued/{issued[n % users]['id']}/file")
+
+        modes = (
+            ("FileResponse", lambda n: client.get(f"/bench/file-response/{digests[n % users]}")),
+            ("by digest", lambda n: client.get(issued[n % users]["file_url"])),
+            ("by id, cold cache", cold),
+            ("by id, warm cache", lambda n: client.get(f"/certificates/issued/{issued[n % users]['id']}/file")),
+            ("1 KiB range", lambda n: client.get(issued[n % users]["file_url"], headers={"Range": "bytes=0-1023"})),
+            ("revalidation", lambda n: client.get(
+                issued[n % users]["file_url"], headers={"If-None-Match": f'"{digests[n % users]}"'})),
+        )
+        window = asyncio.Semaphore(concurrency)
+
+        async def fetch(request, n: int) -> None:
+            async with window:
+                response = await request(n)
+                if response.status_code not in (200, 206, 304):
+                    raise RuntimeError(response.text)
+
+        for label, request in modes:
+            del statements[:]
+            started = time.perf_counter()
+            await asyncio.gather(*(fetch(request, n) for n in range(requests)))
+            elapsed = time.perf_counter() - started
+            print(f"{label:18} {requests / elapsed:,.0f} requests/s ({elapsed:.2f}s, {len(statements)} statements)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    args = parser.parse_args()
+
+    app = create_app()
+    add_baseline_route(app)
+    # Sessions are opened and closed on different threadpool threads.
+    engine = create_engine(database.DATABASE_URL, connect_args={"check_same_thread": False})
+    database.SessionLocal.configure(bind=engine)
+    statements: list = []
+    event.listen(engine, "before_cursor_execute", lambda *a: statements.append(a[2]))
+    store = tempfile.mkdtemp(prefix="bench_certificates_")
+    rendering.render_pool.store_root = store
+    try:
+        asyncio.run(run(app, args.users, args.requests, args.concurrency, statements))
+    finally:
+        rendering.render_pool.shutdown()
+        shutil.rmtree(store)
+        os.remove(DB_PATH)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Measure eligibility consumer throughput against an in-process broker.
+
+Publishes a mix of progress and quiz events through the shared event bus
+into `InMemoryBroker`, with one auto-issued certificate per workshop
+("all steps completed AND best quiz score >= 70"), then times one
+consumer worker folding them into a SQLite database in micro-batches
+and issuing the certificates students earn on the way, rendered by the
+render pool into a temporary store.  Usage (from the repo root):
+
+    python -m certificate_service.benchmarks.bench_eligibility --events 200000
+"""
+
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+
+DB_PATH = os.path.join(tempfile.gettempdir(), "bench_certificate_eligibility.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{DB_PATH}")
+os.environ.setdefault("CERTIFICATE_CONSUMER_ENABLED", "false")
+
+from sukhverse_common.events.bus import EventBus  # noqa: E402
+from sukhverse_common.events.testing import InMemoryBroker  # noqa: E402
+
+from certificate_service.app import database  # noqa: E402
+from certificate_service.app.events.consumer import EligibilityConsumer  # noqa: E402
+from certificate_service.app.models.base import Base  # noqa: E402
+from certificate_service.app.models.certificate import Certificate  # noqa: E402
+from certificate_service.app.services import rendering  # noqa: E402
+from certificate_service.app.services.eligibility import TOPICS  # noqa: E402
+
+
+def publish(bus: EventBus, events: int, workshops: int, students: int, substeps: int) -> None:
+    rng = random.Random(7)
+    for workshop_id in range(1, workshops + 1):
+        bus.send("workshop_created", {"workshop_id": workshop_id, "creator_user_id": 1, "total_substeps": substeps})
+    for result_id in range(1, events - workshops + 1):
+        user_id = rng.randint(1, students)
+        workshop_id = rng.randint(1, workshops)
+        if rng.random() < 0.75:
+            completed = rng.random() < 0.9
+            bus.send(
+                "step_completed" if completed else "step_updated",
+                {
+                    "user_id": user_id,
+                    "workshop_id": workshop_id,
+                    "step_id": 1,
+                    "substep_id": rng.randint(1, substeps),
+                    "status": "completed" if completed else "in_progress",
+                },
+            )
+        else:
+            score = rng.randint(0, 100)
+            bus.send(
+                "quiz_submitted",
+                {
+                    "quiz_id": workshop_id,
+                    "user_id": user_id,
+                    "score": score,
+                    "pass_fail": score >= 50,
+                    "workshop_id": workshop_id,
+                    "result_id": result_id,
+                },
+            )
+    bus.flush()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--events", type=int, default=200_000)
+    parser.add_argument("--workshops", type=int, default=10)
+    parser.add_argument("--students", type=int, default=500)
+    parser.add_argument("--substeps", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=2000)
+    args = parser.parse_args()
+
+    if os.path.exists(DB_PATH):
+        os.remove(DB_PATH)
+    Base.metadata.create_all(bind=database.engine)
+    with database.SessionLocal() as db:
+        db.add_all(
+            Certificate(workshop_id=workshop_id, name=f"Workshop {workshop_id}",
+                        criteria={"all_steps_completed": True, "min_quiz_score": 70})
+            for workshop_id in range(1, args.workshops + 1)
+        )
+        db.commit()
+    store = tempfile.mkdtemp(prefix="bench_certificates_")
+    rendering.render_pool.store_root = store
+
+    broker = InMemoryBroker()
+    publish(EventBus("bench", producer_factory=lambda: broker), args.events, args.workshops, args.students, args.substeps)
+    consumer = broker.consumer(*TOPICS)
+    worker = EligibilityConsumer(batch_size=args.batch_size)
+
+    try:
+        started = time.perf_counter()
+        while worker.process_batch(consumer):
+            pass
+        elapsed = time.perf_counter() - started
+    finally:
+        rendering.render_pool.shutdown()
+        shutil.rmtree(store)
+        os.remove(DB_PATH)
+
+    print(f"{args.events} events in {elapsed:.2f}s: {args.events / elapsed:,.0f} events/s, "
+          f"{worker.metrics()['issued']} certificates issued (batch size {args.batch_size})")
+
+
+if __name__ == "__main__":
+    main()
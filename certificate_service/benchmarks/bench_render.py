@@ -0,0 +1,70 @@
+"""
+Certificate rendering throughput.
+
+Renders `--certificates` certificates with the default layout, each for a
+different recipient: compiling the template for every certificate, with
+the compiled template cached, and through the render pool
+(`--workers` processes writing into a temporary file store) with every
+certificate submitted at once.  Reports certificates per second and,
+for the pool, its latency percentiles.  Usage (from the repo root):
+
+    python -m certificate_service.benchmarks.bench_render --certificates 2000 --workers 4
+"""
+
+import argparse
+import asyncio
+import shutil
+import tempfile
+import time
+
+from certificate_service.app.services import rendering
+
+
+def values(n: int):
+    return {"recipient": f"Student {n}", "certificate_name": "Intro to Rust", "issued_on": "2026-10-18"}
+
+
+def serial(count: int, cached: bool) -> float:
+    started = time.perf_counter()
+    template = rendering.compile_template(None)
+    for n in range(count):
+        if not cached:
+            template = rendering.compile_template(None)
+        rendering.render(template, values(n))
+    return time.perf_counter() - started
+
+
+async def pooled(pool: rendering.RenderPool, count: int) -> float:
+    # Start the workers and compile the template in each before timing.
+    await asyncio.gather(*(pool.render(rendering.RenderJob(None, None, values(-n))) for n in range(pool.workers * 4)))
+    started = time.perf_counter()
+    await asyncio.gather(*(pool.render(rendering.RenderJob(None, None, values(n))) for n in range(count)))
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--certificates", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    for label, cached in (("compiled per certificate", False), ("compiled template", True)):
+        elapsed = serial(args.certificates, cached)
+        print(f"{label:26} {args.certificates / elapsed:,.0f} certificates/s ({elapsed:.2f}s, 1 process)")
+
+    store = tempfile.mkdtemp(prefix="bench_certificates_")
+    pool = rendering.RenderPool(store_root=store, workers=args.workers, max_queue=args.certificates)
+    try:
+        elapsed = asyncio.run(pooled(pool, args.certificates))
+    finally:
+        pool.shutdown()
+        shutil.rmtree(store)
+    metrics = pool.metrics()
+    render, total = metrics["render_latency"], metrics["total_latency"]
+    print(f"{'render pool':26} {args.certificates / elapsed:,.0f} certificates/s ({elapsed:.2f}s, "
+          f"{pool.workers} processes, render p50 {render['p50_ms']}ms p95 {render['p95_ms']}ms, "
+          f"queued p95 {total['p95_ms']}ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from sukhverse_common.db import engine_options
+
+
+@pytest.fixture()
+def client(monkeypatch, tmp_path):
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    yield from make_client(monkeypatch, tmp_path, engine)
+
+
+@pytest.fixture()
+def async_client(monkeypatch, tmp_path):
+    """`client` with the async routes on an aiosqlite engine over a database file."""
+    url = f"sqlite:///{tmp_path / 'certificate.db'}"
+    engine = create_engine(url, **engine_options(url))
+    yield from make_client(monkeypatch, tmp_path, engine, async_url=url)
+
+
+def make_client(monkeypatch, tmp_path, engine, async_url=None):
+    os.environ.setdefault("OUTBOX_RELAY_ENABLED", "false")
+    os.environ.setdefault("CERTIFICATE_CONSUMER_ENABLED", "false")
+
+    from certificate_service.app import database as database_module
+    from certificate_service.app import security
+    from certificate_service.app.services.downloads import digest_cache
+    from certificate_service.app.services import rendering
+    from certificate_service.app.services.rendering import render_pool
+    from certificate_service.app.models.base import Base
+
+    TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+    monkeypatch.setattr(database_module, "engine", engine)
+    monkeypatch.setattr(database_module, "SessionLocal", TestingSessionLocal)
+    if async_url:
+        monkeypatch.setattr(database_module.async_db, "url", async_url)
+        monkeypatch.setattr(database_module.async_db, "enabled", True)
+    monkeypatch.setattr(render_pool, "store_root", str(tmp_path / "store"))
+    monkeypatch.setattr(rendering, "ASSET_DIR", str(tmp_path / "assets"))
+    monkeypatch.setattr(security, "SERVICE_TOKEN", "test-service-token")
+    monkeypatch.setattr(render_pool, "_executor_factory", lambda n: ThreadPoolExecutor(max_workers=n))
+    # Issued ids restart with every test database.
+    digest_cache.clear()
+
+    from certificate_service.app.main import create_app
+    from certificate_service.app.database import get_db
+
+    def override_get_db():
+        db = TestingSessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app = create_app()
+    app.dependency_overrides[get_db] = override_get_db
+
+    with TestClient(app) as c:
+        c.session_factory = TestingSessionLocal
+        c.engine = engine
+        c.async_db = database_module.async_db
+        c.store_root = tmp_path / "store"
+        c.asset_dir = tmp_path / "assets"
+        c.admin_headers = {"X-Service-Token": "test-service-token"}
+        yield c
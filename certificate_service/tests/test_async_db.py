@@ -0,0 +1,28 @@
+import pytest
+from sqlalchemy import event
+
+from certificate_service.tests import test_certificates, test_downloads, test_rendering
+
+# The hot routes behave the same on async sessions; re-run their tests there.
+CASES = [
+    test_certificates.test_user_certificates_are_listed_newest_first_in_pages,
+    test_rendering.test_issue_renders_into_content_addressed_store,
+    test_downloads.test_download_by_digest,
+]
+
+
+@pytest.mark.parametrize("case", CASES, ids=lambda case: case.__name__)
+def test_hot_routes_on_async_sessions(async_client, case):
+    statements = []
+    event.listen(async_client.async_db.engine.sync_engine, "before_cursor_execute", lambda *a: statements.append(a[2]))
+    case(async_client)
+    assert statements
+
+
+def test_issued_file_digest_is_looked_up_on_the_async_engine(async_client):
+    issued = test_downloads.issue(async_client)
+    statements = []
+    event.listen(async_client.async_db.engine.sync_engine, "before_cursor_execute", lambda *a: statements.append(a[2]))
+    assert async_client.get(f"/certificates/issued/{issued['id']}/file").status_code == 200
+    assert async_client.get(f"/certificates/issued/{issued['id']}/file").status_code == 200
+    assert len(statements) == 1
@@ -0,0 +1,142 @@
+import asyncio
+import json
+
+import pytest
+
+from certificate_service.app.models.certificate import IssuedCertificate
+from certificate_service.app.models.outbox import OutboxEvent
+from certificate_service.app.services import bulk_issue, rendering
+
+
+def bulk(client, certificate_id, user_ids):
+    response = client.post(f"/certificates/{certificate_id}/issue:bulk", json={"user_ids": user_ids})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def issued_events(client):
+    with client.session_factory() as db:
+        return db.query(OutboxEvent).filter(OutboxEvent.topic == "certificate_issued").count()
+
+
+def test_bulk_issue_skips_holders_and_is_idempotent(client, monkeypatch):
+    monkeypatch.setattr(bulk_issue, "CHUNK_SIZE", 2)
+    certificate = client.post("/certificates", json={"workshop_id": 1, "name": "Cohort"}).json()
+    single = client.post("/certificates/issue", json={"certificate_id": certificate["id"], "user_id": 2})
+    assert single.status_code == 201
+
+    lines = bulk(client, certificate["id"], [1, 2, 3, 2, 4, 5])
+    assert [line["processed"] for line in lines] == [2, 4, 5]
+    assert lines[-1] == {"status": "completed", "processed": 5, "total": 5, "issued": 4, "already_issued": 1}
+    assert [line["status"] for line in lines[:-1]] == ["running", "running"]
+    with client.session_factory() as db:
+        rows = db.query(IssuedCertificate).filter(IssuedCertificate.certificate_id == certificate["id"]).all()
+    assert sorted(row.user_id for row in rows) == [1, 2, 3, 4, 5]
+    assert all(row.file_url.startswith("/certificates/files/") for row in rows)
+    assert issued_events(client) == 5
+
+    again = bulk(client, certificate["id"], [1, 2, 3, 4, 5])
+    assert again[-1] == {"status": "completed", "processed": 5, "total": 5, "issued": 0, "already_issued": 5}
+    assert issued_events(client) == 5
+
+    repeat = client.post("/certificates/issue", json={"certificate_id": certificate["id"], "user_id": 3})
+    assert repeat.status_code == 200
+    assert repeat.json()["id"] == next(row.id for row in rows if row.user_id == 3)
+
+
+def test_interrupted_bulk_issue_resumes(client, monkeypatch):
+    certificate = client.post("/certificates", json={"workshop_id": 1, "name": "Cohort"}).json()
+
+    async def fail(jobs):
+        raise RuntimeError("render workers gone")
+
+    monkeypatch.setattr(rendering.render_pool, "render_many", fail)
+    lines = bulk(client, certificate["id"], [10, 11])
+    assert lines[-1]["status"] == "failed"
+    assert lines[-1]["error"] == "render workers gone"
+    with client.session_factory() as db:
+        assert [row.file_url for row in db.query(IssuedCertificate)] == [None, None]
+    assert issued_events(client) == 0
+
+    monkeypatch.delattr(rendering.render_pool, "render_many")
+    lines = bulk(client, certificate["id"], [10, 11, 12])
+    assert lines[-1] == {"status": "completed", "processed": 3, "total": 3, "issued": 3, "already_issued": 0}
+    with client.session_factory() as db:
+        assert all(row.file_url for row in db.query(IssuedCertificate))
+    assert issued_events(client) == 3
+
+
+def test_abandoned_bulk_issue_releases_its_claims(client, monkeypatch):
+    certificate = client.post("/certificates", json={"workshop_id": 1, "name": "Cohort"}).json()
+
+    async def scenario():
+        rendering_started = asyncio.Event()
+
+        async def stall(jobs):
+            rendering_started.set()
+            await asyncio.Event().wait()
+
+        monkeypatch.setattr(rendering.render_pool, "render_many", stall)
+        # The client disconnects while the first chunk renders.
+        first_line = asyncio.ensure_future(bulk_issue.issue_bulk(certificate["id"], [20, 21]).__anext__())
+        await rendering_started.wait()
+        first_line.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first_line
+
+    asyncio.run(scenario())
+    monkeypatch.delattr(rendering.render_pool, "render_many")
+    with client.session_factory() as db:
+        assert [(row.claim_token, row.file_url) for row in db.query(IssuedCertificate)] == [(None, None)] * 2
+    single = client.post("/certificates/issue", json={"certificate_id": certificate["id"], "user_id": 20})
+    assert single.status_code == 200
+    assert single.json()["file_url"]
+
+
+def test_concurrent_runs_render_and_announce_each_issuance_once(client, monkeypatch):
+    certificate = client.post("/certificates", json={"workshop_id": 1, "name": "Cohort"}).json()
+    with client.session_factory() as db:
+        first, _ = bulk_issue.claim(db, certificate["id"], [1, 2], "first")
+        # A second run, or the eligibility consumer, leaves live claims alone.
+        assert bulk_issue.claim(db, certificate["id"], [1, 2, 3], "second") == ([(3, 3)], 0)
+        assert bulk_issue.finish(db, certificate["id"], "second", [(3, 3)], ["c" * 64]) == 1
+
+        # The first run stalls past the timeout; a third takes over its claims.
+        monkeypatch.setattr(bulk_issue, "CLAIM_TIMEOUT_SECONDS", -1)
+        assert bulk_issue.claim(db, certificate["id"], [1, 2, 3], "third") == (first, 1)
+        assert bulk_issue.finish(db, certificate["id"], "third", first[:1], ["a" * 64]) == 1
+        # The stalled run records and announces nothing when it finishes.
+        assert bulk_issue.finish(db, certificate["id"], "first", first, ["b" * 64, "b" * 64]) == 0
+        bulk_issue.release(db, "third")
+        assert bulk_issue.claim(db, certificate["id"], [1, 2, 3], "fourth") == (first[1:], 2)
+
+        urls = {row.user_id: row.file_url for row in db.query(IssuedCertificate)}
+        assert urls == {1: f"/certificates/files/{'a' * 64}.pdf", 2: None, 3: f"/certificates/files/{'c' * 64}.pdf"}
+    assert issued_events(client) == 2
+
+
+def test_single_issue_renders_an_unrendered_bulk_issuance(client):
+    certificate = client.post("/certificates", json={"workshop_id": 1, "name": "Cohort"}).json()
+    body = {"certificate_id": certificate["id"], "user_id": 4}
+    with client.session_factory() as db:
+        [(issued_id, _)], _ = bulk_issue.claim(db, certificate["id"], [4], "bulk")
+
+    rendering = client.post("/certificates/issue", json=body)
+    assert rendering.status_code == 202
+    assert (rendering.json()["id"], rendering.json()["file_url"]) == (issued_id, None)
+
+    with client.session_factory() as db:
+        bulk_issue.release(db, "bulk")
+    issued = client.post("/certificates/issue", json=body)
+    assert issued.status_code == 200
+    assert issued.json()["id"] == issued_id
+    assert issued.json()["file_url"].startswith("/certificates/files/")
+    assert issued_events(client) == 1
+    assert client.post("/certificates/issue", json=body).json() == issued.json()
+
+
+def test_bulk_issue_validation(client):
+    assert client.post("/certificates/99/issue:bulk", json={"user_ids": [1]}).status_code == 404
+    certificate = client.post("/certificates", json={"workshop_id": 1, "name": "Cohort"}).json()
+    assert client.post(f"/certificates/{certificate['id']}/issue:bulk", json={"user_ids": []}).status_code == 422
@@ -0,0 +1,30 @@
+from datetime import datetime, timedelta
+
+from certificate_service.app.models.certificate import IssuedCertificate
+
+
+def test_user_certificates_are_listed_newest_first_in_pages(client):
+    certificates = [client.post("/certificates", json={"workshop_id": 1, "name": f"Intro {n}"}).json() for n in range(8)]
+    issued_at = datetime(2026, 3, 1)
+    with client.session_factory() as db:
+        db.add_all(
+            IssuedCertificate(certificate_id=certificates[n]["id"], user_id=7 if n != 3 else 8,
+                              issued_at=issued_at + timedelta(hours=n // 2))
+            for n in range(7)
+        )
+        db.commit()
+    issued = client.post("/certificates/issue", json={"certificate_id": certificates[7]["id"], "user_id": 7})
+    assert issued.status_code == 201
+
+    first = client.get("/certificates/user/7", params={"limit": 4})
+    assert first.status_code == 200
+    assert [c["id"] for c in first.json()] == [8, 7, 6, 5]
+    assert first.headers["link"].endswith('>; rel="next"')
+    url = first.headers["link"][1:].split(">")[0]
+    assert "limit=4" in url
+
+    second = client.get(url)
+    assert [c["id"] for c in second.json()] == [3, 2, 1]
+    assert "link" not in second.headers
+    assert client.get("/certificates/user/7", params={"cursor": "nonsense"}).status_code == 400
+    assert client.get("/certificates/user/7", params={"limit": 0}).status_code == 422
@@ -0,0 +1,129 @@
+import asyncio
+
+import pytest
+from sqlalchemy import event
+
+from certificate_service.app.services import downloads
+from certificate_service.app.services.file_store import FileStore
+from certificate_service.app.utils import file_response
+from certificate_service.app.utils.file_response import ImmutableFileResponse, RangeNotSatisfiable, parse_range
+
+
+def issue(client, user_id=7):
+    certificate = client.post("/certificates", json={"workshop_id": 1, "name": "Intro to Rust"}).json()
+    return client.post("/certificates/issue", json={"certificate_id": certificate["id"], "user_id": user_id}).json()
+
+
+def test_parse_range():
+    assert parse_range(None, 100) is None
+    assert parse_range("bytes=0-9", 100) == (0, 9)
+    assert parse_range("bytes=90-", 100) == (90, 99)
+    assert parse_range("bytes=90-500", 100) == (90, 99)
+    assert parse_range("bytes=-10", 100) == (90, 99)
+    assert parse_range("bytes=-500", 100) == (0, 99)
+    # Malformed and multi-range requests get the whole file.
+    for header in ("bytes=0-1,5-6", "items=0-1", "bytes=-", "bytes=9-2"):
+        assert parse_range(header, 100) is None
+    for header in ("bytes=100-", "bytes=-0"):
+        with pytest.raises(RangeNotSatisfiable):
+            parse_range(header, 100)
+
+
+def test_download_by_digest(client):
+    url = issue(client)["file_url"]
+    digest = url.rsplit("/", 1)[1][: -len(".pdf")]
+    pdf = FileStore(str(client.store_root)).path(digest).read_bytes()
+
+    full = client.get(url)
+    assert full.status_code == 200
+    assert full.content == pdf
+    assert full.headers["content-type"] == "application/pdf"
+    assert full.headers["content-length"] == str(len(pdf))
+    assert full.headers["etag"] == f'"{digest}"'
+    assert full.headers["cache-control"] == "public, max-age=31536000, immutable"
+    assert full.headers["accept-ranges"] == "bytes"
+
+    part = client.get(url, headers={"Range": "bytes=4-13"})
+    assert part.status_code == 206
+    assert part.content == pdf[4:14]
+    assert part.headers["content-range"] == f"bytes 4-13/{len(pdf)}"
+    tail = client.get(url, headers={"Range": "bytes=-6"})
+    assert tail.content == pdf[-6:]
+    # A validator for another version of the file voids the range.
+    assert client.get(url, headers={"Range": "bytes=0-3", "If-Range": '"other"'}).status_code == 200
+    assert client.get(url, headers={"Range": "bytes=0-3", "If-Range": f'"{digest}"'}).status_code == 206
+
+    unsatisfiable = client.get(url, headers={"Range": f"bytes={len(pdf)}-"})
+    assert unsatisfiable.status_code == 416
+    assert unsatisfiable.headers["content-range"] == f"bytes */{len(pdf)}"
+
+    cached = client.get(url, headers={"If-None-Match": f'"abc", W/"{digest}"'})
+    assert cached.status_code == 304
+    assert cached.content == b""
+    assert cached.headers["etag"] == f'"{digest}"'
+
+    head = client.head(url)
+    assert head.status_code == 200 and head.content == b""
+    assert head.headers["content-length"] == str(len(pdf))
+
+    assert client.get(f"/certificates/files/{'0' * 64}.pdf").status_code == 404
+    assert client.get("/certificates/files/..%2F..%2Fetc.pdf").status_code == 404
+    assert client.get(f"/certificates/files/{digest.upper()}.pdf").status_code == 404
+
+
+def test_download_issued_certificate_hits_the_database_once(client):
+    issued = issue(client)
+    pdf = client.get(issued["file_url"]).content
+    statements = []
+    event.listen(client.engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    first = client.get(f"/certificates/issued/{issued['id']}/file")
+    assert first.status_code == 200 and first.content == pdf
+    assert len(statements) == 1
+    again = client.get(f"/certificates/issued/{issued['id']}/file", headers={"Range": "bytes=0-4"})
+    assert again.content == b"%PDF-"
+    assert len(statements) == 1
+
+    assert client.get("/certificates/issued/999/file").status_code == 404
+
+
+def test_zero_copy_and_accel_redirect(client, monkeypatch):
+    url = issue(client)["file_url"]
+    digest = url.rsplit("/", 1)[1][: -len(".pdf")]
+    path = FileStore(str(client.store_root)).path(digest)
+
+    def run(response, extensions):
+        messages = []
+
+        async def send(message):
+            messages.append(message)
+
+        scope = {"type": "http", "method": "GET", "extensions": extensions}
+        asyncio.run(response(scope, None, send))
+        return messages
+
+    response = ImmutableFileResponse(path, f'"{digest}"', {"range": "bytes=10-19"}, media_type="application/pdf")
+    start, body = run(response, {"http.response.zerocopysend": {}})
+    assert start["status"] == 206
+    assert body["type"] == "http.response.zerocopysend"
+    assert (body["offset"], body["count"]) == (10, 10)
+    assert body["file"].closed
+
+    response = ImmutableFileResponse(path, f'"{digest}"', {}, media_type="application/pdf")
+    _, body = run(response, {"http.response.pathsend": {}})
+    assert body == {"type": "http.response.pathsend", "path": str(path)}
+
+    # Without either extension the file goes out as plain bytes chunks.
+    monkeypatch.setattr(file_response, "CHUNK_SIZE", 4)
+    response = ImmutableFileResponse(path, f'"{digest}"', {"range": "bytes=10-19"}, media_type="application/pdf")
+    _, *bodies = run(response, {})
+    assert all(type(body["body"]) is bytes for body in bodies)
+    assert [body["more_body"] for body in bodies] == [True, True, False]
+    assert b"".join(body["body"] for body in bodies) == path.read_bytes()[10:20]
+
+    monkeypatch.setattr(downloads, "ACCEL_REDIRECT_PREFIX", "/_certificate_store/")
+    offloaded = client.get(url, headers={"Range": "bytes=0-9"})
+    assert offloaded.status_code == 200
+    assert offloaded.content == b""
+    assert offloaded.headers["x-accel-redirect"] == f"/_certificate_store/{digest[:2]}/{digest[2:4]}/{digest}"
+    assert offloaded.headers["etag"] == f'"{digest}"'
@@ -0,0 +1,170 @@
+import json
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.pool import StaticPool
+
+from sukhverse_common.events import backfill
+from sukhverse_common.events.bus import EventBus
+from sukhverse_common.events.testing import InMemoryBroker
+
+from certificate_service.app.models.certificate import IssuedCertificate
+from certificate_service.app.models.eligibility import StudentProgress
+from certificate_service.app.services.criteria import CriteriaError, Progress, compile_criteria
+
+CRITERIA = {"all_steps_completed": True, "min_quiz_score": 70}
+
+
+@pytest.fixture()
+def pipeline(client):
+    from certificate_service.app.events.consumer import EligibilityConsumer
+    from certificate_service.app.services.eligibility import TOPICS
+
+    broker = InMemoryBroker(partitions=4)
+    bus = EventBus("test", producer_factory=lambda: broker)
+    consumer = broker.consumer(*TOPICS)
+    worker = EligibilityConsumer(batch_size=100, session_factory=client.session_factory)
+
+    def publish(topic, **event):
+        bus.send(topic, event)
+
+    def drain():
+        bus.flush()
+        while worker.process_batch(consumer):
+            pass
+
+    return publish, drain, consumer, worker
+
+
+def complete(publish, user_id, substeps, workshop_id=1):
+    for substep_id in substeps:
+        publish("step_completed", user_id=user_id, workshop_id=workshop_id, step_id=1, substep_id=substep_id,
+                status="completed")
+
+
+def holders(client, certificate_id):
+    with client.session_factory() as db:
+        rows = db.query(IssuedCertificate).filter(IssuedCertificate.certificate_id == certificate_id).all()
+    assert all(row.file_url for row in rows)
+    return sorted(row.user_id for row in rows)
+
+
+def test_criteria_compile_to_predicates():
+    done = Progress(completed_substeps=4, total_substeps=4, best_quiz_score=72, quizzes_passed=1)
+    assert compile_criteria(CRITERIA)(done)
+    assert not compile_criteria(CRITERIA)(done._replace(best_quiz_score=69))
+    assert not compile_criteria(CRITERIA)(done._replace(best_quiz_score=None))
+    assert not compile_criteria({"all_steps_completed": True})(done._replace(total_substeps=0, completed_substeps=0))
+    either = compile_criteria({"any": [{"min_quizzes_passed": 2}, {"min_completed_substeps": 4}]})
+    assert either(done)
+    assert not either(done._replace(completed_substeps=3))
+    assert compile_criteria(None) is None and compile_criteria({}) is None
+    for bad in ({"min_quiz_score": "70"}, {"min_quiz_score": True}, {"steps": 1}, {"any": []}, {"all": [{}]}):
+        with pytest.raises(CriteriaError):
+            compile_criteria(bad)
+
+
+def test_certificates_are_issued_when_criteria_are_met(client, pipeline):
+    publish, drain, consumer, worker = pipeline
+    certificate = client.post("/certificates", json={"workshop_id": 1, "name": "Intro", "criteria": CRITERIA}).json()
+    manual = client.post("/certificates", json={"workshop_id": 1, "name": "Mentor"}).json()
+    other = client.post("/certificates", json={"workshop_id": 2, "name": "Other", "criteria": {"min_quiz_score": 0}}).json()
+    assert client.post("/certificates", json={"workshop_id": 1, "name": "Bad", "criteria": {"x": 1}}).status_code == 400
+
+    publish("workshop_created", workshop_id=1, creator_user_id=9, total_substeps=3)
+    complete(publish, 10, [1, 2, 3])
+    publish("quiz_submitted", quiz_id=5, user_id=10, score=80, pass_fail=True, workshop_id=1, result_id=1)
+    complete(publish, 11, [1, 2, 3])
+    publish("quiz_submitted", quiz_id=5, user_id=11, score=60, pass_fail=True, workshop_id=1, result_id=2)
+    complete(publish, 12, [1, 2])
+    publish("quiz_submitted", quiz_id=5, user_id=12, score=95, pass_fail=True, workshop_id=1, result_id=3)
+    # Quiz results of v1 events have no workshop and count for nothing.
+    publish("quiz_submitted", quiz_id=6, user_id=11, score=99, pass_fail=True)
+    drain()
+    assert holders(client, certificate["id"]) == [10]
+    assert holders(client, manual["id"]) == []
+    assert holders(client, other["id"]) == []
+
+    publish("quiz_submitted", quiz_id=5, user_id=11, score=75, pass_fail=True, workshop_id=1, result_id=4)
+    publish("step_updated", user_id=12, workshop_id=1, step_id=1, substep_id=3, status="in_progress")
+    drain()
+    assert holders(client, certificate["id"]) == [10, 11]
+
+    # A redelivered history changes no counter and issues nothing twice.
+    consumer.committed = {}
+    consumer.seek_to_committed()
+    drain()
+    assert holders(client, certificate["id"]) == [10, 11]
+    with client.session_factory() as db:
+        progress = {row.user_id: row for row in db.query(StudentProgress).filter(StudentProgress.workshop_id == 1)}
+    assert {user_id: (row.completed_substeps, row.best_quiz_score, row.quizzes_passed)
+            for user_id, row in progress.items()} == {10: (3, 80, 1), 11: (3, 75, 1), 12: (2, 95, 1)}
+    assert worker.metrics()["issued"] == 2
+
+    complete(publish, 12, [3])
+    drain()
+    assert holders(client, certificate["id"]) == [10, 11, 12]
+
+
+def test_a_late_workshop_total_rechecks_its_students(client, pipeline):
+    publish, drain, consumer, worker = pipeline
+    certificate = client.post("/certificates", json={"workshop_id": 3, "name": "Late", "criteria": {"all_steps_completed": True}}).json()
+
+    # The last step_completed arrives before the workshop's total.
+    complete(publish, 20, [1, 2], workshop_id=3)
+    complete(publish, 21, [1], workshop_id=3)
+    drain()
+    assert holders(client, certificate["id"]) == []
+
+    publish("workshop_created", workshop_id=3, creator_user_id=9, total_substeps=2)
+    drain()
+    assert holders(client, certificate["id"]) == [20]
+
+    # A redelivered total issues nothing twice.
+    publish("workshop_created", workshop_id=3, creator_user_id=9, total_substeps=2)
+    complete(publish, 21, [2], workshop_id=3)
+    drain()
+    assert holders(client, certificate["id"]) == [20, 21]
+    assert worker.metrics()["issued"] == 2
+
+
+def test_backfill_then_issue_to_all_eligible(client):
+    from certificate_service.app.events.backfill import EligibilitySink
+
+    certificate = client.post("/certificates", json={"workshop_id": 1, "name": "Intro", "criteria": CRITERIA}).json()
+    manual = client.post("/certificates", json={"workshop_id": 1, "name": "Mentor"}).json()
+
+    source = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    backfill.metadata.create_all(bind=source)
+    with source.begin() as connection:
+        connection.execute(backfill.workshops.insert(), [{"id": 1, "creator_user_id": 9}])
+        connection.execute(backfill.steps.insert(), [{"id": 1, "workshop_id": 1}])
+        connection.execute(backfill.substeps.insert(), [{"id": n, "step_id": 1} for n in (1, 2)])
+        connection.execute(
+            backfill.substep_progress.insert(),
+            [
+                {"user_id": user_id, "workshop_id": 1, "step_id": 1, "substep_id": substep_id, "status": "completed"}
+                for user_id in (20, 21, 22)
+                for substep_id in (1, 2)
+            ],
+        )
+        connection.execute(backfill.quizzes.insert(), [{"id": 5, "linked_to": "1"}])
+        connection.execute(
+            backfill.quiz_results.insert(),
+            [{"quiz_id": 5, "user_id": user_id, "score": score, "pass_fail": score >= 50}
+             for user_id, score in ((20, 90), (21, 40), (22, 70))],
+        )
+    sink = EligibilitySink(client.session_factory)
+    for name in ("workshops", "progress", "quiz_results"):
+        backfill.replay(backfill.SOURCES[name], source, sink, backfill.Checkpoint(None), chunk_size=2)
+    assert holders(client, certificate["id"]) == []
+
+    response = client.post(f"/certificates/{certificate['id']}/issue:bulk", json={"all_eligible": True})
+    last = json.loads(response.text.splitlines()[-1])
+    assert last == {"status": "completed", "processed": 2, "total": 2, "issued": 2, "already_issued": 0}
+    assert holders(client, certificate["id"]) == [20, 22]
+
+    assert client.post(f"/certificates/{manual['id']}/issue:bulk", json={"all_eligible": True}).status_code == 400
+    both = {"all_eligible": True, "user_ids": [1]}
+    assert client.post(f"/certificates/{certificate['id']}/issue:bulk", json=both).status_code == 422
+    assert client.post(f"/certificates/{certificate['id']}/issue:bulk", json={}).status_code == 422
@@ -0,0 +1,132 @@
+import base64
+import re
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+from certificate_service.app.services import rendering
+from certificate_service.app.services.file_store import FileStore
+
+LAYOUT = {
+    "page": {"width": 600, "height": 400},
+    "background": [
+        {"type": "rect", "x": 10, "y": 10, "width": 580, "height": 380, "stroke": "#1f3a5f", "fill": "#fffdf5"},
+        {"type": "text", "text": "Hackathon Finisher", "x": 300, "y": 300, "font": "Times-Bold", "size": 28,
+         "align": "center"},
+    ],
+    "fields": [{"text": "{recipient} ({team})", "x": 300, "y": 200, "align": "center"}],
+}
+
+
+def page_text(pdf: bytes) -> bytes:
+    streams = re.findall(rb"stream\r?\n(.*?~>)endstream", pdf, re.S)
+    return b"".join(zlib.decompress(base64.a85decode(b"<~" + stream, adobe=True)) for stream in streams)
+
+
+def test_issue_renders_into_content_addressed_store(client):
+    certificate = client.post("/certificates", json={"workshop_id": 1, "name": "Intro to Rust"}).json()
+    body = {"certificate_id": certificate["id"], "user_id": 7, "fields": {"recipient": "Ada Lovelace"}}
+    completed = client.get("/certificates/metrics/rendering").json()["completed"]
+
+    first = client.post("/certificates/issue", json=body)
+    assert first.status_code == 201
+    match = re.fullmatch(r"/certificates/files/([0-9a-f]{64})\.pdf", first.json()["file_url"])
+    assert match
+    path = FileStore(str(client.store_root)).path(match.group(1))
+    assert path.parent.parent.parent == client.store_root
+    pdf = path.read_bytes()
+    assert pdf.startswith(b"%PDF")
+    text = page_text(pdf)
+    assert b"(Ada Lovelace)" in text
+    assert b"(has completed Intro to Rust)" in text
+    assert b"(Certificate of Completion)" in text
+
+    # Identical certificates render to identical bytes and share one file.
+    second = client.post("/certificates/issue", json={**body, "user_id": 8})
+    assert second.json()["file_url"] == first.json()["file_url"]
+    assert second.json()["id"] != first.json()["id"]
+    assert len([p for p in client.store_root.rglob("*") if p.is_file()]) == 1
+
+    metrics = client.get("/certificates/metrics/rendering").json()
+    assert metrics["completed"] == completed + 2
+    assert metrics["queue_depth"] == 0
+    assert metrics["render_latency"]["max_ms"] > 0
+    assert metrics["total_latency"]["p95_ms"] >= metrics["render_latency"]["p50_ms"]
+
+    assert client.post("/certificates/issue", json={"certificate_id": 999, "user_id": 7}).status_code == 404
+
+
+def test_templates_are_validated_and_rendered(client):
+    def post(layout, headers=client.admin_headers):
+        return client.post("/certificates/templates", json={"format_json": layout}, headers=headers)
+
+    assert post({"fields": [{"text": "{oops", "x": 0, "y": 0}]}).status_code == 400
+    assert post({"background": [{"type": "text", "text": "x"}]}).status_code == 400
+
+    template = post(LAYOUT)
+    assert template.status_code == 201
+    certificate = client.post(
+        "/certificates",
+        json={"workshop_id": 2, "name": "Hackathon", "template_id": template.json()["template_id"]},
+    ).json()
+    assert certificate["template_id"] == template.json()["template_id"]
+    issued = client.post(
+        "/certificates/issue",
+        json={"certificate_id": certificate["id"], "user_id": 8, "fields": {"recipient": "Grace"}},
+    ).json()
+    digest = issued["file_url"].rsplit("/", 1)[1][: -len(".pdf")]
+    text = page_text(FileStore(str(client.store_root)).path(digest).read_bytes())
+    assert b"(Hackathon Finisher)" in text
+    # Unknown field names render empty.
+    assert b"(Grace \\(\\))" in text
+
+
+def test_template_assets_stay_inside_the_asset_directory(client, monkeypatch):
+    from jose import jwt
+
+    from certificate_service.app import security
+
+    def post(layout, headers=client.admin_headers):
+        return client.post("/certificates/templates", json={"format_json": layout}, headers=headers)
+
+    assert post(LAYOUT, headers={}).status_code == 401
+    assert post(LAYOUT, headers={"X-Service-Token": "wrong"}).status_code == 401
+    monkeypatch.setattr(security, "JWT_SECRET_KEY", "secret")
+    for roles, expected in [(["student"], 403), (["admin"], 201)]:
+        token = jwt.encode({"sub": "1", "roles": roles}, "secret", algorithm="HS256")
+        assert post(LAYOUT, headers={"Authorization": f"Bearer {token}"}).status_code == expected
+
+    client.asset_dir.mkdir()
+    (client.asset_dir.parent / "secret.ttf").write_bytes(b"not a font")
+    for path in ["../secret.ttf", str(client.asset_dir.parent / "secret.ttf"), "http://169.254.169.254/font.ttf"]:
+        response = post({"fonts": {"Leaky": path}})
+        assert response.status_code == 400
+        assert "asset directory" in response.json()["detail"]
+        image = {"type": "image", "path": path, "x": 0, "y": 0, "width": 1, "height": 1}
+        assert "asset directory" in post({"background": [image]}).json()["detail"]
+
+
+def test_compiled_templates_are_cached_and_render_in_worker_processes(tmp_path):
+    template = rendering.compiled_template(-1, LAYOUT)
+    assert rendering.compiled_template(-1, None) is template
+    assert template.page_size == (600, 400)
+
+    job = rendering.RenderJob(template_id=-1, layout=LAYOUT, values={"recipient": "Linus", "team": "Kernel"})
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        digest, seconds = executor.submit(rendering.render_to_store, str(tmp_path), job).result()
+    assert seconds > 0
+    assert b"(Linus \\(Kernel\\))" in page_text(FileStore(str(tmp_path)).path(digest).read_bytes())
+    # The worker's output is byte-for-byte what this process renders.
+    assert FileStore(str(tmp_path)).put(rendering.render(template, job.values)) == digest
+
+
+def test_saturated_render_pool_returns_503_with_retry_after(client, monkeypatch):
+    certificate = client.post("/certificates", json={"workshop_id": 1, "name": "Intro"}).json()
+    pool = rendering.render_pool
+    monkeypatch.setattr(pool, "_in_flight", pool.capacity)
+
+    resp = client.post("/certificates/issue", json={"certificate_id": certificate["id"], "user_id": 7})
+    assert resp.status_code == 503
+    assert resp.headers["Retry-After"] == str(pool.retry_after)
+    metrics = client.get("/certificates/metrics/rendering").json()
+    assert metrics["rejected"] >= 1
+    assert metrics["queue_depth"] == pool.max_queue
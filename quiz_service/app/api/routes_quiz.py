@@ -2,15 +2,26 @@
 API routes for the quiz service.
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
+import asyncio
+import os
+
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from ..database import get_db
-from ..schemas.quiz import QuizCreate, QuizOut, QuizAttemptCreate, QuizResultOut
-from ..services import quiz_service
+from sukhverse_common import bulk, pagination
+
+from .. import database
+from ..database import get_async_db, get_db
+from ..models.quiz import Quiz, RegradeRun
+from ..schemas.quiz import QuizCreate, QuizOut, ImportResultOut, QuizAttemptCreate, QuizResultOut, RegradeRunOut
+from ..services import answer_keys, group_commit, quiz_service, regrade
 
 router = APIRouter(prefix="/quizzes", tags=["quizzes"])
 
+IMPORT_BATCH_SIZE = int(os.getenv("QUIZ_IMPORT_BATCH_SIZE", "200"))
+
 
 @router.post("", response_model=QuizOut, status_code=status.HTTP_201_CREATED)
 def create_quiz_route(quiz_in: QuizCreate, db: Session = Depends(get_db)):
@@ -18,18 +29,95 @@ def create_quiz_route(quiz_in: QuizCreate, db: Session = Depends(get_db)):
     return quiz
 
 
+@router.post(":import", response_model=ImportResultOut)
+async def import_quizzes_route(request: Request, db: Session = Depends(get_db)):
+    """Create quizzes from a JSON Lines body, one `QuizCreate` per line, committed in batches."""
+    results = []
+    async for lines in bulk.iter_batches(bulk.iter_lines(request.stream()), IMPORT_BATCH_SIZE):
+        results += await run_in_threadpool(quiz_service.import_quizzes, db, lines)
+    failed = sum(1 for result in results if result["error"])
+    return {"imported": len(results) - failed, "failed": failed, "results": results}
+
+
+@router.get("/user/{user_id}/results", response_model=list[QuizResultOut])
+def list_user_results_route(
+    user_id: int,
+    request: Request,
+    response: Response,
+    quiz_id: int | None = None,
+    cursor: str | None = None,
+    limit: int = Query(pagination.DEFAULT_PAGE_SIZE, ge=1, le=pagination.MAX_PAGE_SIZE),
+    db: Session = Depends(get_db),
+):
+    """A user's results by quiz; the next page is linked from the `Link` header."""
+    try:
+        page = quiz_service.list_user_results(db, user_id, cursor, limit, quiz_id)
+    except pagination.InvalidCursor as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+    link = pagination.next_link(request.url, page.next_cursor)
+    if link:
+        response.headers["Link"] = link
+    return page.items
+
+
 @router.get("/{quiz_id}", response_model=QuizOut)
-def get_quiz_route(quiz_id: int, db: Session = Depends(get_db)):
-    quiz = quiz_service.get_quiz(db, quiz_id)
+async def get_quiz_route(quiz_id: int, db: AsyncSession = Depends(get_async_db)):
+    quiz = await db.run_sync(quiz_service.quiz_out, quiz_id)
     if not quiz:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Quiz not found")
     return quiz
 
 
 @router.post("/{quiz_id}/attempts", response_model=QuizResultOut, status_code=status.HTTP_201_CREATED)
-def submit_quiz_route(quiz_id: int, attempt_in: QuizAttemptCreate, db: Session = Depends(get_db)):
-    try:
-        result = quiz_service.submit_quiz(db, quiz_id, attempt_in)
-    except ValueError as exc:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc))
-    return result
\ No newline at end of file
+async def submit_quiz_route(
+    quiz_id: int,
+    attempt_in: QuizAttemptCreate,
+    response: Response,
+    durable: bool = True,
+):
+    """Grade and store an attempt.
+
+    With group commit on, the attempt is queued: a durable submission (the
+    default, for exams) is answered once its batch commits, otherwise it
+    gets a 202 with its score and no id as soon as it is queued.
+    """
+    key = answer_keys.cache.get(quiz_id) or await run_in_threadpool(answer_keys.fetch, quiz_id)
+    if key is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Quiz not found")
+    graded = quiz_service.grade(quiz_id, key, attempt_in)
+    queue = group_commit.submission_queue
+    if not queue.running:
+        async with database.async_db.session() as db:
+            return await db.run_sync(_write_one, graded)
+    future = queue.put(graded)
+    if durable:
+        return await asyncio.wrap_future(future)
+    response.status_code = status.HTTP_202_ACCEPTED
+    return {"id": None, **{field: graded[field] for field in ("quiz_id", "user_id", "score", "pass_fail", "result_json")}}
+
+
+def _write_one(db: Session, graded: dict) -> dict:
+    result = quiz_service.write_submissions(db, [graded])[0]
+    db.commit()
+    return result
+
+
+@router.post("/{quiz_id}/regrade", response_model=RegradeRunOut, status_code=status.HTTP_202_ACCEPTED)
+def regrade_route(quiz_id: int, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+    """Recompute every result of the quiz against its current answer key, in the background."""
+    if not db.query(Quiz.id).filter(Quiz.id == quiz_id).first():
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Quiz not found")
+    run = RegradeRun(quiz_id=quiz_id, status="pending")
+    db.add(run)
+    db.commit()
+    db.refresh(run)
+    background_tasks.add_task(regrade.run_regrade, run.id)
+    return run
+
+
+@router.get("/{quiz_id}/regrades/{run_id}", response_model=RegradeRunOut)
+def get_regrade_route(quiz_id: int, run_id: int, db: Session = Depends(get_db)):
+    run = db.query(RegradeRun).filter(RegradeRun.id == run_id, RegradeRun.quiz_id == quiz_id).first()
+    if not run:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Regrade not found")
+    return run
\ No newline at end of file
@@ -5,9 +5,13 @@ Entrypoint for the quiz microservice.
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from .database import engine
+from sukhverse_common.events.bus import metrics_router
+
+from .database import async_db, engine
 from .models.base import Base
 from .api.routes_quiz import router as quiz_router
+from .events.producer import bus, outbox_relay
+from .services.group_commit import submission_queue
 
 
 def init_db() -> None:
@@ -24,6 +28,15 @@ def create_app() -> FastAPI:
     )
     init_db()
     app.include_router(quiz_router)
+    app.include_router(metrics_router(bus, outbox_relay))
+    app.add_event_handler("startup", outbox_relay.start)
+    app.add_event_handler("startup", submission_queue.start)
+    # Queued submissions are written before the relay's final drain.
+    app.add_event_handler("shutdown", submission_queue.stop)
+    app.add_event_handler("shutdown", outbox_relay.stop)
+    # Registered after the relay so its final drain is flushed too.
+    app.add_event_handler("shutdown", bus.aclose)
+    app.add_event_handler("shutdown", async_db.dispose)
     return app
 
 
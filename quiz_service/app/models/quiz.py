@@ -2,7 +2,7 @@
 SQLAlchemy models for the quiz service.
 """
 
-from sqlalchemy import Column, Integer, String, Text, Boolean, ForeignKey, DateTime, JSON
+from sqlalchemy import Column, Integer, String, Text, Boolean, ForeignKey, DateTime, JSON, Index, LargeBinary
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 
@@ -15,6 +15,8 @@ class Quiz(Base):
     title = Column(String(200), nullable=False)
     linked_to = Column(String(100), nullable=True)  # external identifier (e.g., workshop_id)
     duration = Column(Integer, nullable=True)
+    # Bumped on every write to the quiz or its questions and options.
+    version = Column(Integer, nullable=False, default=1)
 
     questions = relationship("Question", back_populates="quiz", cascade="all, delete-orphan")
 
@@ -42,19 +44,54 @@ class Option(Base):
 
 class StudentQuizAttempt(Base):
     __tablename__ = "student_quiz_attempts"
+    __table_args__ = (Index("ix_student_quiz_attempts_user_id_quiz_id", "user_id", "quiz_id", "id"),)
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, nullable=False)
     quiz_id = Column(Integer, nullable=False)
     started_at = Column(DateTime(timezone=False), server_default=func.now())
     completed_at = Column(DateTime(timezone=False), nullable=True)
-    answers_json = Column(JSON, nullable=True)
+    # All answers of attempts stored before `answers_packed`; since then
+    # only those it cannot hold, such as free text.
+    answers_json = Column(JSON(none_as_null=True), nullable=True)
+    # See `answer_keys.PACKED_DTYPE`.
+    answers_packed = Column(LargeBinary, nullable=True)
 
 
 class QuizResult(Base):
     __tablename__ = "quiz_results"
+    __table_args__ = (
+        # Regrades page through a quiz's results in id order.
+        Index("ix_quiz_results_quiz_id_id", "quiz_id", "id"),
+        # Per-user listing; covering on PostgreSQL.
+        Index(
+            "ix_quiz_results_user_id_quiz_id",
+            "user_id",
+            "quiz_id",
+            "id",
+            postgresql_include=["score", "pass_fail", "result_json"],
+        ),
+    )
     id = Column(Integer, primary_key=True, index=True)
     quiz_id = Column(Integer, nullable=False)
     user_id = Column(Integer, nullable=False)
+    # The graded attempt; NULL for results recorded before it was tracked.
+    attempt_id = Column(Integer, ForeignKey("student_quiz_attempts.id"), nullable=True)
     score = Column(Integer, nullable=False)
     pass_fail = Column(Boolean, nullable=False)
-    result_json = Column(JSON, nullable=True)
\ No newline at end of file
+    result_json = Column(JSON, nullable=True)
+
+    attempt = relationship("StudentQuizAttempt")
+
+
+class RegradeRun(Base):
+    __tablename__ = "regrade_runs"
+    id = Column(Integer, primary_key=True, index=True)
+    quiz_id = Column(Integer, nullable=False)
+    status = Column(String(50), nullable=False, default="pending")  # pending, processing, completed, failed
+    started_at = Column(DateTime(timezone=False), server_default=func.now())
+    completed_at = Column(DateTime(timezone=False), nullable=True)
+    processed_results = Column(Integer, nullable=False, default=0)
+    changed_results = Column(Integer, nullable=False, default=0)
+    # Results without a linked attempt cannot be regraded.
+    skipped_results = Column(Integer, nullable=False, default=0)
+    error = Column(Text, nullable=True)
\ No newline at end of file
@@ -2,6 +2,7 @@
 Pydantic models for the quiz service.
 """
 
+from datetime import datetime
 from typing import List, Optional
 from pydantic import BaseModel
 
@@ -52,18 +53,45 @@ class QuizOut(BaseModel):
         orm_mode = True
 
 
+class ImportLineOut(BaseModel):
+    line: int
+    id: Optional[int] = None
+    error: Optional[str] = None
+
+
+class ImportResultOut(BaseModel):
+    imported: int
+    failed: int
+    results: List[ImportLineOut]
+
+
 class QuizAttemptCreate(BaseModel):
     user_id: int
     answers: dict  # mapping question_id to selected option id
 
 
 class QuizResultOut(BaseModel):
-    id: int
+    id: Optional[int]  # None until a queued, non-durable submission is written
     quiz_id: int
     user_id: int
     score: int
     pass_fail: bool
     result_json: Optional[dict]
 
+    class Config:
+        orm_mode = True
+
+
+class RegradeRunOut(BaseModel):
+    id: int
+    quiz_id: int
+    status: str
+    processed_results: int
+    changed_results: int
+    skipped_results: int
+    error: Optional[str]
+    started_at: Optional[datetime]
+    completed_at: Optional[datetime]
+
     class Config:
         orm_mode = True
\ No newline at end of file
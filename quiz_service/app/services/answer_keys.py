@@ -0,0 +1,140 @@
+"""
+Compiled answer keys for scoring.
+
+Scoring a submission used to load the quiz, then lazily every question
+and every option list, and compare each option with the selected one.
+The answer key of a quiz is instead compiled once, with a single query,
+into a mapping from question id to the ids of its correct options, and
+kept in a bounded LRU.  A submission then reads no quiz content and is
+scored with one set lookup per question.
+
+Editing a quiz, question or option through the ORM bumps the quiz's
+`version` and drops its key (see `sukhverse_common.versioned_cache`);
+other processes recompile after `ANSWER_KEY_TTL_SECONDS`.
+"""
+
+import os
+from typing import Any, Dict, FrozenSet, NamedTuple, Optional, Set
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from sukhverse_common.versioned_cache import VersionedCache, track_versions
+
+from .. import database
+from ..models.quiz import Option, Question, Quiz
+
+CACHE_SIZE = int(os.getenv("ANSWER_KEY_CACHE_SIZE", "4096"))
+CACHE_TTL_SECONDS = float(os.getenv("ANSWER_KEY_TTL_SECONDS", "30"))
+
+# Stored answers: little-endian int32 `(question_id, option_id)` pairs in
+# question id order, one per answered question of the quiz.
+PACKED_DTYPE = np.dtype("<i4")
+MAX_ID = 2**31 - 1
+
+
+def option_id(value: Any) -> Optional[int]:
+    """The option id an answer can match, or None: only integral numbers can."""
+    if type(value) is not int:
+        if not isinstance(value, (bool, float)) or not float(value).is_integer():
+            return None
+        value = int(value)
+    return value if 0 <= value <= MAX_ID else None
+
+
+class AnswerKey(NamedTuple):
+    version: int
+    workshop_id: Optional[int]
+    # Question id -> ids of its correct options (empty when none is correct).
+    correct: Dict[int, FrozenSet[int]]
+    expires_at: float
+
+    def score(self, answers: Dict[str, Any]) -> int:
+        """Number of questions whose selected option is a correct one."""
+        correct = 0
+        for question_id, options in self.correct.items():
+            selected = answers.get(str(question_id))
+            try:
+                correct += selected in options
+            except TypeError:  # unhashable answer, never an option id
+                pass
+        return correct
+
+    def pack(self, answers: Dict[str, Any]) -> bytes:
+        """The answers to this quiz's questions in the compact stored form."""
+        pairs = []
+        for question_id in sorted(self.correct):
+            selected = option_id(answers.get(str(question_id)))
+            if selected is not None:
+                pairs.append((question_id, selected))
+        return np.array(pairs, dtype=PACKED_DTYPE).tobytes()
+
+    def unpacked(self, answers: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """The answers `pack` leaves out, such as free text or unknown questions; None if there are none."""
+        packed = {str(question_id) for question_id in self.correct if option_id(answers.get(str(question_id))) is not None}
+        rest = {question: value for question, value in answers.items() if question not in packed}
+        return rest or None
+
+
+cache = VersionedCache(CACHE_SIZE, CACHE_TTL_SECONDS)
+
+
+def compile_key(db: Session, quiz_id: int) -> Optional[AnswerKey]:
+    """Build the answer key of a quiz with one query; None if the quiz does not exist."""
+    rows = (
+        db.query(Quiz.version, Quiz.linked_to, Question.id, Option.id, Option.is_correct)
+        .outerjoin(Question, Question.quiz_id == Quiz.id)
+        .outerjoin(Option, Option.question_id == Question.id)
+        .filter(Quiz.id == quiz_id)
+        .all()
+    )
+    if not rows:
+        return None
+    correct: Dict[int, Set[int]] = {}
+    for _, _, question_id, option_id, is_correct in rows:
+        if question_id is None:
+            continue
+        options = correct.setdefault(question_id, set())
+        if is_correct:
+            options.add(option_id)
+    version, linked_to = rows[0][0], rows[0][1]
+    return AnswerKey(
+        version=version,
+        workshop_id=int(linked_to) if (linked_to or "").isdigit() else None,
+        correct={question_id: frozenset(options) for question_id, options in correct.items()},
+        expires_at=cache.expiry(),
+    )
+
+
+def fetch(quiz_id: int) -> Optional[AnswerKey]:
+    """The cached answer key, compiling and caching it on a miss; None if the quiz does not exist."""
+    entry = cache.get(quiz_id)
+    if entry is not None:
+        return entry
+    with cache.loading(quiz_id):
+        entry = cache.get(quiz_id)
+        if entry is not None:
+            return entry
+        generation = cache.generation(quiz_id)
+        db = database.SessionLocal()
+        try:
+            entry = compile_key(db, quiz_id)
+        finally:
+            db.close()
+        if entry is not None:
+            cache.put(quiz_id, entry, generation)
+    return entry
+
+
+def _quiz_id(session: Session, instance: object) -> Optional[int]:
+    if isinstance(instance, Quiz):
+        return instance.id
+    if isinstance(instance, Question):
+        return instance.quiz_id or (instance.quiz.id if instance.quiz else None)
+    if isinstance(instance, Option):
+        question = instance.question or (session.get(Question, instance.question_id) if instance.question_id else None)
+        return _quiz_id(session, question) if question is not None else None
+    return None
+
+
+track_versions(cache, Quiz, _quiz_id)
@@ -0,0 +1,114 @@
+"""
+Group commit of quiz submissions.
+
+During a live exam thousands of students submit within seconds, and a
+transaction per submission makes the database's commit (its WAL flush)
+the bottleneck.  With `QUIZ_GROUP_COMMIT_ENABLED=true`, graded
+submissions are queued in memory instead and a writer thread stores
+everything queued in the last `QUIZ_GROUP_COMMIT_INTERVAL_MS` (at most
+`QUIZ_GROUP_COMMIT_MAX_BATCH`) with one transaction of three INSERTs.
+
+A durable submission waits for its batch to commit before it is
+acknowledged, so exam mode loses nothing that was acknowledged.  A
+non-durable one is acknowledged once queued; it is lost if the process
+dies before the next commit.
+"""
+
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from .. import database
+from .quiz_service import write_submissions
+
+logger = logging.getLogger(__name__)
+
+
+def group_commit_enabled() -> bool:
+    return os.getenv("QUIZ_GROUP_COMMIT_ENABLED", "false").lower() == "true"
+
+
+class SubmissionQueue:
+    """In-memory queue of graded submissions, written in batches by a background thread."""
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        interval: Optional[float] = None,
+        max_batch: Optional[int] = None,
+    ) -> None:
+        self.session_factory = session_factory
+        self.interval = interval or float(os.getenv("QUIZ_GROUP_COMMIT_INTERVAL_MS", "5")) / 1000
+        self.max_batch = max_batch or int(os.getenv("QUIZ_GROUP_COMMIT_MAX_BATCH", "500"))
+        self._queue: "queue.Queue[Tuple[Dict, Future]]" = queue.Queue()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def put(self, graded: Dict) -> Future:
+        """Queue a graded submission; the future resolves to its stored result."""
+        future: Future = Future()
+        self._queue.put((graded, future))
+        return future
+
+    def write_batch(self, batch: List[Tuple[Dict, Future]]) -> None:
+        db = self.session_factory()
+        try:
+            results = write_submissions(db, [graded for graded, _ in batch])
+            db.commit()
+        except Exception as exc:
+            db.rollback()
+            logger.exception("Group commit of %d submissions failed", len(batch))
+            for _, future in batch:
+                future.set_exception(exc)
+            return
+        finally:
+            db.close()
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+    def _collect(self) -> List[Tuple[Dict, Future]]:
+        try:
+            batch = [self._queue.get(timeout=0.1)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.interval
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while not self._stop.is_set() or not self._queue.empty():
+            batch = self._collect()
+            if batch:
+                self.write_batch(batch)
+
+    def start(self) -> None:
+        if group_commit_enabled() and self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="quiz-group-commit", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Write whatever is still queued, then stop the writer."""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout=10)
+        self._thread = None
+
+
+submission_queue = SubmissionQueue(lambda: database.SessionLocal())
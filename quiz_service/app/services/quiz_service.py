@@ -2,60 +2,161 @@
 Business logic for the quiz service.
 """
 
-from sqlalchemy.orm import Session
+from typing import Dict, List, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy.orm import Session, selectinload
+
+from sukhverse_common import pagination
+from sukhverse_common.bulk import insert_returning_ids
+
 from ..models.quiz import Quiz, Question, Option, StudentQuizAttempt, QuizResult
-from ..schemas.quiz import QuizCreate, QuizAttemptCreate
-from ..events.producer import publish_event
+from ..schemas.quiz import QuizCreate, QuizAttemptCreate, QuizOut
+from ..events.producer import publish_events
+from . import answer_keys
+
+PASS_SCORE = 50
+
+
+def insert_quizzes(db: Session, quizzes_in: List[QuizCreate]) -> List[int]:
+    """Insert quiz trees without committing: one statement each for quizzes, questions and options."""
+    quiz_ids = insert_returning_ids(
+        db,
+        Quiz.__table__,
+        [{"title": q.title, "linked_to": q.linked_to, "duration": q.duration} for q in quizzes_in],
+    )
+    questions = [(quiz_id, q) for quiz_id, quiz_in in zip(quiz_ids, quizzes_in) for q in quiz_in.questions]
+    question_ids = insert_returning_ids(
+        db,
+        Question.__table__,
+        [{"quiz_id": quiz_id, "content": q.content, "type": q.type} for quiz_id, q in questions],
+    )
+    options = [
+        {"question_id": question_id, "label": opt.label, "is_correct": opt.is_correct}
+        for question_id, (_, q) in zip(question_ids, questions)
+        for opt in q.options
+    ]
+    if options:
+        db.execute(Option.__table__.insert(), options)
+    return quiz_ids
 
 
 def create_quiz(db: Session, quiz_in: QuizCreate) -> Quiz:
-    quiz = Quiz(title=quiz_in.title, linked_to=quiz_in.linked_to, duration=quiz_in.duration)
-    db.add(quiz)
-    db.flush()
-    for q in quiz_in.questions:
-        question = Question(quiz_id=quiz.id, content=q.content, type=q.type)
-        db.add(question)
-        db.flush()
-        for opt in q.options:
-            option = Option(question_id=question.id, label=opt.label, is_correct=opt.is_correct)
-            db.add(option)
+    quiz_id = insert_quizzes(db, [quiz_in])[0]
     db.commit()
-    db.refresh(quiz)
-    return quiz
+    return get_quiz(db, quiz_id)
+
+
+def import_quizzes(db: Session, lines: List[Tuple[int, bytes]]) -> List[Dict]:
+    """Create the quizzes of a batch of JSON Lines in one transaction, reporting bad lines."""
+    results: List[Dict] = []
+    valid: List[Dict] = []
+    quizzes_in: List[QuizCreate] = []
+    for line, raw in lines:
+        try:
+            quizzes_in.append(QuizCreate.parse_raw(raw))
+        except ValidationError as exc:
+            error = "; ".join(f"{'.'.join(str(part) for part in e['loc'])}: {e['msg']}" for e in exc.errors())
+            results.append({"line": line, "id": None, "error": error})
+            continue
+        result = {"line": line, "id": None, "error": None}
+        results.append(result)
+        valid.append(result)
+    if quizzes_in:
+        for result, quiz_id in zip(valid, insert_quizzes(db, quizzes_in)):
+            result["id"] = quiz_id
+        db.commit()
+    return results
 
 
 def get_quiz(db: Session, quiz_id: int) -> Quiz | None:
     return db.query(Quiz).filter(Quiz.id == quiz_id).first()
 
 
-def submit_quiz(db: Session, quiz_id: int, attempt_in: QuizAttemptCreate) -> QuizResult:
-    # Persist the attempt
-    attempt = StudentQuizAttempt(user_id=attempt_in.user_id, quiz_id=quiz_id, answers_json=attempt_in.answers)
-    db.add(attempt)
-    # Score the quiz
-    quiz = get_quiz(db, quiz_id)
-    if not quiz:
-        raise ValueError("Quiz not found")
-    total_questions = len(quiz.questions)
-    correct = 0
-    for question in quiz.questions:
-        selected = attempt_in.answers.get(str(question.id))
-        for option in question.options:
-            if option.id == selected and option.is_correct:
-                correct += 1
+def quiz_out(db: Session, quiz_id: int) -> QuizOut | None:
+    """The quiz with its questions and options, loaded in three queries and serialized."""
+    quiz = (
+        db.query(Quiz)
+        .options(selectinload(Quiz.questions).selectinload(Question.options))
+        .filter(Quiz.id == quiz_id)
+        .first()
+    )
+    return QuizOut.from_orm(quiz) if quiz else None
+
+
+def list_user_results(
+    db: Session, user_id: int, cursor: str | None, limit: int, quiz_id: int | None = None
+) -> pagination.Page:
+    query = db.query(QuizResult).filter(QuizResult.user_id == user_id)
+    if quiz_id is not None:
+        query = query.filter(QuizResult.quiz_id == quiz_id)
+    return pagination.paginate(query, [QuizResult.quiz_id, QuizResult.id], cursor, limit)
+
+
+def grade(quiz_id: int, key: answer_keys.AnswerKey, attempt_in: QuizAttemptCreate) -> Dict:
+    """Score an attempt against the compiled answer key; no quiz content is read."""
+    total_questions = len(key.correct)
+    correct = key.score(attempt_in.answers)
     score = int((correct / total_questions) * 100) if total_questions else 0
-    pass_fail = score >= 50
-    result = QuizResult(quiz_id=quiz_id, user_id=attempt_in.user_id, score=score, pass_fail=pass_fail, result_json={"correct": correct, "total": total_questions})
-    db.add(result)
-    db.commit()
-    db.refresh(result)
-    publish_event(
-        "quiz_submitted",
+    return {
+        "quiz_id": quiz_id,
+        "user_id": attempt_in.user_id,
+        "answers_packed": key.pack(attempt_in.answers),
+        "answers_json": key.unpacked(attempt_in.answers),
+        "score": score,
+        "pass_fail": score >= PASS_SCORE,
+        "result_json": {"correct": correct, "total": total_questions},
+        "workshop_id": key.workshop_id,
+    }
+
+
+def write_submissions(db: Session, graded: List[Dict]) -> List[Dict]:
+    """Store graded attempts, their results and events without committing.
+
+    Three INSERTs whatever the number of submissions: attempts and results
+    with their ids returned, then one outbox batch.  Returns the results.
+    """
+    attempt_ids = insert_returning_ids(
+        db,
+        StudentQuizAttempt.__table__,
+        [
+            {
+                "user_id": g["user_id"],
+                "quiz_id": g["quiz_id"],
+                "answers_packed": g["answers_packed"],
+                "answers_json": g.get("answers_json"),
+            }
+            for g in graded
+        ],
+    )
+    results = [
         {
-            "quiz_id": quiz_id,
-            "user_id": attempt_in.user_id,
-            "score": score,
-            "pass_fail": pass_fail,
-        },
+            "quiz_id": g["quiz_id"],
+            "user_id": g["user_id"],
+            "attempt_id": attempt_id,
+            "score": g["score"],
+            "pass_fail": g["pass_fail"],
+            "result_json": g["result_json"],
+        }
+        for g, attempt_id in zip(graded, attempt_ids)
+    ]
+    for result, result_id in zip(results, insert_returning_ids(db, QuizResult.__table__, results)):
+        result["id"] = result_id
+    publish_events(
+        "quiz_submitted",
+        (
+            {
+                "quiz_id": g["quiz_id"],
+                "user_id": g["user_id"],
+                "score": g["score"],
+                "pass_fail": g["pass_fail"],
+                "workshop_id": g["workshop_id"],
+                "result_id": result["id"],
+            }
+            for g, result in zip(graded, results)
+        ),
+        key_field="user_id",
+        db=db,
     )
-    return result
\ No newline at end of file
+    return results
+
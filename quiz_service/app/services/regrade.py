@@ -0,0 +1,309 @@
+"""
+Regrading of stored quiz results.
+
+When an answer key is corrected every result of the quiz has to be
+recomputed.  A regrade pages through the quiz's results and their
+attempts in `id` order, `REGRADE_CHUNK_SIZE` at a time, so memory stays
+bounded however many attempts there are.  Each chunk's answers are
+decoded into an `(attempts, questions)` array of selected option ids,
+straight from the packed pairs (or from JSON for older attempts), and
+scored with one vectorized lookup against the compiled answer key.
+
+Results recorded before `attempt_id` existed are first linked to their
+attempts by `link_legacy_results`, so they are regraded too.
+
+The score, pass flag and `result_json` of a result only depend on its
+number of correct answers, so the changed results of a chunk are updated
+with one UPDATE per distinct count, and announced with one outbox batch
+of `quiz_regraded` events, in the chunk's transaction.  Progress and
+counts are recorded on the `RegradeRun` row as the job runs.
+"""
+
+import logging
+import os
+from datetime import datetime
+from itertools import chain, groupby
+from operator import itemgetter
+from typing import Any, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import bindparam, tuple_
+from sqlalchemy.orm import Session
+
+from .. import database
+from ..events.producer import publish_events
+from ..models.quiz import QuizResult, RegradeRun, StudentQuizAttempt
+from . import answer_keys
+from .quiz_service import PASS_SCORE
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = int(os.getenv("REGRADE_CHUNK_SIZE", "10000"))
+
+# Selected option ids are packed next to their question's position in one
+# int64, so a single `isin` checks every (question, option) pair.  Option
+# ids fit in 31 bits (see `answer_keys.MAX_ID`).
+_SHIFT = 32
+_NO_ANSWER = -1
+
+
+def key_codes(key: answer_keys.AnswerKey) -> Tuple[np.ndarray, np.ndarray]:
+    """The quiz's question ids in order, and the packed correct pairs."""
+    question_ids = sorted(key.correct)
+    codes = [
+        (index << _SHIFT) | option_id
+        for index, question_id in enumerate(question_ids)
+        for option_id in key.correct[question_id]
+    ]
+    return np.array(question_ids, dtype=np.int64), np.array(sorted(codes), dtype=np.int64)
+
+
+def decode_packed(blobs: Sequence[bytes], question_ids: np.ndarray) -> np.ndarray:
+    """`(attempts, questions)` selected option ids from `answers_packed` values."""
+    selected = np.full((len(blobs), len(question_ids)), _NO_ANSWER, dtype=np.int64)
+    pairs = np.frombuffer(b"".join(blobs), dtype=answer_keys.PACKED_DTYPE).reshape(-1, 2)
+    if not len(pairs) or not len(question_ids):
+        return selected
+    rows = np.repeat(np.arange(len(blobs)), [len(blob) // (2 * answer_keys.PACKED_DTYPE.itemsize) for blob in blobs])
+    positions = np.minimum(np.searchsorted(question_ids, pairs[:, 0]), len(question_ids) - 1)
+    # Questions deleted since the attempt are ignored.
+    known = question_ids[positions] == pairs[:, 0]
+    selected[rows[known], positions[known]] = pairs[known, 1]
+    return selected
+
+
+def decode_json(answers: Sequence[Any], question_ids: np.ndarray) -> np.ndarray:
+    """`(attempts, questions)` selected option ids from free-form `answers_json` values."""
+    questions = [str(question_id) for question_id in question_ids.tolist()]
+    if not questions:
+        return np.full((len(answers), 0), _NO_ANSWER, dtype=np.int64)
+    get = itemgetter(*questions)
+    missing = (_NO_ANSWER,) * len(questions)
+    cells = []
+    for attempt in answers:
+        try:
+            cells.append(get(attempt) if len(questions) > 1 else (get(attempt),))
+        except (KeyError, TypeError, IndexError):
+            if isinstance(attempt, dict):
+                cells.append(tuple(attempt.get(question, _NO_ANSWER) for question in questions))
+            else:
+                cells.append(missing)
+    # Option ids are plain ints in all but odd submissions; `np.array` would
+    # silently coerce strings, floats and bools, so they take the slow path.
+    if set(map(type, chain.from_iterable(cells))) <= {int}:
+        try:
+            selected = np.array(cells, dtype=np.int64)
+        except OverflowError:
+            pass
+        else:
+            selected[(selected < 0) | (selected > answer_keys.MAX_ID)] = _NO_ANSWER
+            return selected
+    return np.array([[_option_id(value) for value in row] for row in cells], dtype=np.int64)
+
+
+def _option_id(value: Any) -> int:
+    selected = answer_keys.option_id(value)
+    return _NO_ANSWER if selected is None else selected
+
+
+def count_correct(selected: np.ndarray, codes: np.ndarray) -> np.ndarray:
+    """Number of correct answers in each row of selected option ids."""
+    packed = (np.arange(selected.shape[1], dtype=np.int64) << _SHIFT) | selected
+    # Unanswered cells pack to -1, which is never a code.
+    return np.isin(packed, codes).sum(axis=1)
+
+
+def scores(correct: np.ndarray, total: int) -> np.ndarray:
+    """`int(correct / total * 100)` for every count, as `quiz_service.grade` computes it."""
+    if not total:
+        return np.zeros(len(correct), dtype=np.int64)
+    return (correct / total * 100).astype(np.int64)
+
+
+def _decode(rows: List[Any], question_ids: np.ndarray) -> np.ndarray:
+    packed = [index for index, row in enumerate(rows) if row.answers_packed is not None]
+    if len(packed) == len(rows):
+        return decode_packed([row.answers_packed for row in rows], question_ids)
+    selected = decode_json([row.answers_json for row in rows], question_ids)
+    if packed:
+        selected[packed] = decode_packed([rows[index].answers_packed for index in packed], question_ids)
+    return selected
+
+
+def _regrade_chunk(db: Session, run: RegradeRun, key: answer_keys.AnswerKey, rows: List[Any],
+                   question_ids: np.ndarray, codes: np.ndarray) -> int:
+    total = len(question_ids)
+    correct = count_correct(_decode(rows, question_ids), codes)
+    new_scores = scores(correct, total)
+    old_scores = np.fromiter((row.score for row in rows), dtype=np.int64, count=len(rows))
+    old_passes = np.fromiter((row.pass_fail for row in rows), dtype=bool, count=len(rows))
+    stale_json = np.fromiter(
+        (row.result_json != {"correct": int(c), "total": total} for row, c in zip(rows, correct)),
+        dtype=bool,
+        count=len(rows),
+    )
+    changed = np.flatnonzero((new_scores != old_scores) | (old_passes != (new_scores >= PASS_SCORE)) | stale_json)
+    if not len(changed):
+        return 0
+    table = QuizResult.__table__
+    result_ids = np.fromiter((row.id for row in rows), dtype=np.int64, count=len(rows))
+    for count in np.unique(correct[changed]):
+        score = int(scores(np.array([count]), total)[0])
+        db.execute(
+            table.update()
+            .where(table.c.id.in_(result_ids[changed[correct[changed] == count]].tolist()))
+            .values(score=score, pass_fail=score >= PASS_SCORE, result_json={"correct": int(count), "total": total})
+        )
+    publish_events(
+        "quiz_regraded",
+        (
+            {
+                "quiz_id": run.quiz_id,
+                "user_id": rows[i].user_id,
+                "result_id": rows[i].id,
+                "score": int(new_scores[i]),
+                "pass_fail": bool(new_scores[i] >= PASS_SCORE),
+                "previous_score": rows[i].score,
+                "previous_pass_fail": rows[i].pass_fail,
+                "workshop_id": key.workshop_id,
+            }
+            for i in changed.tolist()
+        ),
+        key_field="user_id",
+        db=db,
+    )
+    return len(changed)
+
+
+def _keyset(query: Any, user_id: Any, row_id: Any, chunk_size: int) -> Iterable[Any]:
+    """`query`'s `(id, user_id)` rows in `(user_id, id)` order, read `chunk_size` at a time."""
+    position = None
+    while True:
+        page = query if position is None else query.filter(tuple_(user_id, row_id) > position)
+        rows = page.order_by(user_id, row_id).limit(chunk_size).all()
+        yield from rows
+        if len(rows) < chunk_size:
+            return
+        position = (rows[-1][1], rows[-1][0])
+
+
+def _by_user(query: Any, user_id: Any, row_id: Any, chunk_size: int) -> Iterable[Tuple[int, List[int]]]:
+    for user, rows in groupby(_keyset(query, user_id, row_id, chunk_size), key=itemgetter(1)):
+        yield user, [row[0] for row in rows]
+
+
+def _link(db: Session, pairs: List[dict]) -> int:
+    if pairs:
+        table = QuizResult.__table__
+        db.execute(
+            table.update()
+            .where(table.c.id == bindparam("result_id"))
+            .values(attempt_id=bindparam("linked_attempt_id")),
+            pairs,
+        )
+    db.commit()
+    return len(pairs)
+
+
+def link_legacy_results(db: Session, quiz_id: int, chunk_size: Optional[int] = None) -> int:
+    """Link the quiz's results that have no `attempt_id` to their attempts; return how many.
+
+    Such results were written in the same transaction as their attempt, one
+    per attempt, so a user's n-th unlinked result belongs to their n-th
+    unlinked attempt.  Users whose counts differ are left alone.  Unlinked
+    results and attempts are walked side by side in `(user_id, id)` order,
+    `chunk_size` rows at a time, and the links are written as they go.
+    """
+    chunk_size = chunk_size or CHUNK_SIZE
+    linked = db.query(QuizResult.attempt_id).filter(QuizResult.quiz_id == quiz_id, QuizResult.attempt_id.isnot(None))
+    results = _by_user(
+        db.query(QuizResult.id, QuizResult.user_id).filter(
+            QuizResult.quiz_id == quiz_id, QuizResult.attempt_id.is_(None)
+        ),
+        QuizResult.user_id, QuizResult.id, chunk_size,
+    )
+    attempts = _by_user(
+        db.query(StudentQuizAttempt.id, StudentQuizAttempt.user_id).filter(
+            StudentQuizAttempt.quiz_id == quiz_id, StudentQuizAttempt.id.notin_(linked)
+        ),
+        StudentQuizAttempt.user_id, StudentQuizAttempt.id, chunk_size,
+    )
+    count = 0
+    pairs: List[dict] = []
+    attempt = next(attempts, None)
+    for user_id, result_ids in results:
+        while attempt is not None and attempt[0] < user_id:
+            attempt = next(attempts, None)
+        if attempt is not None and attempt[0] == user_id and len(attempt[1]) == len(result_ids):
+            pairs.extend(
+                {"result_id": result_id, "linked_attempt_id": attempt_id}
+                for result_id, attempt_id in zip(result_ids, attempt[1])
+            )
+        if len(pairs) >= chunk_size:
+            count += _link(db, pairs)
+            pairs = []
+    return count + _link(db, pairs)
+
+
+def _chunks(db: Session, quiz_id: int, chunk_size: int) -> Iterable[List[Any]]:
+    last_id = 0
+    while True:
+        rows = (
+            db.query(
+                QuizResult.id,
+                QuizResult.user_id,
+                QuizResult.score,
+                QuizResult.pass_fail,
+                QuizResult.result_json,
+                StudentQuizAttempt.answers_json,
+                StudentQuizAttempt.answers_packed,
+            )
+            .join(StudentQuizAttempt, StudentQuizAttempt.id == QuizResult.attempt_id)
+            .filter(QuizResult.quiz_id == quiz_id, QuizResult.id > last_id)
+            .order_by(QuizResult.id)
+            .limit(chunk_size)
+            .all()
+        )
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1].id
+
+
+def _process(db: Session, run: RegradeRun, chunk_size: int) -> None:
+    # Always grade against the stored key, even if an edit bypassed the cache.
+    answer_keys.cache.invalidate([run.quiz_id])
+    key = answer_keys.compile_key(db, run.quiz_id)
+    if key is None:
+        raise ValueError("Quiz not found")
+    question_ids, codes = key_codes(key)
+    link_legacy_results(db, run.quiz_id, chunk_size)
+    run.skipped_results = (
+        db.query(QuizResult).filter(QuizResult.quiz_id == run.quiz_id, QuizResult.attempt_id.is_(None)).count()
+    )
+    for rows in _chunks(db, run.quiz_id, chunk_size):
+        run.changed_results += _regrade_chunk(db, run, key, rows, question_ids, codes)
+        run.processed_results += len(rows)
+        db.commit()
+
+
+def run_regrade(run_id: int, chunk_size: Optional[int] = None) -> None:
+    """Regrade every result of a `RegradeRun`'s quiz, recording progress on the run."""
+    chunk_size = chunk_size or CHUNK_SIZE
+    db = database.SessionLocal()
+    try:
+        run = db.query(RegradeRun).filter(RegradeRun.id == run_id).one()
+        run.status = "processing"
+        db.commit()
+        try:
+            _process(db, run, chunk_size)
+            run.status = "completed"
+        except Exception as exc:
+            logger.exception("Regrade %s failed", run_id)
+            db.rollback()
+            run.status = "failed"
+            run.error = str(exc)
+        run.completed_at = datetime.utcnow()
+        db.commit()
+    finally:
+        db.close()
@@ -0,0 +1,127 @@
+"""
+Concurrency ceiling of the async data layer.
+
+Creates a quiz in a SQLite database, then fetches it through the ASGI
+app `--requests` times at each of `--concurrency` requests in flight:
+once with threaded sessions and once with `DB_ASYNC_ENABLED` sessions on
+aiosqlite.  Every statement waits `--latency-ms` first, on the connection
+it runs on, standing in for the round trip to a database server.  Both
+modes get a pool of `--pool-size` connections; threaded sessions are
+also capped by Starlette's threadpool (`--threads`, 40 by default).
+Reports requests per second and the median and p99 latency.  Usage
+(from the repo root):
+
+    python -m quiz_service.benchmarks.bench_async_db --requests 2000 --concurrency 16 64 256
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+DB_PATH = os.path.join(tempfile.gettempdir(), "bench_quiz_async_db.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{DB_PATH}")
+os.environ.setdefault("OUTBOX_RELAY_ENABLED", "false")
+
+import anyio.to_thread  # noqa: E402
+import httpx  # noqa: E402
+from sqlalchemy import create_engine, event  # noqa: E402
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool  # noqa: E402
+
+from quiz_service.app import database  # noqa: E402
+from quiz_service.app.main import create_app, init_db  # noqa: E402
+from quiz_service.tests.test_quizzes import quiz_body  # noqa: E402
+
+
+def simulate_latency(sync_engine, latency: float, is_async: bool) -> None:
+    def wait(sql: str) -> None:
+        time.sleep(latency)
+
+    @event.listens_for(sync_engine, "connect")
+    def connect(dbapi_connection, record):
+        if is_async:
+            # Runs in the aiosqlite connection's own thread, off the event loop.
+            dbapi_connection.run_async(lambda connection: connection.set_trace_callback(wait))
+        else:
+            dbapi_connection.set_trace_callback(wait)
+
+
+async def run(app, quiz_id: int, requests: int, concurrency: int, threads: int):
+    anyio.to_thread.current_default_thread_limiter().total_tokens = threads
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        window = asyncio.Semaphore(concurrency)
+        latencies = []
+
+        async def fetch() -> None:
+            async with window:
+                started = time.perf_counter()
+                response = await client.get(f"/quizzes/{quiz_id}")
+                latencies.append(time.perf_counter() - started)
+                if response.status_code != 200:
+                    raise RuntimeError(response.text)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(fetch() for _ in range(requests)))
+        elapsed = time.perf_counter() - started
+    latencies.sort()
+    return requests / elapsed, statistics.median(latencies), latencies[int((len(latencies) - 1) * 0.99)]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[16, 64, 256])
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    parser.add_argument("--pool-size", type=int, default=128)
+    parser.add_argument("--threads", type=int, default=40)
+    args = parser.parse_args()
+    latency = args.latency_ms / 1000
+
+    engine = create_engine(
+        database.DATABASE_URL,
+        connect_args={"check_same_thread": False},
+        poolclass=QueuePool,
+        pool_size=args.pool_size,
+        max_overflow=0,
+        pool_pre_ping=True,
+    )
+    simulate_latency(engine, latency, is_async=False)
+    database.SessionLocal.configure(bind=engine)
+    database.async_db.engine_kwargs = {"poolclass": AsyncAdaptedQueuePool, "pool_size": args.pool_size, "max_overflow": 0}
+    init_db()
+    with database.SessionLocal() as db:
+        db.execute("PRAGMA journal_mode=WAL")
+
+    app = create_app()
+    try:
+        quiz_id = asyncio.run(_create_quiz(app))
+        print(f"{args.latency_ms:g}ms per statement, pool of {args.pool_size}, {args.threads} threads")
+        for concurrency in args.concurrency:
+            for label, enabled in (("threaded", False), ("async", True)):
+                database.async_db.enabled = enabled
+                if enabled:
+                    simulate_latency(database.async_db.engine.sync_engine, latency, is_async=True)
+                rate, p50, p99 = asyncio.run(run(app, quiz_id, args.requests, concurrency, args.threads))
+                # The async engine's connections belong to the loop that opened them.
+                asyncio.run(database.async_db.dispose())
+                print(f"{concurrency:4} in flight, {label:8} {rate:8,.0f} requests/s  "
+                      f"p50 {p50 * 1000:6.1f}ms  p99 {p99 * 1000:6.1f}ms")
+    finally:
+        asyncio.run(database.async_db.dispose())
+        engine.dispose()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(DB_PATH + suffix):
+                os.remove(DB_PATH + suffix)
+
+
+async def _create_quiz(app) -> int:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        return (await client.post("/quizzes", json=quiz_body(questions=5))).json()["id"]
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Regrade throughput.
+
+Fills a SQLite database with `--attempts` graded attempts of one quiz,
+flips the correct option of every other question and runs a regrade,
+reporting results per second end to end.  Also times the vectorized
+scoring of one chunk (and, with `--json`, scoring it attempt by attempt
+with `AnswerKey.score`).  Usage (from the repo root):
+
+    python -m quiz_service.benchmarks.bench_regrade --attempts 1000000 --questions 20
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+DB_PATH = os.path.join(tempfile.gettempdir(), "bench_quiz_regrade.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{DB_PATH}")
+os.environ.setdefault("OUTBOX_RELAY_ENABLED", "false")
+
+from quiz_service.app import database  # noqa: E402
+from quiz_service.app.main import init_db  # noqa: E402
+from quiz_service.app.models.quiz import Option, QuizResult, RegradeRun, StudentQuizAttempt  # noqa: E402
+from quiz_service.app.schemas.quiz import QuizCreate  # noqa: E402
+from quiz_service.app.services import answer_keys, quiz_service, regrade  # noqa: E402
+
+
+def seed(attempts: int, questions: int, options: int, legacy_json: bool) -> int:
+    body = {
+        "title": "Benchmark",
+        "questions": [
+            {"content": f"Q{n}", "type": "mcq", "options": [{"label": str(i), "is_correct": i == 0} for i in range(options)]}
+            for n in range(questions)
+        ],
+    }
+    db = database.SessionLocal()
+    try:
+        quiz = quiz_service.create_quiz(db, QuizCreate.parse_obj(body))
+        option_ids = [[option.id for option in question.options] for question in quiz.questions]
+        question_ids = [str(question.id) for question in quiz.questions]
+        key = answer_keys.compile_key(db, quiz.id)
+        rng = random.Random(7)
+        for start in range(0, attempts, 50_000):
+            count = min(50_000, attempts - start)
+            answers = [
+                {question_id: rng.choice(ids) for question_id, ids in zip(question_ids, option_ids)}
+                for _ in range(count)
+            ]
+            first = start + 1
+            db.execute(
+                StudentQuizAttempt.__table__.insert(),
+                [
+                    {"id": first + n, "user_id": start + n, "quiz_id": quiz.id,
+                     **({"answers_json": a} if legacy_json else {"answers_packed": key.pack(a)})}
+                    for n, a in enumerate(answers)
+                ],
+            )
+            db.execute(
+                QuizResult.__table__.insert(),
+                [
+                    {"id": first + n, "quiz_id": quiz.id, "user_id": start + n, "attempt_id": first + n,
+                     "score": 0, "pass_fail": False, "result_json": None}
+                    for n in range(count)
+                ],
+            )
+            db.commit()
+        for ids in option_ids[::2]:
+            db.query(Option).filter(Option.id == ids[0]).update({"is_correct": False})
+            db.query(Option).filter(Option.id == ids[1]).update({"is_correct": True})
+        db.commit()
+        return quiz.id
+    finally:
+        db.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--attempts", type=int, default=200_000)
+    parser.add_argument("--questions", type=int, default=20)
+    parser.add_argument("--options", type=int, default=4)
+    parser.add_argument("--json", action="store_true", help="store answers as JSON, like attempts from before packing")
+    args = parser.parse_args()
+
+    init_db()
+    started = time.perf_counter()
+    quiz_id = seed(args.attempts, args.questions, args.options, args.json)
+    print(f"seeded {args.attempts:,} attempts in {time.perf_counter() - started:.1f}s")
+
+    db = database.SessionLocal()
+    key = answer_keys.compile_key(db, quiz_id)
+    chunk = db.query(StudentQuizAttempt.answers_json, StudentQuizAttempt.answers_packed).limit(regrade.CHUNK_SIZE).all()
+    run = RegradeRun(quiz_id=quiz_id, status="pending")
+    db.add(run)
+    db.commit()
+    run_id = run.id
+    db.close()
+
+    question_ids, codes = regrade.key_codes(key)
+    started = time.perf_counter()
+    regrade.count_correct(regrade._decode(chunk, question_ids), codes)
+    vectorized = time.perf_counter() - started
+    report = f"scoring a chunk of {len(chunk):,}: vectorized {vectorized * 1000:.0f}ms"
+    if args.json:
+        started = time.perf_counter()
+        for row in chunk:
+            key.score(row.answers_json)
+        report += f", per attempt {(time.perf_counter() - started) * 1000:.0f}ms"
+    print(report)
+
+    started = time.perf_counter()
+    regrade.run_regrade(run_id)
+    elapsed = time.perf_counter() - started
+    db = database.SessionLocal()
+    run = db.get(RegradeRun, run_id)
+    print(f"regrade: {run.status}, {run.processed_results:,} results, {run.changed_results:,} changed, "
+          f"{elapsed:.1f}s ({run.processed_results / elapsed:,.0f} results/s)")
+    db.close()
+    os.remove(DB_PATH)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Concurrent submissions against one quiz: answer key cache and group commit.
+
+Fires `--submitters` concurrent `POST /quizzes/<id>/attempts` requests
+for the same quiz through the ASGI app, against a SQLite database with
+the outbox relay off: with the key compiled per submission, with it
+cached, and with durable group commit.  Reports submissions per second,
+the statements each submission ran and the number of transactions.  Usage (from the repo root):
+
+    python -m quiz_service.benchmarks.bench_submissions --submitters 1000 --questions 50
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+DB_PATH = os.path.join(tempfile.gettempdir(), "bench_quiz_submissions.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{DB_PATH}")
+os.environ.setdefault("OUTBOX_RELAY_ENABLED", "false")
+
+import httpx  # noqa: E402
+from sqlalchemy import create_engine, event  # noqa: E402
+
+from quiz_service.app import database  # noqa: E402
+from quiz_service.app.main import create_app  # noqa: E402
+from quiz_service.app.services import answer_keys, group_commit  # noqa: E402
+
+
+def quiz_body(questions: int, options: int):
+    return {
+        "title": "Benchmark",
+        "questions": [
+            {
+                "content": f"Q{n}",
+                "type": "mcq",
+                "options": [{"label": str(i), "is_correct": i == 0} for i in range(options)],
+            }
+            for n in range(questions)
+        ],
+    }
+
+
+async def create_quiz(app, body):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        response = await client.post("/quizzes", json=body)
+        response.raise_for_status()
+        return response.json()
+
+
+async def run(app, quiz, submitters: int):
+    rng = random.Random(7)
+    bodies = [
+        {
+            "user_id": user_id,
+            "answers": {str(q["id"]): rng.choice(q["options"])["id"] for q in quiz["questions"]},
+        }
+        for user_id in range(submitters)
+    ]
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        started = time.perf_counter()
+        responses = await asyncio.gather(
+            *(client.post(f"/quizzes/{quiz['id']}/attempts", json=body) for body in bodies)
+        )
+        elapsed = time.perf_counter() - started
+    for response in responses:
+        response.raise_for_status()
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--submitters", type=int, default=1000)
+    parser.add_argument("--questions", type=int, default=50)
+    parser.add_argument("--options", type=int, default=4)
+    args = parser.parse_args()
+
+    app = create_app()
+    # Sessions are opened and closed on different threadpool threads.
+    engine = create_engine(database.DATABASE_URL, connect_args={"check_same_thread": False})
+    database.SessionLocal.configure(bind=engine)
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *a: statements.append(a[2]))
+    quiz = asyncio.run(create_quiz(app, quiz_body(args.questions, args.options)))
+
+    queue = group_commit.submission_queue
+    queue.session_factory = database.SessionLocal
+    modes = (
+        ("compiled per submission", 0, False),
+        ("cached answer key", answer_keys.CACHE_SIZE, False),
+        ("group commit (durable)", answer_keys.CACHE_SIZE, True),
+    )
+    for label, size, grouped in modes:
+        answer_keys.cache.size = size
+        answer_keys.cache.clear()
+        if grouped:
+            os.environ["QUIZ_GROUP_COMMIT_ENABLED"] = "true"
+            queue.start()
+        del statements[:]
+        elapsed = asyncio.run(run(app, quiz, args.submitters))
+        queue.stop()
+        commits = sum(1 for statement in statements if statement.startswith("INSERT INTO quiz_results"))
+        print(f"{label:24} {args.submitters / elapsed:,.0f} submissions/s ({elapsed:.2f}s, "
+              f"{len(statements) / args.submitters:.2f} statements per submission, {commits} transactions)")
+    os.remove(DB_PATH)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+from sqlalchemy import event
+
+from quiz_service.app.models.quiz import QuizResult
+from quiz_service.tests.test_quizzes import quiz_body
+from quiz_service.tests.test_scoring import correct_answers
+
+
+def test_hot_routes_on_async_sessions(async_client):
+    quiz = async_client.post("/quizzes", json=quiz_body(questions=3)).json()
+    statements = []
+    event.listen(async_client.async_db.engine.sync_engine, "before_cursor_execute", lambda *a: statements.append(a[2]))
+
+    assert async_client.get(f"/quizzes/{quiz['id']}").json() == quiz
+    assert async_client.get("/quizzes/999").status_code == 404
+    assert any("FROM questions" in statement for statement in statements)
+
+    del statements[:]
+    response = async_client.post(f"/quizzes/{quiz['id']}/attempts", json={"user_id": 5, "answers": correct_answers(quiz, wrong=1)})
+    assert response.status_code == 201
+    assert (response.json()["score"], response.json()["pass_fail"]) == (66, True)
+    assert [s.split()[2] for s in statements] == ["student_quiz_attempts", "quiz_results", "outbox"]
+    with async_client.session_factory() as db:
+        assert db.get(QuizResult, response.json()["id"]).score == 66
@@ -0,0 +1,64 @@
+import json
+
+from sqlalchemy import event
+
+
+def quiz_body(title="Quiz", questions=3, options=4):
+    return {
+        "title": title,
+        "linked_to": "1",
+        "questions": [
+            {
+                "content": f"Q{n}",
+                "type": "mcq",
+                "options": [{"label": f"{n}.{i}", "is_correct": i == 0} for i in range(options)],
+            }
+            for n in range(questions)
+        ],
+    }
+
+
+def test_create_writes_one_insert_per_level(client):
+    statements = []
+    event.listen(client.engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    response = client.post("/quizzes", json=quiz_body(questions=5, options=3))
+    assert response.status_code == 201
+    quiz = response.json()
+    assert len([statement for statement in statements if statement.startswith("INSERT")]) == 3
+    assert [question["content"] for question in quiz["questions"]] == ["Q0", "Q1", "Q2", "Q3", "Q4"]
+    assert [[option["label"] for option in question["options"]] for question in quiz["questions"]][4] == ["4.0", "4.1", "4.2"]
+    assert client.get(f"/quizzes/{quiz['id']}").json() == quiz
+
+
+def test_import_streams_json_lines_and_reports_bad_lines(client, monkeypatch):
+    from quiz_service.app.api import routes_quiz
+
+    monkeypatch.setattr(routes_quiz, "IMPORT_BATCH_SIZE", 2)
+    body = "\n".join(
+        [json.dumps(quiz_body("A")), json.dumps({"title": "B"}), json.dumps(quiz_body("C", questions=0))]
+    )
+
+    result = client.post("/quizzes:import", content=body.encode()).json()
+    assert (result["imported"], result["failed"]) == (2, 1)
+    assert result["results"][1]["error"] == "questions: field required"
+    first, third = result["results"][0]["id"], result["results"][2]["id"]
+    assert client.get(f"/quizzes/{first}").json()["questions"][2]["options"][0]["is_correct"] is True
+    assert client.get(f"/quizzes/{third}").json()["questions"] == []
+
+
+def test_user_results_are_paged_by_quiz(client):
+    quizzes = [client.post("/quizzes", json=quiz_body(title=f"Q{n}", questions=1)).json() for n in range(3)]
+    for quiz in reversed(quizzes):
+        for user_id in (4, 4, 5):
+            client.post(f"/quizzes/{quiz['id']}/attempts", json={"user_id": user_id, "answers": {}})
+
+    pages, url = [], "/quizzes/user/4/results?limit=4"
+    while url:
+        response = client.get(url)
+        pages.append([(r["quiz_id"], r["user_id"]) for r in response.json()])
+        url = response.headers.get("link", "")[1:].split(">")[0]
+    ids = [quiz["id"] for quiz in quizzes]
+    assert pages == [[(ids[0], 4), (ids[0], 4), (ids[1], 4), (ids[1], 4)], [(ids[2], 4), (ids[2], 4)]]
+    only = client.get("/quizzes/user/4/results", params={"quiz_id": ids[1]}).json()
+    assert len(only) == 2 and "link" not in client.get("/quizzes/user/4/results").headers
@@ -0,0 +1,148 @@
+import numpy as np
+from sqlalchemy import event
+
+from quiz_service.app.models.outbox import OutboxEvent
+from quiz_service.app.models.quiz import Option, QuizResult, StudentQuizAttempt
+from quiz_service.app.services import answer_keys, regrade
+from quiz_service.tests.test_quizzes import quiz_body
+
+
+def test_vectorized_scoring_matches_the_answer_key():
+    key = answer_keys.AnswerKey(1, None, {10: frozenset({101}), 20: frozenset({201, 202}), 30: frozenset()}, 0.0)
+    question_ids, codes = regrade.key_codes(key)
+    attempts = [
+        {"10": 101, "20": 202, "30": 301},
+        {"10": 101.0, "20": "201", "30": None},
+        {"10": [101], "20": True, "99": 101},
+        {"20": 101, "10": 2**40},
+        {},
+    ]
+    expected = [key.score(a) for a in attempts]
+    assert expected == [2, 1, 0, 0, 0]
+    assert regrade.count_correct(regrade.decode_json(attempts + [None], question_ids), codes).tolist() == expected + [0]
+    packed = [key.pack(a) for a in attempts]
+    assert len(packed[0]) == 24
+    assert regrade.count_correct(regrade.decode_packed(packed, question_ids), codes).tolist() == expected
+    # A question deleted after the attempt no longer counts.
+    fewer_ids, fewer_codes = regrade.key_codes(answer_keys.AnswerKey(2, None, {10: frozenset({101})}, 0.0))
+    assert regrade.count_correct(regrade.decode_packed(packed[:1], fewer_ids), fewer_codes).tolist() == [1]
+    assert regrade.scores(np.array([0, 1, 2, 3]), 3).tolist() == [int(c / 3 * 100) for c in range(4)]
+    assert regrade.scores(np.array([29]), 100).tolist() == [int(29 / 100 * 100)]
+
+
+def test_regrade_updates_changed_results_in_chunks_and_emits_events(client):
+    quiz = client.post("/quizzes", json=quiz_body(questions=2, options=2)).json()
+    first, second = quiz["questions"]
+
+    def right(question):
+        return question["options"][0]["id"]
+
+    def wrong(question):
+        return question["options"][1]["id"]
+
+    submissions = [
+        (1, {str(first["id"]): right(first), str(second["id"]): right(second)}),
+        (2, {str(first["id"]): right(first), str(second["id"]): wrong(second)}),
+        (3, {str(first["id"]): wrong(first), str(second["id"]): wrong(second)}),
+    ]
+    for user_id, answers in submissions:
+        client.post(f"/quizzes/{quiz['id']}/attempts", json={"user_id": user_id, "answers": answers})
+
+    with client.session_factory() as db:
+        db.add(QuizResult(quiz_id=quiz["id"], user_id=4, score=10, pass_fail=False))
+        # An attempt stored before answers were packed.
+        legacy = StudentQuizAttempt(quiz_id=quiz["id"], user_id=5, answers_json=submissions[0][1])
+        db.add(QuizResult(quiz_id=quiz["id"], user_id=5, attempt=legacy, score=100, pass_fail=True))
+        # Results recorded before they were linked to their attempt.
+        for answers, score in ((submissions[2][1], 0), (submissions[0][1], 100)):
+            db.add(StudentQuizAttempt(quiz_id=quiz["id"], user_id=6, answers_json=answers))
+            db.add(QuizResult(quiz_id=quiz["id"], user_id=6, score=score, pass_fail=score >= 50))
+            db.flush()
+        # The key was wrong for the second question.
+        db.get(Option, right(second)).is_correct = False
+        db.get(Option, wrong(second)).is_correct = True
+        db.commit()
+
+    response = client.post(f"/quizzes/{quiz['id']}/regrade")
+    assert response.status_code == 202
+    run = client.get(f"/quizzes/{quiz['id']}/regrades/{response.json()['id']}").json()
+    assert (run["status"], run["processed_results"], run["changed_results"], run["skipped_results"]) == (
+        "completed", 6, 6, 1
+    )
+
+    with client.session_factory() as db:
+        results = {r.user_id: (r.score, r.pass_fail, r.result_json) for r in db.query(QuizResult).order_by(QuizResult.id)}
+        legacy_results = [(r.score, r.attempt.answers_json) for r in db.query(QuizResult).filter(QuizResult.user_id == 6).order_by(QuizResult.id)]
+        events = [e.payload for e in db.query(OutboxEvent).filter(OutboxEvent.topic == "quiz_regraded").order_by(OutboxEvent.id)]
+    assert results == {
+        1: (50, True, {"correct": 1, "total": 2}),
+        2: (100, True, {"correct": 2, "total": 2}),
+        3: (50, True, {"correct": 1, "total": 2}),
+        4: (10, False, None),
+        5: (50, True, {"correct": 1, "total": 2}),
+        6: (50, True, {"correct": 1, "total": 2}),
+    }
+    assert legacy_results == [(50, submissions[2][1]), (50, submissions[0][1])]
+    assert [(e["user_id"], e["previous_score"], e["score"], e["pass_fail"]) for e in events] == [
+        (1, 100, 50, True), (2, 50, 100, True), (3, 0, 50, True), (5, 100, 50, True), (6, 0, 50, True), (6, 100, 50, True),
+    ]
+
+    # Nothing left to change.
+    again = client.post(f"/quizzes/{quiz['id']}/regrade").json()
+    assert client.get(f"/quizzes/{quiz['id']}/regrades/{again['id']}").json()["changed_results"] == 0
+    assert client.post("/quizzes/999/regrade").status_code == 404
+
+
+def test_regrade_pages_through_results(client, monkeypatch):
+    quiz = client.post("/quizzes", json=quiz_body(questions=1, options=2)).json()
+    question = quiz["questions"][0]
+    for user_id in range(5):
+        answers = {str(question["id"]): question["options"][user_id % 2]["id"]}
+        client.post(f"/quizzes/{quiz['id']}/attempts", json={"user_id": user_id, "answers": answers})
+    with client.session_factory() as db:
+        for option in db.query(Option).filter(Option.question_id == question["id"]):
+            option.is_correct = not option.is_correct
+        db.commit()
+
+    chunks = []
+    original = regrade._regrade_chunk
+
+    def counting(db, run, key, rows, *args):
+        chunks.append(len(rows))
+        return original(db, run, key, rows, *args)
+
+    monkeypatch.setattr(regrade, "_regrade_chunk", counting)
+    monkeypatch.setattr(regrade, "CHUNK_SIZE", 2)
+    run_id = client.post(f"/quizzes/{quiz['id']}/regrade").json()["id"]
+    assert chunks == [2, 2, 1]
+    assert client.get(f"/quizzes/{quiz['id']}/regrades/{run_id}").json()["changed_results"] == 5
+
+
+def test_legacy_results_are_linked_in_keyset_chunks(client):
+    with client.session_factory() as db:
+        # Attempts per user; each but user 3's has one result per attempt.
+        attempts = {1: 3, 2: 1, 3: 2, 4: 2, 5: 1}
+        for quiz_id in (1, 2):
+            for user_id, count in attempts.items():
+                for _ in range(count):
+                    db.add(StudentQuizAttempt(quiz_id=quiz_id, user_id=user_id, answers_json={}))
+                    if user_id != 3 or quiz_id == 2:
+                        db.add(QuizResult(quiz_id=quiz_id, user_id=user_id, score=0, pass_fail=False))
+                    db.flush()
+        db.add(QuizResult(quiz_id=1, user_id=3, score=0, pass_fail=False))
+        db.commit()
+
+        statements = []
+        event.listen(client.engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+        assert regrade.link_legacy_results(db, 1, chunk_size=2) == 7
+        assert len([s for s in statements if s.startswith("UPDATE")]) == 3
+
+        links = {}
+        for result in db.query(QuizResult).filter(QuizResult.quiz_id == 1).order_by(QuizResult.id):
+            attempt = result.attempt
+            links.setdefault(result.user_id, []).append(attempt and (attempt.quiz_id, attempt.user_id))
+        assert links == {1: [(1, 1)] * 3, 2: [(1, 2)], 3: [None], 4: [(1, 4)] * 2, 5: [(1, 5)]}
+        assert [r.attempt_id for r in db.query(QuizResult).filter(QuizResult.quiz_id == 1).order_by(QuizResult.id)] == sorted(
+            a.id for a in db.query(StudentQuizAttempt).filter(StudentQuizAttempt.quiz_id == 1, StudentQuizAttempt.user_id != 3)
+        ) + [None]
+        assert db.query(QuizResult).filter(QuizResult.quiz_id == 2, QuizResult.attempt_id.isnot(None)).count() == 0
@@ -0,0 +1,70 @@
+from sqlalchemy import event
+
+from quiz_service.app.models.quiz import Option, Quiz
+from quiz_service.app.services import answer_keys
+from quiz_service.tests.test_quizzes import quiz_body
+
+
+def correct_answers(quiz, wrong=0):
+    answers = {}
+    for n, question in enumerate(quiz["questions"]):
+        options = [option for option in question["options"] if option["is_correct"] == (n >= wrong)]
+        answers[str(question["id"])] = options[0]["id"]
+    return answers
+
+
+def test_submissions_are_scored_without_reading_the_quiz(client):
+    quiz = client.post("/quizzes", json=quiz_body(questions=4)).json()
+
+    def submit(answers):
+        return client.post(f"/quizzes/{quiz['id']}/attempts", json={"user_id": 5, "answers": answers})
+
+    first = submit(correct_answers(quiz, wrong=1)).json()
+    assert (first["score"], first["pass_fail"], first["result_json"]) == (75, True, {"correct": 3, "total": 4})
+
+    statements = []
+    event.listen(client.engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    answers = correct_answers(quiz, wrong=3)
+    answers[str(quiz["questions"][3]["id"])] = [1]  # unhashable answers are just wrong
+    assert submit(answers).json()["score"] == 0
+    assert not [s for s in statements if s.startswith("SELECT") and ("questions" in s or "options" in s)]
+    assert client.post("/quizzes/999/attempts", json={"user_id": 5, "answers": {}}).status_code == 404
+
+
+def test_editing_the_quiz_bumps_its_version_and_recompiles_the_key(client):
+    quiz = client.post("/quizzes", json=quiz_body(questions=2)).json()
+    answers = correct_answers(quiz)
+    assert answer_keys.fetch(quiz["id"]).version == 1
+
+    with client.session_factory() as db:
+        for option in db.query(Option).filter(Option.id.in_(answers.values())):
+            option.is_correct = False
+        db.commit()
+        assert db.get(Quiz, quiz["id"]).version == 2
+    assert answer_keys.cache.get(quiz["id"]) is None
+
+    result = client.post(f"/quizzes/{quiz['id']}/attempts", json={"user_id": 5, "answers": answers}).json()
+    assert result["score"] == 0
+    assert answer_keys.cache.get(quiz["id"]).version == 2
+
+
+def test_an_edit_during_a_load_keeps_the_stale_key_out_of_the_cache(client, monkeypatch):
+    quiz = client.post("/quizzes", json=quiz_body(questions=2)).json()
+    answers = correct_answers(quiz)
+    compile_key = answer_keys.compile_key
+
+    def compile_then_edit(db, quiz_id):
+        key = compile_key(db, quiz_id)
+        with client.session_factory() as other:
+            for option in other.query(Option).filter(Option.id.in_(answers.values())):
+                option.is_correct = False
+            other.commit()
+        return key
+
+    monkeypatch.setattr(answer_keys, "compile_key", compile_then_edit)
+    assert answer_keys.fetch(quiz["id"]).version == 1
+    assert answer_keys.cache.get(quiz["id"]) is None
+
+    monkeypatch.setattr(answer_keys, "compile_key", compile_key)
+    result = client.post(f"/quizzes/{quiz['id']}/attempts", json={"user_id": 5, "answers": answers}).json()
+    assert result["score"] == 0
@@ -0,0 +1,79 @@
+import numpy as np
+from sqlalchemy import event
+
+from quiz_service.app.models.quiz import QuizResult, StudentQuizAttempt
+from quiz_service.app.services import answer_keys, group_commit
+from quiz_service.tests.test_quizzes import quiz_body
+from quiz_service.tests.test_scoring import correct_answers
+
+
+def test_submission_is_three_inserts_and_stores_packed_answers(client):
+    quiz = client.post("/quizzes", json=quiz_body(questions=3)).json()
+    client.post(f"/quizzes/{quiz['id']}/attempts", json={"user_id": 1, "answers": correct_answers(quiz)})
+
+    statements = []
+    event.listen(client.engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    response = client.post(f"/quizzes/{quiz['id']}/attempts", json={"user_id": 2, "answers": correct_answers(quiz, wrong=1)})
+    assert response.status_code == 201
+    assert response.json()["score"] == 66
+    assert [s.split()[2] for s in statements] == ["student_quiz_attempts", "quiz_results", "outbox"]
+
+    with client.session_factory() as db:
+        attempt = db.query(StudentQuizAttempt).filter(StudentQuizAttempt.user_id == 2).one()
+        assert attempt.answers_json is None
+        assert len(attempt.answers_packed) == 3 * 8
+        assert db.get(QuizResult, response.json()["id"]).attempt_id == attempt.id
+
+
+def test_answers_that_cannot_be_packed_are_kept(client):
+    quiz = client.post("/quizzes", json=quiz_body(questions=2)).json()
+    answers = correct_answers(quiz)
+    first = str(quiz["questions"][0]["id"])
+    answers[first] = "print('hello')"
+    answers["999"] = 3
+    response = client.post(f"/quizzes/{quiz['id']}/attempts", json={"user_id": 3, "answers": answers})
+    assert response.json()["score"] == 50
+
+    with client.session_factory() as db:
+        attempt = db.query(StudentQuizAttempt).filter(StudentQuizAttempt.user_id == 3).one()
+        pairs = np.frombuffer(attempt.answers_packed, dtype=answer_keys.PACKED_DTYPE).reshape(-1, 2).tolist()
+    assert attempt.answers_json == {first: "print('hello')", "999": 3}
+    stored = {**{str(question): option for question, option in pairs}, **attempt.answers_json}
+    assert stored == answers
+
+
+def test_group_commit_batches_durable_and_queued_submissions(client, monkeypatch):
+    quiz = client.post("/quizzes", json=quiz_body(questions=2)).json()
+    monkeypatch.setenv("QUIZ_GROUP_COMMIT_ENABLED", "true")
+    queue = group_commit.submission_queue
+    monkeypatch.setattr(queue, "interval", 0.05)
+    batches = []
+    write_batch = queue.write_batch
+
+    def counting(batch):
+        batches.append(len(batch))
+        write_batch(batch)
+
+    monkeypatch.setattr(queue, "write_batch", counting)
+    queue.start()
+    try:
+        futures = [queue.put({"quiz_id": quiz["id"], "user_id": n, "answers_packed": b"", "score": 0,
+                              "pass_fail": False, "result_json": {"correct": 0, "total": 2}, "workshop_id": None})
+                   for n in range(3)]
+        assert [future.result(timeout=5)["user_id"] for future in futures] == [0, 1, 2]
+
+        durable = client.post(f"/quizzes/{quiz['id']}/attempts", json={"user_id": 7, "answers": correct_answers(quiz)})
+        assert (durable.status_code, durable.json()["score"]) == (201, 100)
+        assert durable.json()["id"] is not None
+
+        queued = client.post(
+            f"/quizzes/{quiz['id']}/attempts", params={"durable": "false"}, json={"user_id": 8, "answers": {}}
+        )
+        assert queued.status_code == 202
+        assert (queued.json()["id"], queued.json()["score"]) == (None, 0)
+    finally:
+        queue.stop()
+    assert batches[0] == 3
+
+    with client.session_factory() as db:
+        assert sorted(r.user_id for r in db.query(QuizResult)) == [0, 1, 2, 7, 8]
@@ -0,0 +1,6 @@
+"""
+Code shared by the Sukverse microservices.
+
+Each service still owns its database and models; this package only
+holds infrastructure that would otherwise be copied into every service.
+"""
@@ -0,0 +1,65 @@
+"""
+Compare event payload size and encode/decode speed per serializer.
+
+Usage (from the repo root):
+
+    python -m sukhverse_common.benchmarks.bench_event_encoding --events 200000
+"""
+
+import argparse
+import json
+import time
+
+from sukhverse_common.events import serializers
+
+SAMPLES = [
+    ("quiz_submitted", {"quiz_id": 42, "user_id": 183_204, "score": 85, "pass_fail": True}),
+    ("step_completed", {"user_id": 183_204, "workshop_id": 17, "step_id": 301, "substep_id": 1204, "status": "completed"}),
+    ("certificate_issued", {"certificate_id": 9, "user_id": 183_204, "file_url": "/certificates/certificate-9-183204.pdf"}),
+]
+
+
+class StdlibJson:
+    name = "json (stdlib)"
+
+    def dumps(self, value, topic=None):
+        return json.dumps(value).encode("utf-8")
+
+    def loads(self, data, topic=None):
+        return json.loads(data)
+
+
+def measure(serializer, events: int) -> None:
+    encoded = [(topic, serializer.dumps(message, topic)) for topic, message in SAMPLES]
+    size = sum(len(data) for _, data in encoded) / len(encoded)
+    rounds = events // len(SAMPLES)
+
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for topic, message in SAMPLES:
+            serializer.dumps(message, topic)
+    encode = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for topic, data in encoded:
+            serializer.loads(data, topic)
+    decode = time.perf_counter() - started
+
+    total = rounds * len(SAMPLES)
+    print(
+        f"{serializer.name:<14} {size:6.1f} B/event  "
+        f"encode {total / encode / 1000:7.0f}k/s  decode {total / decode / 1000:7.0f}k/s"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--events", type=int, default=200_000)
+    args = parser.parse_args()
+    for serializer in (StdlibJson(), serializers.get_serializer("json"), serializers.get_serializer("msgpack")):
+        measure(serializer, args.events)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Bulk inserts and JSON Lines imports.
+
+`insert_returning_ids` writes a whole level of a tree (every step of
+every workshop in a batch, say) with one statement and hands back the
+new primary keys in input order, so the next level can reference them
+without a flush per parent.
+
+`iter_lines` and `iter_batches` split a streamed request body into
+numbered JSON Lines and fixed-size batches without reading it whole.
+"""
+
+from typing import Any, AsyncIterator, Dict, List, Sequence, Tuple
+
+from sqlalchemy.orm import Session
+
+# SQLite binds at most 32766 parameters per statement (3.32+).
+SQLITE_MAX_PARAMETERS = 32766
+
+
+def insert_returning_ids(db: Session, table: Any, rows: Sequence[Dict]) -> List[int]:
+    """Insert `rows` into `table` and return their `id`s in the same order.
+
+    PostgreSQL runs one `INSERT ... RETURNING id` for the batch
+    (psycopg2 pages it through `execute_values`).  A sequence hands out
+    increasing values to the rows of a statement in order, so sorting the
+    returned ids restores the input order even with concurrent writers.
+
+    SQLite has no RETURNING support in this SQLAlchemy version; a
+    multi-row INSERT gives its rows consecutive rowids ending at
+    `lastrowid`, and the statement holds the database write lock.
+    Other dialects fall back to one INSERT per row.
+    """
+    if not rows:
+        return []
+    dialect = db.bind.dialect
+    if dialect.insert_executemany_returning:
+        result = db.execute(table.insert().returning(table.c.id), list(rows))
+        return sorted(result.scalars().all())
+    if dialect.name == "sqlite":
+        ids: List[int] = []
+        step = max(1, SQLITE_MAX_PARAMETERS // len(rows[0]))
+        for start in range(0, len(rows), step):
+            chunk = rows[start : start + step]
+            last = db.execute(table.insert().values(list(chunk))).lastrowid
+            ids.extend(range(last - len(chunk) + 1, last + 1))
+        return ids
+    return [db.execute(table.insert(), row).inserted_primary_key[0] for row in rows]
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, bytes]]:
+    """Yield `(line_number, line)` for each non-blank line of a byte stream."""
+    buffer = b""
+    number = 0
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            number += 1
+            if line.strip():
+                yield number, line
+    if buffer.strip():
+        yield number + 1, buffer
+
+
+async def iter_batches(lines: AsyncIterator[Tuple[int, bytes]], size: int) -> AsyncIterator[List[Tuple[int, bytes]]]:
+    """Group numbered lines into lists of at most `size`."""
+    batch: List[Tuple[int, bytes]] = []
+    async for line in lines:
+        batch.append(line)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
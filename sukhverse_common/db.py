@@ -0,0 +1,145 @@
+"""
+Engine settings and the optional async session layer.
+
+Every service sizes its connection pools from `DB_POOL_SIZE`,
+`DB_MAX_OVERFLOW`, `DB_POOL_TIMEOUT` and `DB_POOL_RECYCLE_SECONDS` through
+`engine_options`.
+
+The hot routes are `async def` and take their session from the service's
+`get_async_db` dependency, backed by an `AsyncDatabase`.  With
+`DB_ASYNC_ENABLED=true` it hands out `AsyncSession`s on an async engine
+over the same database (asyncpg for PostgreSQL, aiosqlite for SQLite),
+so a request waiting on the database holds no thread: the ceiling on
+concurrent requests becomes the async pool rather than Starlette's
+threadpool of 40.  Otherwise it hands out `ThreadedSession`s, which run
+the same work on a regular session in the threadpool, as before.
+
+Both kinds expose `run_sync(fn, *args)`, which calls `fn(session, *args)`
+with a plain `Session`, so service functions stay ordinary synchronous
+SQLAlchemy code and run unchanged either way.  Under `AsyncSession` they
+run on the event loop and yield to it whenever the driver waits.  Their
+results are used after `run_sync` returns, so they must come back fully
+loaded: serialize anything with lazy relationships inside `fn`.  Async
+sessions do not expire objects on commit for the same reason.
+"""
+
+import asyncio
+import os
+from typing import Any, Callable, Dict, Optional, TypeVar, Union
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+POOL_RECYCLE_SECONDS = int(os.getenv("DB_POOL_RECYCLE_SECONDS", "-1"))
+ASYNC_ENABLED = os.getenv("DB_ASYNC_ENABLED", "false").lower() == "true"
+
+_ASYNC_DRIVERS = {"postgresql": "asyncpg", "sqlite": "aiosqlite"}
+
+T = TypeVar("T")
+
+
+def engine_options(url: Union[str, URL]) -> Dict[str, Any]:
+    """Keyword arguments for `create_engine` / `create_async_engine` on `url`.
+
+    SQLite keeps SQLAlchemy's default pool, which takes no sizes.  A session
+    may run its statements and close on different threadpool threads, so
+    SQLite connections are not tied to the thread that opened them.
+    """
+    options: Dict[str, Any] = {"pool_pre_ping": True}
+    if make_url(url).get_backend_name() == "sqlite":
+        options["connect_args"] = {"check_same_thread": False}
+    else:
+        options.update(
+            pool_size=POOL_SIZE,
+            max_overflow=MAX_OVERFLOW,
+            pool_timeout=POOL_TIMEOUT,
+            pool_recycle=POOL_RECYCLE_SECONDS,
+        )
+    return options
+
+
+def async_url(url: Union[str, URL]) -> URL:
+    """`url` with its driver swapped for the asyncio one of its backend."""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in _ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for {backend} databases")
+    return parsed.set(drivername=f"{backend}+{_ASYNC_DRIVERS[backend]}")
+
+
+class ThreadedSession:
+    """A regular session driven from async code, one threadpool call per `run_sync`."""
+
+    def __init__(self, session: Session) -> None:
+        self.sync_session = session
+
+    async def run_sync(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        return await run_in_threadpool(fn, self.sync_session, *args, **kwargs)
+
+    async def close(self) -> None:
+        if self.sync_session.in_transaction():
+            # Closing hands the connection back, so it must not queue behind
+            # threadpool work that may itself be waiting for a connection.
+            await asyncio.get_running_loop().run_in_executor(None, self.sync_session.close)
+        else:
+            # Nothing to roll back or return to the pool.
+            self.sync_session.close()
+
+    async def __aenter__(self) -> "ThreadedSession":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.close()
+
+
+class AsyncDatabase:
+    """Sessions for `async def` routes: async ones when enabled, threaded otherwise.
+
+    `session_factory` makes the regular sessions of the threaded mode.  The
+    async engine is created on first use, with `engine_kwargs` on top of
+    `engine_options`.
+    """
+
+    def __init__(
+        self,
+        url: Union[str, URL],
+        session_factory: Callable[[], Session],
+        enabled: Optional[bool] = None,
+        **engine_kwargs: Any,
+    ) -> None:
+        self.url = url
+        self.session_factory = session_factory
+        self.enabled = ASYNC_ENABLED if enabled is None else enabled
+        self.engine_kwargs = engine_kwargs
+        self._engine: Optional[AsyncEngine] = None
+        self._sessionmaker: Optional[sessionmaker] = None
+
+    def _sessions(self) -> sessionmaker:
+        if self._sessionmaker is None:
+            url = async_url(self.url)
+            self._engine = create_async_engine(url, **{**engine_options(url), **self.engine_kwargs})
+            self._sessionmaker = sessionmaker(
+                self._engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+            )
+        return self._sessionmaker
+
+    @property
+    def engine(self) -> AsyncEngine:
+        self._sessions()
+        return self._engine
+
+    def session(self) -> Union[AsyncSession, ThreadedSession]:
+        if not self.enabled:
+            return ThreadedSession(self.session_factory())
+        return self._sessions()()
+
+    async def dispose(self) -> None:
+        """Close the async engine's pooled connections; it is recreated on next use."""
+        if self._engine is not None:
+            engine, self._engine, self._sessionmaker = self._engine, None, None
+            await engine.dispose()
@@ -0,0 +1 @@
+# Event publishing infrastructure shared by all services.
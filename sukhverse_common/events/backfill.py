@@ -0,0 +1,272 @@
+"""
+Replay of event history from the source-of-truth tables.
+
+Consumers that change their logic or schema rebuild their derived state
+by replaying history.  Kafka only retains recent events, so the backfill
+reads the tables that own the facts instead (`workshops` and
+`substep_progress` in the workshop database, `quiz_results` in the quiz
+database), turns each row into the canonical event the producer
+would have published and hands the events straight to a consumer's
+processor in bulk, without going through the broker.
+
+Rows are streamed in primary key order through a server-side cursor and
+applied in chunks, so memory stays bounded by the chunk size however
+large the table is.  After each chunk is applied the last key is written
+to a checkpoint file; a rerun resumes after it.  A crash between applying
+a chunk and saving the checkpoint replays that chunk, so sinks must be
+idempotent, like the Kafka consumers already are.
+
+A service exposes a backfill by passing its sink to `main`:
+
+    if __name__ == "__main__":
+        backfill.main(MySink)
+
+A sink has `apply(events)`, called once per chunk with
+`(topic, payload, event time)` tuples, and optionally `reset()` to clear
+its state before a full rebuild.
+"""
+
+import argparse
+import json
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import Boolean, Column, DateTime, Integer, MetaData, String, Table, create_engine, func, select, true, tuple_
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# (topic, payload, event time); the time is None when the source has none.
+Event = Tuple[str, Dict, Optional[datetime]]
+
+CHUNK_SIZE = int(os.getenv("BACKFILL_CHUNK_SIZE", "20000"))
+
+# Only the columns the backfill reads are mirrored here, so this module
+# does not depend on any service's models.
+metadata = MetaData()
+
+workshops = Table(
+    "workshops",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("creator_user_id", Integer),
+)
+
+steps = Table(
+    "steps",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("workshop_id", Integer),
+)
+
+substeps = Table(
+    "substeps",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("step_id", Integer),
+)
+
+substep_progress = Table(
+    "substep_progress",
+    metadata,
+    Column("user_id", Integer, primary_key=True),
+    Column("workshop_id", Integer, primary_key=True),
+    Column("substep_id", Integer, primary_key=True),
+    Column("step_id", Integer),
+    Column("status", String(20)),
+    Column("updated_at", DateTime),
+)
+
+quizzes = Table(
+    "quizzes",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("linked_to", String(100)),
+)
+
+quiz_results = Table(
+    "quiz_results",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("quiz_id", Integer),
+    Column("user_id", Integer),
+    Column("score", Integer),
+    Column("pass_fail", Boolean),
+)
+
+
+class Source:
+    """A table replayed in primary key order, with the mapping from a row to its event.
+
+    `query(after)` selects the rows past the checkpointed key (everything
+    when it is None) and `key(row)` gives the key to checkpoint.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        query: Callable[[Any], Any],
+        key: Callable[[Any], Any],
+        to_event: Callable[[Any], Event],
+    ) -> None:
+        self.name = name
+        self.query = query
+        self.key = key
+        self.to_event = to_event
+
+
+def _after(columns: Sequence[Any], after: Any) -> Any:
+    if after is None:
+        return true()
+    if len(columns) == 1:
+        return columns[0] > after
+    return tuple_(*columns) > tuple_(*after)
+
+
+def _workshop_event(row: Any) -> Event:
+    payload = {"workshop_id": row.id, "creator_user_id": row.creator_user_id, "total_substeps": row.total_substeps}
+    return "workshop_created", payload, None
+
+
+def _progress_event(row: Any) -> Event:
+    topic = "step_completed" if row.status == "completed" else "step_updated"
+    payload = {
+        "user_id": row.user_id,
+        "workshop_id": row.workshop_id,
+        "step_id": row.step_id,
+        "substep_id": row.substep_id,
+        "status": row.status,
+    }
+    return topic, payload, row.updated_at
+
+
+def _quiz_event(row: Any) -> Event:
+    # quiz_results records no submission time.
+    payload = {
+        "quiz_id": row.quiz_id,
+        "user_id": row.user_id,
+        "score": row.score,
+        "pass_fail": row.pass_fail,
+        "workshop_id": int(row.linked_to) if (row.linked_to or "").isdigit() else None,
+        "result_id": row.id,
+    }
+    return "quiz_submitted", payload, None
+
+
+SOURCES: Dict[str, Source] = {
+    "workshops": Source(
+        "workshops",
+        lambda after: select(workshops, func.count(substeps.c.id).label("total_substeps"))
+        .outerjoin(steps, steps.c.workshop_id == workshops.c.id)
+        .outerjoin(substeps, substeps.c.step_id == steps.c.id)
+        .where(_after([workshops.c.id], after))
+        .group_by(workshops.c.id, workshops.c.creator_user_id)
+        .order_by(workshops.c.id),
+        lambda row: row.id,
+        _workshop_event,
+    ),
+    # The current state is enough to rebuild every aggregate; the optional
+    # log of every update is not needed.
+    "progress": Source(
+        "progress",
+        lambda after: select(substep_progress)
+        .where(_after(substep_progress.primary_key.columns, after))
+        .order_by(*substep_progress.primary_key.columns),
+        lambda row: [row.user_id, row.workshop_id, row.substep_id],
+        _progress_event,
+    ),
+    "quiz_results": Source(
+        "quiz_results",
+        lambda after: select(quiz_results, quizzes.c.linked_to)
+        .outerjoin(quizzes, quizzes.c.id == quiz_results.c.quiz_id)
+        .where(_after([quiz_results.c.id], after))
+        .order_by(quiz_results.c.id),
+        lambda row: row.id,
+        _quiz_event,
+    ),
+}
+
+
+class Checkpoint:
+    """Last replayed key per source, persisted to a JSON file after every chunk."""
+
+    def __init__(self, path: Optional[str]) -> None:
+        self.path = path
+        self.positions: Dict[str, Any] = {}
+        if path and os.path.exists(path):
+            with open(path) as f:
+                self.positions = json.load(f)
+
+    def get(self, source: str) -> Any:
+        return self.positions.get(source)
+
+    def save(self, source: str, position: Any) -> None:
+        self.positions[source] = position
+        if self.path:
+            # Write-then-rename, so a crash never leaves a torn file behind.
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self.positions, f)
+            os.replace(tmp_path, self.path)
+
+
+def replay(source: Source, engine: Engine, sink: Any, checkpoint: Checkpoint, chunk_size: int = CHUNK_SIZE) -> int:
+    """Stream `source` from its checkpoint into `sink`; return the number of rows replayed."""
+    replayed = 0
+    started = time.perf_counter()
+    with engine.connect() as connection:
+        result = connection.execution_options(stream_results=True, max_row_buffer=chunk_size).execute(
+            source.query(checkpoint.get(source.name))
+        )
+        for rows in result.partitions(chunk_size):
+            sink.apply([source.to_event(row) for row in rows])
+            checkpoint.save(source.name, source.key(rows[-1]))
+            replayed += len(rows)
+            logger.info(
+                "%s: %d rows replayed (%.0f rows/s)",
+                source.name,
+                replayed,
+                replayed / (time.perf_counter() - started),
+            )
+    return replayed
+
+
+def main(sink_factory: Callable[[], Any], argv: Optional[Sequence[str]] = None) -> None:
+    """Command line entry point: replay the selected sources into the sink `sink_factory` builds."""
+    parser = argparse.ArgumentParser(description="Rebuild derived state by replaying event history.")
+    parser.add_argument("--workshop-url", default=os.getenv("WORKSHOP_DATABASE_URL"),
+                        help="workshop database to replay workshops and substep_progress from")
+    parser.add_argument("--quiz-url", default=os.getenv("QUIZ_DATABASE_URL"),
+                        help="quiz database to replay quiz_results from")
+    parser.add_argument("--checkpoint", default="backfill-checkpoint.json")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--reset", action="store_true",
+                        help="discard the checkpoint and the sink's state and start over")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+
+    urls: List[Tuple[str, str]] = []
+    if args.workshop_url:
+        urls += [("workshops", args.workshop_url), ("progress", args.workshop_url)]
+    if args.quiz_url:
+        urls.append(("quiz_results", args.quiz_url))
+    if not urls:
+        parser.error("give --workshop-url and/or --quiz-url")
+
+    sink = sink_factory()
+    if args.reset:
+        if os.path.exists(args.checkpoint):
+            os.remove(args.checkpoint)
+        if hasattr(sink, "reset"):
+            sink.reset()
+    checkpoint = Checkpoint(args.checkpoint)
+    for name, url in urls:
+        engine = create_engine(url)
+        try:
+            total = replay(SOURCES[name], engine, sink, checkpoint, args.chunk_size)
+        finally:
+            engine.dispose()
+        logger.info("%s: done, %d rows replayed this run", name, total)
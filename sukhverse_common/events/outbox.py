@@ -0,0 +1,239 @@
+"""
+Transactional outbox for domain events.
+
+Instead of sending to Kafka after `db.commit()`, services insert their
+events into an `outbox` table inside the same transaction as the domain
+write.  The event is therefore stored if and only if the write commits,
+and the request path costs one local INSERT.
+
+`OutboxRelay` runs in the background, drains unsent rows in large
+batches, hands them to a Kafka producer, flushes once per batch and
+marks the rows as sent.  Delivery is at-least-once: if the process dies
+between the flush and the commit the batch is sent again, so consumers
+must tolerate duplicates.
+
+A row the producer refuses to encode (a `ValueError` or `TypeError` from
+`send`, such as a `SchemaError`) does not hold up the rows behind it: the
+rest of the batch is sent, and the row's `attempts` is counted up.  After
+`OUTBOX_MAX_ATTEMPTS` failures it gets a `failed_at` and the relay stops
+trying; such rows are kept for inspection, logged and counted in
+`metrics`.  Delivery failures, by contrast, are the broker's and leave the
+whole batch pending.
+"""
+
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import JSON, BigInteger, Column, DateTime, Index, Integer, String, text
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
+
+logger = logging.getLogger(__name__)
+
+
+def make_outbox_model(base: Any) -> Any:
+    """Return an `OutboxEvent` model bound to a service's declarative base."""
+
+    class OutboxEvent(base):
+        __tablename__ = "outbox"
+        __table_args__ = (
+            # Only unsent rows are indexed, so the relay's scan stays small
+            # no matter how many sent rows are retained.
+            Index(
+                "ix_outbox_unsent",
+                "id",
+                postgresql_where=text("sent_at IS NULL"),
+                sqlite_where=text("sent_at IS NULL"),
+            ),
+            Index("ix_outbox_sent_at", "sent_at"),
+        )
+
+        id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+        topic = Column(String(100), nullable=False)
+        key = Column(String(100), nullable=True)
+        payload = Column(JSON, nullable=False)
+        created_at = Column(DateTime(timezone=False), server_default=func.now(), nullable=False)
+        sent_at = Column(DateTime(timezone=False), nullable=True)
+        attempts = Column(Integer, nullable=False, default=0, server_default="0")
+        failed_at = Column(DateTime(timezone=False), nullable=True)
+
+    return OutboxEvent
+
+
+def enqueue(db: Session, model: Any, topic: str, message: Dict, key: Optional[str] = None) -> None:
+    """Add an event to the caller's transaction.  Nothing is sent until it commits."""
+    db.add(model(topic=topic, key=key, payload=message))
+
+
+def enqueue_many(db: Session, model: Any, topic: str, messages: Iterable[Dict], key_field: Optional[str] = None) -> int:
+    """Add a batch of events to the caller's transaction with one executemany INSERT."""
+    return enqueue_events(
+        db, model, ((topic, message, str(message[key_field]) if key_field else None) for message in messages)
+    )
+
+
+def enqueue_events(db: Session, model: Any, events: Iterable[Tuple[str, Dict, Optional[str]]]) -> int:
+    """Like `enqueue_many` for `(topic, message, key)` triples that may mix topics; order is kept."""
+    rows = [{"topic": topic, "key": key, "payload": message} for topic, message, key in events]
+    if rows:
+        db.execute(model.__table__.insert(), rows)
+    return len(rows)
+
+
+def relay_enabled() -> bool:
+    return os.getenv("OUTBOX_RELAY_ENABLED", "true").lower() == "true"
+
+
+class OutboxRelay:
+    """Background worker moving committed outbox rows to the event broker.
+
+    `producer_factory` must return an object with kafka-python's
+    `send(topic, value=..., key=...)` and `flush()` methods, such as an
+    `EventBus`.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        model: Any,
+        producer_factory: Callable[[], Any],
+        batch_size: Optional[int] = None,
+        poll_interval: Optional[float] = None,
+        retention: Optional[timedelta] = None,
+        max_attempts: Optional[int] = None,
+    ) -> None:
+        self.session_factory = session_factory
+        self.model = model
+        self.producer_factory = producer_factory
+        self.batch_size = batch_size or int(os.getenv("OUTBOX_BATCH_SIZE", "1000"))
+        self.poll_interval = poll_interval or float(os.getenv("OUTBOX_POLL_INTERVAL_SECONDS", "0.2"))
+        self.retention = retention or timedelta(hours=float(os.getenv("OUTBOX_RETENTION_HOURS", "24")))
+        self.max_attempts = max_attempts or int(os.getenv("OUTBOX_MAX_ATTEMPTS", "5"))
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._last_purge = datetime.min
+        self._lock = threading.Lock()
+        self._relayed = 0
+        self._row_failures = 0
+        self._given_up = 0
+
+    def drain_once(self) -> int:
+        """Send one batch of pending events and return how many were sent."""
+        model = self.model
+        db = self.session_factory()
+        try:
+            rows = (
+                db.query(model.id, model.topic, model.key, model.payload, model.attempts)
+                .filter(model.sent_at.is_(None), model.failed_at.is_(None))
+                .order_by(model.id)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+                .all()
+            )
+            if not rows:
+                db.rollback()
+                return 0
+            producer = self.producer_factory()
+            futures, sent_ids, failures = [], [], []
+            for row in rows:
+                try:
+                    futures.append(producer.send(row.topic, value=row.payload, key=row.key))
+                except (TypeError, ValueError) as exc:
+                    failures.append((row, exc))
+                else:
+                    sent_ids.append(row.id)
+            producer.flush()
+            # flush() does not raise for failed records; leave the batch
+            # unsent so it is retried.
+            for future in futures:
+                if future is not None and future.failed():
+                    raise future.exception
+            now = datetime.utcnow()
+            if sent_ids:
+                db.query(model).filter(model.id.in_(sent_ids)).update(
+                    {model.sent_at: now}, synchronize_session=False
+                )
+            given_up = self._record_failures(db, failures, now)
+            db.commit()
+            with self._lock:
+                self._relayed += len(sent_ids)
+                self._row_failures += len(failures)
+                self._given_up += given_up
+            return len(sent_ids)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _record_failures(self, db: Session, failures: List[Tuple[Any, Exception]], now: datetime) -> int:
+        """Count a failed attempt on each row; return how many rows were given up on."""
+        model = self.model
+        given_up = 0
+        for row, exc in failures:
+            attempts = row.attempts + 1
+            values: Dict[Any, Any] = {model.attempts: attempts}
+            if attempts >= self.max_attempts:
+                values[model.failed_at] = now
+                given_up += 1
+                logger.error("Giving up on outbox event %s (%s) after %d attempts: %s", row.id, row.topic, attempts, exc)
+            else:
+                logger.warning("Outbox event %s (%s) could not be sent: %s", row.id, row.topic, exc)
+            db.query(model).filter(model.id == row.id).update(values, synchronize_session=False)
+        return given_up
+
+    def metrics(self) -> Dict[str, Any]:
+        """Events relayed, failed attempts of single events, and events given up on."""
+        with self._lock:
+            return {"relayed": self._relayed, "row_failures": self._row_failures, "given_up": self._given_up}
+
+    def purge_sent(self) -> int:
+        """Delete sent events older than the retention window."""
+        model = self.model
+        db = self.session_factory()
+        try:
+            deleted = (
+                db.query(model)
+                .filter(model.sent_at < datetime.utcnow() - self.retention)
+                .delete(synchronize_session=False)
+            )
+            db.commit()
+            return deleted
+        finally:
+            db.close()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                sent = self.drain_once()
+                if datetime.utcnow() - self._last_purge > timedelta(minutes=1):
+                    self.purge_sent()
+                    self._last_purge = datetime.utcnow()
+            except Exception:
+                logger.exception("Outbox relay iteration failed")
+                sent = 0
+            # A full batch means more rows are probably waiting.
+            if sent < self.batch_size:
+                self._stop.wait(self.poll_interval)
+
+    def start(self) -> None:
+        if relay_enabled() and self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="outbox-relay", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout=10)
+        self._thread = None
+        # Hand over whatever is still pending before the process exits.
+        try:
+            while self.drain_once() == self.batch_size:
+                pass
+        except Exception:
+            logger.exception("Final outbox drain failed")
@@ -0,0 +1,63 @@
+"""
+Event publishing bound to a service's bus and outbox.
+
+Every service binds the pair once, in its `events/producer.py`:
+
+    publish_event, publish_events = make_publishers(bus, OutboxEvent)
+
+With `db`, events are written to the outbox as part of that session's
+transaction and sent by the relay once it commits.  Without it, they are
+handed straight to the bus (fire-and-forget).  Messages are checked
+against their topic's registered schema first, and `SchemaError` is
+raised before anything is stored.
+"""
+
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple, Union
+
+from sqlalchemy.orm import Session
+
+from . import outbox
+from .bus import EventBus
+from .registry import registry as event_schemas
+
+Topic = Union[str, Callable[[Dict], str]]
+
+
+def make_publishers(bus: EventBus, model: Any) -> Tuple[Callable[..., None], Callable[..., None]]:
+    """Return `(publish_event, publish_events)` for `bus` and the outbox table `model`."""
+
+    def publish_event(topic: str, message: Dict, key: Optional[str] = None, db: Optional[Session] = None) -> None:
+        """Publish an event on the given Kafka topic.
+
+        The partition key defaults to the payload's `user_id` (see
+        `EventBus.partition_key`).
+        """
+        event_schemas.validate(topic, message)
+        if db is not None:
+            outbox.enqueue(db, model, topic, message, key)
+            return
+        bus.send(topic, message, key)
+
+    def publish_events(
+        topic: Topic, messages: Iterable[Dict], key_field: Optional[str] = None, db: Optional[Session] = None
+    ) -> None:
+        """Publish a batch of events, in order.
+
+        `topic` may be a function of each message, for batches that mix
+        topics.  With `db`, the batch is written to the outbox with one
+        INSERT; without it, the batch is sent and flushed.
+        """
+        events = [
+            (topic if isinstance(topic, str) else topic(message), message, str(message[key_field]) if key_field else None)
+            for message in messages
+        ]
+        for event_topic, message, _ in events:
+            event_schemas.validate(event_topic, message)
+        if db is not None:
+            outbox.enqueue_events(db, model, events)
+            return
+        for event_topic, message, key in events:
+            bus.send(event_topic, message, key)
+        bus.flush()
+
+    return publish_event, publish_events
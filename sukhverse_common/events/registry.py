@@ -0,0 +1,194 @@
+"""
+File-based schema registry for domain events.
+
+Every topic has a JSON file under `schemas/` listing its versions.  A
+version is a list of fields, each with a numeric `id` that is written on
+the wire instead of the field name:
+
+    {"id": 1, "name": "user_id", "type": "int", "required": true}
+
+Events are encoded with msgpack as `[version, {field_id: value}]`.  To
+evolve an event, add a version: keep the ids of existing fields, never
+reuse a retired id and make new fields optional.  Readers decode every
+event into the latest version they know: ids they do not know are
+skipped and missing optional fields get their default, so old and new
+producers and consumers can run side by side.
+
+Producers call `validate` before an event is stored or sent; consumers
+get a validated dict back from `decode`.  Both raise `SchemaError`.
+"""
+
+import json
+import os
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import msgpack
+
+SCHEMA_DIR = os.path.join(os.path.dirname(__file__), "schemas")
+
+_TYPES: Dict[str, Tuple[type, ...]] = {
+    "int": (int,),
+    "float": (int, float),
+    "str": (str,),
+    "bool": (bool,),
+    "list": (list, tuple),
+    "dict": (dict,),
+}
+# Types accepted by identity check on the hot path.
+_EXACT_TYPES: Dict[str, Tuple[type, ...]] = {
+    "int": (int,),
+    "float": (float, int),
+    "str": (str,),
+    "bool": (bool,),
+    "list": (list,),
+    "dict": (dict,),
+}
+
+
+class SchemaError(ValueError):
+    """An event does not match its registered schema."""
+
+
+@dataclass(frozen=True)
+class Field:
+    id: int
+    name: str
+    type: str
+    required: bool = True
+    default: Any = None
+
+    def check(self, event: str, value: Any) -> None:
+        if value is None:
+            if self.required:
+                raise SchemaError(f"{event}.{self.name} is required")
+            return
+        # bool is a subclass of int; do not let True pass as an id.
+        if type(value) not in _EXACT_TYPES[self.type] and (
+            isinstance(value, bool) or not isinstance(value, _TYPES[self.type])
+        ):
+            raise SchemaError(f"{event}.{self.name} must be {self.type}, got {type(value).__name__}")
+
+
+class EventSchema:
+    """One version of one event."""
+
+    def __init__(self, name: str, version: int, fields: List[Field]) -> None:
+        self.name = name
+        self.version = version
+        self.fields = fields
+        self.by_name = {field.name: field for field in fields}
+        self.by_id = {field.id: field for field in fields}
+        self._required = [field for field in fields if field.required]
+        # name -> (field id, exact types accepted without further checks)
+        self._fast = {field.name: (field.id, _EXACT_TYPES[field.type]) for field in fields}
+
+    def _error(self, message: Dict[str, Any]) -> SchemaError:
+        unknown = set(message) - set(self.by_name)
+        if unknown:
+            return SchemaError(f"{self.name} v{self.version} has no field(s): {', '.join(sorted(unknown))}")
+        for field in self.fields:
+            try:
+                field.check(self.name, message.get(field.name))
+            except SchemaError as exc:
+                return exc
+        return SchemaError(f"Invalid {self.name} event")
+
+    def _values(self, message: Dict[str, Any]) -> Dict[int, Any]:
+        # Single pass over the message; the slower, descriptive checks in
+        # `_error` only run once something is wrong.
+        values: Dict[int, Any] = {}
+        fast = self._fast
+        for name, value in message.items():
+            spec = fast.get(name)
+            if spec is None:
+                raise self._error(message)
+            if value is None:
+                continue
+            if type(value) not in spec[1]:
+                self.by_name[name].check(self.name, value)
+            values[spec[0]] = value
+        for field in self._required:
+            if field.id not in values:
+                raise self._error(message)
+        return values
+
+    def validate(self, message: Dict[str, Any]) -> None:
+        self._values(message)
+
+    def encode(self, message: Dict[str, Any]) -> bytes:
+        return msgpack.packb([self.version, self._values(message)], use_bin_type=True)
+
+    def decode_values(self, values: Dict[int, Any]) -> Dict[str, Any]:
+        message: Dict[str, Any] = {}
+        for field in self.fields:
+            value = values.get(field.id, field.default)
+            if type(value) not in _EXACT_TYPES[field.type]:
+                field.check(self.name, value)
+            message[field.name] = value
+        return message
+
+
+class SchemaRegistry:
+    """All event schemas found in a directory, loaded once."""
+
+    def __init__(self, directory: str = SCHEMA_DIR) -> None:
+        self.directory = directory
+        self._schemas: Dict[str, Dict[int, EventSchema]] = {}
+        self._latest: Dict[str, EventSchema] = {}
+        for filename in sorted(os.listdir(directory)):
+            if filename.endswith(".json"):
+                self._load(os.path.join(directory, filename))
+
+    def _load(self, path: str) -> None:
+        with open(path, encoding="utf-8") as handle:
+            spec = json.load(handle)
+        name = spec["name"]
+        versions: Dict[int, EventSchema] = {}
+        seen: Dict[int, Field] = {}
+        for version_spec in spec["versions"]:
+            fields = [Field(**field) for field in version_spec["fields"]]
+            for field in fields:
+                if field.type not in _TYPES:
+                    raise SchemaError(f"{path}: unknown type {field.type!r} for {field.name}")
+                previous = seen.setdefault(field.id, field)
+                if (previous.name, previous.type) != (field.name, field.type):
+                    raise SchemaError(f"{path}: field id {field.id} is reused with a different name or type")
+            if len({field.name for field in fields}) != len(fields):
+                raise SchemaError(f"{path}: duplicate field name in version {version_spec['version']}")
+            versions[version_spec["version"]] = EventSchema(name, version_spec["version"], fields)
+        self._schemas[name] = versions
+        self._latest[name] = versions[max(versions)]
+
+    @property
+    def names(self) -> List[str]:
+        return sorted(self._schemas)
+
+    def get(self, name: str, version: Optional[int] = None) -> EventSchema:
+        """Return `version` of `name`, or its latest version."""
+        if name not in self._latest:
+            raise SchemaError(f"No schema registered for event {name!r}")
+        if version is None:
+            return self._latest[name]
+        try:
+            return self._schemas[name][version]
+        except KeyError:
+            raise SchemaError(f"No version {version} registered for event {name!r}") from None
+
+    def validate(self, name: str, message: Dict[str, Any]) -> None:
+        self.get(name).validate(message)
+
+    def encode(self, name: str, message: Dict[str, Any]) -> bytes:
+        return self.get(name).encode(message)
+
+    def decode(self, name: str, data: bytes) -> Dict[str, Any]:
+        try:
+            _version, values = msgpack.unpackb(data, raw=False, strict_map_key=False)
+        except (ValueError, TypeError, msgpack.UnpackException) as exc:
+            raise SchemaError(f"Malformed {name} event: {exc}") from exc
+        # Field ids are stable across versions, so the reader's latest
+        # version can decode what any writer version produced.
+        return self.get(name).decode_values(values)
+
+
+registry = SchemaRegistry(os.getenv("EVENT_SCHEMA_DIR", SCHEMA_DIR))
@@ -0,0 +1,97 @@
+"""
+Event payload serializers.
+
+The event bus encodes payloads itself and tags every record with a
+`content-type` header, so consumers can decode messages produced with any
+registered serializer and the wire format can change one producer at a time.
+
+`msgpack` (the default) writes the compact, schema-checked encoding from
+`registry`; `json` remains available for debugging and older consumers.
+"""
+
+import json
+import os
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from .registry import SchemaRegistry, registry as default_registry
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is in every service's requirements
+    orjson = None
+
+CONTENT_TYPE_HEADER = "content-type"
+
+
+class JsonSerializer:
+    """JSON via orjson when available, falling back to the standard library."""
+
+    name = "json"
+    content_type = "application/json"
+
+    def dumps(self, value: Any, topic: Optional[str] = None) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(value)
+        return json.dumps(value, separators=(",", ":")).encode("utf-8")
+
+    def loads(self, data: bytes, topic: Optional[str] = None) -> Any:
+        if orjson is not None:
+            return orjson.loads(data)
+        return json.loads(data)
+
+
+class MsgpackSerializer:
+    """Schema-validated msgpack keyed by field id; see `registry`."""
+
+    name = "msgpack"
+    content_type = "application/vnd.sukhverse.event+msgpack"
+
+    def __init__(self, schemas: SchemaRegistry = default_registry) -> None:
+        self.schemas = schemas
+
+    def dumps(self, value: Any, topic: Optional[str] = None) -> bytes:
+        if topic is None:
+            raise ValueError("msgpack events need a topic to pick their schema")
+        return self.schemas.encode(topic, value)
+
+    def loads(self, data: bytes, topic: Optional[str] = None) -> Any:
+        if topic is None:
+            raise ValueError("msgpack events need a topic to pick their schema")
+        return self.schemas.decode(topic, data)
+
+
+_serializers: Dict[str, Any] = {}
+
+
+def register(serializer: Any) -> None:
+    """Make `serializer` available by name and content type.
+
+    A serializer needs `name`, `content_type`, `dumps(value, topic) -> bytes`
+    and `loads(data, topic) -> value`.
+    """
+    _serializers[serializer.name] = serializer
+    _serializers[serializer.content_type] = serializer
+
+
+def get_serializer(name: Optional[str] = None) -> Any:
+    """Return a registered serializer, defaulting to `EVENT_SERIALIZER`."""
+    name = name or os.getenv("EVENT_SERIALIZER", "msgpack")
+    try:
+        return _serializers[name]
+    except KeyError:
+        raise ValueError(f"Unknown event serializer: {name}") from None
+
+
+def decode(value: bytes, headers: Optional[Iterable[Tuple[str, bytes]]] = None, topic: Optional[str] = None) -> Any:
+    """Decode a consumed record using its `content-type` header.
+
+    Records without the header predate the bus and are JSON.
+    """
+    for header, header_value in headers or ():
+        if header == CONTENT_TYPE_HEADER:
+            return get_serializer(header_value.decode("ascii")).loads(value, topic)
+    return _serializers["json"].loads(value, topic)
+
+
+register(JsonSerializer())
+register(MsgpackSerializer())
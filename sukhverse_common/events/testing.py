@@ -0,0 +1,157 @@
+"""
+In-process stand-ins for Kafka used by tests and benchmarks.
+"""
+
+import threading
+import time
+import zlib
+from collections import namedtuple
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+TopicPartition = namedtuple("TopicPartition", "topic partition")
+ConsumerRecord = namedtuple("ConsumerRecord", "topic partition offset timestamp key value headers")
+
+
+class DeliveryFuture:
+    """Minimal counterpart of kafka-python's `FutureRecordMetadata`."""
+
+    def __init__(self) -> None:
+        self.is_done = False
+        self.value: Any = None
+        self.exception: Optional[BaseException] = None
+        self._callbacks: List[Callable[[Any], None]] = []
+        self._errbacks: List[Callable[[BaseException], None]] = []
+
+    def succeeded(self) -> bool:
+        return self.is_done and self.exception is None
+
+    def failed(self) -> bool:
+        return self.is_done and self.exception is not None
+
+    def add_callback(self, f: Callable, *args: Any) -> "DeliveryFuture":
+        callback = lambda value: f(*args, value)  # noqa: E731
+        if self.succeeded():
+            callback(self.value)
+        else:
+            self._callbacks.append(callback)
+        return self
+
+    def add_errback(self, f: Callable, *args: Any) -> "DeliveryFuture":
+        errback = lambda exc: f(*args, exc)  # noqa: E731
+        if self.failed():
+            errback(self.exception)
+        else:
+            self._errbacks.append(errback)
+        return self
+
+    def success(self, value: Any) -> None:
+        self.is_done, self.value = True, value
+        for callback in self._callbacks:
+            callback(value)
+
+    def failure(self, exception: BaseException) -> None:
+        self.is_done, self.exception = True, exception
+        for errback in self._errbacks:
+            errback(exception)
+
+
+class InMemoryBroker:
+    """Producer-compatible fake that records every message it is sent.
+
+    Messages only become visible in `messages` after `flush()`, mirroring
+    how a real producer buffers sends until the batch is delivered.  Set
+    `fail_with` to make the next flush fail every buffered send.  Delivered
+    messages are spread over `partitions` by key and can be read back with
+    `consumer()`.
+    """
+
+    def __init__(self, partitions: int = 1) -> None:
+        self._lock = threading.Lock()
+        self._buffer: List[Dict[str, Any]] = []
+        self.partitions = partitions
+        self.messages: List[Dict[str, Any]] = []
+        self.logs: Dict[TopicPartition, List[ConsumerRecord]] = {}
+        self.flushes = 0
+        self.fail_with: Optional[BaseException] = None
+
+    def partition_for(self, key: Any) -> int:
+        if key is None or self.partitions == 1:
+            return 0
+        data = key if isinstance(key, bytes) else str(key).encode("utf-8")
+        return zlib.crc32(data) % self.partitions
+
+    def send(self, topic: str, value: Any = None, key: Any = None, headers: Any = None) -> DeliveryFuture:
+        future = DeliveryFuture()
+        with self._lock:
+            self._buffer.append({"topic": topic, "value": value, "key": key, "headers": headers, "future": future})
+        return future
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        with self._lock:
+            buffered, self._buffer = self._buffer, []
+            self.flushes += 1
+            failure, self.fail_with = self.fail_with, None
+        for message in buffered:
+            future = message.pop("future")
+            if failure is not None:
+                future.failure(failure)
+                continue
+            with self._lock:
+                offset = self._append(message)
+            future.success(offset)
+
+    def _append(self, message: Dict[str, Any]) -> int:
+        tp = TopicPartition(message["topic"], self.partition_for(message["key"]))
+        log = self.logs.setdefault(tp, [])
+        record = ConsumerRecord(
+            tp.topic, tp.partition, len(log), int(time.time() * 1000), message["key"], message["value"], message["headers"] or []
+        )
+        log.append(record)
+        self.messages.append(dict(message, partition=tp.partition, offset=record.offset))
+        return len(self.messages) - 1
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        self.flush(timeout)
+
+    def topic(self, name: str) -> List[Any]:
+        return [m["value"] for m in self.messages if m["topic"] == name]
+
+    def consumer(self, *topics: str, partitions: Optional[Iterable[int]] = None) -> "InMemoryConsumer":
+        """A consumer of `topics` assigned `partitions` (all by default)."""
+        return InMemoryConsumer(self, topics, range(self.partitions) if partitions is None else partitions)
+
+
+class InMemoryConsumer:
+    """Subset of kafka-python's `KafkaConsumer` reading from an `InMemoryBroker`."""
+
+    def __init__(self, broker: InMemoryBroker, topics: Iterable[str], partitions: Iterable[int]) -> None:
+        self.broker = broker
+        self.assignment = [TopicPartition(topic, partition) for topic in topics for partition in partitions]
+        self.positions = {tp: 0 for tp in self.assignment}
+        self.committed: Dict[TopicPartition, int] = {}
+        self.closed = False
+
+    def poll(self, timeout_ms: int = 0, max_records: Optional[int] = None) -> Dict[TopicPartition, List[ConsumerRecord]]:
+        remaining = max_records if max_records is not None else float("inf")
+        batches: Dict[TopicPartition, List[ConsumerRecord]] = {}
+        for tp in self.assignment:
+            if remaining <= 0:
+                break
+            log = self.broker.logs.get(tp, [])
+            position = self.positions[tp]
+            records = log[position : position + int(min(remaining, len(log)))]
+            if records:
+                batches[tp] = records
+                self.positions[tp] = position + len(records)
+                remaining -= len(records)
+        return batches
+
+    def commit(self) -> None:
+        self.committed = dict(self.positions)
+
+    def seek_to_committed(self) -> None:
+        """Rewind to the last commit, as a restarted group member would."""
+        self.positions = {tp: self.committed.get(tp, 0) for tp in self.assignment}
+
+    def close(self) -> None:
+        self.closed = True
@@ -0,0 +1,99 @@
+"""
+Keyset (cursor) pagination for listing endpoints.
+
+An OFFSET page costs the rows it skips, so deep pages of a power user's
+history get slower and slower.  A keyset page instead continues after
+the last row of the previous page, `WHERE (a, b) > (:a, :b) ORDER BY a, b
+LIMIT n`, which a composite index on the filter and sort columns answers
+by seeking straight to the position: every page costs the same.
+
+The sort columns must identify a row uniquely (end with the primary key).
+The position is handed to the client as an opaque cursor, and listing
+endpoints return a plain JSON array with the next page's URL in a
+`Link: <...>; rel="next"` header, absent on the last page.
+"""
+
+import base64
+import json
+import os
+from datetime import date, datetime
+from typing import Any, List, NamedTuple, Optional, Sequence
+
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Query
+
+DEFAULT_PAGE_SIZE = int(os.getenv("PAGE_SIZE_DEFAULT", "50"))
+MAX_PAGE_SIZE = int(os.getenv("PAGE_SIZE_MAX", "500"))
+
+
+class InvalidCursor(ValueError):
+    """A cursor that was not produced by `encode_cursor` for these columns."""
+
+
+class Page(NamedTuple):
+    items: List[Any]
+    next_cursor: Optional[str]
+
+
+def _dump(value: Any) -> Any:
+    return value.isoformat() if isinstance(value, (date, datetime)) else value
+
+
+def _load(value: Any, column: Any) -> Any:
+    python_type = column.type.python_type
+    if python_type in (datetime, date) and isinstance(value, str):
+        return python_type.fromisoformat(value)
+    if isinstance(value, bool) != (python_type is bool) or not isinstance(value, python_type):
+        raise InvalidCursor(f"cursor value for {column.key} has the wrong type")
+    return value
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    raw = json.dumps([_dump(value) for value in values], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str, columns: Sequence[Any]) -> List[Any]:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError as exc:
+        raise InvalidCursor("malformed cursor") from exc
+    if not isinstance(values, list) or len(values) != len(columns):
+        raise InvalidCursor("malformed cursor")
+    try:
+        return [_load(value, column) for value, column in zip(values, columns)]
+    except (TypeError, ValueError) as exc:
+        raise InvalidCursor(str(exc)) from exc
+
+
+def paginate(
+    query: Query,
+    columns: Sequence[Any],
+    cursor: Optional[str],
+    limit: int,
+    descending: bool = False,
+) -> Page:
+    """One page of `query` in `columns` order, starting after `cursor`.
+
+    Fetches one row more than `limit` to know whether a next page exists.
+    Rows must expose the sort columns as attributes (entities or named
+    columns).
+    """
+    if cursor:
+        after = decode_cursor(cursor, columns)
+        key = tuple_(*columns) if len(columns) > 1 else columns[0]
+        position = tuple_(*after) if len(columns) > 1 else after[0]
+        query = query.filter(key < position if descending else key > position)
+    order = [column.desc() if descending else column.asc() for column in columns]
+    rows = query.order_by(*order).limit(limit + 1).all()
+    if len(rows) <= limit:
+        return Page(rows, None)
+    last = rows[limit - 1]
+    return Page(rows[:limit], encode_cursor([getattr(last, column.key) for column in columns]))
+
+
+def next_link(url: Any, next_cursor: Optional[str]) -> Optional[str]:
+    """The `Link` header value pointing at the next page of the request `url`, if any."""
+    if next_cursor is None:
+        return None
+    return f'<{url.include_query_params(cursor=next_cursor)}>; rel="next"'
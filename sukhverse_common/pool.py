@@ -0,0 +1,141 @@
+"""
+Bounded worker pools for CPU-heavy work.
+
+Password hashing in the auth service and PDF rendering in the
+certificate service are too slow for the request path, so each service
+runs them on a `BoundedPool`: an executor (a process pool by default)
+sized to the machine's cores, with a cap on the number of outstanding
+jobs.  Once the cap is reached new work is rejected immediately with the
+pool's `busy_error`, a `PoolBusy` that the services turn into a `503`
+with a `Retry-After` header.  `metrics` reports utilisation and queue
+depth.
+
+A worker process that dies (killed by the OOM killer, a segfault in a
+native library) breaks a `ProcessPoolExecutor` for good.  The pool then
+drops that executor and starts a fresh one: work that could not be
+submitted is retried once on it, and jobs that were running when the
+worker died fail with `busy_error` so the client retries later.
+"""
+
+import asyncio
+import os
+import threading
+from concurrent.futures import BrokenExecutor, Executor, ProcessPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple, Type
+
+
+class PoolBusy(Exception):
+    """Raised when a pool's backlog is full."""
+
+    message = "Worker pool is saturated"
+
+    def __init__(self, retry_after: int) -> None:
+        super().__init__(self.message)
+        self.retry_after = retry_after
+
+
+class BoundedPool:
+    """Executor with a bounded backlog and simple queue-depth metrics.
+
+    Unless `max_queue` is given, `queue_per_worker` jobs per worker may
+    wait on top of the ones currently running.
+    """
+
+    busy_error: Type[PoolBusy] = PoolBusy
+    queue_per_worker = 4
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        max_queue: Optional[int] = None,
+        retry_after: int = 1,
+        executor_factory: Optional[Callable[[int], Executor]] = None,
+    ) -> None:
+        self.workers = workers or os.cpu_count() or 1
+        self.max_queue = self.workers * self.queue_per_worker if max_queue is None else max_queue
+        self.retry_after = retry_after
+        self._executor_factory = executor_factory or (lambda n: ProcessPoolExecutor(max_workers=n))
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._restarts = 0
+
+    @property
+    def capacity(self) -> int:
+        return self.workers + self.max_queue
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            self._executor = self._executor_factory(self.workers)
+        return self._executor
+
+    def _discard(self, executor: Executor) -> None:
+        """Drop a broken `executor`; the next job starts a new one."""
+        with self._lock:
+            if self._executor is not executor:
+                return
+            self._executor = None
+            self._restarts += 1
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _submit(self, func: Callable[..., Any], *args: Any) -> Tuple[Executor, Any]:
+        executor = self._get_executor()
+        try:
+            return executor, executor.submit(func, *args)
+        except BrokenExecutor:
+            self._discard(executor)
+        executor = self._get_executor()
+        return executor, executor.submit(func, *args)
+
+    def _acquire(self) -> None:
+        with self._lock:
+            if self._in_flight >= self.capacity:
+                self._rejected += 1
+                raise self.busy_error(self.retry_after)
+            self._in_flight += 1
+
+    def _release(self, future: Any = None) -> None:
+        with self._lock:
+            self._in_flight -= 1
+            if future is not None and not future.cancelled() and future.exception() is None:
+                self._completed += 1
+            else:
+                self._failed += 1
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """Run `func(*args)` on the pool, failing fast when it is saturated."""
+        self._acquire()
+        try:
+            executor, future = self._submit(func, *args)
+        except Exception:
+            self._release()
+            raise
+        future.add_done_callback(self._release)
+        try:
+            return await asyncio.wrap_future(future)
+        except BrokenExecutor:
+            self._discard(executor)
+            raise self.busy_error(self.retry_after)
+
+    def metrics(self) -> Dict[str, Any]:
+        """Return a snapshot of pool utilisation."""
+        with self._lock:
+            in_flight = self._in_flight
+            return {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "in_flight": in_flight,
+                "queue_depth": max(in_flight - self.workers, 0),
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+                "restarts": self._restarts,
+            }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,78 @@
+"""
+Counting substep completions from progress events.
+
+`step_completed` and `step_updated` events carry a substep's current
+status, not a change, and are delivered at least once.  Consumers that
+keep completed-substep counters (the analytics aggregates, certificate
+eligibility) therefore remember the last known status of every substep
+in a table of their own, with `user_id`, `workshop_id`, `substep_id` and
+`completed` columns, and only count transitions: a redelivered or
+repeated status changes nothing.
+
+`count_transitions` does that for a micro-batch with one lookup per
+`LOOKUP_CHUNK` keys and one bulk upsert of the statuses that changed.
+"""
+
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+
+from sqlalchemy import tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+# Keys per `IN (...)` lookup, well below every driver's parameter limit.
+LOOKUP_CHUNK = 1000
+
+# (user_id, workshop_id, substep_id)
+SubstepKey = Tuple[int, int, int]
+# (workshop_id, user_id)
+StudentKey = Tuple[int, int]
+
+
+def upsert_insert(db: Session) -> Any:
+    """The `insert` construct with `on_conflict_do_update` for the session's dialect."""
+    return postgresql.insert if db.bind.dialect.name == "postgresql" else sqlite.insert
+
+
+def chunks(items: Sequence, size: int = LOOKUP_CHUNK) -> Iterable[Sequence]:
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+def _stored_states(db: Session, model: Any, keys: List[SubstepKey]) -> Dict[SubstepKey, bool]:
+    columns = (model.user_id, model.workshop_id, model.substep_id)
+    states: Dict[SubstepKey, bool] = {}
+    for chunk in chunks(keys):
+        rows = db.query(*columns, model.completed).filter(tuple_(*columns).in_(chunk))
+        states.update(((user_id, workshop_id, substep_id), completed) for user_id, workshop_id, substep_id, completed in rows)
+    return states
+
+
+def count_transitions(db: Session, model: Any, substeps: Dict[SubstepKey, bool]) -> Dict[StudentKey, int]:
+    """Store the batch's latest status of each substep in `model`'s table, without committing.
+
+    Returns the change in completed substeps per student: +1 for each
+    substep that became completed, -1 for each that stopped being.
+    """
+    completed: Dict[StudentKey, int] = defaultdict(int)
+    if not substeps:
+        return completed
+    previous = _stored_states(db, model, list(substeps))
+    changed = []
+    for (user_id, workshop_id, substep_id), is_completed in substeps.items():
+        was_completed = previous.get((user_id, workshop_id, substep_id))
+        if was_completed is not None and was_completed == is_completed:
+            continue
+        if is_completed != bool(was_completed):
+            completed[(workshop_id, user_id)] += 1 if is_completed else -1
+        changed.append(
+            {"user_id": user_id, "workshop_id": workshop_id, "substep_id": substep_id, "completed": is_completed}
+        )
+    if changed:
+        stmt = upsert_insert(db)(model.__table__)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[model.user_id, model.workshop_id, model.substep_id],
+            set_={"completed": stmt.excluded.completed},
+        )
+        db.execute(stmt, changed)
+    return completed
@@ -0,0 +1,107 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.pool import StaticPool
+
+from sukhverse_common.events import backfill
+
+
+class ListSink:
+    def __init__(self, fail_after=None):
+        self.chunks = []
+        self.fail_after = fail_after
+
+    def apply(self, events):
+        if self.fail_after is not None and len(self.chunks) == self.fail_after:
+            raise RuntimeError("sink down")
+        self.chunks.append(events)
+
+    @property
+    def events(self):
+        return [event for chunk in self.chunks for event in chunk]
+
+
+@pytest.fixture()
+def engine():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    backfill.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        connection.execute(backfill.workshops.insert(), [{"id": 1, "creator_user_id": 9}, {"id": 2, "creator_user_id": 9}])
+        connection.execute(backfill.steps.insert(), [{"id": 1, "workshop_id": 1}, {"id": 2, "workshop_id": 1}])
+        connection.execute(
+            backfill.substeps.insert(), [{"id": n, "step_id": 1 + n % 2} for n in range(1, 6)]
+        )
+        connection.execute(
+            backfill.substep_progress.insert(),
+            [
+                {
+                    "user_id": 10 + n % 3,
+                    "workshop_id": 1,
+                    "step_id": 1,
+                    "substep_id": n,
+                    "status": "completed" if n % 2 else "in_progress",
+                    "updated_at": datetime(2026, 1, 1, 0, n),
+                }
+                for n in range(1, 11)
+            ],
+        )
+        connection.execute(backfill.quizzes.insert(), [{"id": 5, "linked_to": "1"}, {"id": 6, "linked_to": "intro"}])
+        connection.execute(
+            backfill.quiz_results.insert(),
+            [
+                {"quiz_id": 5, "user_id": 10, "score": 80, "pass_fail": True},
+                {"quiz_id": 6, "user_id": 11, "score": 20, "pass_fail": False},
+            ],
+        )
+    return engine
+
+
+def test_rows_become_canonical_events(engine):
+    sink = ListSink()
+    checkpoint = backfill.Checkpoint(None)
+    for name in ("workshops", "progress", "quiz_results"):
+        backfill.replay(backfill.SOURCES[name], engine, sink, checkpoint, chunk_size=4)
+
+    events = sink.events
+    assert events[:2] == [
+        ("workshop_created", {"workshop_id": 1, "creator_user_id": 9, "total_substeps": 5}, None),
+        ("workshop_created", {"workshop_id": 2, "creator_user_id": 9, "total_substeps": 0}, None),
+    ]
+    assert events[2] == (
+        "step_completed",
+        {"user_id": 10, "workshop_id": 1, "step_id": 1, "substep_id": 3, "status": "completed"},
+        datetime(2026, 1, 1, 0, 3),
+    )
+    assert events[3][0] == "step_updated"
+    assert [payload["workshop_id"] for _, payload, _ in events[-2:]] == [1, None]
+    assert [payload["result_id"] for _, payload, _ in events[-2:]] == [1, 2]
+    assert [len(chunk) for chunk in sink.chunks] == [2, 4, 4, 2, 2]
+
+
+def test_replay_resumes_after_the_last_applied_chunk(engine, tmp_path):
+    path = str(tmp_path / "checkpoint.json")
+    failing = ListSink(fail_after=2)
+    with pytest.raises(RuntimeError):
+        backfill.replay(backfill.SOURCES["progress"], engine, failing, backfill.Checkpoint(path), chunk_size=3)
+    # Keys are composite: (user_id, workshop_id, substep_id).
+    assert backfill.Checkpoint(path).get("progress") == [11, 1, 7]
+
+    sink = ListSink()
+    assert backfill.replay(backfill.SOURCES["progress"], engine, sink, backfill.Checkpoint(path), chunk_size=3) == 4
+    replayed = [(payload["user_id"], payload["substep_id"]) for _, payload, _ in failing.events + sink.events]
+    assert replayed == sorted((10 + n % 3, n) for n in range(1, 11))
+
+
+def test_main_resets_the_sink_and_replays_every_source(engine, tmp_path, monkeypatch):
+    monkeypatch.setattr(backfill, "create_engine", lambda url: engine)
+    monkeypatch.setattr(engine, "dispose", lambda: None)
+    sink = ListSink()
+    sink.reset = lambda: sink.chunks.clear()
+    sink.chunks.append([("stale", {}, None)])
+    path = str(tmp_path / "checkpoint.json")
+
+    backfill.main(lambda: sink, ["--workshop-url", "x", "--quiz-url", "y", "--checkpoint", path, "--reset"])
+    assert len(sink.events) == 14
+    backfill.main(lambda: sink, ["--workshop-url", "x", "--quiz-url", "y", "--checkpoint", path])
+    assert len(sink.events) == 14
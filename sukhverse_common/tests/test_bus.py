@@ -0,0 +1,66 @@
+import asyncio
+
+from sukhverse_common.events import serializers
+from sukhverse_common.events.bus import EventBus
+from sukhverse_common.events.testing import InMemoryBroker
+
+
+def make_bus():
+    broker = InMemoryBroker()
+    return EventBus("test", serializer=serializers.get_serializer("json"), producer_factory=lambda: broker), broker
+
+
+def test_send_derives_partition_key_and_tags_content_type():
+    bus, broker = make_bus()
+    bus.send("role_assigned", {"role_id": 2, "user_id": 7})
+    bus.send("workshop_created", {"workshop_id": 3, "creator_user_id": 1})
+    bus.send("progress_updated", {"user_id": 7}, key="explicit")
+    bus.flush()
+
+    assert [m["key"] for m in broker.messages] == [b"7", b"3", b"explicit"]
+    first = broker.messages[0]
+    assert first["headers"] == [("content-type", b"application/json")]
+    assert serializers.decode(first["value"], first["headers"]) == {"role_id": 2, "user_id": 7}
+
+
+def test_decode_treats_headerless_records_as_json():
+    assert serializers.decode(b'{"user_id": 1}', None) == {"user_id": 1}
+
+
+def test_metrics_track_latency_batches_and_failures():
+    bus, broker = make_bus()
+    for user_id in range(5):
+        bus.send("user_profile_updated", {"user_id": user_id})
+    bus.flush()
+    broker.fail_with = RuntimeError("broker unavailable")
+    bus.send("user_profile_updated", {"user_id": 99})
+    bus.flush()
+
+    stats = bus.metrics()
+    assert (stats["sent"], stats["acked"], stats["failed"], stats["pending"]) == (6, 5, 1, 0)
+    assert stats["flush_batch_size"] == {"avg": 3.0, "max": 5}
+    assert stats["send_latency_ms"]["p50"] is not None
+
+
+def test_publish_awaits_acknowledgement():
+    bus, broker = make_bus()
+
+    async def scenario():
+        pending = asyncio.ensure_future(bus.publish("quiz_submitted", {"user_id": 4, "quiz_id": 1}))
+        await asyncio.sleep(0.05)
+        assert not pending.done()
+        bus.flush()
+        return await pending
+
+    assert asyncio.run(scenario()) == 0
+    assert broker.topic("quiz_submitted")
+
+
+def test_close_flushes_and_releases_producer():
+    bus, broker = make_bus()
+    bus.send("certificate_issued", {"user_id": 1})
+    asyncio.run(bus.aclose())
+
+    assert len(broker.messages) == 1
+    assert bus.metrics()["acked"] == 1
+    bus.close()
@@ -0,0 +1,19 @@
+from sukhverse_common.cache import TTLCache
+
+
+def test_entries_expire_and_the_least_recently_used_is_evicted():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None and cache.get("c") == 3
+    cache.set("d", 4, ttl=0)
+    assert cache.get("d") is None
+    assert cache.stats() == {"size": 2, "hits": 2, "misses": 2}
+
+
+def test_zero_size_disables_caching():
+    cache = TTLCache(maxsize=0, ttl=60)
+    cache.set("a", 1)
+    assert cache.get("a") is None and len(cache) == 0
@@ -0,0 +1,49 @@
+import asyncio
+import threading
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from sukhverse_common.db import AsyncDatabase, ThreadedSession, async_url, engine_options
+
+
+def test_async_url_swaps_the_driver():
+    assert str(async_url("postgresql://u:p@db/app")) == "postgresql+asyncpg://u:p@db/app"
+    assert str(async_url("postgresql+psycopg2://u:p@db/app")) == "postgresql+asyncpg://u:p@db/app"
+    assert str(async_url("sqlite:///./app.db")) == "sqlite+aiosqlite:///./app.db"
+    with pytest.raises(ValueError):
+        async_url("mysql://u:p@db/app")
+
+
+def test_pool_sizes_apply_to_server_databases_only():
+    assert engine_options("sqlite:///./app.db") == {"pool_pre_ping": True, "connect_args": {"check_same_thread": False}}
+    options = engine_options("postgresql://u:p@db/app")
+    assert options["pool_size"] == 5 and options["max_overflow"] == 10
+    assert (options["pool_timeout"], options["pool_recycle"]) == (30, -1)
+
+
+def read(db, value):
+    return db.execute(text("SELECT :value"), {"value": value}).scalar(), threading.get_ident()
+
+
+@pytest.mark.parametrize("enabled", [False, True])
+def test_sessions_run_sync_code_in_both_modes(tmp_path, enabled):
+    url = f"sqlite:///{tmp_path / 'app.db'}"
+    SessionLocal = sessionmaker(bind=create_engine(url, **engine_options(url)))
+    database = AsyncDatabase(url, SessionLocal, enabled=enabled)
+
+    async def run():
+        async with database.session() as db:
+            assert isinstance(db, AsyncSession if enabled else ThreadedSession)
+            return await db.run_sync(read, 42), threading.get_ident()
+
+    try:
+        (value, worker), loop = asyncio.run(run())
+    finally:
+        asyncio.run(database.dispose())
+    assert value == 42
+    # Async sessions run the function on the event loop; threaded ones off it.
+    assert (worker == loop) == enabled
+    assert database._engine is None
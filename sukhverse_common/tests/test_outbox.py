@@ -0,0 +1,131 @@
+import pytest
+from sqlalchemy import Column, Integer, String, create_engine
+from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from sukhverse_common.events import outbox
+from sukhverse_common.events.testing import InMemoryBroker
+
+Base = declarative_base()
+
+
+class Account(Base):
+    __tablename__ = "accounts"
+    id = Column(Integer, primary_key=True)
+    email = Column(String(100), nullable=False)
+
+
+OutboxEvent = outbox.make_outbox_model(Base)
+
+
+def make_session_factory():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine, autoflush=False)
+
+
+def test_events_commit_and_roll_back_with_the_domain_write():
+    Session = make_session_factory()
+    broker = InMemoryBroker()
+    relay = outbox.OutboxRelay(Session, OutboxEvent, lambda: broker, batch_size=10)
+
+    with Session() as db:
+        account = Account(email="kept@example.com")
+        db.add(account)
+        db.flush()
+        outbox.enqueue(db, OutboxEvent, "user_registered", {"user_id": account.id}, key=str(account.id))
+        db.commit()
+
+    with Session() as db:
+        db.add(Account(email="dropped@example.com"))
+        outbox.enqueue(db, OutboxEvent, "user_registered", {"user_id": 999})
+        db.rollback()
+
+    assert broker.messages == []
+    assert relay.drain_once() == 1
+    assert [(m["topic"], m["value"], m["key"]) for m in broker.messages] == [("user_registered", {"user_id": 1}, "1")]
+    assert relay.drain_once() == 0
+
+
+def test_relay_drains_in_batches_with_one_flush_each():
+    Session = make_session_factory()
+    broker = InMemoryBroker()
+    relay = outbox.OutboxRelay(Session, OutboxEvent, lambda: broker, batch_size=4)
+
+    with Session() as db:
+        outbox.enqueue_many(db, OutboxEvent, "user_profile_updated", ({"user_id": i} for i in range(10)), "user_id")
+        db.commit()
+
+    assert [relay.drain_once() for _ in range(4)] == [4, 4, 2, 0]
+    assert broker.flushes == 3
+    assert [m["user_id"] for m in broker.topic("user_profile_updated")] == list(range(10))
+    with Session() as db:
+        assert db.query(OutboxEvent).filter(OutboxEvent.sent_at.is_(None)).count() == 0
+
+
+def test_failed_send_leaves_rows_pending():
+    Session = make_session_factory()
+
+    broker = InMemoryBroker()
+    relay = outbox.OutboxRelay(Session, OutboxEvent, lambda: broker, batch_size=10)
+
+    with Session() as db:
+        outbox.enqueue(db, OutboxEvent, "quiz_submitted", {"quiz_id": 1})
+        db.commit()
+
+    broker.fail_with = RuntimeError("broker unavailable")
+    with pytest.raises(RuntimeError):
+        relay.drain_once()
+    assert relay.drain_once() == 1
+    assert broker.topic("quiz_submitted") == [{"quiz_id": 1}]
+
+
+def test_a_row_that_cannot_be_encoded_does_not_block_the_rest(caplog):
+    from sukhverse_common.events import serializers
+    from sukhverse_common.events.bus import EventBus
+
+    Session = make_session_factory()
+    broker = InMemoryBroker()
+    bus = EventBus("test", serializer=serializers.get_serializer("msgpack"), producer_factory=lambda: broker)
+    relay = outbox.OutboxRelay(Session, OutboxEvent, lambda: bus, batch_size=10, max_attempts=2)
+
+    with Session() as db:
+        outbox.enqueue(db, OutboxEvent, "quiz_submitted", {"quiz_id": 1, "user_id": 1, "score": 90, "pass_fail": True})
+        outbox.enqueue(db, OutboxEvent, "quiz_submitted", {"quiz_id": "one", "user_id": 2})
+        outbox.enqueue(db, OutboxEvent, "quiz_submitted", {"quiz_id": 3, "user_id": 3, "score": 10, "pass_fail": False})
+        db.commit()
+
+    assert relay.drain_once() == 2
+    assert [bus.serializer.loads(value, "quiz_submitted")["user_id"] for value in broker.topic("quiz_submitted")] == [1, 3]
+    assert relay.drain_once() == 0
+    assert relay.drain_once() == 0
+    assert relay.metrics() == {"relayed": 2, "row_failures": 2, "given_up": 1}
+    assert "Giving up on outbox event 2" in caplog.text
+
+    with Session() as db:
+        poison = db.get(OutboxEvent, 2)
+        assert (poison.sent_at, poison.attempts, poison.failed_at is not None) == (None, 2, True)
+
+
+def test_publishers_keep_order_across_topics_with_and_without_the_outbox():
+    from sukhverse_common.events.bus import EventBus
+    from sukhverse_common.events.publisher import make_publishers
+
+    broker = InMemoryBroker()
+    publish_event, publish_events = make_publishers(EventBus("test", producer_factory=lambda: broker), OutboxEvent)
+    progress = [
+        {"user_id": 7, "workshop_id": 1, "step_id": 2, "substep_id": n, "status": status}
+        for n, status in enumerate(["in_progress", "completed", "in_progress"])
+    ]
+    topic = lambda message: "step_completed" if message["status"] == "completed" else "step_updated"  # noqa: E731
+
+    Session = make_session_factory()
+    with Session() as db:
+        publish_events(topic, progress, key_field="user_id", db=db)
+        publish_event("user_registered", {"user_id": 7, "email": "a@example.com"}, db=db)
+        db.commit()
+        rows = db.query(OutboxEvent.topic, OutboxEvent.key).order_by(OutboxEvent.id).all()
+    assert rows == [("step_updated", "7"), ("step_completed", "7"), ("step_updated", "7"), ("user_registered", None)]
+
+    publish_events(topic, progress)
+    assert [m["topic"] for m in broker.messages] == ["step_updated", "step_completed", "step_updated"]
@@ -0,0 +1,54 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import Column, DateTime, Integer, create_engine
+from sqlalchemy.orm import Session, declarative_base
+
+from sukhverse_common import pagination
+
+Base = declarative_base()
+
+
+class Item(Base):
+    __tablename__ = "items"
+    id = Column(Integer, primary_key=True)
+    owner = Column(Integer, nullable=False)
+    created_at = Column(DateTime, nullable=False)
+
+
+@pytest.fixture()
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    with Session(engine) as session:
+        # Timestamps repeat, so only (created_at, id) is unique.
+        session.add_all(
+            Item(id=n, owner=n % 2, created_at=datetime(2026, 1, 1 + n // 3)) for n in range(1, 21)
+        )
+        session.commit()
+        yield session
+
+
+def walk(db, limit, descending):
+    columns = [Item.created_at, Item.id]
+    seen, cursor = [], None
+    while True:
+        page = pagination.paginate(db.query(Item).filter(Item.owner == 0), columns, cursor, limit, descending)
+        seen.append([item.id for item in page.items])
+        if page.next_cursor is None:
+            return seen
+        cursor = page.next_cursor
+
+
+def test_pages_follow_the_cursor_without_gaps_or_repeats(db):
+    assert walk(db, 4, descending=False) == [[2, 4, 6, 8], [10, 12, 14, 16], [18, 20]]
+    assert walk(db, 5, descending=True) == [[20, 18, 16, 14, 12], [10, 8, 6, 4, 2]]
+
+
+def test_bad_cursors_are_rejected(db):
+    columns = [Item.created_at, Item.id]
+    assert pagination.decode_cursor(pagination.encode_cursor([datetime(2026, 1, 2), 7]), columns) == [datetime(2026, 1, 2), 7]
+    for cursor in ["!!", pagination.encode_cursor([1]), pagination.encode_cursor(["2026-01-02T00:00:00", "7"]),
+                   pagination.encode_cursor(["yesterday", 7]), pagination.encode_cursor(["2026-01-02T00:00:00", True])]:
+        with pytest.raises(pagination.InvalidCursor):
+            pagination.decode_cursor(cursor, columns)
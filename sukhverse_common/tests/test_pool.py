@@ -0,0 +1,69 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from sukhverse_common.pool import BoundedPool, PoolBusy
+
+
+class BusyError(PoolBusy):
+    message = "Test pool is saturated"
+
+
+class SmallPool(BoundedPool):
+    busy_error = BusyError
+    queue_per_worker = 2
+
+
+def fail():
+    raise RuntimeError("boom")
+
+
+def die():
+    os._exit(1)
+
+
+def test_pool_counts_outcomes_and_rejects_with_its_busy_error():
+    pool = SmallPool(workers=1, retry_after=5, executor_factory=lambda n: ThreadPoolExecutor(max_workers=n))
+    assert (pool.max_queue, pool.capacity) == (2, 3)
+
+    async def scenario():
+        assert await pool.run(sum, [1, 2]) == 3
+        with pytest.raises(RuntimeError):
+            await pool.run(fail)
+        pool._in_flight = pool.capacity
+        with pytest.raises(BusyError) as excinfo:
+            await pool.run(sum, [])
+        pool._in_flight = 0
+        return excinfo.value
+
+    error = asyncio.run(scenario())
+    assert (str(error), error.retry_after) == ("Test pool is saturated", 5)
+    metrics = pool.metrics()
+    assert (metrics["completed"], metrics["failed"], metrics["rejected"], metrics["in_flight"]) == (1, 1, 1, 0)
+    pool.shutdown()
+
+
+def test_a_dead_worker_is_replaced_instead_of_breaking_the_pool():
+    pool = SmallPool(workers=1, retry_after=2)
+
+    async def scenario():
+        assert await pool.run(sum, [1, 2]) == 3
+        broken = pool._executor
+        with pytest.raises(BusyError) as excinfo:
+            await pool.run(die)
+        assert excinfo.value.retry_after == 2
+        assert await pool.run(sum, [3, 4]) == 7
+        assert pool._executor is not broken
+
+        # A pool that broke between jobs is replaced when the next job is submitted.
+        with pytest.raises(BusyError):
+            await pool.run(die)
+        pool._executor = broken
+        assert await pool.run(sum, [5, 6]) == 11
+
+    asyncio.run(scenario())
+    metrics = pool.metrics()
+    assert (metrics["completed"], metrics["failed"], metrics["restarts"], metrics["in_flight"]) == (3, 2, 3, 0)
+    pool.shutdown()
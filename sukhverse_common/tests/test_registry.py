@@ -0,0 +1,83 @@
+import json
+
+import pytest
+
+from sukhverse_common.events import serializers
+from sukhverse_common.events.registry import SchemaError, SchemaRegistry, registry
+
+
+def write_schema(directory, name, versions):
+    (directory / f"{name}.json").write_text(json.dumps({"name": name, "versions": versions}))
+
+
+def field(id, name, type="int", required=True, **extra):
+    return dict(id=id, name=name, type=type, required=required, **extra)
+
+
+def test_round_trip_is_smaller_than_json():
+    message = {"quiz_id": 12, "user_id": 34567, "score": 80, "pass_fail": True, "workshop_id": 3, "result_id": 901}
+    encoded = registry.encode("quiz_submitted", message)
+
+    assert registry.decode("quiz_submitted", encoded) == message
+    assert len(encoded) < len(json.dumps(message)) / 3
+
+
+@pytest.mark.parametrize(
+    "message",
+    [
+        {"quiz_id": 1, "user_id": 2, "score": 80},
+        {"quiz_id": 1, "user_id": 2, "score": "80", "pass_fail": True},
+        {"quiz_id": True, "user_id": 2, "score": 80, "pass_fail": True},
+        {"quiz_id": 1, "user_id": 2, "score": 80, "pass_fail": True, "passed": True},
+    ],
+)
+def test_invalid_messages_fail_fast(message):
+    with pytest.raises(SchemaError):
+        registry.validate("quiz_submitted", message)
+
+
+def test_unknown_topic_is_rejected():
+    with pytest.raises(SchemaError):
+        registry.encode("quiz_sbumitted", {"quiz_id": 1})
+
+
+def test_optional_fields_may_be_omitted():
+    encoded = registry.encode("certificate_issued", {"certificate_id": 1, "user_id": 2})
+    assert registry.decode("certificate_issued", encoded) == {"certificate_id": 1, "user_id": 2, "file_url": None}
+
+
+def test_readers_and_writers_on_different_versions(tmp_path):
+    v1 = {"version": 1, "fields": [field(1, "user_id")]}
+    v2 = {"version": 2, "fields": [field(1, "user_id"), field(2, "source", "str", False, default="web")]}
+    old_dir, new_dir = tmp_path / "old", tmp_path / "new"
+    old_dir.mkdir()
+    new_dir.mkdir()
+    write_schema(old_dir, "user_registered", [v1])
+    write_schema(new_dir, "user_registered", [v1, v2])
+    old, new = SchemaRegistry(str(old_dir)), SchemaRegistry(str(new_dir))
+
+    from_new = new.encode("user_registered", {"user_id": 1, "source": "csv"})
+    assert old.decode("user_registered", from_new) == {"user_id": 1}
+    from_old = old.encode("user_registered", {"user_id": 1})
+    assert new.decode("user_registered", from_old) == {"user_id": 1, "source": "web"}
+
+
+def test_reusing_a_field_id_is_rejected(tmp_path):
+    write_schema(
+        tmp_path,
+        "user_registered",
+        [
+            {"version": 1, "fields": [field(1, "user_id")]},
+            {"version": 2, "fields": [field(1, "email", "str")]},
+        ],
+    )
+    with pytest.raises(SchemaError):
+        SchemaRegistry(str(tmp_path))
+
+
+def test_decode_dispatches_on_content_type_header():
+    msgpack_serializer = serializers.get_serializer("msgpack")
+    value = msgpack_serializer.dumps({"user_id": 5, "role_id": 1, "assigned_by": 2}, "role_assigned")
+    headers = [(serializers.CONTENT_TYPE_HEADER, msgpack_serializer.content_type.encode("ascii"))]
+
+    assert serializers.decode(value, headers, "role_assigned")["user_id"] == 5
@@ -0,0 +1,29 @@
+from sqlalchemy import Boolean, Column, Integer, create_engine
+from sqlalchemy.orm import declarative_base, sessionmaker
+
+from sukhverse_common import substeps
+
+Base = declarative_base()
+
+
+class SubstepState(Base):
+    __tablename__ = "substep_states"
+    user_id = Column(Integer, primary_key=True)
+    workshop_id = Column(Integer, primary_key=True)
+    substep_id = Column(Integer, primary_key=True)
+    completed = Column(Boolean, nullable=False, default=False)
+
+
+def test_only_status_transitions_are_counted():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+
+    with Session() as db:
+        first = {(7, 1, 1): True, (7, 1, 2): True, (7, 1, 3): False, (8, 1, 1): True, (7, 2, 1): True}
+        assert substeps.count_transitions(db, SubstepState, first) == {(1, 7): 2, (1, 8): 1, (2, 7): 1}
+        # Redelivered statuses count nothing; reopening a substep counts down.
+        again = {(7, 1, 1): True, (7, 1, 2): False, (7, 1, 3): True, (8, 1, 1): True}
+        assert substeps.count_transitions(db, SubstepState, again) == {(1, 7): 0}
+        assert substeps.count_transitions(db, SubstepState, {}) == {}
+        assert db.query(SubstepState).filter(SubstepState.completed).count() == 4
@@ -0,0 +1,98 @@
+import time
+from typing import NamedTuple
+
+import pytest
+from sqlalchemy import Column, ForeignKey, Integer, String, create_engine
+from sqlalchemy.orm import declarative_base, relationship, sessionmaker
+
+from sukhverse_common.versioned_cache import VersionedCache, track_versions
+
+Base = declarative_base()
+
+
+class Root(Base):
+    __tablename__ = "versioned_roots"
+    id = Column(Integer, primary_key=True)
+    name = Column(String(50))
+    version = Column(Integer, nullable=False, default=1)
+    children = relationship("Child", back_populates="root")
+
+
+class Child(Base):
+    __tablename__ = "versioned_children"
+    id = Column(Integer, primary_key=True)
+    root_id = Column(Integer, ForeignKey("versioned_roots.id"))
+    name = Column(String(50))
+    root = relationship("Root", back_populates="children")
+
+
+class Entry(NamedTuple):
+    version: int
+    expires_at: float
+
+
+def root_id(session, instance):
+    if isinstance(instance, Root):
+        return instance.id
+    if isinstance(instance, Child):
+        return instance.root_id
+    return None
+
+
+cache = VersionedCache(size=2, ttl=60)
+track_versions(cache, Root, root_id)
+
+
+def test_lru_keeps_the_newest_version_and_evicts_the_oldest_key():
+    lru = VersionedCache(size=2, ttl=60)
+    lru.put(1, Entry(2, lru.expiry()))
+    lru.put(1, Entry(1, lru.expiry()))
+    assert lru.get(1).version == 2
+    lru.put(2, Entry(1, lru.expiry()))
+    lru.get(1)
+    lru.put(3, Entry(1, lru.expiry()))
+    assert lru.get(2) is None and lru.get(1) is not None
+    lru.put(4, Entry(1, time.monotonic() - 1))
+    assert lru.get(4) is None
+
+
+def test_a_load_that_overlaps_an_invalidation_is_not_cached():
+    lru = VersionedCache(size=2, ttl=60)
+    generation = lru.generation(1)
+    lru.invalidate([1])
+    lru.put(1, Entry(1, lru.expiry()), generation)
+    assert lru.get(1) is None
+    lru.put(1, Entry(2, lru.expiry()), lru.generation(1))
+    assert lru.get(1).version == 2
+
+
+def test_a_failed_load_releases_its_loading_lock():
+    lru = VersionedCache(size=2, ttl=60)
+    with pytest.raises(RuntimeError):
+        with lru.loading(1):
+            raise RuntimeError("compile failed")
+    assert lru._loading == {}
+    with lru.loading(1):
+        lru.put(1, Entry(1, lru.expiry()))
+    assert lru.get(1) is not None
+
+
+def test_committed_writes_bump_the_root_version_and_invalidate():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    db = Session()
+    root = Root(name="r", children=[Child(name="c")])
+    db.add(root)
+    db.commit()
+    assert root.version == 1
+
+    cache.put(root.id, Entry(root.version, cache.expiry()))
+    root.children[0].name = "renamed"
+    db.rollback()
+    assert cache.get(root.id) is not None and root.version == 1
+
+    root.children[0].name = "renamed"
+    db.commit()
+    assert cache.get(root.id) is None and root.version == 2
+    db.close()
@@ -0,0 +1,146 @@
+"""
+In-process caches of entities that carry a `version` column.
+
+`VersionedCache` is a thread-safe LRU with a TTL whose entries record the
+version they were built from, so a slow load never replaces a newer
+entry.  `loading(key)` lets a burst of misses on one key load it once.
+A load reads `generation(key)` before it starts and passes it to `put`,
+which drops the entry if the key was invalidated in the meantime.
+
+`track_versions` wires a cache to the ORM: whenever a flush writes the
+root entity or one of its children, the root's `version` is bumped in
+the same transaction and its entry is dropped once the transaction
+commits.  Writes that bypass the ORM must call `invalidate` themselves.
+Other processes pick up a write when their entry expires.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Hashable, Iterable, Iterator, Optional, Set
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+
+class VersionedCache:
+    """LRU of entries with `version` and `expires_at` attributes, safe to share between threads."""
+
+    def __init__(self, size: int, ttl: float) -> None:
+        self.size = size
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._loading: Dict[Hashable, threading.Lock] = {}
+        # Bumped by every invalidation of a key.
+        self._generations: Dict[Hashable, int] = {}
+
+    def expiry(self) -> float:
+        """`expires_at` for an entry built now."""
+        return time.monotonic() + self.ttl
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def generation(self, key: Hashable) -> int:
+        """Read before loading `key`, for `put`."""
+        with self._lock:
+            return self._generations.get(key, 0)
+
+    def put(self, key: Hashable, entry: Any, generation: Optional[int] = None) -> None:
+        with self._lock:
+            # The entry was loaded before the key was last invalidated.
+            if generation is not None and self._generations.get(key, 0) != generation:
+                return
+            current = self._entries.get(key)
+            # A slow load must not replace what a newer one already cached.
+            if current is not None and current.version > entry.version:
+                return
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    @contextmanager
+    def loading(self, key: Hashable) -> Iterator[None]:
+        """Held while loading `key`, so concurrent misses wait for one load."""
+        with self._lock:
+            lock = self._loading.setdefault(key, threading.Lock())
+        with lock:
+            try:
+                yield
+            finally:
+                with self._lock:
+                    self._loading.pop(key, None)
+
+    def invalidate(self, keys: Iterable[Hashable]) -> None:
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+                self._generations[key] = self._generations.get(key, 0) + 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._loading.clear()
+
+
+def track_versions(cache: VersionedCache, root: Any, root_id: Callable[[Session, object], Optional[int]]) -> None:
+    """Bump `root.version` and invalidate `cache` on ORM writes to a root or its children.
+
+    `root_id(session, instance)` returns the id of the root an instance
+    belongs to, or None for instances of unrelated models.
+    """
+    touched_key = f"versioned_cache_touched_{root.__tablename__}"
+    created_key = f"versioned_cache_created_{root.__tablename__}"
+    table = root.__table__
+
+    @event.listens_for(Session, "before_flush")
+    def _collect_touched(session: Session, flush_context, instances) -> None:
+        created: Set[int] = session.info.setdefault(created_key, set())
+        touched: Set[int] = session.info.setdefault(touched_key, set())
+        bump: Set[int] = set()
+        for instance in list(session.new) + list(session.dirty) + list(session.deleted):
+            if isinstance(instance, root) and instance in session.new:
+                continue
+            key = root_id(session, instance)
+            if key is None:
+                continue
+            touched.add(key)
+            if key not in created:
+                bump.add(key)
+        if bump:
+            # Core UPDATE: ORM-loaded instances pick the new version up when
+            # they expire at commit.
+            session.execute(
+                table.update()
+                .where(table.c.id.in_(sorted(bump)))
+                .values(version=table.c.version + 1)
+            )
+
+    @event.listens_for(Session, "after_flush")
+    def _collect_created(session: Session, flush_context) -> None:
+        for instance in session.new:
+            if isinstance(instance, root):
+                session.info.setdefault(created_key, set()).add(instance.id)
+
+    @event.listens_for(Session, "after_commit")
+    def _invalidate_touched(session: Session) -> None:
+        touched = session.info.pop(touched_key, None)
+        session.info.pop(created_key, None)
+        if touched:
+            cache.invalidate(touched)
+
+    @event.listens_for(Session, "after_rollback")
+    def _forget_touched(session: Session) -> None:
+        session.info.pop(touched_key, None)
+        session.info.pop(created_key, None)
@@ -2,13 +2,16 @@
 API routes for the user management service.
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
+import os
+
+from fastapi import APIRouter, BackgroundTasks, Depends, File, Form, HTTPException, UploadFile, status
 from sqlalchemy.orm import Session
 
 from ..database import get_db
-from ..schemas.user import UserProfileCreate, UserProfileOut, RoleAssignment
-from ..models.user_profile import UserProfile
-from ..services import user_service
+from ..schemas.user import BulkUploadLogOut, UserProfileCreate, UserProfileOut, RoleAssignment
+from ..models.user_profile import BulkUploadLog, UserProfile
+from ..services import bulk_import, user_service
+from ..utils import auth_client
 
 router = APIRouter(prefix="/users", tags=["users"])
 
@@ -31,4 +34,35 @@ def upsert_profile(profile_in: UserProfileCreate, db: Session = Depends(get_db))
 def assign_role_endpoint(user_id: int, assignment: RoleAssignment, db: Session = Depends(get_db)):
     # TODO: call auth service to persist role assignment
     record = user_service.assign_role(db, user_id=user_id, role_id=assignment.role_id, assigned_by=assignment.assigned_by)
-    return {"message": "Role assigned", "assignment_id": record.id}
\ No newline at end of file
+    auth_client.invalidate_user(user_id)
+    return {"message": "Role assigned", "assignment_id": record.id}
+
+
+@router.post("/bulk-upload", response_model=BulkUploadLogOut, status_code=status.HTTP_202_ACCEPTED)
+def bulk_upload(
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(...),
+    uploader_user_id: int = Form(...),
+    db: Session = Depends(get_db),
+):
+    """Accept a CSV of profiles (user_id,bio,contact_number,department) for background import."""
+    path = bulk_import.spool_upload(file.file)
+    try:
+        log = BulkUploadLog(filename=file.filename or "upload.csv", uploader_user_id=uploader_user_id, status="pending")
+        db.add(log)
+        db.commit()
+        db.refresh(log)
+        background_tasks.add_task(bulk_import.run_bulk_import, log.id, path)
+    except BaseException:
+        # The background job never runs, so nothing else deletes the file.
+        os.remove(path)
+        raise
+    return log
+
+
+@router.get("/bulk-upload/{log_id}", response_model=BulkUploadLogOut)
+def get_bulk_upload(log_id: int, db: Session = Depends(get_db)):
+    log = db.query(BulkUploadLog).filter(BulkUploadLog.id == log_id).first()
+    if not log:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Upload not found")
+    return log
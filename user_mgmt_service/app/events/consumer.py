@@ -0,0 +1,78 @@
+"""
+Kafka consumer that keeps the identity cache in `utils.auth_client` fresh.
+
+Every process subscribes without a consumer group so each instance sees
+every `role_assigned` and `user_registered` event and drops the cached
+identity for the affected user.
+"""
+
+import logging
+import os
+import threading
+from typing import Any, Optional
+
+from sukhverse_common.events import serializers
+
+from ..utils import auth_client
+
+logger = logging.getLogger(__name__)
+
+IDENTITY_TOPICS = ("role_assigned", "user_registered")
+CONSUMER_ENABLED = os.getenv("IDENTITY_EVENTS_ENABLED", "true").lower() == "true"
+
+
+class IdentityEventConsumer:
+    """Background thread invalidating cached identities on identity events."""
+
+    def __init__(self, poll_timeout_ms: int = 1000, retry_seconds: float = 5.0) -> None:
+        self.poll_timeout_ms = poll_timeout_ms
+        self.retry_seconds = retry_seconds
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _connect(self) -> Any:
+        from kafka import KafkaConsumer
+
+        return KafkaConsumer(
+            *IDENTITY_TOPICS,
+            bootstrap_servers=os.getenv("KAFKA_BOOTSTRAP_SERVERS", "kafka:9092"),
+            group_id=None,
+            auto_offset_reset="latest",
+        )
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                consumer = self._connect()
+            except Exception:
+                logger.exception("Identity event consumer could not connect; retrying")
+                self._stop.wait(self.retry_seconds)
+                continue
+            try:
+                while not self._stop.is_set():
+                    batches = consumer.poll(timeout_ms=self.poll_timeout_ms)
+                    for records in batches.values():
+                        for record in records:
+                            user_id = (serializers.decode(record.value, record.headers, record.topic) or {}).get("user_id")
+                            if user_id is not None:
+                                auth_client.invalidate_user(int(user_id))
+            except Exception:
+                logger.exception("Identity event consumer failed; reconnecting")
+                self._stop.wait(self.retry_seconds)
+            finally:
+                consumer.close()
+
+    def start(self) -> None:
+        if CONSUMER_ENABLED and self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="identity-events", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+
+identity_consumer = IdentityEventConsumer()
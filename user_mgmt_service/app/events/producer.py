@@ -1,28 +1,20 @@
 """
-Kafka producer for the user management service.
-"""
-
-import json
-import os
-from typing import Dict
+Event publishing for the user management service.
 
-from kafka import KafkaProducer
+Thin bindings of the shared `sukhverse_common` event bus and outbox to
+this service's database; see `sukhverse_common.events.publisher`.
+"""
 
-_producer = None
+from sukhverse_common.events import outbox
+from sukhverse_common.events.bus import EventBus
+from sukhverse_common.events.publisher import make_publishers
 
+from .. import database
+from ..models.outbox import OutboxEvent
 
-def get_producer() -> KafkaProducer:
-    global _producer
-    if _producer is None:
-        bootstrap_servers = os.getenv("KAFKA_BOOTSTRAP_SERVERS", "kafka:9092")
-        _producer = KafkaProducer(
-            bootstrap_servers=bootstrap_servers,
-            value_serializer=lambda v: json.dumps(v).encode("utf-8"),
-            key_serializer=lambda k: k.encode("utf-8") if k else None,
-        )
-    return _producer
 
+bus = EventBus(client_id="user_mgmt_service")
+publish_event, publish_events = make_publishers(bus, OutboxEvent)
 
-def publish_event(topic: str, message: Dict, key: str | None = None) -> None:
-    producer = get_producer()
-    producer.send(topic, value=message, key=key)
\ No newline at end of file
+# Background relay draining the outbox table to Kafka.
+outbox_relay = outbox.OutboxRelay(lambda: database.SessionLocal(), OutboxEvent, lambda: bus)
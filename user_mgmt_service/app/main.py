@@ -5,9 +5,14 @@ Entrypoint for the user management microservice.
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from sukhverse_common.events.bus import metrics_router
+
 from .database import engine
 from .models.base import Base
 from .api.routes_user import router as user_router
+from .events.producer import bus, outbox_relay
+from .events.consumer import identity_consumer
+from .utils.auth_client import close_client
 
 
 def init_db() -> None:
@@ -24,6 +29,14 @@ def create_app() -> FastAPI:
     )
     init_db()
     app.include_router(user_router)
+    app.include_router(metrics_router(bus, outbox_relay))
+    app.add_event_handler("startup", outbox_relay.start)
+    app.add_event_handler("shutdown", outbox_relay.stop)
+    # Registered after the relay so its final drain is flushed too.
+    app.add_event_handler("shutdown", bus.aclose)
+    app.add_event_handler("startup", identity_consumer.start)
+    app.add_event_handler("shutdown", identity_consumer.stop)
+    app.add_event_handler("shutdown", close_client)
     return app
 
 
@@ -0,0 +1,9 @@
+"""
+Outbox table holding events written in the same transaction as domain changes.
+"""
+
+from sukhverse_common.events.outbox import make_outbox_model
+
+from .base import Base
+
+OutboxEvent = make_outbox_model(Base)
@@ -2,7 +2,7 @@
 SQLAlchemy models for the user management microservice.
 """
 
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, JSON
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 
@@ -24,8 +24,13 @@ class BulkUploadLog(Base):
     id = Column(Integer, primary_key=True, index=True)
     filename = Column(String(255), nullable=False)
     uploader_user_id = Column(Integer, nullable=False)
-    status = Column(String(50), nullable=False, default="pending")
+    status = Column(String(50), nullable=False, default="pending")  # pending, processing, completed, failed
     timestamp = Column(DateTime(timezone=False), server_default=func.now())
+    total_rows = Column(Integer, nullable=False, default=0)
+    processed_rows = Column(Integer, nullable=False, default=0)
+    failed_rows = Column(Integer, nullable=False, default=0)
+    errors_json = Column(JSON, nullable=True)  # [{"row": 12, "error": "..."}], capped
+    completed_at = Column(DateTime(timezone=False), nullable=True)
 
 
 class UserRoleAssignment(Base):
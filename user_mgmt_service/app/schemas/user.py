@@ -2,7 +2,8 @@
 Pydantic models for the user management service.
 """
 
-from typing import Optional, List
+from datetime import datetime
+from typing import Any, Dict, Optional, List
 from pydantic import BaseModel
 
 
@@ -26,4 +27,20 @@ class UserProfileOut(UserProfileBase):
 
 class RoleAssignment(BaseModel):
     role_id: int
-    assigned_by: int
\ No newline at end of file
+    assigned_by: int
+
+
+class BulkUploadLogOut(BaseModel):
+    id: int
+    filename: str
+    uploader_user_id: int
+    status: str
+    total_rows: int
+    processed_rows: int
+    failed_rows: int
+    errors_json: Optional[List[Dict[str, Any]]]
+    timestamp: Optional[datetime]
+    completed_at: Optional[datetime]
+
+    class Config:
+        orm_mode = True
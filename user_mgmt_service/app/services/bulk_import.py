@@ -0,0 +1,190 @@
+"""
+Streaming CSV import of user profiles.
+
+Uploads are spooled to a temporary file and processed by a background
+job in fixed-size chunks, so memory use does not grow with file size.
+Each chunk is validated, upserted in one round trip (COPY into a staging
+table on PostgreSQL, an executemany `INSERT ... ON CONFLICT` elsewhere)
+and committed together with one outbox batch of `user_profile_updated`
+events.  Progress, row counts and per-row errors
+are recorded on the `BulkUploadLog` row as the job runs.
+"""
+
+import csv
+import io
+import logging
+import os
+import shutil
+import tempfile
+from datetime import datetime
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from .. import database
+from ..events.producer import publish_events
+from ..models.user_profile import BulkUploadLog, UserProfile
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = int(os.getenv("BULK_UPLOAD_CHUNK_SIZE", "5000"))
+# Per-row errors kept on the log; later errors are only counted.
+MAX_RECORDED_ERRORS = 1000
+
+COLUMNS = ("user_id", "bio", "contact_number", "department")
+MAX_LENGTHS = {"bio": 255, "contact_number": 20, "department": 100}
+
+Row = Dict[str, Optional[str]]
+
+
+def spool_upload(source: BinaryIO) -> str:
+    """Copy an uploaded file to disk in small blocks and return its path."""
+    with tempfile.NamedTemporaryFile(prefix="bulk-upload-", suffix=".csv", delete=False) as target:
+        try:
+            shutil.copyfileobj(source, target, length=1024 * 1024)
+        except BaseException:
+            os.remove(target.name)
+            raise
+        return target.name
+
+
+def iter_chunks(path: str, chunk_size: int = CHUNK_SIZE) -> Iterator[List[Tuple[int, Row]]]:
+    """Yield lists of `(line_number, row)` read lazily from the CSV at `path`."""
+    with open(path, newline="", encoding="utf-8-sig") as handle:
+        reader = csv.DictReader(handle)
+        missing = {"user_id"} - set(reader.fieldnames or ())
+        if missing:
+            raise ValueError(f"CSV is missing required column(s): {', '.join(sorted(missing))}")
+        chunk: List[Tuple[int, Row]] = []
+        for row in reader:
+            chunk.append((reader.line_num, row))
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+
+def validate_chunk(rows: List[Tuple[int, Row]]) -> Tuple[List[Dict], List[Dict]]:
+    """Split a chunk into upsertable records and per-row errors.
+
+    Later rows for the same `user_id` win, since a single upsert statement
+    cannot touch the same row twice.
+    """
+    records: Dict[int, Dict] = {}
+    errors: List[Dict] = []
+    for line, row in rows:
+        try:
+            user_id = int((row.get("user_id") or "").strip())
+        except ValueError:
+            errors.append({"row": line, "error": "user_id must be an integer"})
+            continue
+        record: Dict = {"user_id": user_id}
+        for column in COLUMNS[1:]:
+            value = (row.get(column) or "").strip() or None
+            if value is not None and len(value) > MAX_LENGTHS[column]:
+                errors.append({"row": line, "error": f"{column} longer than {MAX_LENGTHS[column]} characters"})
+                break
+            record[column] = value
+        else:
+            records[user_id] = record
+    return list(records.values()), errors
+
+
+def _copy_upsert(db: Session, records: List[Dict], uploader_user_id: int) -> None:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for record in records:
+        writer.writerow([record[column] for column in COLUMNS] + [uploader_user_id])
+    buffer.seek(0)
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.execute(
+            "CREATE TEMP TABLE IF NOT EXISTS user_profiles_staging "
+            "(LIKE user_profiles INCLUDING DEFAULTS) ON COMMIT DELETE ROWS"
+        )
+        cursor.copy_expert(
+            "COPY user_profiles_staging (user_id, bio, contact_number, department, created_by) "
+            "FROM STDIN WITH (FORMAT csv)",
+            buffer,
+        )
+        cursor.execute(
+            "INSERT INTO user_profiles (user_id, bio, contact_number, department, created_by) "
+            "SELECT user_id, bio, contact_number, department, created_by FROM user_profiles_staging "
+            "ON CONFLICT (user_id) DO UPDATE SET bio = EXCLUDED.bio, "
+            "contact_number = EXCLUDED.contact_number, department = EXCLUDED.department"
+        )
+    finally:
+        cursor.close()
+
+
+def _insert_upsert(db: Session, records: List[Dict], uploader_user_id: int) -> None:
+    # One cached statement executed with the whole chunk as parameters;
+    # compiling a literal multi-row VALUES clause costs more than the insert.
+    dialect = db.bind.dialect.name
+    if dialect == "postgresql":
+        insert = postgresql.insert
+    elif dialect == "sqlite":
+        insert = sqlite.insert
+    else:
+        raise NotImplementedError(f"Bulk profile upserts need PostgreSQL or SQLite, not {dialect}")
+    stmt = insert(UserProfile.__table__)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[UserProfile.user_id],
+        set_={column: stmt.excluded[column] for column in COLUMNS[1:]},
+    )
+    db.execute(stmt, [dict(record, created_by=uploader_user_id) for record in records])
+
+
+def upsert_profiles(db: Session, records: List[Dict], uploader_user_id: int) -> None:
+    """Insert or update `records` in one round trip, without committing."""
+    if not records:
+        return
+    if db.bind.dialect.name == "postgresql":
+        _copy_upsert(db, records, uploader_user_id)
+    else:
+        _insert_upsert(db, records, uploader_user_id)
+
+
+def _process(db: Session, log: BulkUploadLog, path: str, chunk_size: int) -> None:
+    errors: List[Dict] = []
+    for rows in iter_chunks(path, chunk_size):
+        records, chunk_errors = validate_chunk(rows)
+        upsert_profiles(db, records, log.uploader_user_id)
+        errors.extend(chunk_errors[: MAX_RECORDED_ERRORS - len(errors)])
+        log.total_rows += len(rows)
+        log.processed_rows += len(rows) - len(chunk_errors)
+        log.failed_rows += len(chunk_errors)
+        log.errors_json = list(errors)
+        publish_events(
+            "user_profile_updated",
+            ({"user_id": record["user_id"]} for record in records),
+            key_field="user_id",
+            db=db,
+        )
+        db.commit()
+
+
+def run_bulk_import(log_id: int, path: str, chunk_size: Optional[int] = None) -> None:
+    """Process a spooled CSV upload, recording progress on its `BulkUploadLog`."""
+    chunk_size = chunk_size or CHUNK_SIZE
+    db = database.SessionLocal()
+    try:
+        log = db.query(BulkUploadLog).filter(BulkUploadLog.id == log_id).one()
+        log.status = "processing"
+        log.errors_json = []
+        db.commit()
+        try:
+            _process(db, log, path, chunk_size)
+            log.status = "completed"
+        except Exception as exc:
+            logger.exception("Bulk upload %s failed", log_id)
+            db.rollback()
+            log.status = "failed"
+            log.errors_json = (log.errors_json or []) + [{"row": None, "error": str(exc)}]
+        log.completed_at = datetime.utcnow()
+        db.commit()
+    finally:
+        db.close()
+        os.remove(path)
@@ -23,16 +23,16 @@ def create_or_update_profile(db: Session, profile_in: UserProfileCreate) -> User
             department=profile_in.department,
         )
         db.add(profile)
+    publish_event("user_profile_updated", {"user_id": profile_in.user_id}, db=db)
     db.commit()
     db.refresh(profile)
-    publish_event("user_profile_updated", {"user_id": profile.user_id})
     return profile
 
 
 def assign_role(db: Session, user_id: int, role_id: int, assigned_by: int) -> UserRoleAssignment:
     assignment = UserRoleAssignment(user_id=user_id, role_id=role_id, assigned_by=assigned_by)
     db.add(assignment)
+    publish_event("role_assigned", {"user_id": user_id, "role_id": role_id, "assigned_by": assigned_by}, db=db)
     db.commit()
     db.refresh(assignment)
-    publish_event("role_assigned", {"user_id": user_id, "role_id": role_id, "assigned_by": assigned_by})
     return assignment
\ No newline at end of file
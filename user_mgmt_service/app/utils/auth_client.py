@@ -2,28 +2,152 @@
 Client for interacting with the auth service via REST.
 
 The user management service uses this client to fetch user identity
-information (email, roles) and to assign roles to users.  In a
-production system you may wish to use service discovery and handle
-authentication between services.
+information (email, roles) and to assign roles to users, identifying
+itself with the `AUTH_SERVICE_TOKEN` shared with the auth service.  In a
+production system you may wish to use service discovery.
+
+A single process-wide `httpx.AsyncClient` is reused so connections to
+the auth service stay alive between calls.  Identity lookups are cached
+for a short time and concurrent lookups of the same user share one
+in-flight request.  Cached entries are dropped when `role_assigned` or
+`user_registered` events arrive (see `events/consumer.py`).
 """
 
+import asyncio
 import os
-from typing import Any, Dict
+import threading
+from typing import Any, Dict, Iterable, List, Optional
 
 import httpx
 
+from sukhverse_common.cache import TTLCache
 
 AUTH_API_URL = os.getenv("AUTH_API_URL", "http://localhost:8000/auth")
+AUTH_SERVICE_TOKEN = os.getenv("AUTH_SERVICE_TOKEN", "")
+# Ids per `/users:batch` request; chunks are fetched concurrently.
+BATCH_CHUNK_SIZE = int(os.getenv("AUTH_BATCH_CHUNK_SIZE", "1000"))
+
+HTTP_TIMEOUT_SECONDS = float(os.getenv("AUTH_HTTP_TIMEOUT_SECONDS", "5"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("AUTH_HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("AUTH_HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+HTTP_KEEPALIVE_EXPIRY_SECONDS = float(os.getenv("AUTH_HTTP_KEEPALIVE_EXPIRY_SECONDS", "30"))
+
+identity_cache = TTLCache(
+    maxsize=int(os.getenv("IDENTITY_CACHE_SIZE", "50000")),
+    ttl=float(os.getenv("IDENTITY_CACHE_TTL_SECONDS", "60")),
+)
+
+_client: Optional[httpx.AsyncClient] = None
+_inflight: Dict[int, "asyncio.Future[Optional[Dict[str, Any]]]"] = {}
+# Bumped on invalidation so a response already in flight is not cached
+# after the event that made it stale.
+_generations: Dict[int, int] = {}
+_generations_lock = threading.Lock()
+
+
+def get_client() -> httpx.AsyncClient:
+    """Lazy-initialise and return the shared keep-alive client."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            base_url=AUTH_API_URL,
+            headers={"X-Service-Token": AUTH_SERVICE_TOKEN} if AUTH_SERVICE_TOKEN else None,
+            timeout=httpx.Timeout(HTTP_TIMEOUT_SECONDS),
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=HTTP_KEEPALIVE_EXPIRY_SECONDS,
+            ),
+        )
+    return _client
+
+
+async def close_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def invalidate_user(user_id: int) -> None:
+    """Drop any cached identity for `user_id`.  Safe to call from any thread."""
+    with _generations_lock:
+        _generations[user_id] = _generations.get(user_id, 0) + 1
+        identity_cache.pop(user_id)
 
 
-async def get_user(user_id: int) -> Dict[str, Any]:
-    async with httpx.AsyncClient(base_url=AUTH_API_URL) as client:
-        resp = await client.get(f"/users/{user_id}")
+def _generation(user_id: int) -> int:
+    with _generations_lock:
+        return _generations.get(user_id, 0)
+
+
+def _store(user: Dict[str, Any], generation: int) -> None:
+    with _generations_lock:
+        if _generations.get(user["id"], 0) == generation:
+            identity_cache.set(user["id"], user)
+
+
+async def _fetch_user(user_id: int, timeout: Optional[float]) -> Optional[Dict[str, Any]]:
+    generation = _generation(user_id)
+    kwargs = {} if timeout is None else {"timeout": timeout}
+    resp = await get_client().get(f"/users/{user_id}", **kwargs)
+    if resp.status_code == 404:
+        return None
+    resp.raise_for_status()
+    user = resp.json()
+    _store(user, generation)
+    return user
+
+
+async def get_user(user_id: int, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+    """Return the identity record for `user_id`, or None if it does not exist."""
+    cached = identity_cache.get(user_id)
+    if cached is not None:
+        return cached
+    future = _inflight.get(user_id)
+    if future is None:
+        future = asyncio.ensure_future(_fetch_user(user_id, timeout))
+        _inflight[user_id] = future
+        future.add_done_callback(lambda _: _inflight.pop(user_id, None))
+    # Shield the shared call so one cancelled caller does not fail the others.
+    return await asyncio.shield(future)
+
+
+async def get_users(
+    user_ids: Iterable[int],
+    chunk_size: int = BATCH_CHUNK_SIZE,
+    timeout: Optional[float] = None,
+) -> Dict[int, Dict[str, Any]]:
+    """Resolve many users at once, keyed by id.  Unknown ids are omitted."""
+    found: Dict[int, Dict[str, Any]] = {}
+    missing: List[int] = []
+    for user_id in dict.fromkeys(user_ids):
+        cached = identity_cache.get(user_id)
+        if cached is not None:
+            found[user_id] = cached
+        else:
+            missing.append(user_id)
+    if not missing:
+        return found
+    chunks = [missing[i : i + chunk_size] for i in range(0, len(missing), chunk_size)]
+    generations = {user_id: _generation(user_id) for user_id in missing}
+    kwargs = {} if timeout is None else {"timeout": timeout}
+
+    async def fetch(chunk: List[int]) -> List[Dict[str, Any]]:
+        resp = await get_client().post("/users:batch", json={"ids": chunk}, **kwargs)
         resp.raise_for_status()
-        return resp.json()
+        return resp.json()["users"]
+
+    results = await asyncio.gather(*(fetch(chunk) for chunk in chunks))
+    for users in results:
+        for user in users:
+            _store(user, generations[user["id"]])
+            found[user["id"]] = user
+    return found
 
 
-async def assign_role(user_id: int, role_id: int) -> None:
-    async with httpx.AsyncClient(base_url=AUTH_API_URL) as client:
-        resp = await client.post(f"/roles/assign", json={"user_id": user_id, "role_id": role_id})
-        resp.raise_for_status()
\ No newline at end of file
+async def assign_role(user_id: int, role_id: int, timeout: Optional[float] = None) -> None:
+    kwargs = {} if timeout is None else {"timeout": timeout}
+    resp = await get_client().post("/roles/assign", json={"user_id": user_id, "role_id": role_id}, **kwargs)
+    resp.raise_for_status()
+    invalidate_user(user_id)
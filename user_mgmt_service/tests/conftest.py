@@ -0,0 +1,57 @@
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+
+@pytest.fixture()
+def client(monkeypatch):
+    os.environ.setdefault("IDENTITY_EVENTS_ENABLED", "false")
+    os.environ.setdefault("OUTBOX_RELAY_ENABLED", "false")
+
+    from user_mgmt_service.app import database as database_module
+    from user_mgmt_service.app.models.base import Base
+
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+    monkeypatch.setattr(database_module, "engine", engine)
+    monkeypatch.setattr(database_module, "SessionLocal", TestingSessionLocal)
+
+    from user_mgmt_service.app.main import create_app
+    from user_mgmt_service.app.database import get_db
+    from user_mgmt_service.app.services import bulk_import, user_service
+
+    def override_get_db():
+        db = TestingSessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    events = []
+
+    def fake_publish_event(topic, message, key=None, db=None):
+        events.append({"topic": topic, "message": message, "key": key})
+
+    def fake_publish_events(topic, messages, key_field=None, db=None):
+        events.append({"topic": topic, "messages": list(messages), "key_field": key_field})
+
+    monkeypatch.setattr(user_service, "publish_event", fake_publish_event)
+    monkeypatch.setattr(bulk_import, "publish_events", fake_publish_events)
+
+    app = create_app()
+    app.dependency_overrides[get_db] = override_get_db
+
+    with TestClient(app) as c:
+        c.event_calls = events
+        c.session_factory = TestingSessionLocal
+        yield c
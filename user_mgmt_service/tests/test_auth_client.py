@@ -0,0 +1,60 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from user_mgmt_service.app.utils import auth_client
+
+
+@pytest.fixture()
+def auth_api(monkeypatch):
+    """Route the shared client to an in-process fake of the auth service."""
+    calls = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.path)
+        await asyncio.sleep(0.01)
+        if request.url.path.endswith("/users:batch"):
+            ids = [int(i) for i in json.loads(request.content)["ids"]]
+            return httpx.Response(200, json={"users": [{"id": i, "email": f"u{i}@x.io", "roles": []} for i in ids if i < 100]})
+        user_id = int(request.url.path.rsplit("/", 1)[1])
+        if user_id >= 100:
+            return httpx.Response(404, json={"detail": "User not found"})
+        return httpx.Response(200, json={"id": user_id, "email": f"u{user_id}@x.io", "roles": []})
+
+    client = httpx.AsyncClient(base_url="http://auth/auth", transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(auth_client, "_client", client)
+    auth_client.identity_cache.clear()
+    yield calls
+    auth_client.identity_cache.clear()
+
+
+def test_concurrent_lookups_share_one_request(auth_api):
+    async def scenario():
+        return await asyncio.gather(*(auth_client.get_user(7) for _ in range(20)))
+
+    results = asyncio.run(scenario())
+    assert all(r["email"] == "u7@x.io" for r in results)
+    assert auth_api == ["/auth/users/7"]
+
+
+def test_cache_is_invalidated_by_events(auth_api):
+    async def lookup():
+        return await auth_client.get_user(3)
+
+    asyncio.run(lookup())
+    asyncio.run(lookup())
+    assert len(auth_api) == 1
+
+    auth_client.invalidate_user(3)
+    asyncio.run(lookup())
+    assert len(auth_api) == 2
+
+
+def test_get_users_only_fetches_missing_ids_in_chunks(auth_api):
+    asyncio.run(auth_client.get_user(1))
+    users = asyncio.run(auth_client.get_users([1, 2, 3, 4, 5, 150], chunk_size=2))
+    assert sorted(users) == [1, 2, 3, 4, 5]
+    assert auth_api.count("/auth/users:batch") == 3
+    assert asyncio.run(auth_client.get_user(404)) is None
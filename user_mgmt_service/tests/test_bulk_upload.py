@@ -0,0 +1,85 @@
+import io
+import os
+from types import SimpleNamespace
+
+import pytest
+
+
+def _upload(client, content, **params):
+    return client.post(
+        "/users/bulk-upload",
+        files={"file": ("profiles.csv", io.BytesIO(content.encode("utf-8")), "text/csv")},
+        data={"uploader_user_id": "42"},
+        **params,
+    )
+
+
+def test_bulk_upload_upserts_profiles_and_records_errors(client, monkeypatch):
+    from user_mgmt_service.app.models.user_profile import UserProfile
+    from user_mgmt_service.app.services import bulk_import
+
+    monkeypatch.setattr(bulk_import, "CHUNK_SIZE", 2)
+    with client.session_factory() as db:
+        db.add(UserProfile(user_id=1, bio="old", department="Ops"))
+        db.commit()
+
+    csv_text = (
+        "user_id,bio,contact_number,department\n"
+        "1,new bio,555-0100,Engineering\n"
+        "2,,555-0101,Sales\n"
+        "oops,bad,,\n"
+        "3,third,,Support\n"
+        "3,third again,,Support\n"
+    )
+    resp = _upload(client, csv_text)
+    assert resp.status_code == 202
+    log_id = resp.json()["id"]
+
+    log = client.get(f"/users/bulk-upload/{log_id}").json()
+    assert log["status"] == "completed"
+    assert log["total_rows"] == 5
+    assert log["processed_rows"] == 4
+    assert log["failed_rows"] == 1
+    assert log["errors_json"] == [{"row": 4, "error": "user_id must be an integer"}]
+
+    with client.session_factory() as db:
+        profiles = {p.user_id: p for p in db.query(UserProfile).all()}
+    assert set(profiles) == {1, 2, 3}
+    assert profiles[1].bio == "new bio" and profiles[1].department == "Engineering"
+    assert profiles[2].bio is None and profiles[2].created_by == 42
+    assert profiles[3].bio == "third again"
+
+    batches = [e for e in client.event_calls if e["topic"] == "user_profile_updated"]
+    assert [len(b["messages"]) for b in batches] == [2, 1, 1]
+
+
+def test_bulk_upload_without_user_id_column_fails(client):
+    resp = _upload(client, "bio,department\nhello,Ops\n")
+    log = client.get(f"/users/bulk-upload/{resp.json()['id']}").json()
+    assert log["status"] == "failed"
+    assert "user_id" in log["errors_json"][-1]["error"]
+
+
+def test_spooled_upload_is_deleted_when_the_log_cannot_be_written(client, monkeypatch):
+    from user_mgmt_service.app.api import routes_user
+    from user_mgmt_service.app.services import bulk_import
+
+    paths = []
+    spool_upload = bulk_import.spool_upload
+    monkeypatch.setattr(bulk_import, "spool_upload", lambda source: paths.append(spool_upload(source)) or paths[-1])
+
+    def broken_log(**kwargs):
+        raise RuntimeError("database unavailable")
+
+    monkeypatch.setattr(routes_user, "BulkUploadLog", broken_log)
+    with pytest.raises(RuntimeError):
+        _upload(client, "user_id\n1\n")
+    assert len(paths) == 1 and not os.path.exists(paths[0])
+
+
+def test_upserts_refuse_unsupported_dialects():
+    from user_mgmt_service.app.services import bulk_import
+
+    db = SimpleNamespace(bind=SimpleNamespace(dialect=SimpleNamespace(name="mysql")))
+    with pytest.raises(NotImplementedError, match="not mysql"):
+        bulk_import.upsert_profiles(db, [{"user_id": 1}], 42)
@@ -2,15 +2,33 @@
 API routes for workshop management.
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
+import os
+from typing import Any, List, Optional
+
+from fastapi import APIRouter, Body, Depends, Header, HTTPException, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from ..database import get_db
-from ..schemas.workshop import WorkshopCreate, WorkshopOut, ProgressUpdate
-from ..services import workshop_service
+from sukhverse_common import bulk, pagination
+
+from ..database import get_async_db, get_db
+from ..schemas.workshop import (
+    WorkshopCreate,
+    WorkshopOut,
+    ImportResultOut,
+    ProgressUpdate,
+    ProgressBatchItemOut,
+    ProgressSummaryOut,
+    SubstepProgressOut,
+)
+from ..services import workshop_cache, workshop_service
 
 router = APIRouter(prefix="/workshops", tags=["workshops"])
 
+PROGRESS_BATCH_MAX = int(os.getenv("PROGRESS_BATCH_MAX", "1000"))
+IMPORT_BATCH_SIZE = int(os.getenv("WORKSHOP_IMPORT_BATCH_SIZE", "200"))
+
 
 @router.post("", response_model=WorkshopOut, status_code=status.HTTP_201_CREATED)
 def create_workshop_route(workshop_in: WorkshopCreate, db: Session = Depends(get_db)):
@@ -20,15 +38,76 @@ def create_workshop_route(workshop_in: WorkshopCreate, db: Session = Depends(get
     return workshop
 
 
+@router.post(":import", response_model=ImportResultOut)
+async def import_workshops_route(request: Request, db: Session = Depends(get_db)):
+    """Create workshops from a JSON Lines body, one `WorkshopCreate` per line.
+
+    The body is read as it streams in and committed every
+    `WORKSHOP_IMPORT_BATCH_SIZE` lines, so a failure part way leaves the
+    earlier batches in place.
+    """
+    # TODO: Determine creator_user_id from auth token
+    creator_user_id = 1
+    results = []
+    async for lines in bulk.iter_batches(bulk.iter_lines(request.stream()), IMPORT_BATCH_SIZE):
+        results += await run_in_threadpool(workshop_service.import_workshops, db, lines, creator_user_id)
+    failed = sum(1 for result in results if result["error"])
+    return {"imported": len(results) - failed, "failed": failed, "results": results}
+
+
 @router.get("/{workshop_id}", response_model=WorkshopOut)
-def get_workshop_route(workshop_id: int, db: Session = Depends(get_db)):
-    workshop = workshop_service.get_workshop(db, workshop_id)
-    if not workshop:
+async def get_workshop_route(workshop_id: int, if_none_match: Optional[str] = Header(None)):
+    # Served from the pre-serialized cache; only a miss touches the database.
+    cached = workshop_cache.cache.get(workshop_id) or await workshop_cache.fetch(workshop_id)
+    if cached is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Workshop not found")
-    return workshop
+    headers = {"ETag": cached.etag, "Cache-Control": "no-cache"}
+    if workshop_cache.etag_matches(if_none_match, cached.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=cached.body, media_type="application/json", headers=headers)
 
 
 @router.post("/progress", status_code=status.HTTP_201_CREATED)
-def update_progress_route(progress: ProgressUpdate, db: Session = Depends(get_db)):
-    record = workshop_service.update_progress(db, progress)
-    return {"message": "Progress recorded", "progress_id": record.id}
\ No newline at end of file
+async def update_progress_route(progress: ProgressUpdate, db: AsyncSession = Depends(get_async_db)):
+    await db.run_sync(workshop_service.update_progress, progress)
+    return {"message": "Progress recorded"}
+
+
+@router.post("/progress:batch", response_model=List[ProgressBatchItemOut])
+async def update_progress_batch_route(items: List[Any] = Body(...), db: AsyncSession = Depends(get_async_db)):
+    # Items are validated one by one so a bad item does not reject the batch.
+    if len(items) > PROGRESS_BATCH_MAX:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {PROGRESS_BATCH_MAX} progress updates per batch",
+        )
+    return await db.run_sync(workshop_service.record_progress_batch, items)
+
+
+@router.get("/user/{user_id}/progress", response_model=List[SubstepProgressOut])
+async def list_user_progress_route(
+    user_id: int,
+    request: Request,
+    response: Response,
+    workshop_id: Optional[int] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(pagination.DEFAULT_PAGE_SIZE, ge=1, le=pagination.MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """A student's substep states by workshop; the next page is linked from the `Link` header."""
+    try:
+        page = await db.run_sync(workshop_service.list_user_progress, user_id, cursor, limit, workshop_id)
+    except pagination.InvalidCursor as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+    link = pagination.next_link(request.url, page.next_cursor)
+    if link:
+        response.headers["Link"] = link
+    return page.items
+
+
+@router.get("/{workshop_id}/progress/{user_id}", response_model=ProgressSummaryOut)
+async def progress_summary_route(workshop_id: int, user_id: int, db: AsyncSession = Depends(get_async_db)):
+    summary = await db.run_sync(workshop_service.get_progress_summary, workshop_id, user_id)
+    if summary is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Workshop not found")
+    return summary
\ No newline at end of file
@@ -5,13 +5,18 @@ Entrypoint for the workshop service.
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from .database import engine
+from sukhverse_common.events.bus import metrics_router
+
+from .database import async_db, engine
 from .models.base import Base
 from .api.routes_workshop import router as workshop_router
+from .events.producer import bus, outbox_relay
+from .services import progress_log
 
 
 def init_db() -> None:
     Base.metadata.create_all(bind=engine)
+    progress_log.ensure_partitions(engine)
 
 
 def create_app() -> FastAPI:
@@ -24,6 +29,12 @@ def create_app() -> FastAPI:
     )
     init_db()
     app.include_router(workshop_router)
+    app.include_router(metrics_router(bus, outbox_relay))
+    app.add_event_handler("startup", outbox_relay.start)
+    app.add_event_handler("shutdown", outbox_relay.stop)
+    # Registered after the relay so its final drain is flushed too.
+    app.add_event_handler("shutdown", bus.aclose)
+    app.add_event_handler("shutdown", async_db.dispose)
     return app
 
 
@@ -2,7 +2,10 @@
 SQLAlchemy models for the workshop service.
 """
 
-from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, ForeignKey
+from datetime import datetime
+
+from sqlalchemy import BigInteger, Column, Integer, String, Text, Boolean, DateTime, ForeignKey, Index, PrimaryKeyConstraint, Sequence
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 
@@ -17,26 +20,30 @@ class Workshop(Base):
     creator_user_id = Column(Integer, nullable=False)
     published_flag = Column(Boolean, default=False)
     created_at = Column(DateTime(timezone=False), server_default=func.now())
+    # Bumped on every write to the workshop or its steps and substeps.
+    version = Column(Integer, nullable=False, default=1)
 
-    steps = relationship("Step", back_populates="workshop", cascade="all, delete-orphan")
+    steps = relationship("Step", back_populates="workshop", cascade="all, delete-orphan", order_by="Step.id")
     trainers = relationship("TrainerWorkshopMapping", back_populates="workshop", cascade="all, delete-orphan")
 
 
 class Step(Base):
     __tablename__ = "steps"
     id = Column(Integer, primary_key=True, index=True)
-    workshop_id = Column(Integer, ForeignKey("workshops.id"), nullable=False)
+    workshop_id = Column(Integer, ForeignKey("workshops.id"), nullable=False, index=True)
     title = Column(String(200), nullable=False)
     step_type = Column(String(50), nullable=False)  # intro, theory, code, quiz, certificate
 
     workshop = relationship("Workshop", back_populates="steps")
-    substeps = relationship("Substep", back_populates="step", cascade="all, delete-orphan")
+    substeps = relationship(
+        "Substep", back_populates="step", cascade="all, delete-orphan", order_by="(Substep.order_index, Substep.id)"
+    )
 
 
 class Substep(Base):
     __tablename__ = "substeps"
     id = Column(Integer, primary_key=True, index=True)
-    step_id = Column(Integer, ForeignKey("steps.id"), nullable=False)
+    step_id = Column(Integer, ForeignKey("steps.id"), nullable=False, index=True)
     title = Column(String(200), nullable=False)
     substep_type = Column(String(50), nullable=False)  # content, quiz, code
     order_index = Column(Integer, nullable=False)
@@ -53,12 +60,50 @@ class TrainerWorkshopMapping(Base):
     workshop = relationship("Workshop", back_populates="trainers")
 
 
+class SubstepProgress(Base):
+    """Current status of each substep for each student, upserted on every update."""
+
+    __tablename__ = "substep_progress"
+    __table_args__ = (
+        # Covers the per-student summary, which never reads the table itself.
+        Index("ix_substep_progress_summary", "user_id", "workshop_id", "step_id", "status"),
+    )
+    user_id = Column(Integer, primary_key=True)
+    workshop_id = Column(Integer, primary_key=True)
+    substep_id = Column(Integer, primary_key=True)
+    step_id = Column(Integer, nullable=False)
+    status = Column(String(20), nullable=False, default="in_progress")  # in_progress, completed
+    updated_at = Column(DateTime(timezone=False), nullable=False, default=datetime.utcnow)
+
+
 class StudentWorkshopProgress(Base):
+    """Append-only log of progress updates, written when PROGRESS_LOG_ENABLED.
+
+    On PostgreSQL the table is partitioned by month of `updated_at`, so old
+    history can be detached or dropped a partition at a time; the partition
+    key is therefore part of the primary key.  Rows are told apart by `id`,
+    so updates recorded at the same instant never collide.
+    """
+
     __tablename__ = "student_workshop_progress"
-    id = Column(Integer, primary_key=True, index=True)
+    __table_args__ = {"postgresql_partition_by": "RANGE (updated_at)"}
+    # Same sequence as the SERIAL id of tables created before partitioning.
+    id = Column(
+        BigInteger().with_variant(Integer, "sqlite"),
+        Sequence("student_workshop_progress_id_seq"),
+        primary_key=True,
+    )
+    updated_at = Column(DateTime(timezone=False), primary_key=True, default=datetime.utcnow)
     user_id = Column(Integer, nullable=False)
     workshop_id = Column(Integer, nullable=False)
-    step_id = Column(Integer, nullable=False)
     substep_id = Column(Integer, nullable=False)
+    step_id = Column(Integer, nullable=False)
     status = Column(String(20), nullable=False, default="in_progress")  # in_progress, completed
-    updated_at = Column(DateTime(timezone=False), server_default=func.now(), onupdate=func.now())
\ No newline at end of file
+
+
+@compiles(PrimaryKeyConstraint, "sqlite")
+def _progress_log_key_on_sqlite(constraint, compiler, **kw):
+    # SQLite numbers only a single-column integer key, so there the log is keyed by `id` alone.
+    if constraint.table is StudentWorkshopProgress.__table__:
+        return "PRIMARY KEY (id)"
+    return compiler.visit_primary_key_constraint(constraint, **kw)
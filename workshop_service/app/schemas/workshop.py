@@ -2,6 +2,7 @@
 Pydantic models for workshop API requests and responses.
 """
 
+from datetime import datetime
 from typing import List, Optional
 from pydantic import BaseModel
 
@@ -51,9 +52,55 @@ class WorkshopOut(BaseModel):
         orm_mode = True
 
 
+class ImportLineOut(BaseModel):
+    line: int
+    id: Optional[int] = None
+    error: Optional[str] = None
+
+
+class ImportResultOut(BaseModel):
+    imported: int
+    failed: int
+    results: List[ImportLineOut]
+
+
 class ProgressUpdate(BaseModel):
     user_id: int
     workshop_id: int
     step_id: int
     substep_id: int
-    status: str
\ No newline at end of file
+    status: str
+
+
+class SubstepProgressOut(BaseModel):
+    user_id: int
+    workshop_id: int
+    step_id: int
+    substep_id: int
+    status: str
+    updated_at: datetime
+
+    class Config:
+        orm_mode = True
+
+
+class ProgressBatchItemOut(BaseModel):
+    index: int
+    status: str  # recorded, invalid
+    error: Optional[str] = None
+
+
+class StepProgressOut(BaseModel):
+    step_id: int
+    completed_substeps: int
+    total_substeps: int
+    percent_complete: float
+
+
+class ProgressSummaryOut(BaseModel):
+    workshop_id: int
+    user_id: int
+    completed_substeps: int
+    total_substeps: int
+    percent_complete: float
+    steps: List[StepProgressOut]
\ No newline at end of file
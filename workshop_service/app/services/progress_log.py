@@ -0,0 +1,70 @@
+"""
+Monthly partitions for the progress log.
+
+`student_workshop_progress` is range-partitioned by `updated_at` on
+PostgreSQL.  Partitions for the current month and the next
+`PROGRESS_LOG_PARTITIONS_AHEAD` months are created at startup, and a
+default partition catches anything outside them so inserts never fail.
+Retiring history is a `DETACH PARTITION` / `DROP TABLE` of a past month.
+
+A table created before partitioning is left as it is and keeps working
+unpartitioned.  To partition it, rename it, restart the service so the
+partitioned table is created, then copy the rows across with
+`INSERT INTO student_workshop_progress SELECT ... FROM` the old table.
+"""
+
+import logging
+import os
+from datetime import date
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_LOG_ENABLED = os.getenv("PROGRESS_LOG_ENABLED", "true").lower() == "true"
+PARTITIONS_AHEAD = int(os.getenv("PROGRESS_LOG_PARTITIONS_AHEAD", "3"))
+
+TABLE = "student_workshop_progress"
+
+
+def _add_months(month: date, count: int) -> date:
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def ensure_partitions(engine: Engine, today: Optional[date] = None, ahead: int = PARTITIONS_AHEAD) -> None:
+    """Create the default partition and the monthly ones up to `ahead` months out."""
+    if engine.dialect.name != "postgresql":
+        return
+    with engine.begin() as connection:
+        relkind = connection.execute(
+            text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:table)"), {"table": TABLE}
+        ).scalar()
+    if relkind != "p":
+        logger.warning(
+            "%s is not partitioned; skipping its partitions. See %s for how to migrate it.", TABLE, __name__
+        )
+        return
+    try:
+        with engine.begin() as connection:
+            connection.execute(text(f"CREATE TABLE IF NOT EXISTS {TABLE}_default PARTITION OF {TABLE} DEFAULT"))
+    except Exception:
+        logger.exception("Could not create the default progress log partition")
+    first = (today or date.today()).replace(day=1)
+    for offset in range(ahead + 1):
+        start = _add_months(first, offset)
+        end = _add_months(start, 1)
+        try:
+            with engine.begin() as connection:
+                connection.execute(
+                    text(
+                        f"CREATE TABLE IF NOT EXISTS {TABLE}_{start:%Y%m} PARTITION OF {TABLE} "
+                        f"FOR VALUES FROM ('{start}') TO ('{end}')"
+                    )
+                )
+        except Exception:
+            # Fails only when the default partition already holds rows for
+            # that month; they stay there until moved by hand.
+            logger.exception("Could not create progress log partition for %s", start)
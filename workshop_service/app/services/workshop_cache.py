@@ -0,0 +1,100 @@
+"""
+Cached, pre-serialized workshop trees.
+
+A cohort reads the same workshop over and over, so the tree is loaded
+once with `selectinload` (three queries whatever its size), serialized to
+JSON once and kept as immutable bytes together with a strong ETag built
+from the workshop's `version` and a digest of the body.  Reads are then a
+dictionary lookup and `If-None-Match` revalidations cost nothing.
+
+Writing a workshop, step or substep through the ORM bumps the workshop's
+`version` and drops its entry (see `sukhverse_common.versioned_cache`);
+other processes reload after `WORKSHOP_CACHE_TTL_SECONDS`.
+"""
+
+import hashlib
+import os
+from typing import NamedTuple, Optional
+
+from sqlalchemy.orm import Session, selectinload
+
+from sukhverse_common.versioned_cache import VersionedCache, track_versions
+
+from .. import database
+from ..models.workshop import Step, Substep, Workshop
+from ..schemas.workshop import WorkshopOut
+
+CACHE_SIZE = int(os.getenv("WORKSHOP_CACHE_SIZE", "1024"))
+CACHE_TTL_SECONDS = float(os.getenv("WORKSHOP_CACHE_TTL_SECONDS", "30"))
+
+
+class CachedWorkshop(NamedTuple):
+    version: int
+    etag: str
+    body: bytes
+    expires_at: float
+
+
+cache = VersionedCache(CACHE_SIZE, CACHE_TTL_SECONDS)
+
+
+def load_workshop(db: Session, workshop_id: int) -> Optional[Workshop]:
+    """The workshop with its steps and substeps, in three queries."""
+    return (
+        db.query(Workshop)
+        .options(selectinload(Workshop.steps).selectinload(Step.substeps))
+        .filter(Workshop.id == workshop_id)
+        .first()
+    )
+
+
+def render(workshop: Workshop) -> CachedWorkshop:
+    body = WorkshopOut.from_orm(workshop).json().encode()
+    digest = hashlib.blake2b(body, digest_size=8).hexdigest()
+    return CachedWorkshop(
+        version=workshop.version,
+        etag=f'"{workshop.id}-{workshop.version}-{digest}"',
+        body=body,
+        expires_at=cache.expiry(),
+    )
+
+
+def load_entry(db: Session, workshop_id: int) -> Optional[CachedWorkshop]:
+    workshop = load_workshop(db, workshop_id)
+    return render(workshop) if workshop is not None else None
+
+
+async def fetch(workshop_id: int) -> Optional[CachedWorkshop]:
+    """The cached workshop, loading and caching it on a miss; None if it does not exist."""
+    entry = cache.get(workshop_id)
+    if entry is not None:
+        return entry
+    generation = cache.generation(workshop_id)
+    async with database.async_db.session() as db:
+        entry = await db.run_sync(load_entry, workshop_id)
+    if entry is None:
+        return None
+    cache.put(workshop_id, entry, generation)
+    return entry
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """`If-None-Match` comparison, which per RFC 9110 ignores the weak prefix."""
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or any(candidate.removeprefix("W/") == etag for candidate in candidates)
+
+
+def _workshop_id(session: Session, instance: object) -> Optional[int]:
+    if isinstance(instance, Workshop):
+        return instance.id
+    if isinstance(instance, Step):
+        return instance.workshop_id or (instance.workshop.id if instance.workshop else None)
+    if isinstance(instance, Substep):
+        step = instance.step or (session.get(Step, instance.step_id) if instance.step_id else None)
+        return _workshop_id(session, step) if step is not None else None
+    return None
+
+
+track_versions(cache, Workshop, _workshop_id)
@@ -2,65 +2,256 @@
 Business logic for the workshop service.
 """
 
+from datetime import datetime
+from typing import Any, Dict, List, Tuple
+
+from pydantic import ValidationError
+
+from sqlalchemy import case, func
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import Session
-from ..models.workshop import Workshop, Step, Substep, TrainerWorkshopMapping, StudentWorkshopProgress
+
+from sukhverse_common import pagination
+from sukhverse_common.bulk import insert_returning_ids
+
+from ..models.workshop import Workshop, Step, Substep, TrainerWorkshopMapping, StudentWorkshopProgress, SubstepProgress
 from ..schemas.workshop import WorkshopCreate, StepCreate, SubstepCreate, ProgressUpdate
-from ..events.producer import publish_event
+from ..events.producer import publish_events
+from .progress_log import PROGRESS_LOG_ENABLED
+from .workshop_cache import load_workshop
 
 
-def create_workshop(db: Session, workshop_in: WorkshopCreate, creator_user_id: int) -> Workshop:
-    workshop = Workshop(
-        title=workshop_in.title,
-        description=workshop_in.description,
-        creator_user_id=creator_user_id,
+def insert_workshops(db: Session, workshops_in: List[WorkshopCreate], creator_user_id: int) -> List[int]:
+    """Insert workshop trees and queue their `workshop_created` events, without committing.
+
+    Each level (workshops, steps, substeps) is written with one statement
+    for the whole batch, whatever the number or size of the trees.
+    """
+    workshop_ids = insert_returning_ids(
+        db,
+        Workshop.__table__,
+        [
+            {"title": workshop_in.title, "description": workshop_in.description, "creator_user_id": creator_user_id}
+            for workshop_in in workshops_in
+        ],
     )
-    db.add(workshop)
-    db.flush()  # assign ID before adding steps
-    for step_data in workshop_in.steps:
-        step = Step(
-            workshop_id=workshop.id,
-            title=step_data.title,
-            step_type=step_data.step_type,
-        )
-        db.add(step)
-        db.flush()
-        for sub_data in step_data.substeps:
-            sub = Substep(
-                step_id=step.id,
-                title=sub_data.title,
-                substep_type=sub_data.substep_type,
-                order_index=sub_data.order_index,
-            )
-            db.add(sub)
+    steps = [
+        (workshop_id, step_data)
+        for workshop_id, workshop_in in zip(workshop_ids, workshops_in)
+        for step_data in workshop_in.steps
+    ]
+    step_ids = insert_returning_ids(
+        db,
+        Step.__table__,
+        [
+            {"workshop_id": workshop_id, "title": step_data.title, "step_type": step_data.step_type}
+            for workshop_id, step_data in steps
+        ],
+    )
+    substeps = [
+        {
+            "step_id": step_id,
+            "title": sub_data.title,
+            "substep_type": sub_data.substep_type,
+            "order_index": sub_data.order_index,
+        }
+        for step_id, (_, step_data) in zip(step_ids, steps)
+        for sub_data in step_data.substeps
+    ]
+    if substeps:
+        db.execute(Substep.__table__.insert(), substeps)
+    publish_events(
+        "workshop_created",
+        [
+            {
+                "workshop_id": workshop_id,
+                "creator_user_id": creator_user_id,
+                "total_substeps": sum(len(step_data.substeps) for step_data in workshop_in.steps),
+            }
+            for workshop_id, workshop_in in zip(workshop_ids, workshops_in)
+        ],
+        db=db,
+    )
+    return workshop_ids
+
+
+def create_workshop(db: Session, workshop_in: WorkshopCreate, creator_user_id: int) -> Workshop:
+    workshop_id = insert_workshops(db, [workshop_in], creator_user_id)[0]
     db.commit()
-    db.refresh(workshop)
-    publish_event("workshop_created", {"workshop_id": workshop.id, "creator_user_id": creator_user_id})
-    return workshop
+    return load_workshop(db, workshop_id)
+
+
+def import_workshops(db: Session, lines: List[Tuple[int, bytes]], creator_user_id: int) -> List[Dict]:
+    """Create the workshops of a batch of JSON Lines in one transaction.
+
+    Lines are validated on their own, so a bad line is reported and
+    skipped without rejecting the rest of the batch.
+    """
+    results: List[Dict] = []
+    valid: List[Dict] = []
+    workshops_in: List[WorkshopCreate] = []
+    for line, raw in lines:
+        try:
+            workshops_in.append(WorkshopCreate.parse_raw(raw))
+        except ValidationError as exc:
+            results.append({"line": line, "id": None, "error": _describe(exc)})
+            continue
+        result = {"line": line, "id": None, "error": None}
+        results.append(result)
+        valid.append(result)
+    if workshops_in:
+        for result, workshop_id in zip(valid, insert_workshops(db, workshops_in, creator_user_id)):
+            result["id"] = workshop_id
+        db.commit()
+    return results
 
 
 def get_workshop(db: Session, workshop_id: int) -> Workshop | None:
-    return db.query(Workshop).filter(Workshop.id == workshop_id).first()
+    return load_workshop(db, workshop_id)
 
 
-def update_progress(db: Session, progress: ProgressUpdate) -> StudentWorkshopProgress:
-    record = StudentWorkshopProgress(
-        user_id=progress.user_id,
-        workshop_id=progress.workshop_id,
-        step_id=progress.step_id,
-        substep_id=progress.substep_id,
-        status=progress.status,
-    )
-    db.add(record)
-    db.commit()
-    db.refresh(record)
-    publish_event(
-        "step_completed" if progress.status == "completed" else "step_updated",
-        {
+def _insert(db: Session):
+    return postgresql.insert if db.bind.dialect.name == "postgresql" else sqlite.insert
+
+
+def _describe(exc: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(part) for part in e['loc'])}: {e['msg']}" for e in exc.errors())
+
+
+def percent(completed: int, total: int) -> float:
+    return round(min(100.0, 100.0 * completed / total), 1) if total else 0.0
+
+
+def _progress_topic(message: Dict) -> str:
+    return "step_completed" if message["status"] == "completed" else "step_updated"
+
+
+def _progress_event(progress: ProgressUpdate) -> Dict:
+    return {
+        "user_id": progress.user_id,
+        "workshop_id": progress.workshop_id,
+        "step_id": progress.step_id,
+        "substep_id": progress.substep_id,
+        "status": progress.status,
+    }
+
+
+def record_progress(db: Session, updates: List[ProgressUpdate]) -> None:
+    """Record substep statuses in one transaction.
+
+    The current state is written with one multi-row upsert, the log with one
+    multi-row insert and the events with one outbox insert, whatever the
+    batch size.  When a batch updates a substep more than once the last
+    update wins the current state, while the log and the events keep
+    every update.
+    """
+    if not updates:
+        return
+    now = datetime.utcnow()
+    latest = {
+        (progress.user_id, progress.workshop_id, progress.substep_id): {
             "user_id": progress.user_id,
             "workshop_id": progress.workshop_id,
-            "step_id": progress.step_id,
             "substep_id": progress.substep_id,
+            "step_id": progress.step_id,
             "status": progress.status,
-        },
+            "updated_at": now,
+        }
+        for progress in updates
+    }
+    rows = list(latest.values())
+    stmt = _insert(db)(SubstepProgress.__table__).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[SubstepProgress.user_id, SubstepProgress.workshop_id, SubstepProgress.substep_id],
+        set_={"step_id": stmt.excluded.step_id, "status": stmt.excluded.status, "updated_at": stmt.excluded.updated_at},
+    )
+    db.execute(stmt)
+    if PROGRESS_LOG_ENABLED:
+        # Every row of the batch carries the time it was recorded; `id` keeps their order.
+        log = [
+            {
+                "user_id": progress.user_id,
+                "workshop_id": progress.workshop_id,
+                "substep_id": progress.substep_id,
+                "step_id": progress.step_id,
+                "status": progress.status,
+                "updated_at": now,
+            }
+            for progress in updates
+        ]
+        db.execute(StudentWorkshopProgress.__table__.insert().values(log))
+    publish_events(_progress_topic, [_progress_event(progress) for progress in updates], db=db)
+    db.commit()
+
+
+def update_progress(db: Session, progress: ProgressUpdate) -> None:
+    """Record one substep status: upsert the current state and, optionally, append to the log."""
+    record_progress(db, [progress])
+
+
+def record_progress_batch(db: Session, items: List[Any]) -> List[Dict]:
+    """Validate each item on its own, record the valid ones together and report per item."""
+    results: List[Dict] = []
+    updates: List[ProgressUpdate] = []
+    for index, item in enumerate(items):
+        try:
+            updates.append(ProgressUpdate.parse_obj(item))
+        except ValidationError as exc:
+            results.append({"index": index, "status": "invalid", "error": _describe(exc)})
+            continue
+        results.append({"index": index, "status": "recorded", "error": None})
+    record_progress(db, updates)
+    return results
+
+
+def get_progress_summary(db: Session, workshop_id: int, user_id: int) -> Dict | None:
+    """Completed substeps of one student in a workshop, overall and per step."""
+    if not db.query(Workshop.id).filter(Workshop.id == workshop_id).first():
+        return None
+    totals = (
+        db.query(Step.id, func.count(Substep.id))
+        .outerjoin(Substep, Substep.step_id == Step.id)
+        .filter(Step.workshop_id == workshop_id)
+        .group_by(Step.id)
+        .order_by(Step.id)
+        .all()
     )
-    return record
\ No newline at end of file
+    # Answered from ix_substep_progress_summary alone.
+    completed = dict(
+        db.query(
+            SubstepProgress.step_id,
+            func.sum(case((SubstepProgress.status == "completed", 1), else_=0)),
+        )
+        .filter(SubstepProgress.user_id == user_id, SubstepProgress.workshop_id == workshop_id)
+        .group_by(SubstepProgress.step_id)
+        .all()
+    )
+    steps = [
+        {
+            "step_id": step_id,
+            "completed_substeps": completed.get(step_id, 0),
+            "total_substeps": total,
+            "percent_complete": percent(completed.get(step_id, 0), total),
+        }
+        for step_id, total in totals
+    ]
+    done = sum(step["completed_substeps"] for step in steps)
+    total = sum(step["total_substeps"] for step in steps)
+    return {
+        "workshop_id": workshop_id,
+        "user_id": user_id,
+        "completed_substeps": done,
+        "total_substeps": total,
+        "percent_complete": percent(done, total),
+        "steps": steps,
+    }
+
+
+def list_user_progress(
+    db: Session, user_id: int, cursor: str | None, limit: int, workshop_id: int | None = None
+) -> pagination.Page:
+    """A student's substep states in primary key order, so pages are read straight off the key."""
+    query = db.query(SubstepProgress).filter(SubstepProgress.user_id == user_id)
+    if workshop_id is not None:
+        query = query.filter(SubstepProgress.workshop_id == workshop_id)
+    return pagination.paginate(query, [SubstepProgress.workshop_id, SubstepProgress.substep_id], cursor, limit)
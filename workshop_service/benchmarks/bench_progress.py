@@ -0,0 +1,68 @@
+"""
+Compare per-update and batched progress ingestion.
+
+Posts the same stream of substep updates through `POST /workshops/progress`
+one call at a time and through `POST /workshops/progress:batch` in
+batches, against a SQLite database with the outbox relay off, and reports
+updates per second for each.  Usage (from the repo root):
+
+    python -m workshop_service.benchmarks.bench_progress --updates 5000 --batch-size 500
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+DB_PATH = os.path.join(tempfile.gettempdir(), "bench_workshop_progress.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{DB_PATH}")
+os.environ.setdefault("OUTBOX_RELAY_ENABLED", "false")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from workshop_service.app.main import create_app  # noqa: E402
+
+
+def updates(count: int, students: int, substeps: int):
+    rng = random.Random(7)
+    return [
+        {
+            "user_id": rng.randint(1, students),
+            "workshop_id": 1,
+            "step_id": 1,
+            "substep_id": rng.randint(1, substeps),
+            "status": "completed" if rng.random() < 0.8 else "in_progress",
+        }
+        for _ in range(count)
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--updates", type=int, default=5000)
+    parser.add_argument("--students", type=int, default=500)
+    parser.add_argument("--substeps", type=int, default=40)
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    payload = updates(args.updates, args.students, args.substeps)
+    with TestClient(create_app()) as client:
+        started = time.perf_counter()
+        for update in payload:
+            client.post("/workshops/progress", json=update).raise_for_status()
+        single = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for start in range(0, len(payload), args.batch_size):
+            client.post("/workshops/progress:batch", json=payload[start : start + args.batch_size]).raise_for_status()
+        batched = time.perf_counter() - started
+
+    print(f"POST /workshops/progress:       {args.updates / single:,.0f} updates/s ({single:.2f}s)")
+    print(f"POST /workshops/progress:batch: {args.updates / batched:,.0f} updates/s ({batched:.2f}s, "
+          f"batches of {args.batch_size}, {single / batched:.0f}x)")
+    os.remove(DB_PATH)
+
+
+if __name__ == "__main__":
+    main()
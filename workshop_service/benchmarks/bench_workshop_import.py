@@ -0,0 +1,67 @@
+"""
+Compare creating workshops one request at a time with a JSON Lines import.
+
+Creates the same workshop trees through `POST /workshops` and through
+`POST /workshops:import`, against a SQLite database with the outbox relay
+off, and reports workshops per second for each.  Usage (from the repo root):
+
+    python -m workshop_service.benchmarks.bench_workshop_import --workshops 500 --steps 8 --substeps 10
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+DB_PATH = os.path.join(tempfile.gettempdir(), "bench_workshop_import.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{DB_PATH}")
+os.environ.setdefault("OUTBOX_RELAY_ENABLED", "false")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from workshop_service.app.main import create_app  # noqa: E402
+
+
+def tree(n: int, steps: int, substeps: int):
+    return {
+        "title": f"Workshop {n}",
+        "steps": [
+            {
+                "title": f"Step {s}",
+                "step_type": "theory",
+                "substeps": [{"title": f"{s}.{i}", "substep_type": "content", "order_index": i} for i in range(substeps)],
+            }
+            for s in range(steps)
+        ],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workshops", type=int, default=500)
+    parser.add_argument("--steps", type=int, default=8)
+    parser.add_argument("--substeps", type=int, default=10)
+    args = parser.parse_args()
+
+    trees = [tree(n, args.steps, args.substeps) for n in range(args.workshops)]
+    body = "\n".join(json.dumps(t) for t in trees).encode()
+    with TestClient(create_app()) as client:
+        started = time.perf_counter()
+        for t in trees:
+            client.post("/workshops", json=t).raise_for_status()
+        single = time.perf_counter() - started
+
+        started = time.perf_counter()
+        response = client.post("/workshops:import", content=body)
+        response.raise_for_status()
+        imported = time.perf_counter() - started
+        assert response.json()["imported"] == args.workshops
+
+    print(f"POST /workshops:        {args.workshops / single:,.0f} workshops/s ({single:.2f}s)")
+    print(f"POST /workshops:import: {args.workshops / imported:,.0f} workshops/s ({imported:.2f}s, {single / imported:.0f}x)")
+    os.remove(DB_PATH)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Measure `GET /workshops/{id}` for a hot workshop.
+
+Drives the ASGI app directly (no sockets or HTTP parsing), so the numbers
+are the application's own cost per request on one worker:
+
+* uncached: the previous implementation, lazy-loading steps and substeps
+  and serializing through `WorkshopOut` on every request,
+* cached: the pre-serialized body,
+* revalidated: `If-None-Match` with the current ETag (304).
+
+Usage (from the repo root):
+
+    python -m workshop_service.benchmarks.bench_workshop_reads --requests 20000
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+DB_PATH = os.path.join(tempfile.gettempdir(), "bench_workshop_reads.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{DB_PATH}")
+os.environ.setdefault("OUTBOX_RELAY_ENABLED", "false")
+
+from fastapi import Depends, FastAPI  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from workshop_service.app import database  # noqa: E402
+from workshop_service.app.main import create_app  # noqa: E402
+from workshop_service.app.models.workshop import Workshop  # noqa: E402
+from workshop_service.app.schemas.workshop import StepCreate, SubstepCreate, WorkshopCreate, WorkshopOut  # noqa: E402
+from workshop_service.app.services import workshop_service  # noqa: E402
+from workshop_service.app.services.workshop_cache import cache  # noqa: E402
+
+
+def uncached_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/workshops/{workshop_id}", response_model=WorkshopOut)
+    def get_workshop_route(workshop_id: int, db: Session = Depends(database.get_db)):
+        return db.query(Workshop).filter(Workshop.id == workshop_id).first()
+
+    return app
+
+
+async def drive(app, path: str, requests: int, headers=()) -> float:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"host", b"bench")] + [(k.encode(), v.encode()) for k, v in headers],
+        "client": ("127.0.0.1", 1),
+        "server": ("bench", 80),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    statuses = []
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            statuses.append(message["status"])
+
+    started = time.perf_counter()
+    for _ in range(requests):
+        await app(scope, receive, send)
+    elapsed = time.perf_counter() - started
+    assert set(statuses) <= {200, 304}, set(statuses)
+    return requests / elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--steps", type=int, default=8)
+    parser.add_argument("--substeps", type=int, default=6)
+    args = parser.parse_args()
+
+    app = create_app()
+    db = database.SessionLocal()
+    workshop = workshop_service.create_workshop(
+        db,
+        WorkshopCreate(
+            title="Bench",
+            steps=[
+                StepCreate(
+                    title=f"Step {n}",
+                    step_type="theory",
+                    substeps=[SubstepCreate(title=f"{n}.{i}", substep_type="content", order_index=i) for i in range(args.substeps)],
+                )
+                for n in range(args.steps)
+            ],
+        ),
+        creator_user_id=1,
+    )
+    path = f"/workshops/{workshop.id}"
+    db.close()
+
+    async def run():
+        legacy = await drive(uncached_app(), path, max(args.requests // 10, 100))
+        cached = await drive(app, path, args.requests)
+        etag = cache.get(workshop.id).etag
+        revalidated = await drive(app, path, args.requests, headers=[("if-none-match", etag)])
+        return legacy, cached, revalidated
+
+    legacy, cached, revalidated = asyncio.run(run())
+    print(f"{args.steps} steps x {args.substeps} substeps, one worker, in-process ASGI")
+    print(f"uncached (lazy N+1): {legacy:>8,.0f} req/s")
+    print(f"cached body:         {cached:>8,.0f} req/s")
+    print(f"304 revalidation:    {revalidated:>8,.0f} req/s")
+    os.remove(DB_PATH)
+
+
+if __name__ == "__main__":
+    main()
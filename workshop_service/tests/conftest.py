@@ -0,0 +1,65 @@
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from sukhverse_common.db import engine_options
+
+
+@pytest.fixture()
+def client(monkeypatch):
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    yield from make_client(monkeypatch, engine)
+
+
+@pytest.fixture()
+def async_client(monkeypatch, tmp_path):
+    """`client` with the async routes on an aiosqlite engine over a database file."""
+    url = f"sqlite:///{tmp_path / 'workshop.db'}"
+    engine = create_engine(url, **engine_options(url))
+    yield from make_client(monkeypatch, engine, async_url=url)
+
+
+def make_client(monkeypatch, engine, async_url=None):
+    os.environ.setdefault("OUTBOX_RELAY_ENABLED", "false")
+
+    from workshop_service.app import database as database_module
+    from workshop_service.app.models.base import Base
+
+    TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+    monkeypatch.setattr(database_module, "engine", engine)
+    monkeypatch.setattr(database_module, "SessionLocal", TestingSessionLocal)
+    if async_url:
+        monkeypatch.setattr(database_module.async_db, "url", async_url)
+        monkeypatch.setattr(database_module.async_db, "enabled", True)
+
+    from workshop_service.app.main import create_app
+    from workshop_service.app.database import get_db
+    from workshop_service.app.services.workshop_cache import cache
+
+    cache.clear()
+
+    def override_get_db():
+        db = TestingSessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app = create_app()
+    app.dependency_overrides[get_db] = override_get_db
+
+    with TestClient(app) as c:
+        c.session_factory = TestingSessionLocal
+        c.engine = engine
+        c.async_db = database_module.async_db
+        yield c
@@ -0,0 +1,22 @@
+import pytest
+from sqlalchemy import event
+
+from workshop_service.tests import test_progress, test_workshops
+
+# The hot routes behave the same on async sessions; re-run their tests there.
+CASES = [
+    test_progress.test_progress_keeps_one_state_row_per_substep_and_logs_every_update,
+    test_progress.test_progress_summary_counts_completed_substeps,
+    test_progress.test_batch_records_valid_items_in_one_go_and_reports_each,
+    test_progress.test_user_progress_is_listed_in_key_order_pages,
+    test_workshops.test_if_none_match_gets_a_304,
+    test_workshops.test_orm_writes_bump_the_version_and_invalidate,
+]
+
+
+@pytest.mark.parametrize("case", CASES, ids=lambda case: case.__name__)
+def test_hot_routes_on_async_sessions(async_client, case):
+    statements = []
+    event.listen(async_client.async_db.engine.sync_engine, "before_cursor_execute", lambda *a: statements.append(a[2]))
+    case(async_client)
+    assert statements
@@ -0,0 +1,147 @@
+from workshop_service.app.models.outbox import OutboxEvent
+from workshop_service.app.models.workshop import StudentWorkshopProgress, SubstepProgress
+
+
+def create_workshop(client, substeps_per_step=(2, 3)):
+    body = {
+        "title": "Intro",
+        "steps": [
+            {
+                "title": f"Step {n}",
+                "step_type": "theory",
+                "substeps": [{"title": f"{n}.{i}", "substep_type": "content", "order_index": i} for i in range(count)],
+            }
+            for n, count in enumerate(substeps_per_step)
+        ],
+    }
+    return client.post("/workshops", json=body).json()
+
+
+def progress(client, workshop, user_id, step, substep, status="completed"):
+    step_id = workshop["steps"][step]["id"]
+    substep_id = workshop["steps"][step]["substeps"][substep]["id"]
+    body = {"user_id": user_id, "workshop_id": workshop["id"], "step_id": step_id, "substep_id": substep_id, "status": status}
+    response = client.post("/workshops/progress", json=body)
+    assert response.status_code == 201
+
+
+def test_progress_keeps_one_state_row_per_substep_and_logs_every_update(client):
+    workshop = create_workshop(client)
+    progress(client, workshop, 7, 0, 0, status="in_progress")
+    progress(client, workshop, 7, 0, 0)
+    progress(client, workshop, 7, 0, 1)
+
+    with client.session_factory() as db:
+        states = {(row.substep_id, row.status) for row in db.query(SubstepProgress)}
+        assert states == {
+            (workshop["steps"][0]["substeps"][0]["id"], "completed"),
+            (workshop["steps"][0]["substeps"][1]["id"], "completed"),
+        }
+        assert db.query(StudentWorkshopProgress).count() == 3
+        topics = [event.topic for event in db.query(OutboxEvent).order_by(OutboxEvent.id)]
+        assert topics == ["workshop_created", "step_updated", "step_completed", "step_completed"]
+
+
+def test_progress_summary_counts_completed_substeps(client):
+    workshop = create_workshop(client)
+    progress(client, workshop, 7, 0, 0)
+    progress(client, workshop, 7, 0, 1)
+    progress(client, workshop, 7, 1, 0)
+    progress(client, workshop, 7, 1, 1, status="in_progress")
+    progress(client, workshop, 8, 1, 2)
+
+    body = client.get(f"/workshops/{workshop['id']}/progress/7").json()
+    assert (body["completed_substeps"], body["total_substeps"], body["percent_complete"]) == (3, 5, 60.0)
+    assert [(s["completed_substeps"], s["total_substeps"], s["percent_complete"]) for s in body["steps"]] == [
+        (2, 2, 100.0),
+        (1, 3, 33.3),
+    ]
+
+    # Marking a completed substep in progress again takes it out of the count.
+    progress(client, workshop, 7, 0, 0, status="in_progress")
+    assert client.get(f"/workshops/{workshop['id']}/progress/7").json()["completed_substeps"] == 2
+    assert client.get(f"/workshops/{workshop['id']}/progress/9").json()["percent_complete"] == 0.0
+    assert client.get("/workshops/999/progress/7").status_code == 404
+
+
+def test_batch_records_valid_items_in_one_go_and_reports_each(client):
+    workshop = create_workshop(client)
+    first, second = (workshop["steps"][0]["substeps"][i]["id"] for i in (0, 1))
+    step_id = workshop["steps"][0]["id"]
+
+    def item(user_id, substep_id, status):
+        return {"user_id": user_id, "workshop_id": workshop["id"], "step_id": step_id, "substep_id": substep_id, "status": status}
+
+    response = client.post(
+        "/workshops/progress:batch",
+        json=[
+            item(7, first, "in_progress"),
+            item(7, first, "completed"),
+            {"user_id": "nobody", "workshop_id": workshop["id"]},
+            item(8, second, "completed"),
+        ],
+    )
+    assert response.status_code == 200
+    results = response.json()
+    assert [r["status"] for r in results] == ["recorded", "recorded", "invalid", "recorded"]
+    assert "user_id" in results[2]["error"]
+
+    with client.session_factory() as db:
+        states = {(row.user_id, row.substep_id): row.status for row in db.query(SubstepProgress)}
+        assert states == {(7, first): "completed", (8, second): "completed"}
+        topics = [event.topic for event in db.query(OutboxEvent).order_by(OutboxEvent.id)][1:]
+        assert topics == ["step_updated", "step_completed", "step_completed"]
+        log = db.query(StudentWorkshopProgress).order_by(StudentWorkshopProgress.id).all()
+        assert [(row.user_id, row.substep_id, row.status) for row in log] == [
+            (7, first, "in_progress"),
+            (7, first, "completed"),
+            (8, second, "completed"),
+        ]
+        assert len({row.updated_at for row in log}) == 1
+    assert client.get(f"/workshops/{workshop['id']}/progress/7").json()["completed_substeps"] == 1
+
+
+def test_updates_recorded_at_the_same_instant_are_all_logged(client, monkeypatch):
+    from datetime import datetime
+
+    from workshop_service.app.services import workshop_service
+
+    instant = datetime(2024, 5, 1, 12, 0)
+
+    class frozen(datetime):
+        @classmethod
+        def utcnow(cls):
+            return instant
+
+    monkeypatch.setattr(workshop_service, "datetime", frozen)
+    workshop = create_workshop(client)
+    progress(client, workshop, 7, 0, 0, status="in_progress")
+    progress(client, workshop, 7, 0, 0)
+
+    with client.session_factory() as db:
+        log = db.query(StudentWorkshopProgress).order_by(StudentWorkshopProgress.id).all()
+        assert [(row.status, row.updated_at) for row in log] == [("in_progress", instant), ("completed", instant)]
+
+
+def test_batch_size_is_capped(client, monkeypatch):
+    from workshop_service.app.api import routes_workshop
+
+    monkeypatch.setattr(routes_workshop, "PROGRESS_BATCH_MAX", 2)
+    assert client.post("/workshops/progress:batch", json=[{}, {}, {}]).status_code == 413
+
+
+def test_user_progress_is_listed_in_key_order_pages(client):
+    first, second = create_workshop(client), create_workshop(client, substeps_per_step=(1,))
+    progress(client, second, 3, 0, 0)
+    for step, substep in [(1, 2), (0, 1), (1, 0)]:
+        progress(client, first, 3, step, substep, status="in_progress")
+    progress(client, first, 4, 0, 0)
+
+    response = client.get("/workshops/user/3/progress", params={"limit": 3})
+    listed = [(p["workshop_id"], p["substep_id"], p["status"]) for p in response.json()]
+    substeps = [s["id"] for step in first["steps"] for s in step["substeps"]]
+    assert listed == [(first["id"], substeps[1], "in_progress"), (first["id"], substeps[2], "in_progress"),
+                      (first["id"], substeps[4], "in_progress")]
+    rest = client.get(response.headers["link"][1:].split(">")[0]).json()
+    assert [(p["workshop_id"], p["status"]) for p in rest] == [(second["id"], "completed")]
+    assert len(client.get("/workshops/user/3/progress", params={"workshop_id": second["id"]}).json()) == 1
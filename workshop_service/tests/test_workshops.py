@@ -0,0 +1,122 @@
+import json
+
+from sqlalchemy import event
+
+from workshop_service.app.models.outbox import OutboxEvent
+from workshop_service.app.models.workshop import Step, Substep, Workshop
+from workshop_service.tests.test_progress import create_workshop
+
+
+def count_queries(engine):
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    return statements
+
+
+def test_tree_is_loaded_in_fixed_queries_and_then_served_from_cache(client):
+    workshop = create_workshop(client, substeps_per_step=(3, 4, 5))
+    statements = count_queries(client.engine)
+
+    first = client.get(f"/workshops/{workshop['id']}")
+    assert first.status_code == 200
+    assert first.json() == workshop
+    assert len(statements) == 3
+
+    second = client.get(f"/workshops/{workshop['id']}")
+    assert second.content == first.content
+    assert len(statements) == 3
+    assert client.get("/workshops/999").status_code == 404
+
+
+def test_if_none_match_gets_a_304(client):
+    workshop = create_workshop(client)
+    etag = client.get(f"/workshops/{workshop['id']}").headers["etag"]
+    assert etag.startswith('"') and not etag.startswith("W/")
+
+    response = client.get(f"/workshops/{workshop['id']}", headers={"If-None-Match": etag})
+    assert (response.status_code, response.content, response.headers["etag"]) == (304, b"", etag)
+    assert client.get(f"/workshops/{workshop['id']}", headers={"If-None-Match": f'"x", W/{etag}'}).status_code == 304
+    assert client.get(f"/workshops/{workshop['id']}", headers={"If-None-Match": '"stale"'}).status_code == 200
+
+
+def test_orm_writes_bump_the_version_and_invalidate(client):
+    workshop = create_workshop(client)
+    etag = client.get(f"/workshops/{workshop['id']}").headers["etag"]
+
+    with client.session_factory() as db:
+        assert db.get(Workshop, workshop["id"]).version == 1
+        substep = db.get(Substep, workshop["steps"][1]["substeps"][0]["id"])
+        substep.title = "Renamed"
+        db.commit()
+        assert db.get(Workshop, workshop["id"]).version == 2
+
+    response = client.get(f"/workshops/{workshop['id']}", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["steps"][1]["substeps"][0]["title"] == "Renamed"
+    assert response.headers["etag"] != etag
+
+    with client.session_factory() as db:
+        db.add(Step(workshop_id=workshop["id"], title="Extra", step_type="code"))
+        db.commit()
+    assert len(client.get(f"/workshops/{workshop['id']}").json()["steps"]) == 3
+
+
+def test_an_edit_during_a_load_keeps_the_stale_tree_out_of_the_cache(client, monkeypatch):
+    from workshop_service.app.services import workshop_cache
+
+    workshop = create_workshop(client)
+    load_entry = workshop_cache.load_entry
+
+    def load_then_edit(db, workshop_id):
+        entry = load_entry(db, workshop_id)
+        with client.session_factory() as other:
+            other.get(Workshop, workshop_id).title = "Renamed"
+            other.commit()
+        return entry
+
+    monkeypatch.setattr(workshop_cache, "load_entry", load_then_edit)
+    stale = client.get(f"/workshops/{workshop['id']}")
+    assert stale.json()["title"] == "Intro"
+    monkeypatch.setattr(workshop_cache, "load_entry", load_entry)
+
+    response = client.get(f"/workshops/{workshop['id']}", headers={"If-None-Match": stale.headers["etag"]})
+    assert response.status_code == 200
+    assert response.json()["title"] == "Renamed"
+
+
+def test_create_writes_one_insert_per_level(client):
+    statements = count_queries(client.engine)
+    small = create_workshop(client, substeps_per_step=(1,))
+    inserts = [statement for statement in statements if statement.startswith("INSERT")]
+    del statements[:]
+    large = create_workshop(client, substeps_per_step=(3, 4, 5, 6))
+
+    assert len(inserts) == 4  # workshops, steps, substeps, outbox
+    assert len([statement for statement in statements if statement.startswith("INSERT")]) == 4
+    assert [len(step["substeps"]) for step in large["steps"]] == [3, 4, 5, 6]
+    assert [sub["order_index"] for sub in large["steps"][3]["substeps"]] == [0, 1, 2, 3, 4, 5]
+    assert large["id"] == small["id"] + 1
+
+
+def test_import_streams_json_lines_and_reports_bad_lines(client, monkeypatch):
+    from workshop_service.app.api import routes_workshop
+
+    monkeypatch.setattr(routes_workshop, "IMPORT_BATCH_SIZE", 2)
+    tree = {
+        "title": "Imported",
+        "steps": [{"title": "S", "step_type": "theory", "substeps": [{"title": "a", "substep_type": "content", "order_index": 0}]}],
+    }
+    lines = [json.dumps(dict(tree, title=f"W{n}")) for n in range(3)]
+    body = "\n".join([lines[0], "", '{"title": "no steps"}', lines[1], "not json", lines[2]]) + "\n"
+
+    response = client.post("/workshops:import", content=body.encode())
+    assert response.status_code == 200
+    result = response.json()
+    assert (result["imported"], result["failed"]) == (3, 2)
+    assert [(r["line"], r["error"] is None) for r in result["results"]] == [
+        (1, True), (3, False), (4, True), (5, False), (6, True),
+    ]
+    ids = [r["id"] for r in result["results"] if r["id"]]
+    assert [client.get(f"/workshops/{workshop_id}").json()["title"] for workshop_id in ids] == ["W0", "W1", "W2"]
+    with client.session_factory() as db:
+        assert db.query(OutboxEvent).filter(OutboxEvent.topic == "workshop_created").count() == 3